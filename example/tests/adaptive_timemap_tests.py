@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the adaptive time maps generated from synthetic profiles.
+
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from grimsel.auxiliary.timemap import AdaptiveTimeMap
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def make_profiles():
+    ''' Daily demand cycle with weekend reduction and a seasonal wind. '''
+
+    hy = np.arange(8760)
+    dmnd = (1 + 0.3 * np.sin(2 * np.pi * hy / 24)
+            - 0.4 * ((hy // 24 + 3) % 7 >= 5))
+    wind = 0.5 + 0.4 * np.cos(2 * np.pi * hy / 8760)
+
+    return pd.DataFrame({'dmnd': dmnd, 'wind': wind}, index=hy)
+
+
+class TestAdaptiveTimeMap(unittest.TestCase):
+
+    def test_constant_profile(self):
+
+        df_prof = make_profiles() * 0 + 1
+        tm = AdaptiveTimeMap(df_prof, tolerance=0.1, max_len=24,
+                             peak_quantile=None)
+        df = tm.df_time_red
+
+        self.assertEqual(df.weight.sum(), 8760)
+        self.assertEqual(df.weight.max(), 24)
+        self.assertEqual(len(df), 365)
+
+    def test_slot_boundaries(self):
+
+        tm = AdaptiveTimeMap(make_profiles(), tolerance=0.2, max_len=12,
+                             peak_quantile=0.99)
+        df_map = tm.df_time_map
+
+        self.assertEqual(tm.df_time_red.weight.sum(), 8760)
+        self.assertLessEqual(tm.df_time_red.weight.max(), 12)
+        self.assertLess(len(tm.df_time_red), 8760)
+
+        # time slots are consecutive and don't span months or weeks
+        self.assertTrue((np.diff(df_map.sy) >= 0).all())
+        self.assertEqual(df_map.groupby('sy')[['mt_id', 'wk_id']]
+                               .nunique().max().tolist(), [1, 1])
+
+    def test_peak_hours(self):
+
+        df_prof = make_profiles() * 0 + 1
+        df_prof.loc[1000, 'dmnd'] = 2
+
+        tm = AdaptiveTimeMap(df_prof, tolerance=0.1, max_len=24,
+                             peak_quantile=0.9999)
+        df_map = tm.df_time_map
+
+        sy_peak = df_map.loc[df_map.hy == 1000, 'sy'].iloc[0]
+        self.assertEqual((df_map.sy == sy_peak).sum(), 1)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
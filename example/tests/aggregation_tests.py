@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the input aggregation: merging of nodes into zones and
+clustering of plants. The input tables are attributes of a simple
+namespace.
+
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from grimsel.core.aggregation import (aggregate_nodes, cluster_plants,
+                                      disaggregate_plants)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def make_model():
+
+    return SimpleNamespace(
+        df_def_node=pd.DataFrame({'nd_id': [0, 1, 2],
+                                  'nd': ['A', 'B', 'C'],
+                                  'price_co2': [40., 50., 60.]}),
+        df_node_encar=pd.DataFrame({'nd_id': [0, 1, 2], 'ca_id': 0,
+                                    'dmnd_pf_id': [10, 11, 12],
+                                    'dmnd_sum': [100., 300., 50.],
+                                    'grid_losses': [0.1, 0.05, 0.]}),
+        df_profdmnd=pd.DataFrame({'dmnd_pf_id': np.repeat([10, 11, 12], 2),
+                                  'hy': [0, 1] * 3,
+                                  'value': [1., 2., 10., 20., 5., 5.]}),
+        df_def_plant=pd.DataFrame({'pp_id': range(6),
+                                   'pp': ['A_GAS_0', 'A_GAS_1', 'A_GAS_2',
+                                          'A_GAS_3', 'A_HYD', 'B_GAS'],
+                                   'nd_id': [0, 0, 0, 0, 0, 1],
+                                   'pt_id': [0, 0, 0, 0, 1, 0],
+                                   'fl_id': [0, 0, 0, 0, 1, 0],
+                                   'set_def_pp': [1, 1, 1, 1, 0, 1],
+                                   'set_def_hyrs': [0, 0, 0, 0, 1, 0]}),
+        df_plant_encar=pd.DataFrame({'pp_id': range(6), 'ca_id': 0,
+                                     'cap_pwr_leg': [100., 300., 200.,
+                                                     200., 50., 100.],
+                                     'pp_eff': [0.30, 0.31, 0.59, 0.60,
+                                                0.9, 0.45]}),
+        df_fuel_node_encar=pd.DataFrame({'fl_id': 0, 'nd_id': [0, 1, 2],
+                                         'ca_id': 0,
+                                         'vc_fl': [20., 30., 40.],
+                                         'erg_inp': [10., 20., 30.]}),
+        df_node_connect=pd.DataFrame({'nd_id': [0, 1, 0],
+                                      'nd_2_id': [1, 2, 2], 'ca_id': 0,
+                                      'mt_id': 0,
+                                      'cap_trme_leg': [500., 200., 100.],
+                                      'cap_trmi_leg': [500., 300., 100.]}),
+        df_hydro=pd.DataFrame({'pp_id': [4], 'min_erg_share': [0.1]}),
+        )
+
+
+class TestAggregateNodes(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = make_model()
+        self.df_nd_aggr = aggregate_nodes(self.m, {'B': 'A'})
+
+    def test_node_map(self):
+
+        self.assertEqual(self.m.df_def_node.nd.tolist(), ['A', 'C'])
+        self.assertEqual(self.m.slct_node_id, [0, 2])
+        self.assertEqual(self.df_nd_aggr.zone.tolist(), ['A', 'A', 'C'])
+        self.assertEqual(self.m.df_def_plant.nd_id.tolist(),
+                         [0, 0, 0, 0, 0, 0])
+
+    def test_demand(self):
+
+        df_ne = self.m.df_node_encar.set_index('nd_id')
+
+        self.assertEqual(df_ne.dmnd_pf_id.tolist(), [10, 12])
+        self.assertEqual(df_ne.dmnd_sum.tolist(), [400., 50.])
+        self.assertAlmostEqual(df_ne.loc[0, 'grid_losses'],
+                               (100 * 0.1 + 300 * 0.05) / 400)
+
+        df_prof = self.m.df_profdmnd.set_index(['dmnd_pf_id', 'hy']).value
+        self.assertEqual(df_prof.loc[10].tolist(), [11., 22.])
+        self.assertEqual(df_prof.loc[12].tolist(), [5., 5.])
+
+    def test_fuels(self):
+
+        df_fne = self.m.df_fuel_node_encar.set_index('nd_id')
+
+        self.assertEqual(df_fne.erg_inp.tolist(), [30., 30.])
+        self.assertEqual(df_fne.vc_fl.tolist(), [25., 40.])
+
+    def test_transmission(self):
+
+        df = self.m.df_node_connect
+
+        self.assertEqual(df[['nd_id', 'nd_2_id']].values.tolist(), [[0, 2]])
+        self.assertEqual(df.cap_trme_leg.tolist(), [300.])
+        self.assertEqual(df.cap_trmi_leg.tolist(), [400.])
+
+    def test_invalid_zone(self):
+
+        with self.assertRaises(ValueError):
+            aggregate_nodes(make_model(), {'B': 'Z'})
+
+
+class TestClusterPlants(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = make_model()
+        self.df_pp_cluster = cluster_plants(self.m, nbins=2)
+
+    def test_clusters(self):
+
+        dict_cl = self.df_pp_cluster.set_index('pp_id').pp_cluster_id
+
+        # efficiency bins within node/type/fuel groups; the hydro plant
+        # (df_hydro) and the single plant of node B are kept
+        self.assertEqual(dict_cl.tolist(), [0, 0, 2, 2, 4, 5])
+        self.assertEqual(self.m.df_def_plant.pp_id.tolist(), [0, 2, 4, 5])
+
+        self.assertEqual(self.df_pp_cluster.groupby('pp_cluster_id')
+                                           .cap_share.sum().tolist(),
+                         [1.] * 4)
+
+    def test_capacity_weighted_parameters(self):
+
+        df = self.m.df_plant_encar.set_index('pp_id')
+
+        self.assertEqual(df.cap_pwr_leg.tolist(), [400., 400., 50., 100.])
+        self.assertAlmostEqual(df.loc[0, 'pp_eff'],
+                               (100 * 0.30 + 300 * 0.31) / 400)
+        self.assertAlmostEqual(df.loc[2, 'pp_eff'], (0.59 + 0.60) / 2)
+
+    def test_disaggregation(self):
+
+        df = pd.DataFrame({'pp_id': [0, 2], 'value': [40., 10.]})
+
+        df = disaggregate_plants(df, self.df_pp_cluster).set_index('pp_id')
+
+        self.assertEqual(df.value.to_dict(), {0: 10., 1: 30.,
+                                              2: 5., 3: 5.})
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the Benders decomposition: the objective value of the decomposed
+solve of a small linear model is compared to the monolithic solve. The
+tests are skipped if the model's solver is not available.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+from grimsel.core.model_base import ModelBase
+from grimsel.core.benders import BendersDecomposition
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+# yearly limits and ramping at the period boundaries are relaxed in the
+# subproblems; the objective values differ slightly
+RTOL = 1e-3
+
+
+def get_model_loop(cl_out):
+
+    mkwargs = {'slct_encar': ['EL'], 'slct_node': ['AT0'], 'nhours': 24,
+               'tm_filt': [('mt_id', [0, 1])],
+               'constraint_groups': ModelBase.get_constraint_groups()}
+    iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                'cl_out': cl_out, 'no_output': True, 'dev_mode': True}
+
+    ml = model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                              iokwargs=iokwargs)
+
+    # linear model: constant efficiencies, no CHP profiles
+    ml.build_model('input_data')
+    ml.m.df_plant_encar['factor_lin_1'] = 0
+    ml.m.df_plant_encar['erg_chp'] = 0
+    ml.build_model()
+
+    ml.select_run(0)
+
+    return ml
+
+
+class TestBendersDecomposition(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        ml = get_model_loop(os.path.join(cls.tmp_dir, 'full.hdf5'))
+
+        if not ml.m.solver.available(exception_flag=False):
+            shutil.rmtree(cls.tmp_dir)
+            raise unittest.SkipTest('Solver not available.')
+
+        ml.m.run()
+        cls.objective_ref = ml.m.objective_value
+
+        ml = get_model_loop(os.path.join(cls.tmp_dir, 'benders.hdf5'))
+        cls.bd = BendersDecomposition(ml, period='mt_id')
+        cls.df_iter = cls.bd.run()
+        cls.objective = ml.m.objective_value
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_converged(self):
+
+        self.assertTrue(self.df_iter.converged.all())
+        self.assertLessEqual(self.df_iter.gap.iloc[-1], self.bd.tol)
+        self.assertTrue((self.df_iter.lower_bound
+                         <= self.df_iter.upper_bound).all())
+
+    def test_objective(self):
+
+        self.assertLess(abs(self.objective - self.objective_ref)
+                        / abs(self.objective_ref), RTOL)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the state transfer between the fine and the coarse model of the
+coarse-to-fine solve. The models are minimal Pyomo models with the set and
+parameter names of the Grimsel model.
+
+"""
+
+import unittest
+
+import pyomo.environ as po
+
+from grimsel.core.coarse_to_fine import CoarseToFine
+from grimsel.core.rolling_horizon import _has_time_index, _is_time_set
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def make_model(nhours):
+
+    nsy = 8760 // nhours
+
+    m = po.ConcreteModel()
+    m.tm = po.Set(initialize=[0], ordered=True)
+    m.sy = po.Set(initialize=range(nsy), ordered=True)
+    m.ppall = po.Set(initialize=[0, 1], ordered=True)
+    m.tmsy = po.Set(within=m.tm * m.sy, ordered=True,
+                    initialize=[(0, sy) for sy in range(nsy)])
+
+    m.weight = po.Param(m.tmsy, mutable=True, initialize=nhours)
+    m.vc_fl = po.Param(m.ppall, mutable=True, initialize=1)
+    m.cap_pwr_new = po.Var(m.ppall)
+    m.pwr = po.Var(m.sy, m.ppall)
+
+    return m
+
+
+class TestSetState(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = make_model(nhours=1)
+        self.m_coarse = make_model(nhours=4)
+
+    def test_time_index_any_position(self):
+
+        self.assertFalse(_is_time_set(self.m.weight.index_set()))
+        self.assertTrue(_has_time_index(self.m.weight.index_set()))
+        self.assertTrue(_has_time_index(self.m.pwr.index_set()))
+        self.assertFalse(_has_time_index(self.m.vc_fl.index_set()))
+
+    def test_coarse_weights_unchanged(self):
+
+        self.m.vc_fl[1] = 3
+        self.m.cap_pwr_new[0].fix(2)
+        self.m.pwr[0, 0].fix(1)
+
+        CoarseToFine._set_state(
+            self.m_coarse, CoarseToFine._get_state(self.m, time_indexed=False),
+            unfix=True)
+
+        weight = sum(po.value(w) for w in self.m_coarse.weight.values())
+        self.assertEqual(weight, 8760)
+
+        self.assertEqual(po.value(self.m_coarse.vc_fl[1]), 3)
+        self.assertTrue(self.m_coarse.cap_pwr_new[0].fixed)
+        self.assertFalse(self.m_coarse.pwr[0, 0].fixed)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the data type policy of the input and output tables.
+
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from grimsel.auxiliary.aux_dtypes import narrow_dtypes, output_dtypes
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestNarrowDtypes(unittest.TestCase):
+
+    def setUp(self):
+
+        self.df = pd.DataFrame({'nd_id': [0, 1, 1, 0], 'pp_id': [0, 1, 2, 3],
+                                'sy': [0., 1., 2., 3.],
+                                'value': [0.1, 0.2, 0.3, 0.4],
+                                'nd': ['AT0', 'CH0', 'CH0', 'AT0'],
+                                'pp': ['a', 'b', 'c', 'd']})
+
+    def test_narrow_dtypes(self):
+
+        df = narrow_dtypes(self.df, float32_cols=['value'])
+
+        self.assertEqual(df.dtypes.astype(str).to_dict(),
+                         {'nd_id': 'int16', 'pp_id': 'int32', 'sy': 'int32',
+                          'value': 'float32', 'nd': 'category',
+                          'pp': 'object'})
+        # input unchanged
+        self.assertEqual(self.df.nd_id.dtype, np.int64)
+
+    def test_values_out_of_range(self):
+
+        df = self.df.assign(nd_id=[0, 1, 2**15, 0],
+                            sy=[0., 1.5, 2., 3.], pp_id=[0, 1, np.nan, 3])
+        df = narrow_dtypes(df, categorical=False)
+
+        self.assertEqual(df.dtypes.astype(str)[['nd_id', 'sy', 'pp_id', 'nd']]
+                           .tolist(), ['int64', 'float64', 'float64',
+                                       'object'])
+
+
+class TestOutputDtypes(unittest.TestCase):
+
+    def test_output_dtypes(self):
+
+        df = pd.DataFrame({'sy': [0, 1], 'pp_id': [0., 1.], 'ca_id': [0, 0],
+                           'bool_out': [True, False], 'value': [1., 2.],
+                           'run_id': [0, 40000], 'foo_id': [1, 2]})
+
+        self.assertEqual(output_dtypes(df),
+                         {'sy': np.dtype('int32'), 'pp_id': np.dtype('int32'),
+                          'ca_id': np.dtype('int16'),
+                          'bool_out': np.dtype('bool'),
+                          'value': np.dtype('float64'),
+                          'run_id': np.dtype('int32'),
+                          'foo_id': np.dtype('int32')})
+
+    def test_id_out_of_range(self):
+
+        df = pd.DataFrame({'nd_id': [0, 2**15], 'run_id': [0, 2**31],
+                           'value': [1., 2.]})
+
+        with self.assertLogs('grimsel.auxiliary.aux_dtypes',
+                             level='WARNING') as cm:
+            dict_dtype = output_dtypes(df)
+
+        self.assertEqual(dict_dtype, {'value': np.dtype('float64')})
+        self.assertEqual(len(cm.output), 2)
+        self.assertIn('nd_id', cm.output[0])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
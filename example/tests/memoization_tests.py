@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the state key of the run memoization. The models are minimal
+Pyomo models with the component names of the Grimsel model.
+
+"""
+
+import shutil
+import unittest
+import tempfile
+from types import SimpleNamespace
+
+import pyomo.environ as po
+
+from grimsel.core.memoization import (get_structure_key, get_state_key,
+                                      record_run, MemoCatalog)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def make_model(nsy=4):
+
+    m = po.ConcreteModel()
+    m.sy = po.Set(initialize=range(nsy), ordered=True)
+    m.pp = po.Set(initialize=[0, 1], ordered=True)
+
+    m.vc_fl = po.Param(m.pp, mutable=True, initialize=10)
+    m.dmnd = po.Param(m.sy, mutable=True, initialize=100)
+    m.pwr = po.Var(m.sy, m.pp, bounds=(0, None))
+    m.cap_pwr_new = po.Var(m.pp, bounds=(0, None))
+
+    m.supply = po.Constraint(m.sy, rule=lambda m, sy: sum(
+                        m.pwr[sy, pp] for pp in m.pp) == m.dmnd[sy])
+    m.objective = po.Objective(expr=sum(m.vc_fl[pp] * m.pwr[sy, pp]
+                                        for sy in m.sy for pp in m.pp))
+
+    return m
+
+
+class TestStateKey(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = make_model()
+        self.structure_key = get_structure_key(self.m)
+        self.key = self.get_key()
+
+    def get_key(self, m=None):
+
+        return get_state_key(m if m else self.m, self.structure_key)
+
+    def test_identical_models(self):
+
+        m = make_model()
+
+        self.assertEqual(get_structure_key(m), self.structure_key)
+        self.assertEqual(self.get_key(m), self.key)
+
+    def test_solution_values_ignored(self):
+
+        self.m.pwr[0, 0].value = 50
+
+        self.assertEqual(self.get_key(), self.key)
+
+    def test_parameter_values(self):
+
+        self.m.vc_fl[1] = 20
+        self.assertNotEqual(self.get_key(), self.key)
+
+        self.m.vc_fl[1] = 10
+        self.assertEqual(self.get_key(), self.key)
+
+    def test_fixed_variables_and_bounds(self):
+
+        self.m.cap_pwr_new[0].fix(0)
+        key_fixed = self.get_key()
+        self.assertNotEqual(key_fixed, self.key)
+
+        self.m.cap_pwr_new[0].fix(1)
+        self.assertNotEqual(self.get_key(), key_fixed)
+
+        self.m.cap_pwr_new[0].unfix()
+        self.m.cap_pwr_new[0].value = None
+        self.assertEqual(self.get_key(), self.key)
+
+        self.m.pwr[0, 0].setub(10)
+        self.assertNotEqual(self.get_key(), self.key)
+
+    def test_deactivated_constraints(self):
+
+        self.m.supply[0].deactivate()
+        self.assertNotEqual(self.get_key(), self.key)
+
+        self.m.supply[0].activate()
+        self.assertEqual(self.get_key(), self.key)
+
+    def test_structure(self):
+
+        self.assertNotEqual(get_structure_key(make_model(nsy=5)),
+                            self.structure_key)
+
+
+class TestRecordRun(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.catalog = MemoCatalog(self.tmp_dir)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def record(self, termination_condition='optimal', skip_runs=False):
+        '''
+        Records run_id 1 with the given solve outcome; returns the catalog
+        entry.
+        '''
+
+        if termination_condition:
+            solver = SimpleNamespace(termination_condition=SimpleNamespace(
+                                            value=termination_condition))
+            results = SimpleNamespace(solver=solver)
+        else:  # pro-forma results of skipped solves
+            results = SimpleNamespace(Solver=[{'Termination condition':
+                                               'Skipped'}])
+
+        m = SimpleNamespace(skip_runs=skip_runs, results=results,
+                            objective_value=10.)
+        modwr = SimpleNamespace(no_output=False, output_target='hdf5')
+        ml = SimpleNamespace(m=m, run_id=1, memo_catalog=self.catalog,
+                             io=SimpleNamespace(modwr=modwr, cl_out='out'))
+
+        record_run(ml, 'key')
+
+        return self.catalog.get('key')
+
+    def test_optimal(self):
+
+        self.assertEqual(self.record(), {'output_target': 'hdf5',
+                                         'cl_out': 'out', 'run_id': 1,
+                                         'objective': 10.})
+
+    def test_not_optimal(self):
+
+        self.assertIsNone(self.record('infeasible'))
+
+    def test_skipped(self):
+
+        self.assertIsNone(self.record(None, skip_runs=True))
+        self.assertIsNone(self.record(skip_runs=True))
+        self.assertIsNone(self.record(None))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the model size estimate. The estimate obtained from the input
+tables is compared to the components of the model built from the
+``csv_files_national_aggr`` input data for a single month.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+
+import pyomo.environ as po
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+from grimsel.core.model_base import ModelBase
+from grimsel.core.model_size import ModelSize, select_nhours
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+
+def make_model_loop(cl_out, nhours):
+
+    mkwargs = {'slct_encar': ['EL'], 'nhours': nhours,
+               'tm_filt': [('mt_id', [0])],
+               'constraint_groups': ModelBase.get_constraint_groups()}
+    iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                'cl_out': cl_out, 'no_output': True, 'dev_mode': True}
+
+    return model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                                iokwargs=iokwargs)
+
+
+class TestModelSize(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        nhours = {'AT0': 24, 'CH0': 6, 'DE0': 12, 'FR0': 24, 'IT0': 24}
+        cls.ml = make_model_loop(os.path.join(cls.tmp_dir, 'out.hdf5'),
+                                 nhours)
+        cls.ml.build_model('maps')
+
+        cls.ms = ModelSize(cls.ml.m)
+        cls.ms_coarse = ModelSize(cls.ml.m, nhours=24)
+
+        cls.ml.build_model()
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def get_size(self, kind):
+
+        df = self.ms.df_size
+        return df.loc[df.kind == kind].set_index('component')['size']
+
+    def test_variables(self):
+
+        dict_size = {comp.name: len(comp) for comp
+                     in self.ml.m.component_objects(po.Var)}
+
+        self.assertEqual(self.get_size('var').to_dict(), dict_size)
+
+    def test_constraints(self):
+
+        dict_size = {comp.name: sum(cdata.active for cdata in comp.values())
+                     for comp in self.ml.m.component_objects(po.Constraint)}
+        dict_size = {name: size for name, size in dict_size.items() if size}
+
+        size = self.get_size('con')
+        self.assertEqual(size.loc[size > 0].drop('objective_quad',
+                                                 errors='ignore').to_dict(),
+                         dict_size)
+
+    def test_time_indexed_parameters(self):
+
+        for name, size in self.get_size('par').items():
+            self.assertEqual(size, len(getattr(self.ml.m, name)))
+
+    def test_summary(self):
+
+        df = self.ms.df_size
+        summary = self.ms.summary
+
+        self.assertEqual(summary['nvar'], df.loc[df.kind == 'var', 'size']
+                                            .sum())
+        self.assertGreater(summary['memory_mb'], 0)
+        self.assertGreater(summary['build_time_s'], 0)
+
+        # coarser time resolution: fewer variables
+        self.assertLess(self.ms_coarse.summary['nvar'], summary['nvar'])
+
+    def test_select_nhours(self):
+
+        list_nhours = [1, 6, 24, 168]
+        max_memory_mb = ModelSize(self.ml.m, nhours=24).summary['memory_mb']
+
+        nhours = select_nhours(self.ml.m, max_memory_mb=max_memory_mb,
+                               list_nhours=list_nhours)
+        self.assertEqual(nhours, 24)
+
+        with self.assertRaises(ValueError):
+            select_nhours(self.ml.m, max_memory_mb=0,
+                          list_nhours=list_nhours)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the parallel execution of model runs: the splitting into chunks,
+failed runs, and workers dying during a run. The model loop is a stub; the
+runs are functions of the run_id.
+
+"""
+
+import os
+import time
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+
+from grimsel.auxiliary.multiproc import get_chunks, run_parallel
+from grimsel.core.run_control import time_limit
+from grimsel.core.model_loop import logger_parallel
+
+from grimsel import logger
+logger.setLevel('ERROR')
+logger_parallel.setLevel('ERROR')
+
+
+# upper limit of the test durations in seconds
+TIMEOUT = 60
+
+
+class ModelLoopStub():
+    '''
+    Model loop with runs in chains of ``nchain`` runs (``swco_id``).
+    '''
+
+    def __init__(self, nruns, nchain=3):
+
+        self.df_def_run = pd.DataFrame({'run_id': range(nruns),
+                                        'swco_id': [irun // nchain for irun
+                                                    in range(nruns)]})
+        self.m = SimpleNamespace(verbose_solver=False)
+
+    def get_list_run_id(self):
+
+        return self.df_def_run.run_id.tolist()
+
+    def _merge_df_run_files(self):
+
+        pass
+
+
+def get_run_func(run_id_fail=None, run_id_exit=None):
+    '''
+    Returns a run function raising an exception for ``run_id_fail`` and
+    terminating the worker process for ``run_id_exit``.
+    '''
+
+    def func(run_id):
+
+        time.sleep(0.1)
+
+        if run_id == run_id_fail:
+            raise ValueError('Run %s failed'%run_id)
+        if run_id == run_id_exit:
+            # let the message queue deliver the start message
+            time.sleep(0.5)
+            os._exit(1)
+
+    return func
+
+
+class TestGetChunks(unittest.TestCase):
+
+    def setUp(self):
+
+        self.ml = ModelLoopStub(7)
+
+    def test_chunksize(self):
+
+        self.assertEqual(get_chunks(self.ml, chunksize=3),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(get_chunks(self.ml, chunksize=0),
+                         [[run_id] for run_id in range(7)])
+
+    def test_groupby_longest_first(self):
+
+        self.assertEqual(get_chunks(self.ml, groupby=['swco_id']),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+
+        durations = {0: 1, 1: 1, 2: 1, 3: 1, 4: 1, 5: 1, 6: 10}
+        self.assertEqual(get_chunks(self.ml, groupby=['swco_id'],
+                                    durations=durations),
+                         [[6], [0, 1, 2], [3, 4, 5]])
+
+    def test_durations(self):
+
+        durations = {0: 5, 3: 10}
+
+        # runs without duration get the mean
+        self.assertEqual(get_chunks(self.ml, chunksize=2,
+                                    durations=durations),
+                         [[3, 1], [2, 4], [5, 6], [0]])
+
+
+class TestRunParallel(unittest.TestCase):
+
+    def run_parallel(self, ml, func, **kwargs):
+
+        with time_limit(TIMEOUT):
+            df = run_parallel(ml, func, nproc=2, adjust_logger_levels=False,
+                              **kwargs)
+
+        return df.set_index('run_id')
+
+    def test_chunks(self):
+
+        ml = ModelLoopStub(6)
+
+        df = self.run_parallel(ml, get_run_func(), chunksize=3)
+
+        self.assertEqual(df.index.tolist(), list(range(6)))
+        self.assertEqual(set(df.status), {'done'})
+        # all runs of a chunk are performed by the same worker
+        self.assertEqual(df.groupby(df.index // 3).worker.nunique().tolist(),
+                         [1, 1])
+
+    def test_stop_on_error(self):
+
+        ml = ModelLoopStub(6)
+
+        df = self.run_parallel(ml, get_run_func(run_id_fail=1),
+                               groupby=['swco_id'])
+
+        self.assertEqual(df.status.tolist(), ['done', 'failed', 'skipped',
+                                              'done', 'done', 'done'])
+        self.assertIn('Run 1 failed', df.error[1])
+
+        df = self.run_parallel(ml, get_run_func(run_id_fail=1),
+                               chunksize=3, stop_on_error=False)
+
+        self.assertEqual(df.status.tolist(), ['done', 'failed'] + ['done'] * 4)
+
+    def test_dead_worker(self):
+
+        ml = ModelLoopStub(9)
+
+        df = self.run_parallel(ml, get_run_func(run_id_exit=4), chunksize=3)
+
+        self.assertEqual(df.index.tolist(), list(range(9)))
+        self.assertEqual(df.status.tolist(), ['done'] * 4 + ['lost'] * 2
+                                             + ['done'] * 3)
+        self.assertTrue(df.error[[4, 5]].str.contains('died').all())
+
+
+if __name__ == '__main__':
+
+    unittest.main()
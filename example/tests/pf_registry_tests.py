@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the profile id registry: translation of pf_ids to model ids and
+the check of the referenced profiles. The input tables are attributes of a
+simple namespace.
+
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+
+from grimsel.core.model_base import ModelBase
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def make_model(supply_pf_id=(2, 3)):
+
+    m = SimpleNamespace(
+        df_node_encar=pd.DataFrame({'nd_id': [0, 1], 'ca_id': [0, 0],
+                                    'dmnd_pf_id': [0, 1]}),
+        df_plant_encar=pd.DataFrame({'pp_id': [0, 1], 'ca_id': [0, 0],
+                                     'supply_pf_id': list(supply_pf_id)}),
+        df_fuel_node_encar=pd.DataFrame({'fl_id': [0], 'nd_id': [0],
+                                         'ca_id': [0]}),
+        df_profdmnd=pd.DataFrame({'dmnd_pf_id': [0, 1], 'hy': 0,
+                                  'value': 1.}),
+        df_profsupply=pd.DataFrame({'supply_pf_id': [2], 'hy': 0,
+                                    'value': 1.}),
+        df_def_profile=pd.DataFrame({'pf_id': [0, 1, 2, 3]}))
+
+    for name in ['get_pf_registry_name', 'translate_pf_id', 'check_pf_ids']:
+        setattr(m, name, getattr(ModelBase, name).__get__(m))
+
+    ModelBase._init_pf_dicts(m)
+
+    return m
+
+
+class TestProfileRegistry(unittest.TestCase):
+
+    def test_registry(self):
+
+        m = make_model()
+
+        self.assertEqual(m.dict_dmnd_pf, {(0, 0): 0, (1, 0): 1})
+        self.assertEqual(m.dict_supply_pf, {(0, 0): 2, (1, 0): 3})
+        self.assertTrue(m.pf_registry['pricebuy'].empty)
+
+    def test_translate_pf_id(self):
+
+        m = make_model()
+
+        df = m.translate_pf_id(pd.DataFrame({'pf_id': [3, 2, 3],
+                                             'value': [1., 2., 3.]}))
+
+        self.assertEqual(df.sort_values('value')[['pp_id', 'value']]
+                           .values.tolist(), [[1, 1.], [0, 2.], [1, 3.]])
+
+    def test_colliding_pf_ids(self):
+
+        # demand and supply profiles share pf_id 1
+        m = make_model(supply_pf_id=(1, 3))
+
+        with self.assertRaisesRegex(ValueError, 'Ambiguous'):
+            m.translate_pf_id(pd.DataFrame({'pf_id': [1], 'value': 1.}))
+
+        # unique within the supply profiles
+        df = m.translate_pf_id(pd.DataFrame({'pf_id': [1, 3], 'value': 1.}))
+        self.assertEqual(sorted(df.pp_id), [0, 1])
+
+    def test_unknown_pf_id(self):
+
+        m = make_model()
+
+        with self.assertRaisesRegex(ValueError, 'No pf array'):
+            m.translate_pf_id(pd.DataFrame({'pf_id': [0, 2], 'value': 1.}))
+
+    def test_check_pf_ids(self):
+
+        m = make_model()
+        m.df_def_profile = m.df_def_profile.loc[m.df_def_profile.pf_id != 0]
+
+        self.assertEqual(m.check_pf_ids(),
+                         {('supply', 'df_profsupply'): [3],
+                          ('dmnd', 'df_def_profile'): [0]})
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the presolve removing inactive plants: the output tables of a
+model with presolve are compared to those of the unpruned model. Instead of
+calling a solver, all variables are set to a fixed solution with zero values
+for the plants removed by the presolve.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+from unittest import mock
+
+import pandas as pd
+import pyomo.environ as po
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+import grimsel.core.table_struct as table_struct
+from grimsel.core.model_base import ModelBase
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+
+def get_fake_run(list_pp_zero):
+    '''
+    Returns a replacement of :func:`ModelBase.run` setting all variables
+    to 1 (0 for the plants ``list_pp_zero``) and all duals to 0.5.
+    '''
+
+    def run(self, *args, **kwargs):
+
+        for var in self.component_objects(po.Var):
+
+            cols = table_struct.DICT_COMP_IDX.get(var.name, ())
+            ipp = cols.index('pp_id') if 'pp_id' in cols else None
+
+            for key, vardata in var.items():
+                key = key if isinstance(key, tuple) else (key,)
+                if not vardata.fixed:
+                    vardata.value = (0 if ipp is not None
+                                     and key[ipp] in list_pp_zero else 1)
+
+        for cstr in self.component_objects(po.Constraint, active=True):
+            for cstrdata in cstr.values():
+                self.dual[cstrdata] = 0.5
+
+        class Result: pass
+        self.results = Result()
+        self.results.Solver = [{'Termination condition': 'optimal'}]
+        self.objective_value = 1
+
+    return run
+
+
+def run_model(cl_out, presolve, list_pp_zero=()):
+
+    mkwargs = {'slct_encar': ['EL'], 'nhours': 24,
+               'tm_filt': [('mt_id', [0])], 'presolve': presolve,
+               'constraint_groups': ModelBase.get_constraint_groups()}
+    iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                'cl_out': cl_out, 'no_output': False, 'dev_mode': True}
+
+    # no solver statistics: the solver is not called
+    ml = model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                              iokwargs=iokwargs, solver_stats=False)
+    ml.build_model()
+
+    list_pp_zero = list_pp_zero or getattr(ml.m, 'presolve_pp_id', [])
+
+    with mock.patch.object(ModelBase, 'run', get_fake_run(list_pp_zero)):
+        ml.select_run(0)
+        ml.perform_model_run()
+
+    return ml.m
+
+
+def read_tables(cl_out):
+
+    with pd.HDFStore(cl_out, mode='r') as store:
+        list_tb = [key.strip('/') for key in store.keys()]
+
+        return {tb: store[tb] for tb in list_tb
+                if tb.split('_')[0] in ('var', 'par', 'dual')}
+
+
+class TestPresolve(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        cl_out = os.path.join(cls.tmp_dir, 'presolve.hdf5')
+        cls.m = run_model(cl_out, presolve=True)
+        cls.dict_tb = read_tables(cl_out)
+
+        cl_out = os.path.join(cls.tmp_dir, 'unpruned.hdf5')
+        cls.m_ref = run_model(cl_out, presolve=False,
+                              list_pp_zero=cls.m.presolve_pp_id)
+        cls.dict_tb_ref = read_tables(cl_out)
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_plants_removed(self):
+
+        self.assertTrue(self.m.presolve_pp_id)
+        self.assertFalse(set(self.m.presolve_pp_id) & set(self.m.ppall))
+        self.assertTrue(set(self.m.presolve_pp_id) <= set(self.m_ref.ppall))
+        self.assertLess(len(self.m.pwr), len(self.m_ref.pwr))
+
+    def test_output_tables(self):
+
+        self.assertEqual(sorted(self.dict_tb), sorted(self.dict_tb_ref))
+
+        for tb, df_ref in self.dict_tb_ref.items():
+            with self.subTest(table=tb):
+
+                df = self.dict_tb[tb]
+                cols = [c for c in df_ref.columns if not c == 'value']
+
+                df = df.sort_values(cols).reset_index(drop=True)
+                df_ref = df_ref.sort_values(cols).reset_index(drop=True)
+
+                pd.testing.assert_frame_equal(df, df_ref, check_dtype=False)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the on-disk cache of the time-mapped profile tables: cache hits
+return the mapped tables without remapping, modified inputs miss the cache.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+from unittest import mock
+
+import pandas as pd
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+import grimsel.auxiliary.aux_cache as aux_cache
+from grimsel.core.model_base import ModelBase
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+IDX_DMND = ['dmnd_pf_id', 'sy']
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def test_key(self):
+
+        df = pd.DataFrame({'a': [1, 2], 'b': [0.5, 1.5]})
+
+        self.assertEqual(aux_cache.get_key(df, {'x': [1, 2]}),
+                         aux_cache.get_key(df.copy(), {'x': [1, 2]}))
+        self.assertNotEqual(aux_cache.get_key(df),
+                            aux_cache.get_key(df.assign(b=[0.5, 1.])))
+        self.assertNotEqual(aux_cache.get_key(df),
+                            aux_cache.get_key(df.astype({'a': 'int32'})))
+        self.assertNotEqual(aux_cache.get_key(df, ['a']),
+                            aux_cache.get_key(df, ['b']))
+
+    def test_disabled(self):
+
+        with mock.patch.dict(os.environ):
+            os.environ.pop('GRIMSEL_CACHE_DIR', None)
+
+            aux_cache.write(pd.DataFrame(), None, 'name', 'key')
+            self.assertIsNone(aux_cache.read(None, 'name', 'key'))
+
+
+class TestProfileCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        mkwargs = {'slct_encar': ['EL'], 'nhours': 24,
+                   'tm_filt': [('mt_id', [0])],
+                   'constraint_groups': ModelBase.get_constraint_groups()}
+        iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                    'cl_out': os.path.join(cls.tmp_dir, 'out.hdf5'),
+                    'no_output': True, 'dev_mode': True}
+
+        cls.ml = model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                                      iokwargs=iokwargs)
+        cls.ml.build_model('runtime_tables')
+        cls.m = cls.ml.m
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+
+        self.m.cache_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+
+    def tearDown(self):
+
+        self.m.cache_dir = None
+
+    def map_profile(self, df):
+        '''
+        Calls the cached mapping of the demand profiles ``df``; returns the
+        result and the number of calls of the uncached mapping.
+        '''
+
+        with mock.patch.object(ModelBase, 'map_profile_to_time_resolution',
+                               autospec=True, side_effect=ModelBase
+                                        .map_profile_to_time_resolution
+                               ) as mock_map:
+            df_soy = self.m._map_profile_cached(df=df, idx=IDX_DMND,
+                                                itb='dmnd')
+
+        return df_soy, mock_map.call_count
+
+    def test_hit(self):
+
+        df_exp = self.m.map_profile_to_time_resolution(
+                        df=self.m.df_profdmnd, idx=IDX_DMND, itb='dmnd')
+
+        df_soy, ncalls = self.map_profile(self.m.df_profdmnd)
+        self.assertEqual(ncalls, 1)
+        pd.testing.assert_frame_equal(df_soy, df_exp)
+        self.assertEqual(len(os.listdir(self.m.cache_dir)), 1)
+
+        df_soy, ncalls = self.map_profile(self.m.df_profdmnd.copy())
+        self.assertEqual(ncalls, 0)
+        pd.testing.assert_frame_equal(df_soy, df_exp)
+
+    def test_modified_input_misses(self):
+
+        df = self.m.df_profdmnd
+
+        df_soy, _ = self.map_profile(df)
+
+        df_mod = df.assign(value=df.value * 2)
+        df_soy_mod, ncalls = self.map_profile(df_mod)
+
+        self.assertEqual(ncalls, 1)
+        self.assertEqual(len(os.listdir(self.m.cache_dir)), 2)
+        pd.testing.assert_frame_equal(df_soy_mod,
+                                      df_soy.assign(value=df_soy.value * 2))
+
+    def test_modified_time_map_misses(self):
+
+        _, ncalls = self.map_profile(self.m.df_profdmnd)
+        self.assertEqual(ncalls, 1)
+
+        df_tm_soy = self.m.df_tm_soy
+        try:
+            self.m.df_tm_soy = df_tm_soy.assign(weight=df_tm_soy.weight * 2)
+            _, ncalls = self.map_profile(self.m.df_profdmnd)
+        finally:
+            self.m.df_tm_soy = df_tm_soy
+
+        self.assertEqual(ncalls, 1)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the clustering of periods and the representative time maps
+generated from synthetic profiles.
+
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from grimsel.auxiliary.timemap import RepresentativeTimeMap, cluster_periods
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+HOURS_MONTH = [744, 672, 744, 720, 744, 720, 744, 744, 720, 744, 720, 744]
+
+
+
+def make_profiles():
+    ''' Daily demand cycle with weekend reduction and a seasonal wind. '''
+
+    hy = np.arange(8760)
+    dmnd = (1 + 0.3 * np.sin(2 * np.pi * hy / 24)
+            - 0.4 * ((hy // 24 + 3) % 7 >= 5))
+    wind = 0.5 + 0.4 * np.cos(2 * np.pi * hy / 8760)
+
+    return pd.DataFrame({'dmnd': dmnd, 'wind': wind}, index=hy)
+
+
+class TestClusterPeriods(unittest.TestCase):
+
+    def setUp(self):
+
+        rs = np.random.RandomState(0)
+        self.arr = np.r_[rs.normal(0, 0.1, (6, 3)),
+                         rs.normal(5, 0.1, (4, 3))]
+
+    def test_kmeans_kmedoids(self):
+
+        for method in ['kmeans', 'kmedoids']:
+
+            labels, repr_idx = cluster_periods(self.arr, 2, method=method)
+
+            self.assertEqual(labels.tolist(), [0] * 6 + [1] * 4)
+            self.assertEqual(len(repr_idx), 2)
+            self.assertEqual(labels[repr_idx].tolist(), [0, 1])
+
+    def test_more_clusters_than_rows(self):
+
+        labels, repr_idx = cluster_periods(self.arr[:3], 5)
+
+        self.assertLessEqual(len(repr_idx), 3)
+        self.assertEqual(sorted(set(labels)), list(range(len(repr_idx))))
+
+    def test_unknown_method(self):
+
+        with self.assertRaises(ValueError):
+            cluster_periods(self.arr, 2, method='hierarchical')
+
+
+class TestRepresentativeTimeMap(unittest.TestCase):
+
+    def test_monthly_weights(self):
+
+        tm = RepresentativeTimeMap(make_profiles(), nclusters=3,
+                                   period='day', nhours=2)
+        df = tm.df_time_red
+
+        self.assertEqual(len(df), tm.ncopies * 12)
+        self.assertEqual(df.groupby('mt_id').weight.sum().tolist(),
+                         HOURS_MONTH)
+
+        # cyclic storage within each cluster/month combination
+        self.assertEqual(len(tm.dict_sy_prev), tm.ncopies)
+        self.assertTrue(all(sy_last - sy_first == 11 for sy_first, sy_last
+                            in tm.dict_sy_prev.items()))
+
+        # all hours are mapped to time slots of their month
+        df_map = tm.df_time_map.join(df.set_index('sy').mt_id, on='sy',
+                                     rsuffix='_sy')
+        self.assertTrue((df_map.mt_id == df_map.mt_id_sy).all())
+
+
+if __name__ == '__main__':
+
+    unittest.main()
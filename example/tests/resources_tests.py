@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the allocation of processes and solver threads to parallel model
+runs.
+
+"""
+
+import os
+import unittest
+import contextlib
+from types import SimpleNamespace
+
+import pandas as pd
+
+from grimsel.auxiliary.resources import allocate, probe
+from grimsel.core.run_control import time_limit
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestAllocate(unittest.TestCase):
+
+    def setUp(self):
+
+        self.df_probe = pd.DataFrame({'nthreads': [1, 2, 4],
+                                      'tdiff_solve': [100., 60., 40.],
+                                      'worker_mb': 500., 'solver_mb': 500.})
+
+    def test_minimum_makespan(self):
+
+        df = allocate(self.df_probe, nruns=8, ncores=8, memory_mb=4000,
+                      memory_reserve=0)
+
+        self.assertEqual(df.loc[0, ['nproc', 'nthreads']].tolist(), [4, 2])
+        self.assertEqual(df.makespan.tolist(), [120., 160., 200.])
+        self.assertTrue((df.nproc * 1000 <= 4000).all())
+
+    def test_limited_by_runs_and_ties(self):
+
+        df = allocate(self.df_probe.assign(tdiff_solve=100.), nruns=1,
+                      ncores=8, memory_mb=4000, memory_reserve=0)
+
+        # equal makespans: the fewest cores win
+        self.assertEqual(df.nproc.tolist(), [1, 1, 1])
+        self.assertEqual(df.nthreads.tolist(), [1, 2, 4])
+
+    def test_insufficient_memory(self):
+
+        with self.assertRaises(ValueError):
+            allocate(self.df_probe, nruns=8, ncores=8, memory_mb=1000)
+
+
+class ModelLoopStub():
+    '''
+    Model loop with a model solve terminating the process if ``exit_code``
+    is not None.
+    '''
+
+    def __init__(self, exit_code=None):
+
+        def run(**kwargs):
+            if exit_code is not None:
+                os._exit(exit_code)
+
+        @contextlib.contextmanager
+        def temp_files():
+            yield None, None, None, None
+
+        self.m = SimpleNamespace(solver=SimpleNamespace(options={}),
+                                 temp_files=temp_files, run=run)
+
+    def select_run(self, run_id):
+
+        pass
+
+
+class TestProbe(unittest.TestCase):
+
+    def test_probe(self):
+
+        with time_limit(60):
+            df = probe(ModelLoopStub(), list_nthreads=(1,))
+
+        self.assertEqual(df.nthreads.tolist(), [1])
+        self.assertTrue(df.notna().all(axis=None))
+
+    def test_dead_child(self):
+
+        with time_limit(60):
+            with self.assertRaisesRegex(RuntimeError, 'exit code 3'):
+                probe(ModelLoopStub(exit_code=3), list_nthreads=(1,))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the results store: LRU eviction of the in-process tier and
+data passing through the shared tier in a temporary directory.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+
+import pandas as pd
+
+from grimsel.core.results_store import ResultsStore
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+TB = 'var_yr_cap_pwr_new'
+
+
+def make_table(run_id, nrows=2):
+
+    return pd.DataFrame({'pp_id': range(nrows), 'ca_id': 0,
+                         'value': float(run_id), 'run_id': run_id})
+
+
+class TestInProcessTier(unittest.TestCase):
+
+    def setUp(self):
+
+        self.store = ResultsStore(tables=[TB], max_runs=2)
+
+    def test_lru_eviction(self):
+
+        for run_id in range(2):
+            self.store.put(TB, run_id, make_table(run_id))
+
+        # access to run 0 makes run 1 the least recently used
+        self.store.get(TB, 0)
+        self.store.put(TB, 2, make_table(2))
+
+        self.assertEqual(list(self.store._runs), [0, 2])
+        with self.assertRaises(KeyError):
+            self.store.get(TB, 1)
+
+    def test_append_parts(self):
+
+        self.store.put(TB, 0, make_table(0))
+        self.store.put(TB, 0, make_table(0, nrows=3))
+
+        self.assertEqual(len(self.store.get(TB, 0)), 5)
+
+    def test_other_tables_ignored(self):
+
+        self.store.put('var_sy_pwr', 0, make_table(0))
+
+        self.assertEqual(len(self.store._runs), 0)
+
+    def test_discard_run(self):
+
+        self.store.put(TB, 0, make_table(0))
+        self.store.discard_run(0)
+
+        with self.assertRaises(KeyError):
+            self.store.get(TB, 0)
+
+
+class TestSharedTier(unittest.TestCase):
+
+    def setUp(self):
+
+        self.shared_dir = tempfile.mkdtemp()
+        self.store = ResultsStore(tables=[TB], max_runs=1,
+                                  shared_dir=self.shared_dir,
+                                  max_shared_runs=2)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.shared_dir)
+
+    def test_other_process(self):
+
+        self.store.put(TB, 0, make_table(0))
+
+        # e.g. a worker process without access to the in-process tier
+        store_worker = ResultsStore(tables=[TB], max_runs=1,
+                                    shared_dir=self.shared_dir)
+        df = store_worker.get(TB, 0)
+
+        pd.testing.assert_frame_equal(df, make_table(0))
+        self.assertEqual(list(store_worker._runs), [0])
+
+    def test_eviction(self):
+
+        for run_id in range(3):
+            self.store.put(TB, run_id, make_table(run_id))
+            # distinct modification times
+            t = 1e9 + run_id
+            os.utime(self.store._get_shared_file(TB, run_id), (t, t))
+
+        self.store._evict_shared()
+
+        self.assertEqual(sorted(os.listdir(self.shared_dir)),
+                         ['%s_%d.pickle'%(TB, run_id) for run_id in [1, 2]])
+
+        # run 1 is still available although evicted from the in-process tier
+        self.assertEqual(self.store.get(TB, 1).value.tolist(), [1., 1.])
+
+    def test_clear(self):
+
+        self.store.put(TB, 0, make_table(0))
+        self.store.clear()
+
+        self.assertEqual(os.listdir(self.shared_dir), [])
+        self.assertEqual(len(self.store._runs), 0)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
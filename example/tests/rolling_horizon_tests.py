@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the rolling horizon solve: the output tables stitched from the
+committed time slots of all windows are compared to those of the full-year
+model. Instead of calling a solver, the time-indexed variables are set to
+a fixed solution and the yearly and monthly totals are calculated from
+their defining constraints.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+from unittest import mock
+
+import pandas as pd
+import pyomo.environ as po
+from pyomo.core.expr.current import identify_variables
+from pyomo.util.calc_var_value import calculate_variable_from_constraint
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+from grimsel.core.model_base import ModelBase
+from grimsel.core.rolling_horizon import RollingHorizon, YEARLY_VARS
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+TOTAL_VARS = YEARLY_VARS + [('erg_mt', 'monthly_totals')]
+
+
+def fake_run(self, *args, **kwargs):
+    '''
+    Replacement of :func:`ModelBase.run`: all free variables are set to 1,
+    except for the yearly and monthly totals :data:`TOTAL_VARS`, which are
+    calculated from the active constraints; all duals are set to 0.5.
+    '''
+
+    for var in self.component_objects(po.Var):
+        for vardata in var.values():
+            if not vardata.fixed:
+                vardata.value = 1
+
+    for name_var, name_con in TOTAL_VARS:
+        var = getattr(self, name_var, None)
+        con = getattr(self, name_con, None)
+        if var is None or con is None or not con.active:
+            continue
+
+        for condata in con.values():
+            vardata = next(vardata for vardata
+                           in identify_variables(condata.body)
+                           if vardata.parent_component() is var)
+            calculate_variable_from_constraint(vardata, condata)
+
+    for cstr in self.component_objects(po.Constraint, active=True):
+        for cstrdata in cstr.values():
+            if cstrdata.active:
+                self.dual[cstrdata] = 0.5
+
+    class Result: pass
+    self.results = Result()
+    self.results.Solver = [{'Termination condition': 'optimal'}]
+    self.objective_value = 1
+
+
+def get_model_loop(cl_out):
+
+    mkwargs = {'slct_encar': ['EL'], 'nhours': 168, 'tm_filt': False,
+               'constraint_groups': ModelBase.get_constraint_groups()}
+    iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                'cl_out': cl_out, 'no_output': False, 'dev_mode': True}
+
+    # no solver statistics: the solver is not called
+    return model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                                iokwargs=iokwargs, solver_stats=False)
+
+
+def read_tables(cl_out):
+
+    with pd.HDFStore(cl_out, mode='r') as store:
+        list_tb = [key.strip('/') for key in store.keys()]
+
+        return {tb: store[tb] for tb in list_tb
+                if tb.split('_')[0] in ('var', 'par', 'dual')}
+
+
+class TestRollingHorizon(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        with mock.patch.object(ModelBase, 'run', fake_run):
+
+            cl_out = os.path.join(cls.tmp_dir, 'full.hdf5')
+            ml = get_model_loop(cl_out)
+            ml.build_model()
+            ml.select_run(0)
+            ml.perform_model_run()
+            cls.dict_tb_ref = read_tables(cl_out)
+
+            cl_out = os.path.join(cls.tmp_dir, 'windows.hdf5')
+            ml = get_model_loop(cl_out)
+            cls.rh = RollingHorizon(ml, window=168 * 6, overlap=168 * 2)
+            ml.select_run(0)
+            cls.rh.perform_model_run()
+            cls.dict_tb = read_tables(cl_out)
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_windows(self):
+
+        df = self.rh.df_windows
+        nsy = self.rh.nsy
+
+        self.assertEqual(len(df), len(self.rh.list_window))
+        self.assertEqual(df.sy_start.tolist(),
+                         list(range(0, nsy, self.rh.nsy_window)))
+        self.assertEqual(df.sy_commit.iloc[-1], nsy - 1)
+        self.assertEqual(set(df['info']), {'optimal'})
+
+    def test_stitched_output_tables(self):
+
+        self.assertEqual(sorted(self.dict_tb), sorted(self.dict_tb_ref))
+        self.assertTrue({'var_sy_pwr', 'var_sy_erg_st', 'var_yr_erg_yr',
+                         'var_mt_erg_mt', 'dual_supply', 'par_dmnd'}
+                        <= set(self.dict_tb))
+
+        for tb, df_ref in self.dict_tb_ref.items():
+            with self.subTest(table=tb):
+
+                df = self.dict_tb[tb]
+                cols = [c for c in df_ref.columns if not c == 'value']
+
+                self.assertFalse(df.duplicated(cols).any())
+
+                df = df.sort_values(cols).reset_index(drop=True)
+                df_ref = df_ref.sort_values(cols).reset_index(drop=True)
+
+                pd.testing.assert_frame_equal(df, df_ref, check_dtype=False)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
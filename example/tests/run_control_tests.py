@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the run control: solve retries with a model stub returning
+prescribed termination conditions, time limits, and the checkpoint file.
+
+"""
+
+import os
+import time
+import shutil
+import unittest
+import tempfile
+from types import SimpleNamespace
+
+from grimsel.core.run_control import (RetryPolicy, RunFailedError,
+                                      RunTimeout, time_limit,
+                                      write_checkpoint, read_checkpoint,
+                                      get_run_ids_done, get_failure_report,
+                                      CHECKPOINT_COLS)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class ModelStub():
+    '''
+    Model whose solves end with the given termination conditions; exceptions
+    are raised.
+    '''
+
+    def __init__(self, list_cond):
+
+        self.list_cond = list(list_cond)
+        self.solver = SimpleNamespace(options={'threads': 2})
+        self.list_options = []
+
+    def run(self):
+
+        self.list_options.append(dict(self.solver.options))
+
+        cond = self.list_cond.pop(0)
+        if isinstance(cond, Exception):
+            raise cond
+
+        self.results = SimpleNamespace(solver=SimpleNamespace(
+                    termination_condition=SimpleNamespace(value=cond)))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_first_attempt(self):
+
+        m = ModelStub(['optimal'])
+
+        self.assertEqual(RetryPolicy().solve(m), 1)
+
+    def test_retries(self):
+
+        m = ModelStub(['maxTimeLimit', ValueError('solver crashed'),
+                       'optimal'])
+
+        self.assertEqual(RetryPolicy(timelimit=10).solve(m), 3)
+
+        self.assertEqual(m.list_options,
+                         [{'threads': 2, 'timelimit': 10},
+                          {'threads': 2, 'timelimit': 10, 'lpmethod': 4},
+                          {'threads': 2, 'timelimit': 10, 'lpmethod': 4,
+                           'emphasis_numerical': 1}])
+        # options of the model restored
+        self.assertEqual(m.solver.options, {'threads': 2})
+
+    def test_all_attempts_failed(self):
+
+        m = ModelStub(['infeasible', 'infeasible'])
+        policy = RetryPolicy(list_solver_options=[{}, {'lpmethod': 4}])
+
+        with self.assertRaises(RunFailedError) as cm:
+            policy.solve(m)
+
+        self.assertIn('attempt 2', str(cm.exception))
+        self.assertEqual(m.solver.options, {'threads': 2})
+
+    def test_timeout_not_retried(self):
+
+        m = ModelStub([RunTimeout('Run exceeded its time limit'),
+                       'optimal'])
+
+        with self.assertRaises(RunTimeout):
+            RetryPolicy().solve(m)
+
+        self.assertEqual(len(m.list_options), 1)
+
+    def test_skipped_solve(self):
+
+        m = ModelStub([])
+        m.run = lambda: setattr(m, 'results', SimpleNamespace())
+
+        self.assertEqual(RetryPolicy().solve(m), 1)
+
+
+class TestTimeLimit(unittest.TestCase):
+
+    def test_time_limit(self):
+
+        with self.assertRaises(RunTimeout):
+            with time_limit(0.2):
+                time.sleep(5)
+
+    def test_no_time_limit(self):
+
+        with time_limit(None):
+            time.sleep(0.01)
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.fn = os.path.join(self.tmp_dir, 'status.csv')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_missing_file(self):
+
+        df = read_checkpoint(self.fn)
+
+        self.assertTrue(df.empty)
+        self.assertEqual(df.columns.tolist(), CHECKPOINT_COLS)
+        self.assertEqual(get_run_ids_done(self.fn), set())
+
+    def test_latest_status(self):
+
+        write_checkpoint(self.fn, 1, 'failed', worker='w0', tdiff=3.,
+                         error='Traceback ...\nRunFailedError: all failed\n')
+        write_checkpoint(self.fn, 0, 'done', worker='w0', tdiff=1.)
+        write_checkpoint(self.fn, 2, 'timeout', worker='w1', tdiff=9.,
+                         error='RunTimeout: Run exceeded its time limit')
+        # run 1 repeated after a restart
+        write_checkpoint(self.fn, 1, 'done', worker='w1', tdiff=2.)
+
+        df = read_checkpoint(self.fn)
+
+        self.assertEqual(df.run_id.tolist(), [0, 1, 2])
+        self.assertEqual(df.status.tolist(), ['done', 'done', 'timeout'])
+        self.assertEqual(get_run_ids_done(self.fn), {0, 1})
+
+        df_report = get_failure_report(df)
+        self.assertEqual(df_report.run_id.tolist(), [2])
+        self.assertEqual(df_report.error.tolist(),
+                         ['RunTimeout: Run exceeded its time limit'])
+
+    def test_failure_report_last_line(self):
+
+        write_checkpoint(self.fn, 0, 'failed',
+                         error='Traceback ...\nRunFailedError: all failed\n')
+
+        self.assertEqual(get_failure_report(read_checkpoint(self.fn))
+                         .error.tolist(), ['RunFailedError: all failed'])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
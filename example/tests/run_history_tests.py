@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the run time prediction from the run history and the
+longest-first dispatch.
+
+"""
+
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from grimsel.auxiliary.run_history import (RunTimePredictor,
+                                           simulate_makespan)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestRunTimePredictor(unittest.TestCase):
+
+    def setUp(self):
+
+        sgn = lambda swco, swvr: json.dumps({'swco': float(swco),
+                                             'swvr': float(swvr)})
+
+        self.df_history = pd.DataFrame(
+                {'signature': [sgn(0, 0), sgn(0, 0), sgn(1, 0), sgn(0, 1)],
+                 'tdiff_solve': [9., 11., 18., 36.],
+                 'tdiff_write': [1., 1., 2., 4.]})
+
+        self.df_def_run = pd.DataFrame({'run_id': [0, 1, 2, 3],
+                                        'swco': [0., 1., 1., 2.],
+                                        'swvr': [0., 0., 1., 0.]})
+
+    def test_predict(self):
+
+        pred = RunTimePredictor(self.df_history).predict(
+                                    self.df_def_run, ['swco', 'swvr'])
+
+        log_tdiff = np.log([10., 12., 20., 40.])
+        mu = log_tdiff.mean()
+        eff_swco_1 = log_tdiff[2] - mu
+        eff_swvr_1 = log_tdiff[3] - mu
+
+        self.assertEqual(pred.index.tolist(), [0, 1, 2, 3])
+        # identical scenarios: median of the history
+        self.assertAlmostEqual(pred[0], 11.)
+        self.assertAlmostEqual(pred[1], 20.)
+        # new combination: log-additive step effects
+        self.assertAlmostEqual(pred[2], np.exp(mu + eff_swco_1 + eff_swvr_1))
+        # unknown step value: no effect
+        eff_swvr_0 = log_tdiff[:3].mean() - mu
+        self.assertAlmostEqual(pred[3], np.exp(mu + eff_swvr_0))
+
+    def test_longest_first_makespan(self):
+
+        durations = [1, 1, 1, 1, 1, 1, 6]
+
+        self.assertEqual(simulate_makespan(durations, 2), 9)
+        self.assertEqual(simulate_makespan(sorted(durations, reverse=True),
+                                           2), 6)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
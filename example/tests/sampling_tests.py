@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the scenario sampling of the model loop run table: Latin
+hypercube and Sobol samples, adaptive refinement, and appended runs.
+
+"""
+
+import shutil
+import unittest
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from grimsel.core.model_loop import ModelLoop
+from grimsel.auxiliary.sampling import (latin_hypercube, sobol, sobol_points,
+                                        refine, append_runs)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestSampling(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        iokwargs = {'output_target': 'hdf5', 'no_output': True,
+                    'cl_out': self.tmp_dir + '/out.hdf5'}
+        self.ml = ModelLoop(nsteps=[('swco', 8), ('swvr', 8, np.linspace),
+                                    ('swst', 3)],
+                            iokwargs=iokwargs)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_latin_hypercube(self):
+
+        df = latin_hypercube(self.ml, 8, seed=0)
+
+        cols = self.ml.cols_id + self.ml.cols_step + self.ml.cols_val
+        self.assertEqual(df.columns.tolist(), cols)
+
+        # each level of the dimensions with 8 levels exactly once
+        for col in ['swco_id', 'swvr_id']:
+            self.assertEqual(sorted(df[col]), list(range(8)))
+
+        # rows are points of the full grid
+        df_full = self.ml.df_def_run[cols[:6]]
+        self.assertEqual(len(df[cols[:6]].merge(df_full)), len(df))
+
+        pd.testing.assert_frame_equal(df, latin_hypercube(self.ml, 8,
+                                                          seed=0))
+
+    def test_sobol_points(self):
+
+        arr = sobol_points(4, 2)
+
+        self.assertEqual(arr.tolist(), [[0., 0.], [0.5, 0.5],
+                                        [0.75, 0.25], [0.25, 0.75]])
+
+        # stratification of the first 2^k points in all dimensions
+        arr = sobol_points(64, 16)
+        for idim in range(16):
+            self.assertEqual(sorted(np.floor(arr[:, idim] * 64)),
+                             list(range(64)))
+
+        arr_shifted = sobol_points(64, 3, seed=1)
+        self.assertTrue(((arr_shifted >= 0) & (arr_shifted < 1)).all())
+        self.assertFalse(np.allclose(arr_shifted, sobol_points(64, 3)))
+
+        with self.assertRaises(ValueError):
+            sobol_points(4, 17)
+
+    def test_sobol(self):
+
+        df = sobol(self.ml, 8)
+
+        self.assertEqual(len(df), 8)
+        for col in ['swco_id', 'swvr_id']:
+            self.assertEqual(sorted(df[col]), list(range(8)))
+
+    def test_refine_and_append(self):
+
+        df_run = self.ml.df_def_run
+        self.ml.df_def_run = df_run.loc[df_run.swvr_id.isin([0, 4, 7])
+                                        & (df_run.swco_id == 0)
+                                        & (df_run.swst_id == 0)]
+
+        # metric jumps between the swvr levels 4 and 7
+        metric = pd.Series([0., 0., 10.], index=[0, 1, 2])
+        df_new = refine(self.ml, metric, 1)
+
+        self.assertEqual(df_new[self.ml.cols_id].values.tolist(),
+                         [[0, 5, 0]])
+        self.assertAlmostEqual(df_new.swvr.iloc[0], 5 / 7)
+
+        list_run_id = append_runs(self.ml, df_new)
+
+        self.assertEqual(list_run_id, [3])
+        self.assertEqual(self.ml.df_def_run.run_id.tolist(), [0, 1, 2, 3])
+        self.assertEqual(self.ml.df_def_run.swvr_id.tolist(),
+                         [0., 4., 7., 5.])
+
+        # the level 5 between 4 and 7 exists already: the other midpoint
+        metric = pd.Series([0., 0., 10., 9.], index=[0, 1, 2, 3])
+        self.assertEqual(refine(self.ml, metric, 1).swvr_id.tolist(), [6])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the scheduling of chained model runs: run dependencies and
+critical paths.
+
+"""
+
+import shutil
+import unittest
+import tempfile
+
+import numpy as np
+
+from grimsel.core.model_loop import ModelLoop
+from grimsel.core.model_loop_modifier import depends_on, get_run_dependencies
+from grimsel.auxiliary.multiproc import (get_critical_path,
+                                         _get_topological_order)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def make_model_loop(tmp_dir, nsteps):
+
+    iokwargs = {'output_target': 'hdf5', 'cl_out': tmp_dir + '/out.hdf5',
+                'no_output': True}
+
+    return ModelLoop(nsteps=nsteps, iokwargs=iokwargs)
+
+
+class Modifier():
+
+    @depends_on(swfy=-1)
+    def set_cap_from_previous_year(self):
+        pass
+
+    def set_co2_price(self):
+        pass
+
+
+class TestRunDependencies(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ml = make_model_loop(self.tmp_dir, [('swfy', 3), ('swco', 2)])
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_run_dependencies(self):
+
+        dependencies = get_run_dependencies(self.ml, Modifier())
+
+        df = self.ml.df_def_run.set_index('run_id')
+        for run_id, deps in dependencies.items():
+            if df.loc[run_id, 'swfy_id'] == 0:
+                self.assertEqual(deps, [])
+            else:
+                self.assertEqual(len(deps), 1)
+                self.assertEqual(df.loc[deps[0], 'swfy_id'],
+                                 df.loc[run_id, 'swfy_id'] - 1)
+                self.assertEqual(df.loc[deps[0], 'swco_id'],
+                                 df.loc[run_id, 'swco_id'])
+
+    def test_get_run_id(self):
+
+        # offsets apply to the step indices, not to the step values
+        ml = make_model_loop(tempfile.mkdtemp(dir=self.tmp_dir),
+                             [('swfy', 3, np.linspace), ('swco', 2)])
+        dependencies = get_run_dependencies(ml, Modifier())
+
+        for run_id, deps in dependencies.items():
+            ml.select_run(run_id)
+
+            self.assertEqual(ml.get_run_id(), run_id)
+            if deps:
+                self.assertEqual(ml.get_run_id(swfy=-1), deps[0])
+            else:
+                with self.assertRaises(ValueError):
+                    ml.get_run_id(swfy=-1)
+
+    def test_selected_methods(self):
+
+        dependencies = get_run_dependencies(self.ml, Modifier(),
+                                            methods=['set_co2_price'])
+
+        self.assertEqual(set(map(len, dependencies.values())), {0})
+
+
+class TestCriticalPath(unittest.TestCase):
+
+    def setUp(self):
+
+        # two chains 0 -> 1 -> 2 and 3 -> 4; run 5 depends on 2 and 4
+        self.dependencies = {0: [], 1: [0], 2: [1], 3: [], 4: [3],
+                             5: [2, 4]}
+
+    def test_unit_durations(self):
+
+        self.assertEqual(get_critical_path(self.dependencies),
+                         ([0, 1, 2, 5], 4))
+
+    def test_durations(self):
+
+        durations = {0: 1, 1: 1, 2: 1, 3: 10, 4: 1, 5: 2}
+
+        self.assertEqual(get_critical_path(self.dependencies, durations),
+                         ([3, 4, 5], 13))
+
+    def test_topological_order(self):
+
+        order = _get_topological_order(self.dependencies)
+
+        for run_id, deps in self.dependencies.items():
+            self.assertTrue(all(order.index(dep) < order.index(run_id)
+                                for dep in deps))
+
+    def test_cyclic(self):
+
+        with self.assertRaises(ValueError):
+            get_critical_path({0: [2], 1: [0], 2: [1], 3: []})
+
+    def test_empty(self):
+
+        self.assertEqual(get_critical_path({}), ([], 0))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
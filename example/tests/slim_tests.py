@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the slim mode: the build-time tables released after the model
+build, their spilling to disk and restoring, and the parameter reset of a
+slim model.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+
+import pandas as pd
+import pyomo.environ as po
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+from grimsel.core.model_base import ModelBase
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+
+class TestSlim(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        mkwargs = {'slct_encar': ['EL'], 'nhours': 24,
+                   'tm_filt': [('mt_id', [0])],
+                   'constraint_groups': ModelBase.get_constraint_groups()}
+        iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                    'cl_out': os.path.join(cls.tmp_dir, 'out.hdf5'),
+                    'no_output': True, 'dev_mode': True}
+
+        cls.ml = model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                                      iokwargs=iokwargs)
+        cls.ml.build_model()
+        cls.m = m = cls.ml.m
+
+        cls.dict_df = {name: val.copy() for name, val in vars(m).items()
+                       if name.startswith('df_')
+                       and isinstance(val, pd.DataFrame)}
+        cls.dict_par_val = {name: {key: po.value(val) for key, val
+                                   in getattr(m, name).items()}
+                            for name in m.dict_par if hasattr(m, name)}
+
+        m.slim = True
+        m.slim_spill_dir = os.path.join(cls.tmp_dir, 'spill')
+        cls.df_freed = m.release_build_data()
+        cls.dict_released = {name: getattr(m, name)
+                             for name in m.dict_slim_spilled}
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_release(self):
+
+        keep = self.m.get_slim_keep()
+
+        self.assertTrue(self.dict_released)
+        self.assertTrue(all(val is None
+                            for val in self.dict_released.values()))
+        self.assertFalse(set(self.dict_released) & keep)
+        self.assertEqual(set(self.df_freed.index),
+                         set(self.dict_released) & set(self.dict_df))
+
+        for name in keep & set(self.dict_df):
+            pd.testing.assert_frame_equal(getattr(self.m, name),
+                                          self.dict_df[name])
+
+    def test_restore_round_trip(self):
+
+        self.m.restore_build_data()
+
+        for name in set(self.dict_released) & set(self.dict_df):
+            pd.testing.assert_frame_equal(getattr(self.m, name),
+                                          self.dict_df[name])
+
+    def test_restore_not_spilled(self):
+
+        with self.assertRaisesRegex(ValueError, 'slim_keep'):
+            self.m.restore_build_data(['df_def_plant'])
+
+    def test_reset_all_parameters(self):
+
+        m = self.m
+        key = next(iter(m.vc_fl))
+        m.vc_fl[key] = -1
+
+        m.reset_all_parameters()
+
+        for name, dict_val in self.dict_par_val.items():
+            self.assertEqual({key: po.value(val) for key, val
+                              in getattr(m, name).items()}, dict_val)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the parsing of solver logs and the flagging of outlier runs.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from grimsel.core.model_loop import ModelLoop
+from grimsel.core.solver_stats import parse_log, flag_outliers
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+LOG_CPLEX = '''
+Tried aggregator 1 time.
+LP Presolve eliminated 1234 rows and 567 columns.
+Reduced LP has 45678 rows, 56789 columns, and 123456 nonzeros.
+Presolve time = 0.12 sec. (45.67 ticks)
+ Itn      Primal Obj        Dual Obj  Prim Inf Upper Inf  Dual Inf Inf Ratio
+   0   1.2345678e+08  -4.5678901e+07  1.23e+05  0.00e+00  4.56e+03  1.00e+00
+   1   9.8765432e+07  -1.2345678e+07  5.67e+04  0.00e+00  1.23e+03  2.00e+00
+  27   5.0000001e+07   4.9999999e+07  1.00e-06  0.00e+00  1.00e-07  1.00e+09
+Barrier time = 1.23 sec. (456.78 ticks)
+
+Primal crossover.
+  Primal:  Fixing 1234 variables.
+Dual crossover.
+  Dual:  Fixing 12 variables.
+Primal crossover.
+Total crossover time = 0.30 sec. (45.60 ticks)
+
+Barrier - Optimal:  Objective =  5.0000000000e+07
+Solution time =    1.80 sec.  Iterations = 1246 (12)
+Deterministic time = 600.00 ticks  (333.33 ticks/sec)
+'''
+
+LOG_GLPK = '''
+GLPK Simplex Optimizer, v4.65
+1200 rows, 3400 columns, 9800 non-zeros
+Preprocessing...
+*     0: obj =   0.000000000e+00 inf =   1.000e+03 (100)
+*   150: obj =   1.500000000e+05 inf =   0.000e+00 (20)
+*   212: obj =   1.200000000e+05 inf =   0.000e+00 (0)
+OPTIMAL LP SOLUTION FOUND
+Time used:   0.4 secs
+Memory used: 3.2 Mb (3355443 bytes)
+'''
+
+
+class TestParseLog(unittest.TestCase):
+
+    def test_cplex(self):
+
+        dict_stats = parse_log(LOG_CPLEX, 'cplex')
+
+        self.assertEqual(dict_stats,
+                         {'nrows_presolved': 45678., 'ncols_presolved': 56789.,
+                          'nnonzeros_presolved': 123456.,
+                          'tdiff_presolve': 0.12, 'iterations': 1246.,
+                          'iterations_barrier': 27., 'tdiff_barrier': 1.23,
+                          'crossover': 'dual, primal', 'tdiff_crossover': 0.3,
+                          'tdiff_solver': 1.8, 'ticks': 600.})
+
+    def test_cplex_barrier_summary(self):
+
+        # the summary line takes precedence over the iteration log
+        log = LOG_CPLEX + 'Barrier iterations = 30\n'
+
+        self.assertEqual(parse_log(log, 'cplex')['iterations_barrier'], 30.)
+
+    def test_glpk(self):
+
+        self.assertEqual(parse_log(LOG_GLPK, 'glpk'),
+                         {'nrows': 1200., 'ncols': 3400., 'nnonzeros': 9800.,
+                          'iterations': 212., 'tdiff_solver': 0.4,
+                          'solver_peak_mb': 3.2})
+
+    def test_unknown_solver_or_empty_log(self):
+
+        self.assertEqual(parse_log(LOG_CPLEX, 'mosek'), {})
+        self.assertEqual(parse_log('', 'cplex'), {})
+
+
+class TestFlagOutliers(unittest.TestCase):
+
+    def test_flag_outliers(self):
+
+        df_stats = pd.DataFrame({'run_id': range(4),
+                                 'iterations': [100., 110., 90., 1000.],
+                                 'iterations_barrier': np.nan,
+                                 'tdiff_solver': [1., 1., 1., 2.],
+                                 'tdiff_wall': [2., 2., 2., 3.],
+                                 'termination_condition': ['optimal', '',
+                                                           'infeasible',
+                                                           'optimal']})
+
+        df = flag_outliers(df_stats)
+
+        self.assertEqual(df.run_id.tolist(), [2, 3])
+        self.assertEqual(df.flag.tolist(),
+                         ['not optimal', 'iterations > 3 x median'])
+
+
+class TestReplaceRun(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.df_stats = pd.DataFrame({'run_id': [0, 1, 1],
+                                      'iterations': [10., 20., 30.]})
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def get_model_loop(self, output_target, cl_out):
+
+        iokwargs = {'output_target': output_target,
+                    'cl_out': os.path.join(self.tmp_dir, cl_out),
+                    'no_output': True}
+
+        return ModelLoop(nsteps=[('swco', 2)], iokwargs=iokwargs)
+
+    def test_hdf5(self):
+
+        ml = self.get_model_loop('hdf5', 'out.hdf5')
+
+        ml.append_to_table('def_solver_stats', self.df_stats)
+        ml.delete_from_table('def_solver_stats', 1)
+        ml.delete_from_table('def_missing', 1)
+
+        with pd.HDFStore(ml.io.cl_out, mode='r') as store:
+            df = store['def_solver_stats']
+        self.assertEqual(df.iterations.tolist(), [10.])
+
+    def test_fastparquet(self):
+
+        ml = self.get_model_loop('fastparquet', 'out')
+
+        ml.append_to_table('def_solver_stats', self.df_stats)
+        ml.delete_from_table('def_solver_stats', 1)
+        ml.delete_from_table('def_missing', 1)
+
+        df = pd.read_parquet(os.path.join(ml.io.cl_out,
+                                          'def_solver_stats.parq'))
+        self.assertEqual(df.iterations.tolist(), [10.])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
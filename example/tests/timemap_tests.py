@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the time maps: calendar columns of single- and multi-year
+time maps including leap years, time resolution, and filtering.
+
+"""
+
+import unittest
+import datetime
+
+import numpy as np
+
+from grimsel.auxiliary.timemap import (TimeMap, _days_to_civil,
+                                       _civil_to_days, _iso_week)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+HOURS_MONTH = [744, 672, 744, 720, 744, 720, 744, 744, 720, 744, 720, 744]
+
+
+
+class TestCalendar(unittest.TestCase):
+
+    def test_civil_days_round_trip(self):
+
+        days = np.arange(-800, 20000, 7)
+        year, month, day = _days_to_civil(days)
+
+        date_0 = datetime.date(1970, 1, 1)
+        list_exp = [date_0 + datetime.timedelta(days=int(d)) for d in days]
+
+        self.assertEqual(list(zip(year, month, day)),
+                         [(d.year, d.month, d.day) for d in list_exp])
+        self.assertTrue((_civil_to_days(year, month, day) == days).all())
+
+    def test_iso_week(self):
+
+        list_date = [datetime.date(2015, 1, 1), datetime.date(2015, 12, 31),
+                     datetime.date(2016, 1, 3), datetime.date(2016, 12, 31),
+                     datetime.date(2020, 12, 31), datetime.date(2021, 1, 4)]
+
+        week = _iso_week(np.array([d.year for d in list_date]),
+                         np.array([d.timetuple().tm_yday for d in list_date]),
+                         np.array([d.weekday() for d in list_date]))
+
+        self.assertEqual(list(week), [d.isocalendar()[1] for d in list_date])
+
+
+class TestTimeMap(unittest.TestCase):
+
+    def test_single_year(self):
+
+        df = TimeMap(nhours=1).df_time_map
+
+        self.assertEqual(len(df), 8760)
+        self.assertEqual(df.groupby('mt_id').size().tolist(), HOURS_MONTH)
+        # 2015-01-01 is a Thursday
+        self.assertEqual(df.dow.iloc[0], 3)
+        self.assertEqual(df.hy.tolist(), list(range(8760)))
+
+    def test_leap_year(self):
+
+        df = TimeMap(nhours=1, start='2016-1-1 00:00',
+                     stop='2016-12-31 23:59').df_time_map
+
+        # February 29 is removed, the weekdays follow the calendar
+        self.assertEqual(len(df), 8760)
+        self.assertEqual(df.groupby('mt_id').size().tolist(), HOURS_MONTH)
+        self.assertEqual(df.loc[df.mt_id == 2, 'dow'].iloc[0], 1)
+        self.assertEqual(df.loc[df.mt_id == 2, 'doy'].iloc[0], 61)
+
+    def test_multi_year(self):
+
+        tm = TimeMap(nhours=1, start='2015-1-1 00:00',
+                     stop='2016-12-31 23:59')
+        df = tm.df_time_map
+
+        self.assertEqual(len(df), 2 * 8760)
+        self.assertEqual(df.groupby('year').size().tolist(), [8760, 8760])
+        self.assertEqual(df.groupby('year').hy.max().tolist(), [8759] * 2)
+        self.assertEqual(df.sy.tolist(), list(range(2 * 8760)))
+
+        # ISO week 53 of 2015 extends into 2016; its hours are counted
+        # separately in each year
+        df_2015 = df.loc[df.year == 2015]
+        wk_weight = df_2015.groupby('wk_id').wk_weight.first()
+        self.assertEqual(wk_weight.tolist(),
+                         df_2015.groupby('wk_id').size().tolist())
+        self.assertEqual(wk_weight.iloc[-1], 96)
+        self.assertEqual(df.wk_weight.iloc[8760], 72)
+
+    def test_time_resolution_and_filter(self):
+
+        tm = TimeMap(nhours=4)
+        self.assertEqual(len(tm.df_time_red), 8760 // 4)
+        self.assertEqual(tm.df_time_red.weight.sum(), 8760)
+        self.assertEqual(tm.df_hoy_soy.groupby('sy').size().max(), 4)
+
+        tm = TimeMap(nhours=1, tm_filt=[('mt_id', [1])])
+        self.assertEqual(len(tm.df_time_red), 672)
+        self.assertAlmostEqual(tm.get_year_share(), 672 / 8760)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the time slot maps between connected nodes and the transmission
+bounds. The tables of a model with different time resolutions of the
+nodes are compared to the original row-wise implementation.
+
+"""
+
+import os
+import shutil
+import unittest
+import tempfile
+
+import pyomo.environ as po
+
+import grimsel
+import grimsel.core.model_loop as model_loop
+import grimsel.auxiliary.timemap as timemap
+from grimsel.core.model_base import ModelBase
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+DATA_PATH = os.path.join(os.path.dirname(grimsel.__file__), os.pardir,
+                         'input_data', 'csv_files_national_aggr')
+
+NHOURS = {'AT0': 24, 'CH0': 6, 'DE0': 12, 'FR0': 24, 'IT0': 1}
+
+
+def get_sysy_loop(m):
+    '''
+    Time slot correspondence of all node connections, generated for each
+    connection separately: ``{(nd, nd_2): set of (sy, sy2)}``.
+    '''
+
+    df_ndcnn = m.df_node_connect[['nd_id', 'nd_2_id']].drop_duplicates()
+
+    dict_sysy = {}
+    for nd, nd_2 in df_ndcnn.itertuples(index=False):
+
+        freq, nhours = m._dict_nd_tm[nd]
+        freq_2, nhours_2 = m._dict_nd_tm[nd_2]
+
+        tm = timemap.TimeMap(tm_filt=m.tm_filt, minimum=True,
+                             freq=min(freq, freq_2), nhours=nhours)
+        tm_2 = timemap.TimeMap(tm_filt=m.tm_filt, minimum=True,
+                               freq=min(freq, freq_2), nhours=nhours_2)
+        df = tm.df_hoy_soy.merge(tm_2.df_hoy_soy.rename(
+                                            columns={'sy': 'sy2'}), on='hy')
+
+        dict_sysy[(nd, nd_2)] = set(zip(df.sy, df.sy2))
+
+    return dict_sysy
+
+
+class TestTransmission(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp()
+
+        mkwargs = {'slct_encar': ['EL'], 'nhours': NHOURS,
+                   'tm_filt': [('mt_id', [0, 1])],
+                   'constraint_groups': ModelBase.get_constraint_groups()}
+        iokwargs = {'data_path': DATA_PATH, 'output_target': 'hdf5',
+                    'cl_out': os.path.join(cls.tmp_dir, 'out.hdf5'),
+                    'no_output': True, 'dev_mode': True}
+
+        cls.ml = model_loop.ModelLoop(nsteps=[('swco', 1)], mkwargs=mkwargs,
+                                      iokwargs=iokwargs)
+        cls.ml.build_model()
+        cls.m = cls.ml.m
+
+        cls.dict_sysy = get_sysy_loop(cls.m)
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_dict_sysy(self):
+
+        dict_exp = {}
+        for (nd, nd_2), set_sysy in self.dict_sysy.items():
+            for sy, sy2 in set_sysy:
+                dict_exp.setdefault((nd, nd_2, sy), set()).add(sy2)
+                dict_exp.setdefault((nd_2, nd, sy2), set()).add(sy)
+
+        self.assertEqual(self.m.dict_sysy, dict_exp)
+
+    def test_symin_ndcnn(self):
+
+        m = self.m
+
+        set_exp = set()
+        df_ndcnn = m.df_node_connect[['nd_id', 'nd_2_id', 'ca_id']]
+        for nd, nd_2, ca in df_ndcnn.drop_duplicates().itertuples(
+                                                                index=False):
+
+            nd_smaller = m._dict_nd_tm[nd][1] <= m._dict_nd_tm[nd_2][1]
+            tm_min = m.dict_nd_tm_id[nd if nd_smaller else nd_2]
+
+            self.assertEqual(m.dict_ndnd_tm_id[(nd, nd_2)], tm_min)
+            self.assertEqual(m.dict_ndnd_tm_id[(nd_2, nd)], tm_min)
+
+            set_exp |= {(tm_min, sy if nd_smaller else sy2, nd, nd_2, ca)
+                        for sy, sy2 in self.dict_sysy[(nd, nd_2)]}
+
+        cols = ['tm_min_id', 'symin', 'nd_id', 'nd_2_id', 'ca_id']
+        set_res = set(map(tuple, m.df_symin_ndcnn[cols].values.tolist()))
+
+        self.assertEqual(len(m.df_symin_ndcnn), len(set_exp))
+        self.assertEqual(set_res, set_exp)
+
+    def test_transmission_bounds(self):
+
+        m = self.m
+        dict_weight = {nd: po.value(m.nd_weight[nd]) for nd in m.nd}
+
+        self.assertTrue(len(m.trm))
+
+        for (sy, nd, nd_2, ca), trm in m.trm.items():
+
+            nd_w = max([nd, nd_2], key=lambda x: dict_weight[x])
+            mt = m.dict_soy_month[(m.dict_ndnd_tm_id[nd, nd_2], sy)]
+
+            self.assertAlmostEqual(po.value(trm.ub),
+                                   po.value(m.cap_trme_leg[mt, nd, nd_2, ca])
+                                   * dict_weight[nd_w])
+            self.assertAlmostEqual(po.value(trm.lb),
+                                   - po.value(m.cap_trmi_leg[mt, nd, nd_2, ca])
+                                   * dict_weight[nd_w])
+
+    def test_get_last_soy(self):
+
+        for tm, list_sy in self.m.dict_tm_sy.items():
+
+            self.assertEqual(self.m.get_last_soy(tm, list_sy[0]),
+                             list_sy[-1])
+            self.assertEqual([self.m.get_last_soy(tm, sy)
+                              for sy in list_sy[1:]], list_sy[:-1])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the input validation. The input tables of a minimal two-node
+model are attributes of a simple namespace; each test introduces a single
+inconsistency and checks the reported problem.
+
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from grimsel.core.validation import (validate_input, format_problems,
+                                     InputValidationError)
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+NSY = 4
+
+
+def make_model():
+
+    nhy = pd.DataFrame({'hy': range(NSY)})
+
+    return SimpleNamespace(
+        nhours=1,
+        df_tm_soy=pd.DataFrame({'sy': range(NSY), 'weight': 8760 / NSY}),
+        df_def_node=pd.DataFrame({'nd_id': [0, 1], 'nd': ['N0', 'N1'],
+                                  'price_co2': [40., 40.],
+                                  'nd_weight': [1., 1.]}),
+        df_def_fuel=pd.DataFrame({'fl_id': [0, 1], 'fl': ['gas', 'wind'],
+                                  'co2_int': [0.2, 0.]}),
+        df_def_pp_type=pd.DataFrame({'pt_id': [0, 1]}),
+        df_def_encar=pd.DataFrame({'ca_id': [0], 'ca': ['EL']}),
+        df_def_month=pd.DataFrame({'mt_id': range(12)}),
+        df_def_plant=pd.DataFrame({'pp_id': [0, 1, 2],
+                                   'pp': ['N0_GAS', 'N1_GAS', 'N1_WIND'],
+                                   'nd_id': [0, 1, 1], 'fl_id': [0, 0, 1],
+                                   'pt_id': [0, 0, 1],
+                                   'set_def_pp': [1, 1, 0],
+                                   'set_def_pr': [0, 0, 1]}),
+        df_plant_encar=pd.DataFrame({'pp_id': [0, 1, 2], 'ca_id': [0, 0, 0],
+                                     'cap_pwr_leg': [100., 200., 50.],
+                                     'pp_eff': [0.5, 0.4, np.nan],
+                                     'cap_avlb': [1., 0.9, 1.]}),
+        df_node_encar=pd.DataFrame({'nd_id': [0, 1], 'ca_id': [0, 0],
+                                    'dmnd_pf_id': [0, 1],
+                                    'grid_losses': [0.05, 0.05]}),
+        df_fuel_node_encar=pd.DataFrame({'fl_id': [0, 0], 'nd_id': [0, 1],
+                                         'ca_id': [0, 0],
+                                         'vc_fl': [20., 20.]}),
+        df_node_connect=pd.DataFrame({'nd_id': 0, 'nd_2_id': 1, 'ca_id': 0,
+                                      'mt_id': range(12),
+                                      'cap_trme_leg': 100.,
+                                      'cap_trmi_leg': 100.}),
+        df_profdmnd=pd.concat([nhy.assign(dmnd_pf_id=pf_id, value=1000.)
+                               for pf_id in [0, 1]], ignore_index=True),
+        )
+
+
+class TestValidateInput(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = make_model()
+
+    def get_problems(self):
+
+        df = validate_input(self.m)
+        return df.set_index(['check', 'table', 'column'])
+
+    def test_consistent_input(self):
+
+        self.assertTrue(validate_input(self.m).empty)
+
+    def test_foreign_key(self):
+
+        self.m.df_def_plant.loc[1, 'nd_id'] = 5
+
+        df = self.get_problems()
+
+        self.assertIn(('foreign_key', 'df_def_plant', 'nd_id'), df.index)
+        self.assertEqual(df.loc[('foreign_key', 'df_def_plant', 'nd_id'),
+                                'examples'], '5')
+
+    def test_primary_key(self):
+
+        self.m.df_plant_encar = pd.concat([self.m.df_plant_encar,
+                                           self.m.df_plant_encar.iloc[[0]]])
+
+        df = self.get_problems()
+
+        row = df.loc[('primary_key', 'df_plant_encar', 'pp_id, ca_id')]
+        self.assertEqual(row['count'], 1)
+        self.assertEqual(row.examples, '(0, 0)')
+
+    def test_incomplete_profile(self):
+
+        df_prof = self.m.df_profdmnd
+        self.m.df_profdmnd = df_prof.loc[~((df_prof.dmnd_pf_id == 1)
+                                           & (df_prof.hy == 2))]
+
+        df = self.get_problems()
+
+        row = df.loc[('profile', 'df_profdmnd', 'hy')]
+        self.assertEqual(row.examples, '1')
+        self.assertIn('exactly %d hours'%NSY, row.message)
+
+    def test_missing_fuel_price(self):
+
+        self.m.df_fuel_node_encar = self.m.df_fuel_node_encar.iloc[:1]
+
+        df = self.get_problems()
+
+        row = df.loc[('coverage', 'df_fuel_node_encar',
+                      'fl_id, nd_id, ca_id')]
+        self.assertEqual(row.examples, 'N1_GAS')
+
+    def test_missing_transmission_months(self):
+
+        self.m.df_node_connect = self.m.df_node_connect.iloc[:-1]
+
+        df = self.get_problems()
+
+        self.assertIn(('coverage', 'df_node_connect', 'mt_id'), df.index)
+
+    def test_value_ranges_and_scenario_columns(self):
+
+        self.m.df_plant_encar['cap_avlb'] = [1., 1.1, 1.]
+        self.m.df_plant_encar['cap_pwr_leg_yr2030'] = [100., -1., 0.]
+
+        df = self.get_problems()
+
+        self.assertIn(('range', 'df_plant_encar', 'cap_avlb'), df.index)
+        self.assertIn(('range', 'df_plant_encar', 'cap_pwr_leg_yr2030'),
+                      df.index)
+        self.assertNotIn(('range', 'df_plant_encar', 'cap_pwr_leg'),
+                         df.index)
+
+    def test_non_positive_efficiency(self):
+
+        self.m.df_plant_encar['pp_eff'] = [0.5, 0., np.nan]
+
+        df = self.get_problems()
+
+        self.assertEqual(df.loc[('range', 'df_plant_encar', 'pp_eff'),
+                                'examples'], 'N1_GAS')
+
+    def test_duplicate_plant(self):
+
+        self.m.df_def_plant = pd.concat([self.m.df_def_plant,
+                                         self.m.df_def_plant.iloc[[2]]],
+                                        ignore_index=True)
+        self.m.df_plant_encar['pp_eff'] = [0.5, 0., np.nan]
+
+        df = self.get_problems()
+
+        self.assertEqual(df.loc[('primary_key', 'df_def_plant', 'pp_id'),
+                                'examples'], '2')
+        self.assertEqual(df.loc[('range', 'df_plant_encar', 'pp_eff'),
+                                'examples'], 'N1_GAS')
+
+    def test_monthly_factors(self):
+
+        self.m.df_parameter_month = pd.DataFrame(
+                {'parameter': 'vc_fl', 'set_1_name': 'fl_id', 'set_1_id': 0,
+                 'set_2_name': 'nd_id', 'set_2_id': [0] * 6 + [1] * 5,
+                 'mt_id': list(range(6)) + list(range(5)), 'mt_fact': 1.})
+
+        df = self.get_problems()
+
+        self.assertEqual(df.loc[('monthly_factors', 'df_parameter_month',
+                                 'mt_id'), 'examples'], '6, 7, 8, 9, 10, ...')
+        self.assertIn(('monthly_factors', 'df_parameter_month',
+                       'parameter, set_1_id, set_2_id'), df.index)
+
+    def test_time_map_nodes(self):
+
+        self.m.nhours = {'N0': 1, 'N2': 2}
+
+        df = self.get_problems()
+
+        self.assertEqual(df.loc[('time_map', 'df_def_node', 'nd'),
+                                'examples'], 'N2')
+
+    def test_all_problems_reported(self):
+
+        self.m.df_def_plant.loc[1, 'pt_id'] = 5
+        self.m.df_plant_encar['cap_pwr_leg'] = [100., -1., 50.]
+
+        df_problems = validate_input(self.m)
+        err = InputValidationError(df_problems)
+
+        self.assertEqual(set(df_problems.check), {'foreign_key', 'range'})
+        self.assertIs(err.df_problems, df_problems)
+        self.assertIn(format_problems(df_problems), str(err))
+        self.assertEqual(len(format_problems(df_problems).splitlines()),
+                         len(df_problems))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
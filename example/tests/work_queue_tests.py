@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the file system work queue: population, claiming, completion,
+and the reclaiming of expired leases. The queue is a temporary directory.
+
+"""
+
+import os
+import time
+import shutil
+import unittest
+import tempfile
+
+from grimsel.auxiliary.work_queue import WorkQueue, STATUS_COLS
+
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+
+        self.queue_dir = tempfile.mkdtemp()
+        self.wq = WorkQueue(self.queue_dir, lease_timeout=60, max_attempts=2)
+        self.wq.populate([2, 0, 1])
+
+    def tearDown(self):
+
+        shutil.rmtree(self.queue_dir)
+
+    def expire(self, run_id):
+        ''' Sets the last lease renewal before the lease timeout. '''
+
+        t_old = time.time() - 2 * self.wq.lease_timeout
+        os.utime(self.wq._get_path('leased', run_id), (t_old, t_old))
+
+    def test_populate(self):
+
+        self.assertEqual(self.wq.get_list_run_id('todo'), [0, 1, 2])
+
+        self.wq.claim('w0')
+        self.assertEqual(self.wq.populate([0, 1, 2, 3]), 1)
+        self.assertEqual(self.wq.get_list_run_id('todo'), [1, 2, 3])
+
+        self.assertEqual(self.wq.populate([5], reset=True), 1)
+        self.assertEqual(self.wq.get_list_run_id('todo'), [5])
+        self.assertEqual(self.wq.get_list_run_id('leased'), [])
+
+    def test_claim_and_complete(self):
+
+        self.assertEqual([self.wq.claim('w0'), self.wq.claim('w1')], [0, 1])
+        self.assertEqual(self.wq.get_list_run_id('leased'), [0, 1])
+        self.assertEqual(self.wq._read('leased', 1)['worker'], 'w1')
+
+        self.assertTrue(self.wq.complete(0, tdiff=1.5))
+        self.assertTrue(self.wq.complete(1, tdiff=2., error='Traceback'))
+        self.assertEqual(self.wq.claim('w0'), 2)
+        self.assertIsNone(self.wq.claim('w0'))
+        self.assertFalse(self.wq.is_complete())
+
+        self.wq.complete(2, tdiff=1.)
+        self.assertTrue(self.wq.is_complete())
+
+        df = self.wq.get_status()
+        self.assertEqual(df.columns.tolist(), STATUS_COLS)
+        self.assertEqual(df.status.tolist(), ['done', 'failed', 'done'])
+        self.assertEqual(df.attempts.tolist(), [1, 1, 1])
+
+    def test_reclaim_expired(self):
+
+        self.wq.claim('w0')
+        self.wq.claim('w1')
+        self.expire(0)
+
+        self.assertEqual(self.wq.reclaim_expired(), [0])
+        self.assertEqual(self.wq.get_list_run_id('todo'), [0, 2])
+        self.assertEqual(self.wq.get_list_run_id('leased'), [1])
+
+        # the lease of the original worker is lost
+        self.assertFalse(self.wq.renew(0))
+        self.assertFalse(self.wq.complete(0, tdiff=1.))
+
+        # second expiry: max_attempts reached
+        self.assertEqual(self.wq.claim('w2'), 0)
+        self.expire(0)
+        self.assertEqual(self.wq.reclaim_expired(), [0])
+        self.assertEqual(self.wq.get_list_run_id('failed'), [0])
+
+        df = self.wq.get_status().set_index('run_id')
+        self.assertEqual(df.loc[0, 'attempts'], 2)
+        self.assertIn('expired 2 times', df.loc[0, 'error'])
+
+    def test_renewed_lease_not_reclaimed(self):
+
+        self.wq.claim('w0')
+        self.expire(0)
+        self.assertTrue(self.wq.renew(0))
+
+        self.assertEqual(self.wq.reclaim_expired(), [])
+
+    def test_acquire_merge(self):
+
+        self.assertTrue(self.wq.acquire_merge())
+        self.assertFalse(self.wq.acquire_merge())
+
+        # new runs require a new merge
+        self.wq.populate([3])
+        self.assertTrue(self.wq.acquire_merge())
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,171 @@
+'''
+On-disk cache
+==============
+
+Content-addressed cache for intermediate tables whose generation only depends
+on their inputs, e.g. time maps (:class:`grimsel.auxiliary.timemap.TimeMap`)
+and time-mapped profiles
+(:func:`grimsel.core.model_base.ModelBase.map_to_time_res`).
+
+* Cache keys are hashes of all inputs (see :func:`get_key`). Modified
+  inputs therefore never hit outdated cache files; there is no invalidation.
+* Files are written to a temporary file in the cache directory first and
+  then moved to their final name (atomic on POSIX and Windows). Concurrent
+  writers, e.g. parallel model runs, never produce incomplete cache files;
+  the last writer wins.
+
+The cache directory is set through the ``cache_dir`` arguments or the
+environment variable ``GRIMSEL_CACHE_DIR``. Caching is disabled if neither
+is set.
+
+'''
+
+import os
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# increment if the structure of cached tables changes
+CACHE_VERSION = 1
+
+
+def get_cache_dir(cache_dir=None):
+    '''
+    Returns ``cache_dir`` or the ``GRIMSEL_CACHE_DIR`` environment variable.
+
+    '''
+
+    return cache_dir if cache_dir else os.environ.get('GRIMSEL_CACHE_DIR')
+
+
+def _update_hash(hsh, obj):
+
+    if isinstance(obj, pd.DataFrame):
+        hsh.update(repr((obj.columns.tolist(),
+                         obj.dtypes.astype(str).tolist())).encode())
+        hsh.update(pd.util.hash_pandas_object(obj, index=False).values
+                                                               .tobytes())
+    elif isinstance(obj, pd.Series):
+        _update_hash(hsh, obj.to_frame())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            hsh.update(repr(key).encode())
+            _update_hash(hsh, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        hsh.update(b'[')
+        for item in obj:
+            _update_hash(hsh, item)
+        hsh.update(b']')
+    elif isinstance(obj, (np.ndarray, range)):
+        _update_hash(hsh, np.asarray(obj).tolist())
+    else:
+        hsh.update(repr(obj).encode())
+
+
+def get_key(*objs):
+    '''
+    Hash of the input objects.
+
+    Supports DataFrames, Series, numpy arrays, and (nested) dicts, lists, and
+    tuples of these or of objects with a deterministic ``repr``.
+
+    Returns
+    -------
+    str
+        hexadecimal SHA-1 digest
+
+    '''
+
+    hsh = hashlib.sha1(repr(CACHE_VERSION).encode())
+    for obj in objs:
+        _update_hash(hsh, obj)
+
+    return hsh.hexdigest()
+
+
+def _get_file(cache_dir, name, key):
+
+    return os.path.join(cache_dir, '%s_%s.pickle'%(name, key))
+
+
+def read(cache_dir, name, key):
+    '''
+    Reads a cached object.
+
+    Parameters
+    ----------
+    cache_dir : str
+        cache directory; caching is disabled if None
+        (see :func:`get_cache_dir`)
+    name : str
+        file name prefix
+    key : str
+        cache key (:func:`get_key`)
+
+    Returns
+    -------
+    object
+        the cached object; None if it doesn't exist or can't be read
+
+    '''
+
+    cache_dir = get_cache_dir(cache_dir)
+
+    if not cache_dir:
+        return None
+
+    fn = _get_file(cache_dir, name, key)
+
+    if not os.path.isfile(fn):
+        return None
+
+    try:
+        obj = pd.read_pickle(fn)
+    except Exception as e:
+        logger.warning('Failed to read cache file %s: %s'%(fn, e))
+        return None
+
+    logger.info('Read %s from cache file %s'%(name, fn))
+
+    return obj
+
+
+def write(obj, cache_dir, name, key):
+    '''
+    Writes an object to the cache.
+
+    See :func:`read` for the parameters. Failures are logged and otherwise
+    ignored.
+
+    '''
+
+    cache_dir = get_cache_dir(cache_dir)
+
+    if not cache_dir:
+        return
+
+    fn = _get_file(cache_dir, name, key)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, fn_tmp = tempfile.mkstemp(dir=cache_dir, prefix=name,
+                                      suffix='.tmp')
+        os.close(fd)
+    except OSError as e:
+        logger.warning('Failed to write cache file %s: %s'%(fn, e))
+        return
+
+    try:
+        pd.to_pickle(obj, fn_tmp)
+        os.replace(fn_tmp, fn)
+    except Exception as e:
+        logger.warning('Failed to write cache file %s: %s'%(fn, e))
+        if os.path.isfile(fn_tmp):
+            os.remove(fn_tmp)
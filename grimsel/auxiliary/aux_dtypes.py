@@ -0,0 +1,171 @@
+'''
+Data type policy
+=================
+
+Memory-efficient data types for the model's input, intermediate, and output
+tables. The policy is opt-in through the :class:`ModelBase` keyword
+arguments ``narrow_dtypes`` and ``float32_profiles``.
+
+* Integer id columns are cast to the fixed narrow types of :data:`ID_DTYPES`
+  if all values fit. Fixed (instead of value-dependent) types make sure
+  tables appended over several model runs keep consistent column types.
+* Repetitive string columns are converted to ``category``.
+* Profile ``value`` columns are optionally stored as ``float32``.
+
+'''
+
+import os
+import resource
+
+import numpy as np
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+ID_DTYPES = {**{col: np.dtype('int16')
+                for col in ['nd_id', 'nd_2_id', 'ca_id', 'ca_2_id', 'fl_id',
+                            'pt_id', 'mt_id', 'wk_id', 'tm_id', 'tm_2_id',
+                            'tm_min_id']},
+             **{col: np.dtype('int32')
+                for col in ['run_id', 'pp_id', 'pf_id', 'supply_pf_id',
+                            'dmnd_pf_id', 'price_pf_id', 'pricebuy_pf_id',
+                            'pricesll_pf_id', 'sy', 'sy2', 'symin', 'hy',
+                            'doy', 'how']}}
+
+# maximum ratio unique values/rows for the conversion to categoricals
+MAX_CAT_RATIO = 0.5
+
+
+def _fits(ser, dtype):
+    ''' Checks whether the integer-valued Series can be cast to dtype. '''
+
+    if ser.isna().any():
+        return False
+
+    vals = ser.values
+
+    if not np.issubdtype(vals.dtype, np.integer):
+        if not np.issubdtype(vals.dtype, np.floating):
+            return False
+        if not (np.mod(vals, 1) == 0).all():
+            return False
+
+    if not len(vals):
+        return True
+
+    info = np.iinfo(dtype)
+    return info.min <= vals.min() and vals.max() <= info.max
+
+
+def narrow_dtypes(df, float32_cols=(), categorical=True):
+    '''
+    Applies the data type policy to a single DataFrame.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        input table; modified copy is returned
+    float32_cols : list of str
+        columns to be cast to ``float32``
+    categorical : bool
+        convert repetitive string columns to ``category``
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    '''
+
+    if df is None or not isinstance(df, pd.DataFrame):
+        return df
+
+    dict_dtype = {}
+    for col in df.columns:
+
+        if col in ID_DTYPES:
+            if (not df[col].dtype == ID_DTYPES[col]
+                    and _fits(df[col], ID_DTYPES[col])):
+                dict_dtype[col] = ID_DTYPES[col]
+
+        elif col in float32_cols:
+            if np.issubdtype(df[col].dtype, np.floating):
+                dict_dtype[col] = np.dtype('float32')
+
+        elif categorical and df[col].dtype == object and len(df) > 1:
+            if (df[col].map(type) == str).all() and (
+                    df[col].nunique() <= MAX_CAT_RATIO * len(df)):
+                dict_dtype[col] = 'category'
+
+    return df.astype(dict_dtype) if dict_dtype else df
+
+
+def output_dtypes(df):
+    '''
+    Fixed data types for output tables.
+
+    Id columns are cast to :data:`ID_DTYPES` (``int32`` for unknown index
+    columns), ``value`` columns remain ``float64``. Id columns with values
+    out of the range of their type keep their original type.
+
+    '''
+
+    dtype_dict = {'value': np.dtype('float64'),
+                  'bool_out': np.dtype('bool')}
+
+    for col in df.columns:
+        if col in ('value', 'bool_out'):
+            continue
+        dtype = ID_DTYPES.get(col, np.dtype('int32'))
+        if _fits(df[col], dtype):
+            dtype_dict[col] = dtype
+        else:
+            logger.warning('Output column %s doesn\'t fit %s; keeping %s'
+                           %(col, dtype, df[col].dtype))
+
+    return {col: dtype for col, dtype in dtype_dict.items()
+            if col in df.columns}
+
+
+def get_rss():
+    '''
+    Returns the resident set size of the current process in MB.
+
+    Uses ``/proc/self/statm`` if available, otherwise falls back to the
+    peak resident set size reported by :func:`resource.getrusage`.
+
+    '''
+
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            nrss = int(f.read().split()[1])
+        return nrss * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_df_memory(obj, prefix='df_'):
+    '''
+    Returns the memory usage of all DataFrame attributes of ``obj`` in MB.
+
+    Parameters
+    ----------
+    obj : object
+        e.g. :class:`ModelBase` instance
+    prefix : str
+        attribute name prefix of the DataFrames
+
+    Returns
+    -------
+    pandas.Series
+        memory usage by attribute name
+
+    '''
+
+    return pd.Series({name: df.memory_usage(deep=True).sum() / 1024**2
+                      for name, df in vars(obj).items()
+                      if name.startswith(prefix)
+                      and isinstance(df, pd.DataFrame)}, dtype=float)
@@ -5,18 +5,26 @@ Created on Tue Nov  5 21:31:46 2019
 
 @author: user
 """
-from multiprocess import Pool
-from multiprocess import current_process
+import os
+import gc
+import time
+import queue
+import datetime
+import traceback
 import contextlib
+
+import pandas as pd
+from multiprocess import Pool, Queue
+from multiprocess import current_process
+import grimsel.core.run_control as run_control
 from grimsel.core.model_loop import logger_parallel
 from grimsel import logger
 
-def _call_list_run_id(func, list_run_id):
-
-    for run_id in list_run_id:
-        func(run_id)
-
+# seconds between dead worker checks of the parent process
+POLL_INTERVAL = 1.
 
+# state of the worker processes, set by _init_worker
+_worker = {}
 
 @contextlib.contextmanager
 def _adjust_logger_levels(do, ml, grimsel_level, parallel_level, verbose_solver):
@@ -37,19 +45,367 @@ def _adjust_logger_levels(do, ml, grimsel_level, parallel_level, verbose_solver)
     logger_parallel.setLevel(old_parallel_level)
 
 
-def run_sequential(ml, func, adjust_logger_levels=True):
-    ''' Sequential execution of all model runs. '''
+@contextlib.contextmanager
+def _frozen_gc(do):
+    '''
+    Moves all objects to the permanent gc generation during the fork.
+
+    Otherwise the first garbage collections in the workers touch the
+    reference counts of the inherited model objects, which copies the
+    corresponding copy-on-write memory pages to each worker.
+    '''
+
+    do = do and hasattr(gc, 'freeze')  # Python >= 3.7
+
+    if do:
+        gc.collect()
+        gc.freeze()
+
+    try:
+        yield
+    finally:
+        if do:
+            gc.unfreeze()
+
+
+def _format_time(seconds):
+
+    return str(datetime.timedelta(seconds=int(round(seconds))))
+
+
+def _init_worker(func, init_func, msg_queue, timeout=None):
+    '''
+    Pool initializer, called once in each worker process.
+    '''
+
+    _worker.update(func=func, queue=msg_queue, init_error=None,
+                   timeout=timeout)
+
+    if init_func:
+        try:
+            init_func()
+        except Exception:
+            # a raising initializer would make the pool respawn workers
+            # indefinitely; all runs of this worker fail instead
+            _worker['init_error'] = traceback.format_exc()
+
+
+def _run_chunk(ichunk, list_run_id, stop_on_error):
+    '''
+    Task executed by the workers: runs a chunk of run_ids in order.
+
+    Start and end of each run are reported to the parent through the
+    message queue.
+    '''
+
+    msg_queue, pid = _worker['queue'], os.getpid()
+    name = current_process().name
+
+    for irun, run_id in enumerate(list_run_id):
+
+        msg_queue.put(('start', pid, name, ichunk, run_id, None, None))
+
+        t = time.time()
+        error = _worker['init_error']
+
+        if not error:
+            try:
+                with run_control.time_limit(_worker['timeout']):
+                    _worker['func'](run_id)
+            except Exception:
+                error = traceback.format_exc()
+                logger_parallel.error('Run_id %s failed:\n%s'%(run_id, error))
+
+        msg_queue.put(('done', pid, name, ichunk, run_id,
+                       time.time() - t, error))
+
+        if error and stop_on_error:
+            for run_id_skip in list_run_id[irun + 1:]:
+                msg_queue.put(('skipped', pid, name, ichunk, run_id_skip,
+                               None, 'Skipped after failure of run_id %s'
+                                     %run_id))
+            break
+
+    return ichunk
+
+
+def get_chunks(ml, groupby=None, chunksize=1, durations=None):
+    '''
+    Splits the model runs into the tasks sent to the workers.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop instance
+    groupby : list of `ModelLoop.df_def_run` columns
+        each group of runs becomes a chain of runs executed in order by
+        the same worker; chains are sorted longest-first to reduce the idle
+        time at the end
+    chunksize : int
+        number of runs per chunk if ``groupby`` is None
+    durations : dict, optional
+        expected durations ``{run_id: seconds}``, e.g. from
+        :func:`grimsel.auxiliary.run_history.RunHistory.predict`; runs and
+        chains are sorted by expected duration instead of ``run_id`` and
+        length; runs without a value get the mean duration
+
+    Returns
+    -------
+    list of lists
+        run_ids of each chunk
+
+    '''
+
+    list_run_id = list(ml.get_list_run_id())
+
+    if durations:
+        mean_duration = sum(durations.values()) / len(durations)
+        get_duration = lambda run_id: durations.get(run_id, mean_duration)
+    else:
+        get_duration = lambda run_id: 1
+
+    if groupby:
+        df_def_run = ml.df_def_run.loc[ml.df_def_run.run_id
+                                                    .isin(list_run_id)]
+        chunks = (df_def_run.groupby(groupby).run_id.apply(list).tolist())
+        chunks = sorted(chunks, reverse=True,
+                        key=lambda chunk: sum(map(get_duration, chunk)))
+    else:
+        if durations:
+            list_run_id = sorted(list_run_id, key=get_duration, reverse=True)
+        chunksize = max(1, int(chunksize))
+        chunks = [list_run_id[i:i + chunksize]
+                  for i in range(0, len(list_run_id), chunksize)]
+
+    return chunks
+
+
+class _Progress():
+    '''
+    Bookkeeping of the parallel model runs in the parent process.
+    '''
+
+    def __init__(self, chunks, nruns=None, checkpoint=None):
+
+        self.chunks = chunks
+        self.checkpoint = checkpoint
+        self.nruns = (nruns if nruns is not None
+                      else sum(len(chunk) for chunk in chunks))
+        self.t_start = time.time()
+
+        self.status = {}
+        self.any_lost = False
+        # pid -> (worker name, chunk index, run_id) of the runs in progress
+        self.running = {}
+
+    @property
+    def ndone(self):
+
+        return len(self.status)
+
+    def set_status(self, run_id, status, worker, tdiff=None, error=None):
+
+        self.status[run_id] = dict(status=status, worker=worker,
+                                   tdiff=tdiff, error=error)
+
+        if self.checkpoint:
+            run_control.write_checkpoint(self.checkpoint, run_id, status,
+                                         worker, tdiff, error)
+
+    def handle(self, msg):
+
+        kind, pid, name, ichunk, run_id, tdiff, error = msg
+
+        if kind == 'start':
+            self.running[pid] = (name, ichunk, run_id)
+            return
+
+        self.running.pop(pid, None)
+
+        if kind == 'skipped':
+            self.set_status(run_id, 'skipped', name, error=error)
+        else:
+            self.set_status(run_id, 'failed' if error else 'done',
+                            name, tdiff, error)
+            self.log_progress(run_id, name, tdiff)
+
+    def log_progress(self, run_id, name, tdiff):
+
+        elapsed = time.time() - self.t_start
+        nfailed = sum(val['status'] != 'done'
+                      for val in self.status.values())
+        eta = elapsed / self.ndone * (self.nruns - self.ndone)
+
+        logger_parallel.info(('%d/%d runs finished (%d failed); run_id %s '
+                              'took %s on %s; elapsed %s, ETA %s')
+                             %(self.ndone, self.nruns, nfailed, run_id,
+                               _format_time(tdiff), name,
+                               _format_time(elapsed), _format_time(eta)))
+
+    def check_workers(self, pool):
+        '''
+        Marks the remaining runs of dead workers' chunks as lost.
+
+        Returns
+        -------
+        bool
+            True if any runs were lost
+
+        '''
+
+        # the pool replaces dead workers; only the live ones are listed
+        alive = {proc.pid for proc in pool._pool if proc.exitcode is None}
+
+        dead = [pid for pid in self.running if pid not in alive]
+
+        for pid in dead:
+            name, ichunk, run_id = self.running.pop(pid)
+            list_lost = [run_id_lost for run_id_lost in self.chunks[ichunk]
+                         if run_id_lost not in self.status]
+
+            logger_parallel.error(('Worker %s (pid %d) died during run_id %s;'
+                                   ' lost run_ids %s')
+                                  %(name, pid, run_id, list_lost))
+
+            for run_id_lost in list_lost:
+                self.set_status(run_id_lost, 'lost', name,
+                                error='Worker %s died'%name)
+
+        return bool(dead)
+
+    def get_table(self):
+
+        df = pd.DataFrame([dict(run_id=run_id, **val)
+                           for run_id, val in self.status.items()],
+                          columns=['run_id', 'status', 'worker',
+                                   'tdiff', 'error'])
+
+        return df.sort_values('run_id').reset_index(drop=True)
+
+
+def _skip_done(chunks, checkpoint):
+    '''
+    Removes the runs which are done according to the checkpoint file.
+    '''
+
+    set_done = run_control.get_run_ids_done(checkpoint)
+
+    if set_done:
+        logger_parallel.info('Skipping %d runs done according to checkpoint '
+                             '%s'%(len(set_done), checkpoint))
+
+    chunks = [[run_id for run_id in chunk if run_id not in set_done]
+              for chunk in chunks]
+
+    return [chunk for chunk in chunks if chunk]
+
+
+def run_sequential(ml, func, adjust_logger_levels=True, timeout=None,
+                   checkpoint=None, stop_on_error=False):
+    '''
+    Sequential execution of all model runs.
+
+    Parameters
+    ----------
+    func : function(run_id)
+        performs a single model run
+    timeout, checkpoint :
+        see :func:`run_parallel`
+    stop_on_error : bool
+        raise the exception of the first failed run; otherwise the remaining
+        runs are performed
+
+    Returns
+    -------
+    pandas.DataFrame
+        status of each run as returned by :func:`run_parallel`
+
+    '''
+
+    chunks = [list(ml.get_list_run_id())]
+    if checkpoint:
+        chunks = _skip_done(chunks, checkpoint)
+    list_run_id = chunks[0] if chunks else []
+
+    progress = _Progress(chunks, checkpoint=checkpoint)
 
     with _adjust_logger_levels(adjust_logger_levels,
                                ml, 'DEBUG', 'ERROR', True):
 
-        _call_list_run_id(func, ml.get_list_run_id())
+        for run_id in list_run_id:
+
+            t = time.time()
+            error = None
+            try:
+                with run_control.time_limit(timeout):
+                    func(run_id)
+            except Exception:
+                if stop_on_error:
+                    raise
+                error = traceback.format_exc()
+                logger.error('Run_id %s failed:\n%s'%(run_id, error))
+
+            progress.set_status(run_id, 'failed' if error else 'done',
+                                current_process().name, time.time() - t,
+                                error)
+
+    return _get_status_table(progress)
+
+
+def map_parallel(func, list_args, nproc=None, freeze_gc=True):
+    '''
+    Parallel execution of a function for a list of arguments.
+
+    Unlike :func:`run_parallel`, the tasks aren't model runs, e.g. the
+    subproblems of :class:`grimsel.core.benders.BendersDecomposition`. The
+    workers are forked from the current process and inherit its state.
+
+    Parameters
+    ----------
+    func : function(args)
+        function to be sent to the workers
+    list_args : list
+        arguments of the function calls
+    nproc : int
+        number of processes; sequential execution in the current process
+        if None or 1
+    freeze_gc : bool
+        see :func:`run_parallel`
+
+    Returns
+    -------
+    list
+        return values in the order of ``list_args``
+
+    '''
 
+    if not nproc or nproc <= 1 or len(list_args) <= 1:
+        return [func(args) for args in list_args]
+
+    with _frozen_gc(freeze_gc):
+        p = Pool(min(nproc, len(list_args)))
+
+    try:
+        return p.map(func, list_args)
+    finally:
+        p.close()
+        p.join()
 
 
 def run_parallel(ml, func, nproc=None, groupby=None,
-                 adjust_logger_levels=True):
+                 adjust_logger_levels=True, init_func=None, chunksize=1,
+                 stop_on_error=None, freeze_gc=True, throttle=None,
+                 durations=None, timeout=None, checkpoint=None):
     '''
+    Parallel execution of all model runs.
+
+    The runs are split into chunks (see :func:`get_chunks`) which are
+    dispatched dynamically: each worker takes the next chunk as soon as it
+    is done with the previous one. The parent process logs the aggregate
+    progress and ETA after each run and detects workers which died (e.g.
+    killed by the OOM killer); the remaining runs of their chunks are
+    reported as lost.
+
     Parameters
     ----------
     func : function(run_id)
@@ -59,30 +415,373 @@ def run_parallel(ml, func, nproc=None, groupby=None,
     groupby : list of `ModelLoop.df_run` columns
         Determines the groups of runs which are passed to the processes. This
         is necessary if certain model runs depend on each other.
+    init_func : callable, optional
+        called without arguments once in each worker before its first run,
+        e.g. ``ml.build_model`` to build the model in the workers or a
+        function loading a pickled model; by default the workers use the
+        model inherited from the parent process
+    chunksize : int
+        number of runs per task if ``groupby`` is None
+    stop_on_error : bool
+        skip the remaining runs of a chunk after a failed run; defaults to
+        True if ``groupby`` is set (dependent runs)
+    freeze_gc : bool
+        freeze the garbage collector during the fork to keep the inherited
+        memory pages shared between the workers
+    throttle : grimsel.auxiliary.resources.MemoryThrottle, optional
+        limits the number of dispatched chunks while the available memory
+        is low; by default all chunks are dispatched at once
+    durations : dict, optional
+        expected durations ``{run_id: seconds}``; the runs with the longest
+        expected durations are dispatched first (see :func:`get_chunks`)
+    timeout : float, optional
+        wall time limit of each run in seconds; the solver processes of runs
+        exceeding the limit are killed and the runs fail (see
+        :func:`grimsel.core.run_control.time_limit`)
+    checkpoint : str, optional
+        csv file to which the status of each run is appended as soon as it is
+        finished; runs which are done according to an existing file are
+        skipped, e.g. to repeat failed runs after a restart with unchanged
+        output (io ``reset_output`` False)
+
+    Returns
+    -------
+    pandas.DataFrame
+        status of each run (``done``, ``failed``, ``skipped``, ``lost``)
+        with the worker name, the run time in seconds and the error message
+
     '''
 
+    if stop_on_error is None:
+        stop_on_error = bool(groupby)
+
+    chunks = get_chunks(ml, groupby, chunksize, durations)
+    if checkpoint:
+        chunks = _skip_done(chunks, checkpoint)
+    progress = _Progress(chunks, checkpoint=checkpoint)
+    msg_queue = Queue()
+
     with _adjust_logger_levels(adjust_logger_levels,
                                ml, 'ERROR', 'INFO', False):
 
-        p = Pool(nproc)
+        with _frozen_gc(freeze_gc):
+            p = Pool(nproc, initializer=_init_worker,
+                     initargs=(func, init_func, msg_queue, timeout))
 
-        if groupby:
-            # list of lists of run_ids grouped by groupby
-            grouped_run_id = (ml.df_def_run.groupby(groupby)
-                                           .run_id.apply(list).tolist())
+        logger_parallel.info('Running %d runs in %d chunks on %d processes'
+                             %(progress.nruns, len(chunks), p._processes))
 
-            args = zip([func] * len(grouped_run_id), grouped_run_id)
-            p.starmap(_call_list_run_id, args)
+        results = []
+        pending = list(enumerate(chunks))
+        running = set()
 
-        else:
-            list_run_id = ml.get_list_run_id()
-            p.map(func, list_run_id)
+        def submit():
+
+            running.difference_update(
+                    [ichunk for ichunk in running
+                     if all(run_id in progress.status
+                            for run_id in chunks[ichunk])])
+
+            nallowed = (throttle.get_nallowed(len(running)) if throttle
+                        else len(chunks))
+            while pending and len(running) < nallowed:
+                ichunk, chunk = pending.pop(0)
+                results.append(p.apply_async(_run_chunk,
+                                             (ichunk, chunk, stop_on_error)))
+                running.add(ichunk)
+
+        submit()
+        for _ in _monitor(progress, p, msg_queue, results):
+            submit()
+
+        _close_pool(p, progress)
+
+        ml._merge_df_run_files()
+
+    return _get_status_table(progress)
+
+
+def _monitor(progress, pool, msg_queue, results):
+    '''
+    Processes the worker messages until all runs are finished.
+
+    Generator yielding after each message or dead worker check, which allows
+    the caller to submit further tasks.
+    '''
+
+    t_check = time.time()
+    while progress.ndone < progress.nruns:
+
+        try:
+            progress.handle(msg_queue.get(timeout=POLL_INTERVAL))
+            is_idle = False
+        except queue.Empty:
+            is_idle = True
+
+        if is_idle or time.time() - t_check > 10 * POLL_INTERVAL:
+            progress.any_lost |= progress.check_workers(pool)
+            t_check = time.time()
+
+        for res in results:
+            if res.ready() and not res.successful():
+                res.get()  # raises exceptions outside of the runs
+
+        yield
+
+
+def _close_pool(pool, progress):
+
+    if progress.any_lost:
+        # tasks of dead workers never finish; close and join would block
+        pool.terminate()
+    else:
+        pool.close()
+    pool.join()
+
+
+def _get_status_table(progress):
+
+    df_status = progress.get_table()
+
+    if (df_status.status != 'done').any():
+        logger_parallel.error('Unsuccessful runs:\n%s'
+                              %run_control.get_failure_report(df_status)
+                                          .to_string(index=False))
+
+    return df_status
+
+
+def _get_topological_order(dependencies):
+    '''
+    Sorts the runs such that all dependencies precede the dependent runs.
+
+    Raises
+    ------
+    ValueError
+        if the dependencies are cyclic
+
+    '''
+
+    npending = {run_id: len(deps) for run_id, deps in dependencies.items()}
+    successors = _get_successors(dependencies)
+
+    order = [run_id for run_id, npend in npending.items() if not npend]
+    for run_id in order:  # extended in the loop
+        for run_id_succ in successors[run_id]:
+            npending[run_id_succ] -= 1
+            if not npending[run_id_succ]:
+                order.append(run_id_succ)
+
+    if len(order) < len(dependencies):
+        raise ValueError('Cyclic run dependencies involving run_ids %s'
+                         %sorted(set(dependencies) - set(order)))
+
+    return order
+
+
+def _get_successors(dependencies):
+
+    successors = {run_id: [] for run_id in dependencies}
+    for run_id, deps in dependencies.items():
+        for run_id_dep in deps:
+            successors[run_id_dep].append(run_id)
+
+    return successors
 
-        p.close()
-        p.join()
+
+def _get_path_lengths(dependencies, durations=None):
+    '''
+    Longest path from each run to the end of the schedule (including the
+    run itself).
+
+    Returns
+    -------
+    dict
+        ``{run_id: (length, next run_id on the path)}``
+
+    '''
+
+    durations = durations if durations else {}
+    successors = _get_successors(dependencies)
+
+    dict_length = {}
+    for run_id in reversed(_get_topological_order(dependencies)):
+        length_next, run_id_next = max([(dict_length[succ][0], succ)
+                                        for succ in successors[run_id]],
+                                       default=(0, None))
+        dict_length[run_id] = (durations.get(run_id, 1) + length_next,
+                               run_id_next)
+
+    return dict_length
+
+
+def get_critical_path(dependencies, durations=None):
+    '''
+    Longest chain of dependent runs.
+
+    Parameters
+    ----------
+    dependencies : dict
+        ``{run_id: [run_ids depended on]}``, e.g. from
+        :func:`grimsel.core.model_loop_modifier.get_run_dependencies`
+    durations : dict, optional
+        ``{run_id: duration}``; all runs have unit duration by default
+
+    Returns
+    -------
+    tuple
+        list of run_ids on the critical path, total duration
+
+    '''
+
+    if not dependencies:
+        return [], 0
+
+    dict_length = _get_path_lengths(dependencies, durations)
+
+    run_id = max(dict_length, key=lambda run_id: dict_length[run_id][0])
+    length = dict_length[run_id][0]
+
+    path = []
+    while run_id is not None:
+        path.append(run_id)
+        run_id = dict_length[run_id][1]
+
+    return path, length
+
+
+def run_dag(ml, func, dependencies, nproc=None, adjust_logger_levels=True,
+            init_func=None, durations=None, freeze_gc=True, throttle=None,
+            timeout=None, checkpoint=None):
+    '''
+    Parallel execution of dependent model runs.
+
+    Each run is started as soon as all runs it depends on are done, on any
+    worker. Independent branches of run chains are thus executed in
+    parallel, as opposed to :func:`run_parallel` with ``groupby``. Among the
+    runs ready to start, those with the longest remaining chain of dependent
+    runs are started first. Runs depending on failed or lost runs are
+    skipped. The critical path is logged before and after the execution.
+
+    Parameters
+    ----------
+    func : function(run_id)
+        function to be sent to the workers; the runs depended on have
+        written their output when it is called
+    dependencies : dict
+        ``{run_id: [run_ids depended on]}``, e.g. from
+        :func:`grimsel.core.model_loop_modifier.get_run_dependencies`;
+        dependencies on run_ids outside of ``ml.get_list_run_id()`` are
+        considered done
+    nproc : int
+        Number of processes
+    init_func : callable, optional
+        see :func:`run_parallel`
+    durations : dict, optional
+        ``{run_id: expected duration}`` for the prioritization of the runs;
+        all runs have unit duration by default
+    freeze_gc, throttle, timeout :
+        see :func:`run_parallel`
+    checkpoint : str, optional
+        see :func:`run_parallel`; runs depending on runs which are done
+        according to the checkpoint file are ready to start
+
+    Returns
+    -------
+    pandas.DataFrame
+        status of each run as returned by :func:`run_parallel`
+
+    '''
+
+    list_run_id = ml.get_list_run_id()
+    if checkpoint:
+        list_run_id = (_skip_done([list(list_run_id)], checkpoint) or [[]])[0]
+    set_run_id = set(list_run_id)
+
+    dependencies = {run_id: [run_id_dep
+                             for run_id_dep in dependencies.get(run_id, [])
+                             if run_id_dep in set_run_id]
+                    for run_id in list_run_id}
+
+    successors = _get_successors(dependencies)
+    dict_length = _get_path_lengths(dependencies, durations)
+    npending = {run_id: len(deps) for run_id, deps in dependencies.items()}
+    ready = [run_id for run_id in list_run_id if not npending[run_id]]
+    running = set()
+
+    progress = _Progress([], nruns=len(list_run_id), checkpoint=checkpoint)
+    msg_queue = Queue()
+
+    with _adjust_logger_levels(adjust_logger_levels,
+                               ml, 'ERROR', 'INFO', False):
+
+        path, length = get_critical_path(dependencies, durations)
+        logger_parallel.info('Critical path: %d of %d runs, length %s (%s)'
+                             %(len(path), len(list_run_id), length, path))
+
+        with _frozen_gc(freeze_gc):
+            p = Pool(nproc, initializer=_init_worker,
+                     initargs=(func, init_func, msg_queue, timeout))
+
+        results = []
+
+        def submit():
+
+            # at most one task per worker; priorities apply to queued runs
+            ready.sort(key=lambda run_id: (-dict_length[run_id][0], run_id))
+            nallowed = (throttle.get_nallowed(len(running)) if throttle
+                        else p._processes)
+            while ready and len(running) < min(nallowed, p._processes):
+                run_id = ready.pop(0)
+                progress.chunks.append([run_id])
+                results.append(p.apply_async(_run_chunk,
+                                             (len(progress.chunks) - 1,
+                                              [run_id], False)))
+                running.add(run_id)
+
+        def skip_successors(run_id):
+
+            for run_id_succ in successors[run_id]:
+                if run_id_succ not in progress.status:
+                    progress.set_status(run_id_succ, 'skipped', None,
+                                        error='Depends on unsuccessful run_id'
+                                              ' %s'%run_id)
+                    skip_successors(run_id_succ)
+
+        submit()
+        for _ in _monitor(progress, p, msg_queue, results):
+
+            for run_id in [run_id for run_id in running
+                           if run_id in progress.status]:
+                running.remove(run_id)
+
+                if progress.status[run_id]['status'] != 'done':
+                    skip_successors(run_id)
+                    continue
+
+                for run_id_succ in successors[run_id]:
+                    npending[run_id_succ] -= 1
+                    if not npending[run_id_succ]:
+                        ready.append(run_id_succ)
+
+            submit()
+
+        _close_pool(p, progress)
 
         ml._merge_df_run_files()
 
+    df_status = _get_status_table(progress)
+
+    # unsuccessful runs don't contribute to the critical path
+    durations_run = df_status.set_index('run_id').tdiff.fillna(0).to_dict()
+    path, length = get_critical_path(dependencies, durations_run)
+    makespan = time.time() - progress.t_start
 
+    logger_parallel.info(('Critical path: run_ids %s, %s; makespan %s, total '
+                          'run time %s on %d processes')
+                         %(path, _format_time(length), _format_time(makespan),
+                           _format_time(sum(durations_run.values())),
+                           p._processes))
 
+    return df_status
 
@@ -0,0 +1,383 @@
+'''
+Resource allocation for parallel runs
+=====================================
+
+Chooses the number of worker processes and solver threads for
+:func:`grimsel.auxiliary.multiproc.run_parallel` from the cores and the
+memory of the host.
+
+* :func:`probe` solves a single model run in forked child processes with
+  different numbers of solver threads. It measures the solve time, the
+  private memory of the worker process (the pages not shared with the
+  parent after the fork), and the peak memory of the solver process.
+* :func:`allocate` chooses ``nproc`` and ``nthreads`` minimizing the
+  expected makespan of all runs, given that ``nproc * nthreads`` must not
+  exceed the cores and ``nproc`` workers must fit into the available memory.
+* :class:`MemoryThrottle` reduces the number of concurrently dispatched
+  tasks of :func:`grimsel.auxiliary.multiproc.run_parallel` while the
+  available memory is low.
+
+Example
+-------
+
+.. code-block:: python
+
+    ml.build_model()
+    nproc = allocate_resources(ml)  # sets the solver threads
+    worker_mb = (ml.df_probe.worker_mb + ml.df_probe.solver_mb).max()
+    throttle = MemoryThrottle(nproc, worker_mb)
+    run_parallel(ml, run_model, nproc, throttle=throttle)
+
+'''
+
+import os
+import math
+import time
+import queue
+import resource
+
+import pandas as pd
+from multiprocess import Process, Queue
+
+import grimsel.auxiliary.aux_dtypes as aux_dtypes
+from grimsel.core.model_loop import logger_parallel
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+PROBE_COLS = ['nthreads', 'tdiff_solve', 'worker_mb', 'solver_mb']
+
+# seconds between checks whether the probe child process is alive
+POLL_INTERVAL = 1.
+
+
+def get_ncores():
+    '''
+    Number of cores available to the current process.
+    '''
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on all platforms
+        return os.cpu_count()
+
+
+def get_available_memory():
+    '''
+    Memory available for new processes in MB.
+
+    Uses ``MemAvailable`` from ``/proc/meminfo`` if available, otherwise the
+    number of free physical pages.
+
+    '''
+
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024**2
+
+
+def get_private_memory():
+    '''
+    Private memory (unique set size) of the current process in MB.
+
+    Pages shared with the parent process after a fork are not included.
+    Falls back to the resident set size if ``/proc/self/smaps_rollup`` is not
+    available.
+
+    '''
+
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            return sum(int(line.split()[1]) for line in f
+                       if line.startswith(('Private_Clean:',
+                                           'Private_Dirty:'))) / 1024
+    except (OSError, ValueError):
+        return aux_dtypes.get_rss()
+
+
+def _probe_child(ml, run_id, nthreads, msg_queue):
+
+    try:
+        ml.select_run(run_id)
+        ml.m.nthreads = nthreads
+        ml.m.solver.options['threads'] = nthreads
+
+        worker_mb = get_private_memory()
+
+        t = time.time()
+        with ml.m.temp_files() as (tmp_dir, logf, warmf, solnf):
+            ml.m.run(tmp_dir=tmp_dir, logf=logf, warmf=warmf, solnf=solnf)
+        tdiff = time.time() - t
+
+        worker_mb = max(worker_mb, get_private_memory())
+        # ru_maxrss of the waited-for children, i.e. the solver; kB on Linux
+        solver_mb = (resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+                     / 1024)
+
+        msg_queue.put((nthreads, tdiff, worker_mb, solver_mb, None))
+
+    except Exception as e:
+        msg_queue.put((nthreads, None, None, None, repr(e)))
+
+
+def _get_message(proc, msg_queue):
+    '''
+    Waits for the message of the probe child process ``proc``.
+
+    Raises a :class:`RuntimeError` if the child terminates without message,
+    e.g. if it is killed by the OOM killer during the solve.
+
+    '''
+
+    while True:
+        try:
+            return msg_queue.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if not proc.is_alive():
+                break
+
+    # the message might have been put just before the child terminated
+    try:
+        return msg_queue.get(timeout=POLL_INTERVAL)
+    except queue.Empty:
+        raise RuntimeError('Probe child process died without result '
+                           '(exit code %s)'%proc.exitcode)
+
+
+def probe(ml, run_id=0, list_nthreads=(1, 2, 4)):
+    '''
+    Solves a model run with different numbers of solver threads.
+
+    Each probe solve is performed in a forked child process, which
+    corresponds to a worker of :func:`grimsel.auxiliary.multiproc.run_parallel`.
+    The model is solved with the parameters of the built model after
+    :func:`grimsel.core.model_loop.ModelLoop.select_run`, i.e. without
+    modifiers; nothing is written to the output.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with built model
+    run_id : int
+        probe run
+    list_nthreads : list of int
+        solver threads of the probe solves; values larger than the number of
+        cores are skipped
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``PROBE_COLS``: solve time (s), private worker memory (MB),
+        and peak solver memory (MB) by number of threads
+
+    '''
+
+    ncores = get_ncores()
+
+    rows = []
+    for nthreads in [nth for nth in list_nthreads if nth <= ncores]:
+
+        msg_queue = Queue()
+        proc = Process(target=_probe_child,
+                       args=(ml, run_id, nthreads, msg_queue))
+        proc.start()
+        nthreads, tdiff, worker_mb, solver_mb, error = _get_message(proc,
+                                                                    msg_queue)
+        proc.join()
+
+        if error:
+            raise RuntimeError('Probe solve with %d threads failed: %s'
+                               %(nthreads, error))
+
+        logger.info(('Probe run_id %s with %d threads: %.1f s, worker %.0f '
+                     'MB, solver %.0f MB')%(run_id, nthreads, tdiff,
+                                            worker_mb, solver_mb))
+
+        rows.append((nthreads, tdiff, worker_mb, solver_mb))
+
+    return pd.DataFrame(rows, columns=PROBE_COLS)
+
+
+def allocate(df_probe, nruns, ncores=None, memory_mb=None,
+             memory_reserve=0.1):
+    '''
+    Chooses the number of processes and solver threads.
+
+    For each probed number of threads, the number of processes is limited
+    by the cores, by the memory, and by the number of runs. The combination
+    with the smallest expected makespan is selected; ties are broken in
+    favor of fewer cores.
+
+    Parameters
+    ----------
+    df_probe : pandas.DataFrame
+        output of :func:`probe`
+    nruns : int
+        number of model runs
+    ncores : int, optional
+        defaults to :func:`get_ncores`
+    memory_mb : float, optional
+        memory for the workers; defaults to :func:`get_available_memory`
+    memory_reserve : float
+        fraction of ``memory_mb`` kept free
+
+    Returns
+    -------
+    pandas.DataFrame
+        all candidate allocations sorted by makespan; columns
+        ``nproc``, ``nthreads``, ``memory_mb``, ``makespan``
+
+    Raises
+    ------
+    ValueError
+        if not even a single worker fits into the memory
+
+    '''
+
+    ncores = ncores if ncores else get_ncores()
+    memory_mb = (memory_mb if memory_mb is not None
+                 else get_available_memory()) * (1 - memory_reserve)
+
+    rows = []
+    for _, row in df_probe.iterrows():
+
+        worker_mb = row.worker_mb + row.solver_mb
+        nproc = min(ncores // int(row.nthreads),
+                    int(memory_mb // worker_mb), nruns)
+
+        if nproc < 1:
+            continue
+
+        makespan = math.ceil(nruns / nproc) * row.tdiff_solve
+        rows.append((nproc, int(row.nthreads), nproc * worker_mb, makespan))
+
+    if not rows:
+        raise ValueError('Not enough memory for a single worker: %.0f MB '
+                         'available, %.0f MB required'
+                         %(memory_mb, (df_probe.worker_mb
+                                       + df_probe.solver_mb).min()))
+
+    df = pd.DataFrame(rows, columns=['nproc', 'nthreads', 'memory_mb',
+                                     'makespan'])
+    df['ncores'] = df.nproc * df.nthreads
+
+    return (df.sort_values(['makespan', 'ncores'])
+              .drop(columns='ncores').reset_index(drop=True))
+
+
+def allocate_resources(ml, nruns=None, probe_run_id=0,
+                       list_nthreads=(1, 2, 4), **kwargs):
+    '''
+    Probes the model and sets the allocated number of solver threads.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with built model; the probe results are stored in the
+        ``df_probe`` attribute
+    nruns : int, optional
+        defaults to the length of ``ml.get_list_run_id()``
+    probe_run_id, list_nthreads :
+        see :func:`probe`
+    kwargs :
+        passed to :func:`allocate`
+
+    Returns
+    -------
+    int
+        number of processes for :func:`grimsel.auxiliary.multiproc.run_parallel`
+
+    '''
+
+    nruns = nruns if nruns else len(ml.get_list_run_id())
+
+    ml.df_probe = probe(ml, probe_run_id, list_nthreads)
+    df_alloc = allocate(ml.df_probe, nruns, **kwargs)
+
+    logger.info('Resource allocation candidates:\n%s'%df_alloc.to_string())
+
+    nproc, nthreads = df_alloc.loc[0, ['nproc', 'nthreads']].astype(int)
+
+    logger.info('Allocated %d processes with %d solver threads each'
+                %(nproc, nthreads))
+
+    ml.m.nthreads = nthreads
+    ml.m.solver.options['threads'] = nthreads
+
+    return nproc
+
+
+class MemoryThrottle():
+    '''
+    Limits the concurrent tasks while the available memory is low.
+
+    Passed to :func:`grimsel.auxiliary.multiproc.run_parallel` or
+    :func:`grimsel.auxiliary.multiproc.run_dag`, which don't dispatch new
+    tasks while the number of running tasks exceeds :func:`get_nallowed`.
+    Running tasks are never interrupted.
+
+    Parameters
+    ----------
+    nproc : int
+        maximum number of concurrent tasks
+    worker_mb : float
+        memory of a single worker in MB, e.g. from :func:`probe`
+    min_available_mb : float, optional
+        concurrency is reduced while less memory is available; defaults to
+        ``worker_mb``
+    increase_interval : float
+        minimum seconds between increases of the concurrency; the memory of
+        newly started runs grows only gradually
+
+    '''
+
+    def __init__(self, nproc, worker_mb, min_available_mb=None,
+                 increase_interval=30):
+
+        self.nproc = nproc
+        self.worker_mb = worker_mb
+        self.min_available_mb = (min_available_mb if min_available_mb
+                                 is not None else worker_mb)
+        self.increase_interval = increase_interval
+
+        self.nallowed = nproc
+        self._t_change = time.time()
+
+    def get_nallowed(self, nrunning):
+        '''
+        Number of concurrent tasks allowed given the available memory.
+
+        Parameters
+        ----------
+        nrunning : int
+            number of running tasks
+
+        '''
+
+        available = get_available_memory()
+
+        nallowed = self.nallowed
+        if available < self.min_available_mb:
+            # no new tasks; one fewer once the next task is done
+            nallowed = max(1, min(self.nallowed, nrunning - 1))
+        elif (available > self.min_available_mb + self.worker_mb
+              and time.time() - self._t_change > self.increase_interval):
+            nallowed = min(self.nproc, self.nallowed + 1)
+
+        if nallowed != self.nallowed:
+            logger_parallel.warning('%.0f MB memory available; %s '
+                                    'concurrency to %d'
+                                    %(available,
+                                      'reducing' if nallowed < self.nallowed
+                                      else 'increasing', nallowed))
+            self.nallowed = nallowed
+            self._t_change = time.time()
+
+        return self.nallowed
@@ -0,0 +1,424 @@
+'''
+Run time history
+================
+
+Observed run times of model runs by scenario signature, used to dispatch
+the runs with the longest expected duration first.
+
+* :class:`RunHistory` appends the ``tdiff_solve`` and ``tdiff_write`` columns
+  of the output ``def_run`` table to a csv file after each sweep. Each run
+  is identified by its scenario signature, i.e. the values of the loop step
+  columns (``ModelLoop.cols_step``), and by a key of the model settings
+  (:func:`get_model_key`).
+* :class:`RunTimePredictor` estimates the durations of the runs of a new
+  sweep: the median of past runs with the same signature if available,
+  otherwise a log-additive model of the step values fitted to the history.
+* The predicted durations are passed to
+  :func:`grimsel.auxiliary.multiproc.run_parallel` (longest-first
+  dispatch) or :func:`grimsel.auxiliary.multiproc.run_dag` (critical path
+  priorities).
+* :func:`benchmark` compares the makespans of ``run_id`` order and
+  longest-first dispatch on synthetic run times.
+
+Example
+-------
+
+.. code-block:: python
+
+    history = RunHistory()  # in GRIMSEL_CACHE_DIR
+    ml.build_model()
+    durations = history.predict(ml)
+    run_parallel(ml, run_model, nproc, durations=durations)
+    history.record(ml)
+
+'''
+
+import os
+import json
+import time
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import grimsel.auxiliary.aux_cache as aux_cache
+import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+HISTORY_COLS = ['model_key', 'signature', 'tdiff_solve', 'tdiff_write',
+                't_record']
+
+# lower limit of durations on the log scale
+MIN_TDIFF = 1e-3
+
+
+def _is_plain(obj):
+
+    if isinstance(obj, (list, tuple)):
+        return all(_is_plain(item) for item in obj)
+    if isinstance(obj, dict):
+        return all(_is_plain(key) and _is_plain(val)
+                   for key, val in obj.items())
+
+    return obj is None or isinstance(obj, (str, int, float, bool))
+
+
+def get_model_key(ml):
+    '''
+    Hash of the model settings of a model loop.
+
+    Includes all model kwargs with plain values (strings, numbers, and
+    lists/dicts of these) as well as the input data path and scenario.
+    Other values (e.g. functions) are ignored since their ``repr`` is not
+    deterministic.
+
+    Returns
+    -------
+    str
+
+    '''
+
+    mkwargs = {key: val for key, val in ml.mkwargs.items() if _is_plain(val)}
+    iokwargs = {key: ml.iokwargs.get(key) for key in ('data_path', 'sc_inp')}
+
+    return aux_cache.get_key(mkwargs, iokwargs)
+
+
+def read_def_run(io):
+    '''
+    Reads the ``def_run`` table from the output collection.
+
+    Parameters
+    ----------
+    io : grimsel.core.io.IO
+        io instance of the model loop
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    '''
+
+    output_target = io.modwr.output_target
+
+    if output_target == 'hdf5':
+        df = pd.read_hdf(io.cl_out, 'def_run')
+    elif output_target == 'fastparquet':
+        df = pd.read_parquet(os.path.join(io.cl_out, 'def_run.parq'))
+    elif output_target == 'psql':
+        df = aql.read_sql(io.db, io.cl_out, 'def_run')
+    else:
+        raise ValueError('Unknown output_target %s'%output_target)
+
+    return df.reset_index(drop=True)
+
+
+def _get_signature(row, cols_step):
+
+    return json.dumps({col: float(row[col]) for col in sorted(cols_step)})
+
+
+class RunHistory():
+    '''
+    Persistent table of observed run times.
+
+    Parameters
+    ----------
+    fn : str, optional
+        csv file; defaults to ``run_history.csv`` in the cache directory
+        (:func:`grimsel.auxiliary.aux_cache.get_cache_dir`)
+
+    '''
+
+    def __init__(self, fn=None):
+
+        if not fn:
+            cache_dir = aux_cache.get_cache_dir()
+            if not cache_dir:
+                raise ValueError('RunHistory: either fn or the '
+                                 'GRIMSEL_CACHE_DIR environment variable '
+                                 'must be set')
+            fn = os.path.join(cache_dir, 'run_history.csv')
+
+        self.fn = fn
+
+    def __repr__(self):
+
+        return 'RunHistory(fn=%s)'%self.fn
+
+    def read(self, model_key=None):
+        '''
+        Reads the history.
+
+        Parameters
+        ----------
+        model_key : str, optional
+            only rows of this model key
+
+        Returns
+        -------
+        pandas.DataFrame
+            columns ``HISTORY_COLS``
+
+        '''
+
+        if not os.path.isfile(self.fn):
+            return pd.DataFrame(columns=HISTORY_COLS)
+
+        df = pd.read_csv(self.fn)
+
+        if model_key is not None:
+            df = df.loc[df.model_key == model_key]
+
+        return df.reset_index(drop=True)
+
+    def record(self, ml, df_def_run=None):
+        '''
+        Appends the run times of a finished sweep.
+
+        Parameters
+        ----------
+        ml : grimsel.core.model_loop.ModelLoop
+            model loop
+        df_def_run : pandas.DataFrame, optional
+            ``def_run`` output rows; read from the output collection by
+            default (:func:`read_def_run`)
+
+        Returns
+        -------
+        int
+            number of recorded runs
+
+        '''
+
+        if df_def_run is None:
+            df_def_run = read_def_run(ml.io)
+
+        df = df_def_run.dropna(subset=['tdiff_solve'])
+
+        if df.empty:
+            logger.warning('RunHistory: no run times to record')
+            return 0
+
+        df_add = pd.DataFrame({
+            'model_key': get_model_key(ml),
+            'signature': df.apply(_get_signature, axis=1,
+                                  cols_step=ml.cols_step),
+            'tdiff_solve': df.tdiff_solve.values,
+            'tdiff_write': df.tdiff_write.fillna(0).values,
+            't_record': time.time()}, columns=HISTORY_COLS)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.fn)), exist_ok=True)
+        df_add.to_csv(self.fn, mode='a', index=False,
+                      header=not os.path.isfile(self.fn))
+
+        logger.info('Recorded run times of %d runs in %s'%(len(df_add),
+                                                             self.fn))
+
+        return len(df_add)
+
+    def predict(self, ml):
+        '''
+        Expected durations of the runs of a model loop.
+
+        Uses the history of the same model key. If there is none, the
+        history of all models is used, which still provides the relative
+        durations of the scenarios.
+
+        Returns
+        -------
+        dict or None
+            ``{run_id: seconds}`` of ``ml.get_list_run_id()``; None if the
+            history is empty
+
+        '''
+
+        df_history = self.read(get_model_key(ml))
+
+        if df_history.empty:
+            df_history = self.read()
+            if df_history.empty:
+                logger.info('RunHistory: empty history; no predictions')
+                return None
+            logger.info('RunHistory: no history of this model; using '
+                        'all %d rows'%len(df_history))
+
+        df_def_run = ml.df_def_run.loc[ml.df_def_run.run_id
+                                         .isin(ml.get_list_run_id())]
+
+        return (RunTimePredictor(df_history)
+                    .predict(df_def_run, ml.cols_step).to_dict())
+
+
+class RunTimePredictor():
+    '''
+    Estimates run durations from the run time history.
+
+    The duration of a run is the sum of ``tdiff_solve`` and ``tdiff_write``.
+    Runs with a signature in the history get the median duration of these
+    past runs. Other runs get :math:`\\exp(\\mu + \\sum_i e_i(v_i))`, where
+    :math:`\\mu` is the mean log duration of the history and :math:`e_i(v)`
+    is the mean deviation of the log durations of the past runs with value
+    :math:`v` of step :math:`i`; unknown steps or values have no effect.
+
+    Parameters
+    ----------
+    df_history : pandas.DataFrame
+        output of :func:`RunHistory.read`
+
+    '''
+
+    def __init__(self, df_history):
+
+        df = pd.DataFrame([json.loads(sgn) for sgn in df_history.signature],
+                          index=df_history.index)
+        df['signature'] = df_history.signature
+        df['tdiff'] = df_history.tdiff_solve + df_history.tdiff_write
+
+        self.dict_median = df.groupby('signature').tdiff.median().to_dict()
+
+        log_tdiff = np.log(df.tdiff.clip(lower=MIN_TDIFF))
+        self.mu = log_tdiff.mean()
+        self.dict_effect = {col: (log_tdiff.groupby(df[col]).mean()
+                                  - self.mu)
+                            for col in df.columns
+                            if col not in ('signature', 'tdiff')}
+
+    def predict(self, df_def_run, cols_step):
+        '''
+        Expected durations of the runs in a ``def_run`` table.
+
+        Parameters
+        ----------
+        df_def_run : pandas.DataFrame
+            e.g. ``ModelLoop.df_def_run``
+        cols_step : list of str
+            step columns, e.g. ``ModelLoop.cols_step``
+
+        Returns
+        -------
+        pandas.Series
+            seconds by ``run_id``
+
+        '''
+
+        log_pred = pd.Series(self.mu, index=df_def_run.index)
+        for col in cols_step:
+            if col in self.dict_effect:
+                log_pred += (df_def_run[col].map(self.dict_effect[col])
+                                            .fillna(0).values)
+
+        signature = df_def_run.apply(_get_signature, axis=1,
+                                     cols_step=cols_step)
+        pred = signature.map(self.dict_median).fillna(np.exp(log_pred))
+
+        nexact = signature.isin(self.dict_median).sum()
+        logger.info('Predicted durations of %d runs (%d from identical '
+                    'scenarios)'%(len(pred), nexact))
+
+        return pd.Series(pred.values, index=df_def_run.run_id.values,
+                         name='tdiff')
+
+
+def simulate_makespan(durations, nproc):
+    '''
+    Makespan of a list of tasks dispatched in order to ``nproc`` workers.
+
+    Each task is started by the first idle worker, as the dynamic dispatch of
+    :func:`grimsel.auxiliary.multiproc.run_parallel`.
+
+    Parameters
+    ----------
+    durations : list of float
+        task durations in dispatch order
+    nproc : int
+        number of workers
+
+    Returns
+    -------
+    float
+
+    '''
+
+    t_free = [0.] * nproc
+    for tdiff in durations:
+        heapq.heappush(t_free, heapq.heappop(t_free) + tdiff)
+
+    return max(t_free)
+
+
+def _get_synthetic_durations(df, rng, noise):
+    '''
+    Run times increasing with the VRE share and jumping by an order of
+    magnitude where the storage constraints become binding.
+    '''
+
+    log_tdiff = (np.log(60) + 1.5 * df.vre + 0.2 * df.co2
+                 + np.log(10) * ((df.vre >= 0.6) & (df.sto >= 2)))
+
+    return np.exp(log_tdiff + rng.normal(0, noise, len(df)))
+
+
+def benchmark(nproc=8, noise=0.3, history_share=0.5, seed=0):
+    '''
+    Makespans of ``run_id`` order and longest-first dispatch.
+
+    A synthetic sweep over CO2 prices, VRE shares, and storage capacities
+    has solve times varying by more than an order of magnitude. The
+    predictor is fitted to the noisy run times of a random share of the
+    scenarios; the remaining scenarios are predicted from the step values
+    only.
+
+    Parameters
+    ----------
+    nproc : int
+        number of workers
+    noise : float
+        standard deviation of the log run times between repeated runs
+    history_share : float
+        share of scenarios in the history
+    seed : int
+        random seed
+
+    Returns
+    -------
+    pandas.Series
+        makespans (s) of the ``run_id`` order, the predicted longest-first
+        order, the longest-first order by the actual durations (oracle), and
+        the lower bound of any order
+
+    '''
+
+    rng = np.random.RandomState(seed)
+
+    cols_step = ['co2', 'vre', 'sto']
+    df_def_run = pd.DataFrame(list(itertools.product(range(5),
+                                                     np.linspace(0, 1, 6),
+                                                     range(4))),
+                              columns=cols_step)
+    df_def_run['run_id'] = range(len(df_def_run))
+
+    df_hist = df_def_run.sample(frac=history_share, random_state=rng)
+    df_history = pd.DataFrame({
+        'signature': df_hist.apply(_get_signature, axis=1,
+                                   cols_step=cols_step).values,
+        'tdiff_solve': _get_synthetic_durations(df_hist, rng, noise),
+        'tdiff_write': 0.})
+
+    tdiff = pd.Series(_get_synthetic_durations(df_def_run, rng, noise),
+                      index=df_def_run.run_id)
+    pred = RunTimePredictor(df_history).predict(df_def_run, cols_step)
+
+    order_pred = pred.sort_values(ascending=False, kind='mergesort').index
+
+    return pd.Series({
+        'run_id_order': simulate_makespan(tdiff.values, nproc),
+        'longest_first': simulate_makespan(tdiff[order_pred].values, nproc),
+        'oracle': simulate_makespan(tdiff.sort_values(ascending=False)
+                                         .values, nproc),
+        'lower_bound': max(tdiff.sum() / nproc, tdiff.max())},
+        name='makespan')
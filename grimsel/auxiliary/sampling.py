@@ -0,0 +1,344 @@
+'''
+Scenario sampling
+=================
+
+Subsets of the full Cartesian product of the ``nsteps`` loop dimensions of
+a :class:`grimsel.core.model_loop.ModelLoop`.
+
+All samples are points of the ``nsteps`` grid: the rows have the same
+``_id``, step, and ``_vl`` columns as the full ``df_def_run`` table, so the
+modifiers work unchanged.
+
+* :func:`latin_hypercube`: each level of each dimension is sampled equally
+  often.
+* :func:`sobol`: low-discrepancy Sobol sequence (Joe and Kuo direction
+  numbers, up to ``len(SOBOL_DIRECTIONS) + 1`` dimensions), optionally with
+  a random digital shift.
+* :func:`refine`: adaptive refinement; new points are placed halfway
+  between the neighboring runs whose output metrics differ most.
+
+Duplicate grid points are dropped, so the samplers might return fewer rows
+than requested if the grid is coarse.
+
+Example
+-------
+
+.. code-block:: python
+
+    ml.df_def_run = latin_hypercube(ml, 20, seed=0)
+    ml.build_model()
+    run_parallel(ml, run_model, nproc, checkpoint='status.csv')
+
+    for _ in range(3):
+        metric = read_def_run(ml.io).set_index('run_id').objective
+        append_runs(ml, refine(ml, metric, 10))
+        # the checkpoint skips the runs which are done
+        run_parallel(ml, run_model, nproc, checkpoint='status.csv')
+
+'''
+
+import numpy as np
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# Joe and Kuo (2008) direction numbers (new-joe-kuo-6.21201) of the
+# dimensions 2, 3, ...: degree s and coefficients a of the primitive
+# polynomial, initial direction numbers m
+SOBOL_DIRECTIONS = [(1, 0, (1,)),
+                    (2, 1, (1, 3)),
+                    (3, 1, (1, 3, 1)),
+                    (3, 2, (1, 1, 1)),
+                    (4, 1, (1, 1, 3, 3)),
+                    (4, 4, (1, 3, 5, 13)),
+                    (5, 2, (1, 1, 5, 5, 17)),
+                    (5, 4, (1, 1, 5, 5, 5)),
+                    (5, 7, (1, 1, 7, 11, 19)),
+                    (5, 11, (1, 1, 5, 1, 1)),
+                    (5, 13, (1, 1, 1, 3, 11)),
+                    (5, 14, (1, 3, 5, 5, 31)),
+                    (6, 1, (1, 3, 3, 9, 7, 49)),
+                    (6, 13, (1, 1, 1, 15, 21, 21)),
+                    (6, 16, (1, 3, 1, 13, 27, 49))]
+
+SOBOL_BITS = 30
+
+
+def get_run_table(ml, arr_index):
+    '''
+    Run table rows of the given grid points.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop
+    arr_index : numpy.ndarray
+        integer level index of each dimension (columns) for each run (rows)
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``cols_id``, ``cols_step``, and ``cols_val`` as in
+        ``ml.df_def_run``; without duplicates, sorted by the indices
+
+    '''
+
+    list_steps = ml.get_step_levels()
+
+    df_id = (pd.DataFrame(np.asarray(arr_index, dtype=int).reshape(-1,
+                                                        len(list_steps)),
+                          columns=ml.cols_id)
+               .drop_duplicates().sort_values(ml.cols_id)
+               .reset_index(drop=True))
+
+    df = df_id.astype(float)
+    for col, col_id, steps in zip(ml.cols_step, ml.cols_id, list_steps):
+        df[col] = np.array(steps)[df_id[col_id].values]
+    for col in ml.cols_val:
+        df[col] = np.nan
+
+    return df[ml.cols_id + ml.cols_step + ml.cols_val]
+
+
+def _to_index(ml, arr_unit):
+    '''
+    Maps points of the unit hypercube to the grid level indices.
+    '''
+
+    nlevels = np.array([len(steps) for steps in ml.get_step_levels()])
+
+    return np.minimum(np.floor(arr_unit * nlevels).astype(int), nlevels - 1)
+
+
+def latin_hypercube(ml, n, seed=None):
+    '''
+    Latin hypercube sample of the grid.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop
+    n : int
+        number of samples
+    seed : int, optional
+        random seed
+
+    Returns
+    -------
+    pandas.DataFrame
+        run table as returned by :func:`get_run_table`
+
+    '''
+
+    rng = np.random.RandomState(seed)
+    ndim = len(ml.cols_step)
+
+    arr_unit = np.stack([(rng.permutation(n) + rng.uniform(size=n)) / n
+                         for _ in range(ndim)], axis=1)
+
+    df = get_run_table(ml, _to_index(ml, arr_unit))
+    logger.info('Latin hypercube: %d runs'%len(df))
+
+    return df
+
+
+def _get_sobol_directions(ndim):
+
+    if ndim > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError('Sobol sequence supports up to %d dimensions, got %d'
+                         %(len(SOBOL_DIRECTIONS) + 1, ndim))
+
+    arr_v = np.zeros((ndim, SOBOL_BITS), dtype=np.int64)
+    arr_v[0] = [1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+
+    for idim, (s, a, m) in enumerate(SOBOL_DIRECTIONS[:ndim - 1], 1):
+
+        v = [m[i] << (SOBOL_BITS - 1 - i) for i in range(s)]
+
+        for i in range(s, SOBOL_BITS):
+            vi = v[i - s] ^ (v[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    vi ^= v[i - k]
+            v.append(vi)
+
+        arr_v[idim] = v
+
+    return arr_v
+
+
+def sobol_points(n, ndim, seed=None):
+    '''
+    First ``n`` points of the Sobol sequence in the unit hypercube.
+
+    Parameters
+    ----------
+    n : int
+        number of points
+    ndim : int
+        number of dimensions
+    seed : int, optional
+        random seed of a digital shift; unshifted points if None
+
+    Returns
+    -------
+    numpy.ndarray
+        shape ``(n, ndim)``
+
+    '''
+
+    arr_v = _get_sobol_directions(ndim)
+
+    shift = (np.random.RandomState(seed).randint(0, 1 << SOBOL_BITS, ndim)
+             if seed is not None else np.zeros(ndim, dtype=np.int64))
+
+    arr = np.zeros((n, ndim), dtype=np.int64)
+    x = np.zeros(ndim, dtype=np.int64)
+    for i in range(1, n):
+        # gray code: flip the direction of the rightmost zero bit of i - 1
+        c = ((i - 1) ^ i).bit_length() - 1
+        x ^= arr_v[:, c]
+        arr[i] = x
+
+    return (arr ^ shift) / float(1 << SOBOL_BITS)
+
+
+def sobol(ml, n, seed=None):
+    '''
+    Sobol sample of the grid.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop
+    n : int
+        number of samples; powers of 2 are balanced best
+    seed : int, optional
+        see :func:`sobol_points`
+
+    Returns
+    -------
+    pandas.DataFrame
+        run table as returned by :func:`get_run_table`
+
+    '''
+
+    arr_unit = sobol_points(n, len(ml.cols_step), seed)
+
+    df = get_run_table(ml, _to_index(ml, arr_unit))
+    logger.info('Sobol sequence: %d runs'%len(df))
+
+    return df
+
+
+def _get_neighbor_pairs(arr_pos, nneighbors):
+    '''
+    Index pairs of each point and its nearest neighbors.
+    '''
+
+    dist = ((arr_pos[:, None, :] - arr_pos[None, :, :])**2).sum(axis=2)
+    np.fill_diagonal(dist, np.inf)
+
+    nneighbors = min(nneighbors, len(arr_pos) - 1)
+    arr_nb = np.argsort(dist, axis=1)[:, :nneighbors]
+
+    return {tuple(sorted((i, j))) for i in range(len(arr_pos))
+            for j in arr_nb[i]}
+
+
+def refine(ml, metric, n, nneighbors=None):
+    '''
+    New grid points where the output metrics change most.
+
+    Each run is paired with its nearest neighbors among the runs with
+    metric values (distances in grid levels, normalized by the number of
+    levels of each dimension). Pairs are ranked by the change of the
+    metrics, normalized by their ranges. The grid points halfway between
+    the runs of the top-ranked pairs are returned; pairs of adjacent grid
+    points can't be refined further.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with the runs done so far in ``df_def_run``
+    metric : pandas.Series or pandas.DataFrame
+        one or several output metrics by ``run_id``, e.g. the ``objective``
+        column of the output ``def_run`` table
+    n : int
+        maximum number of new runs
+    nneighbors : int, optional
+        neighbors per run; defaults to twice the number of dimensions
+
+    Returns
+    -------
+    pandas.DataFrame
+        run table of the new runs as returned by :func:`get_run_table`; to
+        be added with :func:`append_runs`
+
+    '''
+
+    df_metric = (metric.to_frame() if isinstance(metric, pd.Series)
+                 else metric).dropna()
+    df_metric = ((df_metric - df_metric.min())
+                 / (df_metric.max() - df_metric.min()).replace(0, 1))
+
+    df_runs = ml.df_def_run.set_index('run_id')
+    df_runs = df_runs.loc[df_runs.index.intersection(df_metric.index)]
+
+    nlevels = np.array([len(steps) for steps in ml.get_step_levels()])
+    arr_index = df_runs[ml.cols_id].values.astype(int)
+    arr_metric = df_metric.loc[df_runs.index].values
+
+    nneighbors = nneighbors if nneighbors else 2 * len(nlevels)
+    pairs = _get_neighbor_pairs(arr_index / np.maximum(nlevels - 1, 1),
+                                nneighbors)
+
+    list_score = sorted(((np.abs(arr_metric[i] - arr_metric[j]).sum(), i, j)
+                         for i, j in pairs), reverse=True)
+
+    set_existing = set(map(tuple, ml.df_def_run[ml.cols_id].values
+                                    .astype(int)))
+    list_new = []
+
+    for score, i, j in list_score:
+
+        if len(list_new) >= n or not score:
+            break
+
+        mid = (arr_index[i] + arr_index[j]) / 2
+        for point in (tuple(np.floor(mid).astype(int)),
+                      tuple(np.ceil(mid).astype(int))):
+            if point not in set_existing:
+                set_existing.add(point)
+                list_new.append(point)
+                break
+
+    logger.info('Refinement: %d new runs from %d runs'%(len(list_new),
+                                                        len(df_runs)))
+
+    return get_run_table(ml, np.array(list_new, dtype=int)
+                                .reshape(-1, len(nlevels)))
+
+
+def append_runs(ml, df_new):
+    '''
+    Adds runs to the ``df_def_run`` table of a model loop.
+
+    The new runs get the next run_ids; the run_ids of the existing runs are
+    unchanged.
+
+    Returns
+    -------
+    list of int
+        run_ids of the new runs
+
+    '''
+
+    nruns = len(ml.df_def_run)
+    ml.df_def_run = pd.concat([ml.df_def_run, df_new], ignore_index=True,
+                              sort=False)[ml.df_def_run.columns]
+
+    return list(range(nruns, len(ml.df_def_run)))
@@ -4,11 +4,19 @@ The timemap module contains the TimeMap class for
 * mapping between hours of the year and model time slots of the year,
 * convenient mapping between time slots/hours and other temporal indices
   (month ids, week ids, seasons, hours of the week/month, etc)
+* representative days or weeks obtained from the clustering of profiles
+* variable-length time slots based on the variability of profiles
+
+Time maps are cached in the module dictionary ``TM_DICT`` and, if a cache
+directory is set (``cache_dir`` argument of :class:`TimeMap` or the
+environment variable ``GRIMSEL_CACHE_DIR``), on disk
+(:mod:`grimsel.auxiliary.aux_cache`).
 
 '''
 
 import pandas as pd
 import numpy as np
+import grimsel.auxiliary.aux_cache as aux_cache
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
@@ -26,11 +34,82 @@ DOW_TYPE_DICT = {**{d: 'WEEKDAY' for d in range(5)}, **{5: 'SAT', 6: 'SUN'}}
 
 TM_DICT = {}
 
-def _tm_hash(nhours, freq, start, stop, tm_filt):
+def _tm_hash(nhours, freq, start, stop, tm_filt, *args):
 
-    hash_val = hash((nhours, freq, start, stop, str(tm_filt)))
+    hash_val = hash((nhours, freq, start, stop, str(tm_filt)) + args)
     return hash_val
 
+def _days_to_civil(days):
+    '''
+    Year, month, and day of the month from the days since 1970-01-01.
+
+    Vectorized version of the *civil_from_days* algorithm by H. Hinnant
+    (proleptic Gregorian calendar).
+
+    '''
+
+    z = np.asarray(days, dtype=np.int64) + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+
+    return year, month, day
+
+def _civil_to_days(year, month, day):
+    ''' Days since 1970-01-01; inverse of :func:`_days_to_civil`. '''
+
+    month = np.asarray(month, dtype=np.int64)
+    year = np.asarray(year, dtype=np.int64) - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+
+    return era * 146097 + doe - 719468
+
+def _is_leap(year):
+
+    return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+
+def _iso_week(year, doy, dow):
+    '''
+    ISO 8601 week numbers (1-53) from the year, the day of the year
+    (1-366), and the day of the week (0: Monday).
+
+    '''
+
+    def nweeks(year):
+        p = lambda y: (y + y // 4 - y // 100 + y // 400) % 7
+        return 52 + ((p(year) == 4) | (p(year - 1) == 3))
+
+    week = (doy - dow + 9) // 7
+    week = np.where(week > nweeks(year), 1,
+                    np.where(week < 1, nweeks(year - 1), week))
+
+    return week
+
+def _last_sunday(year, month):
+    ''' Days since 1970-01-01 of the last Sunday of the month. '''
+
+    year = np.asarray(year, dtype=np.int64)
+    last = (_civil_to_days(year + (month == 12), month % 12 + 1, 1) - 1)
+
+    return last - (last + 4) % 7
+
+def _normalize_tm_filt(tm_filt):
+    ''' Hashable representation of the ``tm_filt`` argument. '''
+
+    if not tm_filt:
+        return None
+
+    return tuple((col, tuple(sorted(set(np.asarray(list(vals)).tolist()))))
+                 for col, vals in tm_filt)
+
 class _UniqueInstancesMeta(type):
     '''
     Load ``TimeMap`` instance from the module dictionary, if exists.
@@ -43,9 +122,11 @@ class _UniqueInstancesMeta(type):
 
     def __call__(cls, nhours=1, freq=1,
                  start='2015-1-1 00:00', stop='2015-12-31 23:59',
-                 tm_filt=False, *args, **kwargs):
+                 tm_filt=False, keep_datetime=False, minimum=False,
+                 dst=False, cache_dir=None):
 
-        key = _tm_hash(nhours, freq, start, stop, tm_filt)
+        key = _tm_hash(nhours, freq, start, stop, tm_filt,
+                       keep_datetime, minimum, dst)
 
         if key in TM_DICT:
             logger.warning(('TimeMap (%s) exists. Reading time '
@@ -53,7 +134,7 @@ class _UniqueInstancesMeta(type):
             return TM_DICT[key]
         else:
             return super().__call__(nhours, freq, start, stop, tm_filt,
-                                    *args, **kwargs)
+                                    keep_datetime, minimum, dst, cache_dir)
 
 class TimeMap(metaclass=_UniqueInstancesMeta):
     '''
@@ -79,7 +160,9 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
     start : str
         start datetime of time map; format ``2015-1-1 00:00``
     stop : str
-        end datetime of time map; format ``2015-1-1 00:00``
+        end datetime of time map; format ``2015-1-1 00:00``; multi-year
+        time maps are generated if ``start`` and ``stop`` are in
+        different years
     tm_filt : list
         list of tuples with shape ``(timemap_column, [values])``
         for time map filtering. For example,
@@ -90,6 +173,11 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         Remove the *DateTime* column if False
     minimum : bool
         don't generate non-essential columns
+    dst : bool
+        add the column *dst* (European summer time); ignored if ``minimum``
+    cache_dir : str
+        directory of the on-disk time map cache; if None, the environment
+        variable ``GRIMSEL_CACHE_DIR`` is used
 
     Raises
     ------
@@ -157,11 +245,13 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
     def __hash__(self):
 
         return _tm_hash(self.nhours, self.freq, self.start,
-                       self.stop, self.tm_filt)
+                       self.stop, self.tm_filt, self.keep_datetime,
+                       self.minimum, self.dst)
 
     def __init__(self, nhours=1, freq=1,
                  start='2015-1-1 00:00', stop='2015-12-31 23:59',
-                 tm_filt=False, keep_datetime=False, minimum=False):
+                 tm_filt=False, keep_datetime=False, minimum=False,
+                 dst=False, cache_dir=None):
 
         self.freq = freq
         self.num_freq = (float(self.freq[:-1])
@@ -176,6 +266,8 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         self.keep_datetime = keep_datetime
 
         self.minimum = minimum
+        self.dst = dst
+        self.cache_dir = aux_cache.get_cache_dir(cache_dir)
 
         self.df_time_red = pd.DataFrame()
         self.df_hoy_soy = pd.DataFrame()
@@ -183,56 +275,114 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
 
         TM_DICT[hash(self)] = self
 
-        if nhours:
+        if nhours and not self._read_cache():
             self.gen_soy_timemap()
+            self._write_cache()
+
+    _cache_tables = ['df_time_map', 'df_time_red', 'df_hoy_soy']
+
+    def _get_cache_key(self):
+
+        return aux_cache.get_key(str(self.start), str(self.stop),
+                                 self.num_freq, self.nhours,
+                                 _normalize_tm_filt(self.tm_filt),
+                                 self.keep_datetime, self.minimum, self.dst)
+
+    def _read_cache(self):
+        '''
+        Reads the time map tables from the on-disk cache.
+
+        Returns
+        -------
+        bool
+            True if the time map was read from the cache
+
+        '''
+
+        dict_tables = aux_cache.read(self.cache_dir, 'timemap',
+                                     self._get_cache_key())
+
+        if dict_tables is None:
+            return False
+
+        for name in self._cache_tables:
+            setattr(self, name, dict_tables[name])
+
+        return True
+
+    def _write_cache(self):
+        ''' Writes the time map tables to the on-disk cache. '''
+
+        aux_cache.write({name: getattr(self, name)
+                         for name in self._cache_tables},
+                        self.cache_dir, 'timemap', self._get_cache_key())
 
     def gen_hoy_timemap(self):
+        '''
+        Generates the base time map ``df_time_map`` indexed by the hour of
+        the year *hy*.
 
+        All calendar columns are calculated through integer arithmetic on
+        the minutes since 1970-01-01 (proleptic Gregorian calendar). The
+        time map is in local standard time, i.e. without missing or
+        repeated hours at daylight saving time changes; the optional column
+        *dst* flags the European summer time (from the last Sunday of March
+        to the last Sunday of October, 02:00 standard time).
 
-        logger.info('Generating time map with freq='
-                    '{} nhours={} from {} to {}'.format(self.freq, self.nhours,
-                                                        self.start, self.stop))
+        February 29 of leap years is removed. The *hy* are the hours of the
+        365-day year, consistent with the 8760-hour input profiles. For
+        multi-year time maps, the *hy* restart in every year.
 
-        df_time_map = pd.DataFrame(index=pd.date_range(self.start, self.stop,
-                                                       freq=self.str_freq))
-        df_time_map = (df_time_map.reset_index()
-                                  .rename(columns={'index': 'DateTime'}))
+        '''
 
-        df_time_map['hour'] = df_time_map['DateTime'].dt.hour
-        df_time_map['doy'] = df_time_map['DateTime'].dt.dayofyear
-        df_time_map['mt_id'] = df_time_map['DateTime'].dt.month - 1
-        df_time_map['day'] = df_time_map['DateTime'].dt.day
-        df_time_map['year'] = df_time_map['DateTime'].dt.year
-        df_time_map['dow'] = df_time_map['DateTime'].dt.weekday
-        df_time_map['how'] = df_time_map['dow'] * 24 + df_time_map['hour']
-        df_time_map['hom'] = (df_time_map['day'] - 1) * 24 + df_time_map['hour']
-        df_time_map['wk_id'] = (df_time_map['DateTime'].dt.isocalendar().week - 1).astype(np.int64)
 
-        # add number of hours per week
-        df_time_map = (df_time_map
-            .join(df_time_map.pivot_table(values='how', index='wk_id', aggfunc=len)
-            .rename(columns={'how': 'wk_weight'}), on='wk_id'))
+        logger.info('Generating time map with freq='
+                    '{} nhours={} from {} to {}'.format(self.freq, self.nhours,
+                                                        self.start, self.stop))
 
+        step = int(round(self.num_freq * 60))
+        minute_start, minute_stop = [pd.Timestamp(t).value // (60 * 10**9)
+                                     for t in (self.start, self.stop)]
+        minutes = np.arange(minute_start, minute_stop + 1, step,
+                            dtype=np.int64)
+
+        days, minute = np.divmod(minutes, 1440)
+        hour, minute = np.divmod(minute, 60)
+        year, month, day = _days_to_civil(days)
+        doy = days - _civil_to_days(year, 1, 1) + 1
+        dow = (days + 3) % 7  # 1970-01-01 is a Thursday
+        wk_id = _iso_week(year, doy, dow) - 1
+
+        df_time_map = pd.DataFrame({'hour': hour, 'doy': doy,
+                                    'mt_id': month - 1, 'day': day,
+                                    'year': year, 'dow': dow,
+                                    'how': dow * 24 + hour,
+                                    'hom': (day - 1) * 24 + hour,
+                                    'wk_id': wk_id})
+
+        # add number of hours per week; weeks of different years are
+        # distinct (wk_id < 53)
+        yr_wk = (year - year.min()) * 53 + wk_id
+        df_time_map['wk_weight'] = np.bincount(yr_wk)[yr_wk]
 
         # remove February 29
-        mask_feb29 = ((df_time_map.mt_id == 1) & (df_time_map.day == 29))
-        df_time_map = df_time_map.loc[-mask_feb29].reset_index(drop=True)
+        mask = ~((month == 2) & (day == 29))
+        df_time_map = df_time_map.loc[mask].reset_index(drop=True)
+        year, month, doy, hour, minute, minutes = (
+                arr[mask] for arr in (year, month, doy, hour, minute, minutes))
 
+        # add hour of the year column; days after February 29 are shifted
+        doy_365 = doy - (_is_leap(year) & (month > 2))
+        df_time_map['hy'] = hour + 24 * (doy_365 - 1) + minute / 60
 
-        # add hour of the year column
-        get_hoy = lambda x: ((x.hour + 24 * (x.doy - 1)
-                             + x.DateTime.dt.minute / 60).rename('hy')
-                             .reset_index())
-        df_time_map['hy'] = (df_time_map.groupby(['year']).apply(get_hoy)
-                                        .reset_index(drop=True)['hy'])
         if not self.minimum:
 
-            df_time_map['month'] = df_time_map['DateTime'].dt.month
+            df_time_map['month'] = month
             df_time_map['mt'] = df_time_map['mt_id'].map(MONTH_DICT)
             df_time_map['season'] = df_time_map['mt'].map(SEASON_DICT)
             df_time_map['wk'] = df_time_map['wk_id']
-            df_time_map['dow_name'] = df_time_map['dow'].replace(DOW_DICT)
-            df_time_map['dow_type'] = df_time_map['dow'].replace(DOW_TYPE_DICT)
+            df_time_map['dow_name'] = df_time_map['dow'].map(DOW_DICT)
+            df_time_map['dow_type'] = df_time_map['dow'].map(DOW_TYPE_DICT)
 
             # week of the month
             dfwom = df_time_map[['wk_id', 'mt_id']]
@@ -252,20 +402,27 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
             dfwom = dfwom.set_index('wk_id')['wom']
             df_time_map = df_time_map.join(dfwom, on=dfwom.index.names)
 
-            df_time_map_ndays = pd.DataFrame(df_time_map.loc[:,['mt', 'year', 'day']]
-                                            .drop_duplicates()
-                                            .pivot_table(values='day',
-                                                         index=['year','mt'],
-                                                               aggfunc=len))['day'].rename('ndays')
-            df_time_map = df_time_map.join(df_time_map_ndays,
-                                           on=df_time_map_ndays.index.names)
+            # number of days of the month
+            df_time_map['ndays'] = (_civil_to_days(year + (month == 12),
+                                                   month % 12 + 1, 1)
+                                    - _civil_to_days(year, month, 1)
+                                    - (_is_leap(year) & (month == 2)))
 
+            if self.dst:
+                minutes_dst = [_last_sunday(year, mt) * 1440 + 120
+                               for mt in (3, 10)]
+                df_time_map['dst'] = ((minutes >= minutes_dst[0])
+                                      & (minutes < minutes_dst[1]))
+
+        if self.keep_datetime:
+            df_time_map.insert(0, 'DateTime',
+                               pd.to_datetime(minutes, unit='m'))
 
         # apply filtering
-        mask = df_time_map.mt_id.apply(lambda x: True).rename('mask')
+        mask = np.ones(len(df_time_map), dtype=bool)
         if self.tm_filt:
             for ifilt in self.tm_filt:
-                mask &= df_time_map[ifilt[0]].isin(ifilt[1])
+                mask &= df_time_map[ifilt[0]].isin(ifilt[1]).values
 
         if mask.sum() == 0:
             raise RuntimeError('Trying to generate and TimeMap which is empty '
@@ -274,10 +431,6 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         self.df_time_map = df_time_map.loc[mask].reset_index(drop=True)
 
 
-        if not self.keep_datetime:
-            self.df_time_map = self.df_time_map.drop('DateTime', axis=1)
-
-
     def gen_soy_timemap(self):
         '''
         Reduces the original timemap to a lower time resolution.
@@ -304,35 +457,42 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         df_time_map = self.df_time_map
 
         # add soy column to dataframe, based on nhours
-        len_rep = self.nhours / self.num_freq
-        len_rge = np.ceil(len(df_time_map)/ len_rep)
-        df_tm = pd.DataFrame(np.repeat(np.arange(len_rge), [len_rep]),
-                             columns=['sy']).iloc[:len(df_time_map)]
-        df_time_map['sy'] = df_tm
+        len_rep = int(round(self.nhours / self.num_freq))
+        isy = np.arange(len(df_time_map)) // len_rep
+        df_time_map['sy'] = isy.astype(float)
 
         # add weight column to dataframe
-        df_weight = df_time_map.pivot_table(values=['hy'], index='sy',
-                                            aggfunc=len)
-        df_weight = df_weight.rename(columns={'hy': 'weight'}) * self.num_freq
-        df_time_map = df_time_map.join(df_weight, on='sy')
+        df_time_map = df_time_map.assign(
+                weight=np.bincount(isy)[isy].astype(float) * self.num_freq)
 
         self.df_hoy_soy = df_time_map[['sy', 'hy']]
 
         if self.nhours == self.num_freq:
             self.df_time_red = df_time_map
         else:
+            # first row of each (year, sy) block
+            year = df_time_map.year.values
+            irow = np.flatnonzero(np.r_[True, (np.diff(isy) != 0)
+                                              | (np.diff(year) != 0)])
 
             df_time_map_num = df_time_map.select_dtypes(include=['integer',
                                                                  'floating'])
+            col_num = sorted(c for c in df_time_map_num.columns
+                             if not c in ['year', 'sy'])
             col_nonnum = [c for c in df_time_map.columns
                           if not c in df_time_map_num.columns]
-            df_time_map_oth = df_time_map[col_nonnum + ['hy']].set_index('hy')
 
-            self.df_time_red = (df_time_map_num
-                        .pivot_table(aggfunc=min, index=['year', 'sy'])
-                        .reset_index())
+            df_time_red = pd.DataFrame(
+                    {'year': year[irow], 'sy': isy[irow].astype(float),
+                     **{col: np.minimum.reduceat(df_time_map_num[col].values,
+                                                 irow)
+                        for col in col_num}})
 
-            self.df_time_red = self.df_time_red.join(df_time_map_oth, on='hy')
+            self.df_time_red = pd.concat(
+                    [df_time_red,
+                     df_time_map[col_nonnum].iloc[irow]
+                                            .reset_index(drop=True)],
+                    axis=1)
 
     def get_year_share(self):
         '''
@@ -352,19 +512,568 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         return len(self.df_time_red) / (8760 / self.nhours)
 
     def _get_dst_days(self, list_months=['MAR', 'OCT']):
+        '''
+        Day of the year of the last Sunday of the months ``list_months``.
+
+        Returns
+        -------
+        dict
+            ``{(year, month name): doy}`` for all years of the time map
+
+        '''
+
+        dict_mt = {mt: mt_id + 1 for mt_id, mt in MONTH_DICT.items()}
+        years = np.unique(self.df_time_map.year.values)
+
+        return {(int(year), mt): int(_last_sunday(year, dict_mt[mt])
+                                     - _civil_to_days(year, 1, 1) + 1)
+                for year in years for mt in list_months}
+
+def _sqdist(arr_a, arr_b):
+    ''' Squared euclidean distances between the rows of two 2D arrays. '''
+
+    dist = ((arr_a**2).sum(axis=1)[:, None] + (arr_b**2).sum(axis=1)[None, :]
+            - 2 * arr_a.dot(arr_b.T))
+    return np.clip(dist, 0, None)
+
+def cluster_periods(arr, nclusters, method='kmeans', niter=100, seed=0):
+    '''
+    Clusters the rows of a feature array using k-means or k-medoids.
+
+    Both methods are initialized through k-means++ seeding. K-medoids
+    uses the alternating (Voronoi iteration) algorithm.
+
+    Parameters
+    ----------
+    arr : numpy.ndarray
+        2D feature array, one row per period
+    nclusters : int
+        number of clusters; limited to the number of rows
+    method : str
+        one of ``'kmeans'``, ``'kmedoids'``
+    niter : int
+        maximum number of iterations
+    seed : int
+        random seed of the initialization
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        cluster of each row; clusters are numbered in the order of their
+        first occurrence
+    repr_idx : numpy.ndarray
+        representative row of each cluster: the medoid (``'kmedoids'``)
+        or the member closest to the centroid (``'kmeans'``)
+
+    Raises
+    ------
+    ValueError
+        If the ``method`` is unknown.
+
+    '''
+
+    if not method in ('kmeans', 'kmedoids'):
+        raise ValueError('cluster_periods: Unknown method %s. Expecting one '
+                         'of [\'kmeans\', \'kmedoids\'].'%method)
+
+    nclusters = min(nclusters, len(arr))
+    rs = np.random.RandomState(seed)
+
+    # k-means++ seeding
+    idx_init = [rs.randint(len(arr))]
+    dist = _sqdist(arr, arr[idx_init])[:, 0]
+    for _ in range(1, nclusters):
+        prob = dist / dist.sum() if dist.sum() > 0 else None
+        idx_init.append(rs.choice(len(arr), p=prob))
+        dist = np.minimum(dist, _sqdist(arr, arr[idx_init[-1:]])[:, 0])
+    idx_init = np.array(idx_init)
+
+    if method == 'kmeans':
+        centers = arr[idx_init]
+        for _ in range(niter):
+            labels = _sqdist(arr, centers).argmin(axis=1)
+            centers_new = np.array([arr[labels == icl].mean(axis=0)
+                                    if (labels == icl).any() else centers[icl]
+                                    for icl in range(nclusters)])
+            if np.allclose(centers_new, centers):
+                break
+            centers = centers_new
+        labels = _sqdist(arr, centers).argmin(axis=1)
+        dist = _sqdist(arr, centers)
+        repr_idx = np.array([np.flatnonzero(labels == icl)[
+                                 dist[labels == icl, icl].argmin()]
+                             if (labels == icl).any() else -1
+                             for icl in range(nclusters)])
+
+    else:
+        dist = _sqdist(arr, arr)
+        repr_idx = idx_init
+        for _ in range(niter):
+            labels = dist[:, repr_idx].argmin(axis=1)
+            repr_idx_new = repr_idx.copy()
+            for icl in range(nclusters):
+                members = np.flatnonzero(labels == icl)
+                if len(members):
+                    cost = dist[np.ix_(members, members)].sum(axis=1)
+                    repr_idx_new[icl] = members[cost.argmin()]
+            if (repr_idx_new == repr_idx).all():
+                break
+            repr_idx = repr_idx_new
+        labels = dist[:, repr_idx].argmin(axis=1)
+
+    # renumber clusters by first occurrence; drop empty clusters
+    _, idx_first = np.unique(labels, return_index=True)
+    order = labels[np.sort(idx_first)]
+    dict_relabel = {old: new for new, old in enumerate(order)}
+    labels = np.array([dict_relabel[lb] for lb in labels])
+    repr_idx = repr_idx[order]
+
+    return labels, repr_idx
+
+
+class _ProfileTimeMap():
+    '''
+    Base class of time maps with time slots derived from profile data.
+
+    Generates the base time map ``df_time_map`` at the input frequency
+    and provides the methods shared by :class:`RepresentativeTimeMap` and
+    :class:`AdaptiveTimeMap`.
+
+    '''
+
+    def _init_base_time_map(self, nhours, freq, tm_filt):
+
+        self.freq = freq
+        self.num_freq = (float(self.freq[:-1])
+                         if isinstance(self.freq, str) else self.freq)
+        self.nhours = nhours
+        self.tm_filt = tm_filt
+
+        assert (self.nhours / self.num_freq) % 1 == 0, \
+                ('%s: The time slot duration nhours must '
+                 'be a multiple of the original time map frequency freq. '
+                 'num_freq=%f, nhours=%f'%(type(self).__name__,
+                                           self.num_freq, self.nhours))
+
+        tm_base = TimeMap(nhours=freq, freq=freq, tm_filt=tm_filt)
+        self.df_time_map = (tm_base.df_time_map.drop('sy', axis=1,
+                                                     errors='ignore')
+                                               .reset_index(drop=True))
+
+    def _get_feature_array(self, df_prof):
+        ''' Profiles reindexed by the time map hours and scaled to [-1, 1]. '''
+
+        arr = (df_prof.reindex(self.df_time_map.hy.values)
+                      .fillna(0).values.astype(float))
+
+        scale = np.abs(arr).max(axis=0)
+        scale[scale == 0] = 1
+
+        return arr / scale
+
+    def _get_time_red(self, df_rows):
+        '''
+        Reduces the *hy* rows ``df_rows`` to the *sy*-indexed ``df_time_red``.
+
+        As in :func:`TimeMap.gen_soy_timemap` the minimum values of the
+        temporal columns are selected. The *weight* is the total duration of
+        all hours mapped to each time slot in ``df_time_map``.
+
+        '''
+
+        df_weight = (self.df_time_map.groupby('sy').hy.size() * self.num_freq
+                    ).rename('weight')
+
+        if df_rows.sy.is_unique:
+            df_time_red = df_rows
+        else:
+            df_rows_num = df_rows.select_dtypes(include=['integer',
+                                                         'floating'])
+            col_nonnum = [c for c in df_rows.columns
+                          if not c in df_rows_num.columns]
+            df_time_red = (df_rows_num.pivot_table(aggfunc=min,
+                                                   index=['year', 'sy'])
+                                      .reset_index())
+            df_time_red = df_time_red.join(
+                    df_rows[col_nonnum + ['hy']].set_index('hy'), on='hy')
+
+        return (df_time_red.join(df_weight, on='sy')
+                           .sort_values('sy')
+                           .reset_index(drop=True))
+
+    def get_year_share(self):
+        '''
+        For a given time map, returns the share after applying ``tm_filt``.
+
+        See :func:`TimeMap.get_year_share`.
+
+        Returns
+        -------
+        float : year share of the time map
+
+        '''
+
+        return self.df_time_red.weight.sum() / 8760
+
+
+class RepresentativeTimeMap(_ProfileTimeMap):
+    '''
+    Time map based on representative days or weeks.
+
+    The hours of the base time map are split into consecutive periods
+    (days or weeks), which are clustered based on the profile table
+    ``df_prof``. Each period is assigned to the month of its middle hour.
+    Each cluster is modelled through a single period per month with
+    member periods; its time slots *sy* carry the total duration of the
+    cluster's hours in this month as *weight*. This keeps the monthly
+    constraints and the monthly parameter factors consistent with the
+    calendar. The attributes follow the :class:`TimeMap` class:
+
+    * ``df_time_map``, indexed by the hour of the year *hy*, with
+      additional columns *period* (chronological period index),
+      *cluster*, and *copy* (index of the cluster/month combination)
+    * ``df_time_red``, reduced time map indexed by the time slot *sy*;
+      *mt_id* is the month of the cluster/month combination, the other
+      temporal columns (*wk_id*, etc) are those of its first member
+      period
+    * ``df_hoy_soy``, the *hy* |rarr| *sy* map used to average the
+      profiles: all hours of the cluster's member periods in the month for
+      ``'kmeans'``, the hours of the cluster's medoid period for
+      ``'kmedoids'``
+    * ``dict_sy_prev``: first |rarr| last time slot of each cluster/month
+      combination; used to make the storage and ramping constraints
+      cyclic within each representative period
+
+    Storage is balanced within each representative period; energy is not
+    transferred between periods, so seasonal storage is not represented.
+
+    A trailing incomplete period (e.g. the 365th day of a week-based
+    time map) is assigned to the cluster whose mean is closest over the
+    available hours.
+
+    Args
+    ----
+    df_prof : pandas.DataFrame
+        profile values; index *hy*, one column per profile
+    nclusters : int
+        number of representative periods
+    period : str
+        one of ``'day'``, ``'week'``
+    nhours : float
+        target time resolution in hours within the representative periods
+    freq : float
+        frequency of the base time map in hours
+    tm_filt : list
+        base time map filtering, see :class:`TimeMap`
+    method : str
+        clustering method, one of ``'kmeans'``, ``'kmedoids'``; see
+        :func:`cluster_periods`
+    seed : int
+        random seed of the cluster initialization
+    niter : int
+        maximum number of clustering iterations
+
+    Raises
+    ------
+    AssertionError
+        If the period length is not a multiple of ``nhours`` or
+        ``nhours`` is not a multiple of ``freq``.
+
+    '''
+
+    DICT_PERIOD_HOURS = {'day': 24, 'week': 168}
+
+    def __repr__(self):
+
+        return ('RepresentativeTimeMap (%d %s clusters, nhours=%s)'
+                %(self.nclusters, self.period, self.nhours))
+
+    def __init__(self, df_prof, nclusters, period='day', nhours=1, freq=1,
+                 tm_filt=False, method='kmeans', seed=0, niter=100):
+
+        assert period in self.DICT_PERIOD_HOURS, (
+                'RepresentativeTimeMap: Unknown period %s. Expecting one of '
+                '%s.'%(period, list(self.DICT_PERIOD_HOURS)))
+
+        self.nclusters = nclusters
+        self.period = period
+        self.method = method
+        self.seed = seed
+        self.niter = niter
+
+        assert (self.DICT_PERIOD_HOURS[period] / nhours) % 1 == 0, \
+                ('RepresentativeTimeMap: The period length must be a multiple '
+                 'of nhours. nhours=%f'%nhours)
+
+        self._init_base_time_map(nhours, freq, tm_filt)
+
+        self.gen_repr_timemap(df_prof)
+
+    def gen_repr_timemap(self, df_prof):
+        '''
+        Clusters the periods and generates the time map tables.
+
+        Parameters
+        ----------
+        df_prof : pandas.DataFrame
+            profile values; index *hy*, one column per profile
+
+        '''
+
+        len_per = int(self.DICT_PERIOD_HOURS[self.period] / self.num_freq)
+        len_rep = int(self.nhours / self.num_freq)
+        nslots = len_per // len_rep
+
+        arr = self._get_feature_array(df_prof)
+        nhy, ncols = arr.shape
+        nper_full = nhy // len_per
+
+        assert nper_full > 0, ('RepresentativeTimeMap: The time map is '
+                               'shorter than a single period.')
+
+        arr_per = arr[:nper_full * len_per].reshape(nper_full,
+                                                    len_per * ncols)
+
+        labels, repr_idx = cluster_periods(arr_per, self.nclusters,
+                                           method=self.method,
+                                           niter=self.niter, seed=self.seed)
+
+        npart = nhy - nper_full * len_per
+        if npart:
+            # trailing incomplete period: closest cluster mean
+            arr_part = arr[nper_full * len_per:].reshape(1, npart * ncols)
+            means = np.array([arr_per[labels == icl, :npart * ncols].mean(axis=0)
+                              for icl in range(len(repr_idx))])
+            labels = np.r_[labels, _sqdist(arr_part, means).argmin()]
+
+        self.nclusters = len(repr_idx)
+
+        nper = len(labels)
+        period = np.arange(nhy) // len_per
+
+        # month of each period's middle hour
+        per_first = np.arange(nper) * len_per
+        per_len = np.minimum(len_per, nhy - per_first)
+        mt_per = self.df_time_map.mt_id.values[per_first + per_len // 2]
+        if npart:
+            # the incomplete period joins a month of its cluster with full
+            # periods, so all time slots of each copy exist
+            mt_full = mt_per[:nper_full][labels[:nper_full] == labels[-1]]
+            if not mt_per[-1] in mt_full:
+                mt_per[-1] = mt_full[-1]
+
+        # cluster/month combinations
+        df_copy = (pd.DataFrame({'cluster': labels, 'mt_id': mt_per})
+                     .drop_duplicates().sort_values(['cluster', 'mt_id'])
+                     .reset_index(drop=True))
+        copy_per = (pd.DataFrame({'cluster': labels, 'mt_id': mt_per})
+                      .merge(df_copy.reset_index(), on=['cluster', 'mt_id'],
+                             how='left')['index'].values)
+        ncopies = len(df_copy)
+
+        pos = (np.arange(nhy) % len_per) // len_rep
+        sy = copy_per[period] * nslots + pos
+
+        df_time_map = self.df_time_map.assign(period=period,
+                                              cluster=labels[period],
+                                              copy=copy_per[period], sy=sy)
+        self.df_time_map = df_time_map
+
+        if self.method == 'kmedoids':
+            # hours of the medoid period mapped to all copies of its cluster
+            df_medoid = (df_time_map.loc[np.isin(period, repr_idx),
+                                         ['hy', 'cluster']]
+                                    .assign(pos=pos[np.isin(period,
+                                                            repr_idx)]))
+            df_hoy_soy = df_medoid.merge(df_copy.reset_index(),
+                                         on='cluster')
+            df_hoy_soy['sy'] = df_hoy_soy['index'] * nslots + df_hoy_soy.pos
+            self.df_hoy_soy = df_hoy_soy[['sy', 'hy']]
+        else:
+            self.df_hoy_soy = df_time_map[['sy', 'hy']]
+
+        # temporal columns from the first full member period of each copy
+        per_rows = pd.Series(np.arange(nper_full),
+                             index=copy_per[:nper_full]).groupby(level=0).min()
+        df_rows = df_time_map.loc[np.isin(period, per_rows.values)]
+
+        df_time_red = self._get_time_red(df_rows)
+        df_time_red['mt_id'] = (df_time_red.sy // nslots).map(
+                                                df_copy.mt_id).values
+
+        # columns depending on the month only (e.g. month names, seasons)
+        cols_mt = [col for col in df_time_map.columns
+                   if not col in ('mt_id', 'sy', 'period', 'cluster', 'copy')
+                   and df_time_map.groupby('mt_id')[col].nunique().max() == 1]
+        df_mt = df_time_map.groupby('mt_id')[cols_mt].first()
+        df_time_red[cols_mt] = df_mt.reindex(df_time_red.mt_id).values
+        self.df_time_red = df_time_red
+
+        sy_first = np.arange(ncopies) * nslots
+        self.dict_sy_prev = dict(zip(sy_first.tolist(),
+                                     (sy_first + nslots - 1).tolist()))
+
+        self.ncopies = ncopies
+
+        logger.info('RepresentativeTimeMap: %d %ss clustered to %d '
+                    'representative %ss (%s) in %d cluster/month '
+                    'combinations; %d -> %d time slots.'
+                    %(len(labels), self.period, self.nclusters, self.period,
+                      self.method, ncopies, nhy / len_rep,
+                      len(self.df_time_red)))
+
+class AdaptiveTimeMap(_ProfileTimeMap):
+    '''
+    Time map with variable-length time slots based on profile variability.
+
+    Consecutive blocks of ``nhours`` are merged into a single time slot as
+    long as the joint profile change within the slot remains below
+    ``tolerance``. The joint change is the root mean square over all
+    profiles of the range (maximum minus minimum) of the profiles scaled
+    to [-1, 1]. Time slots never extend over month or week boundaries,
+    gaps of the filtered time map, or ``max_len`` hours. Peak hours (mean
+    scaled profile above its ``peak_quantile``) are kept at the full
+    resolution ``nhours``.
+
+    The attributes follow the :class:`TimeMap` class: ``df_time_map``,
+    ``df_time_red``, and ``df_hoy_soy``. The *weight* column is the
+    duration of each time slot in hours. Time slots are chronological, so
+    the storage constraints remain unchanged.
+
+    Args
+    ----
+    df_prof : pandas.DataFrame
+        profile values; index *hy*, one column per profile
+    tolerance : float
+        maximum joint profile change within a time slot
+    max_len : float
+        maximum time slot duration in hours
+    peak_quantile : float
+        quantile of the mean scaled profile above which hours are
+        considered peaks; no peak protection if None
+    nhours : float
+        minimum time slot duration in hours
+    freq : float
+        frequency of the base time map in hours
+    tm_filt : list
+        base time map filtering, see :class:`TimeMap`
+
+    Raises
+    ------
+    AssertionError
+        If ``nhours`` is not a multiple of ``freq``.
+
+    '''
+
+    def __repr__(self):
+
+        return ('AdaptiveTimeMap (tolerance=%s, max_len=%s, nhours=%s)'
+                %(self.tolerance, self.max_len, self.nhours))
+
+    def __init__(self, df_prof, tolerance=0.1, max_len=24,
+                 peak_quantile=0.99, nhours=1, freq=1, tm_filt=False):
+
+        self.tolerance = tolerance
+        self.max_len = max_len
+        self.peak_quantile = peak_quantile
+
+        self._init_base_time_map(nhours, freq, tm_filt)
+
+        self.gen_adaptive_timemap(df_prof)
+
+    def _get_blocks(self, df_prof):
+        '''
+        Aggregates the base time map to blocks of ``nhours``.
+
+        Returns
+        -------
+        block : numpy.ndarray
+            block index of each base time map row
+        arr_min, arr_max : numpy.ndarray
+            minimum and maximum scaled profile values of each block
+        is_break : numpy.ndarray
+            bool, True if a new time slot must start with the block
+
+        '''
+
+        df_time_map = self.df_time_map
+        arr = self._get_feature_array(df_prof)
+
+        len_rep = int(self.nhours / self.num_freq)
+
+        # new block at regular intervals, time map gaps, and month/week ends
+        hy = df_time_map.hy.values
+        is_new = np.r_[True, np.diff(hy) > self.num_freq]
+        for col in ['mt_id', 'wk_id']:
+            is_new[1:] |= df_time_map[col].values[1:] != df_time_map[col].values[:-1]
+        is_break_row = is_new.copy()
+        idx_in_block = np.arange(len(hy)) - np.maximum.accumulate(
+                            np.where(is_new, np.arange(len(hy)), 0))
+        is_new |= idx_in_block % len_rep == 0
+        block = np.cumsum(is_new) - 1
+
+        df_arr = pd.DataFrame(arr).groupby(block)
+        arr_min, arr_max = df_arr.min().values, df_arr.max().values
+
+        is_break = pd.Series(is_break_row).groupby(block).first().values
+
+        if self.peak_quantile is not None:
+            arr_mean = arr.mean(axis=1)
+            is_peak = arr_mean >= np.quantile(arr_mean, self.peak_quantile)
+            is_peak = pd.Series(is_peak).groupby(block).any().values
+            # peak blocks are single time slots
+            is_break |= is_peak
+            is_break[1:] |= is_peak[:-1]
+
+        return block, arr_min, arr_max, is_break
+
+    def gen_adaptive_timemap(self, df_prof):
+        '''
+        Segments the time map and generates the time map tables.
+
+        Parameters
+        ----------
+        df_prof : pandas.DataFrame
+            profile values; index *hy*, one column per profile
+
+        '''
+
+        block, arr_min, arr_max, is_break = self._get_blocks(df_prof)
+
+        nblocks = len(arr_min)
+        max_blocks = max(1, int(self.max_len / self.nhours))
+
+        # greedy segmentation of consecutive blocks
+        sy_block = np.zeros(nblocks, dtype=int)
+        isy = 0
+        seg_min, seg_max = arr_min[0], arr_max[0]
+        seg_len = 1
+        for iblock in range(1, nblocks):
+
+            new_min = np.minimum(seg_min, arr_min[iblock])
+            new_max = np.maximum(seg_max, arr_max[iblock])
 
-        # filter by relevant months
-        _df = self.df_time_map.loc[self.df_time_map.mt.isin(list_months)]
-        mask_dy = _df.dow_name == 'SUN'
+            if (is_break[iblock] or seg_len >= max_blocks
+                    or np.sqrt(((new_max - new_min)**2).mean())
+                        > self.tolerance):
+                isy += 1
+                seg_min, seg_max = arr_min[iblock], arr_max[iblock]
+                seg_len = 1
+            else:
+                seg_min, seg_max = new_min, new_max
+                seg_len += 1
 
-        _df = _df.loc[mask_dy].pivot_table(index=['mt', 'year'],
-                                           values='doy', aggfunc=np.max)
-        _df = _df.reset_index()[['year', 'mt', 'doy']]
+            sy_block[iblock] = isy
 
-        dict_dst = _df.set_index(['year', 'mt'])['doy'].to_dict()
+        self.df_time_map = self.df_time_map.assign(sy=sy_block[block])
 
+        self.df_hoy_soy = self.df_time_map[['sy', 'hy']]
+        self.df_time_red = self._get_time_red(self.df_time_map)
 
-        return dict_dst
+        logger.info('AdaptiveTimeMap: %d blocks of %s hours merged to %d '
+                    'time slots (tolerance=%s, max_len=%s).'
+                    %(nblocks, self.nhours, len(self.df_time_red),
+                      self.tolerance, self.max_len))
 # %%
 
 if __name__ == '__main__':
@@ -0,0 +1,458 @@
+'''
+Multi-host work queue
+=====================
+
+File system based work queue distributing the runs of a
+:class:`grimsel.core.model_loop.ModelLoop` over several hosts sharing a
+file system. Workers on any host claim the next ``run_id`` from the queue
+directory until the queue is empty.
+
+* Each run is a file in one of the state subdirectories ``todo``,
+  ``leased``, ``done``, and ``failed`` of the queue directory. State changes
+  are atomic renames; only one worker succeeds in claiming a run.
+* A claimed run is leased to the worker. The worker renews the lease
+  (modification time of the lease file) from a background thread while the
+  run is in progress. Leases older than ``lease_timeout`` belong to dead
+  workers; any worker moves these runs back to ``todo``. The host clocks
+  must therefore be synchronized (e.g. NTP).
+* Runs whose lease expired ``max_attempts`` times are moved to ``failed``,
+  as are runs raising an exception.
+
+The results are written to the output collection of the workers' model
+loops, which must be the same shared ``fastparquet`` directory on all
+hosts. Only the host which populates the queue resets the output
+collection; all other hosts set the ``reset_output`` io option to False.
+The ``def_run`` rows are written to separate files by each worker and
+merged once the queue is complete.
+
+Example
+-------
+
+.. code-block:: python
+
+    # all hosts
+    ml = ModelLoop(nsteps=nsteps, mkwargs=mkwargs,
+                   iokwargs=dict(iokwargs, output_target='fastparquet',
+                                 cl_out=shared_dir,
+                                 reset_output=is_first_host))
+    ml.build_model()
+
+    work_queue = WorkQueue(queue_dir, lease_timeout=3600)
+    if is_first_host:
+        work_queue.populate(ml.get_list_run_id())
+
+    run_queue_worker(ml, run_model, work_queue, nproc=4)
+
+'''
+
+import os
+import json
+import time
+import socket
+import shutil
+import traceback
+import threading
+
+import pandas as pd
+from multiprocess import Process
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+STATES = ('todo', 'leased', 'done', 'failed')
+
+STATUS_COLS = ['run_id', 'status', 'worker', 'attempts', 'tdiff', 'error']
+
+
+class WorkQueue():
+    '''
+    Queue of run_ids in a shared directory.
+
+    Parameters
+    ----------
+    queue_dir : str
+        queue directory on the shared file system; separate from the output
+        directory, which is deleted when the output is reset
+    lease_timeout : float
+        seconds after the last lease renewal after which a run is reclaimed
+    max_attempts : int
+        number of expired leases after which a run is considered failed
+
+    '''
+
+    def __init__(self, queue_dir, lease_timeout=3600, max_attempts=3):
+
+        self.queue_dir = queue_dir
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+    def _get_path(self, state, run_id=None):
+
+        if run_id is None:
+            return os.path.join(self.queue_dir, state)
+
+        return os.path.join(self.queue_dir, state, str(run_id))
+
+    def _read(self, state, run_id):
+
+        try:
+            with open(self._get_path(state, run_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # missing or being written
+            return {}
+
+    def _write(self, state, run_id, info):
+
+        with open(self._get_path(state, run_id), 'w') as f:
+            json.dump(info, f)
+
+    def _move(self, run_id, from_state, to_state):
+        '''
+        Atomic state change; returns False if the run is not in from_state.
+        '''
+
+        try:
+            os.rename(self._get_path(from_state, run_id),
+                      self._get_path(to_state, run_id))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def get_list_run_id(self, state):
+
+        path = self._get_path(state)
+        list_fn = os.listdir(path) if os.path.isdir(path) else []
+
+        return sorted(int(fn) for fn in list_fn if fn.isdigit())
+
+    def populate(self, list_run_id, reset=False):
+        '''
+        Adds run_ids to the queue.
+
+        Parameters
+        ----------
+        list_run_id : list of int
+            run_ids; those already in any state are skipped
+        reset : bool
+            delete the existing queue first
+
+        Returns
+        -------
+        int
+            number of added run_ids
+
+        '''
+
+        if reset and os.path.isdir(self.queue_dir):
+            shutil.rmtree(self.queue_dir)
+
+        for state in STATES:
+            os.makedirs(self._get_path(state), exist_ok=True)
+
+        existing = set(run_id for state in STATES
+                       for run_id in self.get_list_run_id(state))
+
+        list_add = [run_id for run_id in list_run_id
+                    if run_id not in existing]
+
+        for run_id in list_add:
+            self._write('todo', run_id, {'attempts': 0})
+
+        if list_add and os.path.isfile(os.path.join(self.queue_dir,
+                                                    'merged')):
+            os.remove(os.path.join(self.queue_dir, 'merged'))
+
+        logger.info('Added %d run_ids to work queue %s'%(len(list_add),
+                                                          self.queue_dir))
+
+        return len(list_add)
+
+    def claim(self, worker):
+        '''
+        Leases the next run to the worker.
+
+        Returns
+        -------
+        int or None
+            run_id; None if no runs are left
+
+        '''
+
+        for run_id in self.get_list_run_id('todo'):
+            if self._move(run_id, 'todo', 'leased'):
+                # the rename keeps the old modification time
+                self.renew(run_id)
+                info = self._read('leased', run_id)
+                info.update(worker=worker, t_claim=time.time(),
+                            attempts=info.get('attempts', 0) + 1)
+                self._write('leased', run_id, info)
+
+                return run_id
+
+        return None
+
+    def renew(self, run_id):
+        '''
+        Renews the lease of a run.
+
+        Returns
+        -------
+        bool
+            False if the lease was lost
+
+        '''
+
+        try:
+            os.utime(self._get_path('leased', run_id))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def complete(self, run_id, tdiff, error=None):
+        '''
+        Moves a leased run to ``done`` or, if ``error`` is set, ``failed``.
+
+        Returns
+        -------
+        bool
+            False if the lease had expired and the run was reclaimed
+
+        '''
+
+        info = self._read('leased', run_id)
+        state = 'failed' if error else 'done'
+
+        if not self._move(run_id, 'leased', state):
+            logger.warning('Lease of run_id %s expired before completion'
+                           %run_id)
+            return False
+
+        info.update(tdiff=tdiff, error=error)
+        self._write(state, run_id, info)
+
+        return True
+
+    def reclaim_expired(self):
+        '''
+        Moves runs with expired leases back to ``todo`` (or to ``failed``).
+
+        Returns
+        -------
+        list of int
+            reclaimed run_ids
+
+        '''
+
+        list_reclaimed = []
+        for run_id in self.get_list_run_id('leased'):
+
+            try:
+                age = time.time() - os.path.getmtime(self._get_path('leased',
+                                                                    run_id))
+            except FileNotFoundError:
+                continue  # completed in the meantime
+
+            if age < self.lease_timeout:
+                continue
+
+            info = self._read('leased', run_id)
+            attempts = info.get('attempts', self.max_attempts)
+            state = 'failed' if attempts >= self.max_attempts else 'todo'
+
+            if self._move(run_id, 'leased', state):
+                logger.warning(('Lease of run_id %s by %s expired after %d s;'
+                                ' moved to %s')
+                               %(run_id, info.get('worker'), age, state))
+                if state == 'failed':
+                    info.update(error='Lease expired %d times'%attempts)
+                    self._write(state, run_id, info)
+                list_reclaimed.append(run_id)
+
+        return list_reclaimed
+
+    def is_complete(self):
+
+        return not (self.get_list_run_id('todo')
+                    or self.get_list_run_id('leased'))
+
+    def acquire_merge(self):
+        '''
+        Returns True for the first caller only; used to merge the worker
+        ``def_run`` files exactly once.
+        '''
+
+        try:
+            fd = os.open(os.path.join(self.queue_dir, 'merged'),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        os.close(fd)
+
+        return True
+
+    def get_status(self):
+        '''
+        Status table of all runs in the queue.
+
+        Returns
+        -------
+        pandas.DataFrame
+            columns ``STATUS_COLS``
+
+        '''
+
+        rows = [dict(self._read(state, run_id), run_id=run_id, status=state)
+                for state in STATES for run_id in self.get_list_run_id(state)]
+
+        df = pd.DataFrame(rows).reindex(columns=STATUS_COLS)
+
+        return df.sort_values('run_id').reset_index(drop=True)
+
+
+class _Heartbeat():
+    '''
+    Context manager renewing a lease from a background thread.
+    '''
+
+    def __init__(self, work_queue, run_id):
+
+        self.work_queue = work_queue
+        self.run_id = run_id
+        self.interval = work_queue.lease_timeout / 4
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._renew, daemon=True)
+
+    def _renew(self):
+
+        while not self._stop.wait(self.interval):
+            if not self.work_queue.renew(self.run_id):
+                logger.warning('Lost lease of run_id %s'%self.run_id)
+                break
+
+    def __enter__(self):
+
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+
+        self._stop.set()
+        self._thread.join()
+
+
+def _get_worker_name(pid=None):
+
+    return 'QueueWorker-%s-%d'%(socket.gethostname(), pid or os.getpid())
+
+
+def _worker_loop(ml, func, work_queue, wait, poll_interval):
+    '''
+    Claims and runs run_ids until the queue is empty.
+    '''
+
+    worker = _get_worker_name()
+    ml.worker_name = worker
+
+    while True:
+
+        run_id = work_queue.claim(worker)
+
+        if run_id is None and work_queue.reclaim_expired():
+            run_id = work_queue.claim(worker)
+
+        if run_id is None:
+            if wait and work_queue.get_list_run_id('leased'):
+                # other workers might die; wait for their leases to expire
+                time.sleep(poll_interval)
+                continue
+            break
+
+        logger.info('%s claimed run_id %s'%(worker, run_id))
+
+        t = time.time()
+        error = None
+        with _Heartbeat(work_queue, run_id):
+            try:
+                func(run_id)
+            except Exception:
+                error = traceback.format_exc()
+                logger.error('Run_id %s failed:\n%s'%(run_id, error))
+        tdiff = time.time() - t
+
+        work_queue.complete(run_id, tdiff, error)
+
+    ml.worker_name = None
+
+
+def run_queue_worker(ml, func, work_queue, nproc=1, wait=True,
+                     poll_interval=60, merge=True):
+    '''
+    Runs model runs claimed from a work queue until it is empty.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with built model; output to the shared ``fastparquet``
+        directory
+    func : function(run_id)
+        performs a single model run, as for
+        :func:`grimsel.auxiliary.multiproc.run_parallel`
+    work_queue : WorkQueue
+        populated work queue
+    nproc : int
+        number of worker processes on this host
+    wait : bool
+        if the queue is empty, wait for runs leased by other workers, which
+        might be reclaimed; otherwise return immediately
+    poll_interval : float
+        seconds between checks for expired leases while waiting
+    merge : bool
+        merge the ``def_run`` files of all workers once the queue is
+        complete; done by the first worker finding the queue complete
+
+    Returns
+    -------
+    pandas.DataFrame
+        queue status (:func:`WorkQueue.get_status`) of the runs processed by
+        the workers of this host
+
+    '''
+
+    if ml.io.modwr.output_target != 'fastparquet':
+        raise ValueError('run_queue_worker requires fastparquet output, got '
+                         '%s'%ml.io.modwr.output_target)
+
+    args = (ml, func, work_queue, wait, poll_interval)
+
+    if nproc > 1:
+        # forked processes share the model loop instance with func; dying
+        # processes don't block the others
+        procs = [Process(target=_worker_loop, args=args)
+                 for _ in range(nproc)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            if proc.exitcode:
+                logger.error('Worker %s exited with code %s'
+                             %(_get_worker_name(proc.pid), proc.exitcode))
+        list_worker = [_get_worker_name(proc.pid) for proc in procs]
+    else:
+        _worker_loop(*args)
+        list_worker = [_get_worker_name()]
+
+    if merge and work_queue.is_complete() and work_queue.acquire_merge():
+        logger.info('Work queue complete; merging def_run files')
+        ml._merge_df_run_files()
+
+    df_status = work_queue.get_status()
+
+    return (df_status.loc[df_status.worker.isin(list_worker)]
+                     .reset_index(drop=True))
@@ -0,0 +1,440 @@
+'''
+Input aggregation
+==================
+
+Preprocessing of the input tables reducing the model size prior to the
+model build:
+
+* Spatial aggregation: nodes are merged into zones. Each zone is
+  represented by one of its member nodes (lead node), which keeps its id.
+* Plant clustering: plants with identical node, type, fuel, set
+  definitions, and supply profile are merged into capacity-weighted blocks,
+  separated by efficiency bins.
+
+Both are applied by :func:`grimsel.core.model_base.ModelBase.aggregate_input`
+after reading the input data (i.e. before ``init_maps`` and the set
+definition). The maps back to the original ids are kept as
+:class:`ModelBase` attributes ``df_nd_aggr`` and ``df_pp_cluster``; the
+function :func:`disaggregate_plants` distributes plant results among the
+original plants.
+
+'''
+
+import numpy as np
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# plant tables with plant-specific data; these plants are never clustered
+PP_SPECIFIC_TABLES = ['df_hydro', 'df_plant_month', 'df_plant_week',
+                      'df_profinflow']
+
+# plant_encar columns summed in the plant clustering; all other numeric
+# columns are capacity-weighted averages
+PP_SUM_COLS = ['cap_pwr_leg', 'erg_chp', 'erg_max']
+
+
+def _get_cols(df, list_prefix):
+
+    return [c for c in df.columns if any(c.startswith(pref)
+                                         for pref in list_prefix)]
+
+
+def _aggregate(df, idx, cols_sum=(), col_weight=None):
+    '''
+    Aggregates the table ``df`` by the index columns ``idx``.
+
+    Columns in ``cols_sum`` are summed. Other float columns are averaged,
+    weighted by the column ``col_weight`` if provided. All remaining
+    columns keep the value of the first row of each group.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        input table, sorted so the representative row of each group is
+        first
+    idx : list of str
+        index columns
+    cols_sum : list of str
+        columns to be summed
+    col_weight : str
+        weight column for the averages
+
+    Returns
+    -------
+    pandas.DataFrame
+        aggregated table with the original column order
+
+    '''
+
+    cols_sum = [c for c in cols_sum if c in df.columns and not c in idx]
+    cols_mean = [c for c in df.select_dtypes(float).columns
+                 if not c in idx and not c in cols_sum
+                 and not c.endswith('_id')]
+    cols_first = [c for c in df.columns
+                  if not c in idx + cols_sum + cols_mean]
+
+    df = df.copy()
+
+    if col_weight is not None and col_weight in df.columns:
+        wgt = df[col_weight].fillna(0)
+        wgt_sum = wgt.groupby([df[c] for c in idx]).transform('sum')
+        cnt = wgt.groupby([df[c] for c in idx]).transform('size')
+        # equal weights for groups with zero total weight
+        wgt = wgt.where(wgt_sum > 0, 1).div(wgt_sum.where(wgt_sum > 0, cnt))
+    else:
+        wgt = 1 / df.groupby(idx)[idx[0]].transform('size')
+
+    df[cols_mean] = df[cols_mean].mul(wgt, axis=0)
+
+    dfgp = df.groupby(idx, sort=False)
+    list_df = [dfgp[cols_sum].sum(min_count=1),
+               dfgp[cols_mean].sum(min_count=1),
+               dfgp[cols_first].first()]
+
+    df_aggr = pd.concat([df_ for df_ in list_df if len(df_.columns)],
+                        axis=1).reset_index()
+
+    return df_aggr[[c for c in df.columns if c in df_aggr.columns]]
+
+
+def _map_col(df, col, dct):
+
+    df[col] = df[col].replace(dct)
+
+    return df
+
+
+def get_zone_map(m, nd_aggr):
+    '''
+    Returns the node map table for the aggregation specification.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with input tables
+    nd_aggr : dict
+        ``{node name: zone name}``; the zone names must be node names
+        (the lead nodes); nodes not included are kept as single zones
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``nd_id, nd, zone_nd_id, zone``
+
+    Raises
+    ------
+    ValueError
+        If a zone name is not a node name of the model.
+
+    '''
+
+    dict_nd_id = m.df_def_node.set_index('nd').nd_id.to_dict()
+
+    list_invalid = [zone for zone in set(nd_aggr.values())
+                    if not zone in dict_nd_id]
+    if list_invalid:
+        raise ValueError('aggregate_nodes: Zone names %s are not node names. '
+                         'Each zone must be named after one of its '
+                         'nodes.'%list_invalid)
+
+    df_nd_aggr = m.df_def_node[['nd_id', 'nd']].copy()
+    df_nd_aggr['zone'] = df_nd_aggr.nd.map(nd_aggr).fillna(df_nd_aggr.nd)
+    df_nd_aggr['zone_nd_id'] = df_nd_aggr.zone.map(dict_nd_id)
+
+    return df_nd_aggr[['nd_id', 'nd', 'zone_nd_id', 'zone']]
+
+
+def aggregate_nodes(m, nd_aggr):
+    '''
+    Merges nodes into zones.
+
+    * Demand: Profiles and yearly sums of the member nodes are summed;
+      grid losses are demand-weighted averages.
+    * CHP profiles: averages weighted by the nodes' CHP energy.
+    * Fuel availability: summed; other fuel/node parameters are averages.
+    * Transmission: connections within zones are dropped, capacities
+      between zones are summed.
+    * Plants are assigned to their zone.
+
+    Node-specific parameters (e.g. |CO2| prices) are taken from the lead
+    node.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with input tables; modified in place
+    nd_aggr : dict
+        ``{node name: zone name}``, see :func:`get_zone_map`
+
+    Returns
+    -------
+    pandas.DataFrame
+        node map, also stored as attribute ``m.df_nd_aggr``
+
+    '''
+
+    df_nd_aggr = get_zone_map(m, nd_aggr)
+    dict_zone = df_nd_aggr.set_index('nd_id').zone_nd_id.to_dict()
+    dict_zone_name = df_nd_aggr.set_index('nd').zone.to_dict()
+
+    # sort key: lead nodes first
+    is_member = lambda df, col='nd_id': (df[col].map(dict_zone) != df[col])
+
+    # demand profiles: merged into the profile of the lead node
+    df_ne = m.df_node_encar.assign(zone=m.df_node_encar.nd_id.map(dict_zone))
+    df_ne = df_ne.assign(member=is_member(df_ne)).sort_values('member')
+    dict_zone_pf = df_ne.groupby(['zone', 'ca_id']).dmnd_pf_id.first()
+    dict_pf_zone = {pf_id: dict_zone_pf[(zone, ca)] for pf_id, zone, ca
+                    in zip(df_ne.dmnd_pf_id, df_ne.zone, df_ne.ca_id)}
+
+    if getattr(m, 'df_profdmnd', None) is not None:
+        df = _map_col(m.df_profdmnd.copy(), 'dmnd_pf_id', dict_pf_zone)
+        m.df_profdmnd = (df.groupby(['dmnd_pf_id', 'hy'], as_index=False)
+                           .value.sum())
+
+    # node_encar: demand-weighted grid losses
+    col_dmnd = 'dmnd_sum' if 'dmnd_sum' in df_ne.columns else None
+    df_ne = _map_col(df_ne.drop(['zone', 'member'], axis=1), 'nd_id',
+                     dict_zone)
+    m.df_node_encar = _aggregate(df_ne, ['nd_id', 'ca_id'],
+                                 cols_sum=_get_cols(df_ne, ['dmnd_sum',
+                                                    'grid_losses_absolute']),
+                                 col_weight=col_dmnd)
+
+    # chp profiles weighted by chp energy
+    if getattr(m, 'df_profchp', None) is not None:
+        df_erg_chp = m.df_plant_encar[['pp_id', 'ca_id']].assign(
+                erg_chp=m.df_plant_encar.get('erg_chp', 0))
+        df_erg_chp['nd_id'] = df_erg_chp.pp_id.map(
+                m.df_def_plant.set_index('pp_id').nd_id)
+        df_erg_chp = (df_erg_chp.groupby(['nd_id', 'ca_id']).erg_chp.sum()
+                                .rename('weight').reset_index())
+        df = m.df_profchp.merge(df_erg_chp, on=['nd_id', 'ca_id'],
+                                how='left').fillna({'weight': 0})
+        df = _map_col(df, 'nd_id', dict_zone)
+        m.df_profchp = _aggregate(df, ['nd_id', 'ca_id', 'hy'],
+                                  col_weight='weight').drop('weight', axis=1)
+
+    # fuels
+    for tb in ['df_fuel_node_encar', 'df_fuel_node_encar_scenarios']:
+        df = getattr(m, tb, None)
+        if df is None:
+            continue
+        df = df.assign(member=is_member(df)).sort_values('member')
+        df = _map_col(df.drop('member', axis=1), 'nd_id', dict_zone)
+        idx = [c for c in ['fl_id', 'nd_id', 'ca_id', 'scenario']
+               if c in df.columns]
+        setattr(m, tb, _aggregate(df, idx,
+                                  cols_sum=_get_cols(df, ['erg_inp'])))
+
+    # transmission
+    for tb, idx in [('df_node_connect', ['nd_id', 'nd_2_id', 'ca_id', 'mt_id']),
+                    ('df_imex_comp', ['nd_id', 'nd_2_id'])]:
+        df = getattr(m, tb, None)
+        if df is None:
+            continue
+        df = _map_col(_map_col(df.copy(), 'nd_id', dict_zone),
+                      'nd_2_id', dict_zone)
+        df = df.loc[df.nd_id != df.nd_2_id]
+        idx = [c for c in idx if c in df.columns]
+        cols_sum = [c for c in df.select_dtypes(float).columns
+                    if not c in idx]
+        setattr(m, tb, _aggregate(df, idx, cols_sum=cols_sum))
+
+    # node-indexed monthly factors of the lead nodes
+    if getattr(m, 'df_parameter_month', None) is not None:
+        df = m.df_parameter_month
+        mask_nd = df.set_1_name == 'nd_id'
+        m.df_parameter_month = df.loc[~mask_nd | df.set_1_id.isin(
+                                        df_nd_aggr.zone_nd_id)]
+
+    m.df_def_plant = _map_col(m.df_def_plant.copy(), 'nd_id', dict_zone)
+    m.df_def_node = m.df_def_node.loc[m.df_def_node.nd_id.isin(
+                                        df_nd_aggr.zone_nd_id)]
+
+    if 'primary_nd' in getattr(m, 'df_def_profile', pd.DataFrame()).columns:
+        m.df_def_profile = m.df_def_profile.loc[
+                m.df_def_profile.pf_id.isin(set(dict_pf_zone.values())) |
+                ~m.df_def_profile.pf_id.isin(dict_pf_zone.keys())]
+        m.df_def_profile = _map_col(m.df_def_profile.copy(), 'primary_nd',
+                                    dict_zone_name)
+
+    m.slct_node_id = m.df_def_node.nd_id.tolist()
+    m.df_nd_aggr = df_nd_aggr
+
+    logger.info('aggregate_nodes: %d nodes merged into %d zones'
+                %(len(df_nd_aggr), df_nd_aggr.zone_nd_id.nunique()))
+
+    return df_nd_aggr
+
+
+def _get_cluster_key_cols(m):
+
+    cols_set = [c for c in m.df_def_plant.columns if c.startswith('set_def_')]
+
+    return ['nd_id', 'pt_id', 'fl_id'] + cols_set
+
+
+def get_plant_clusters(m, nbins):
+    '''
+    Assigns the plants to clusters.
+
+    Plants are clustered if they share node, plant type, fuel, all
+    ``set_def_*`` flags, and supply profiles for all energy carriers.
+    Within these groups, the efficiency range is split into ``nbins``
+    equal-width bins. Plants occurring in :data:`PP_SPECIFIC_TABLES` are
+    never clustered.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with input tables
+    nbins : int
+        number of efficiency bins per group
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``pp_id, pp_cluster_id, cap_share``; the cluster id is the
+        smallest ``pp_id`` of the cluster; the capacity share is used to
+        disaggregate the cluster results
+
+    '''
+
+    df_pe = m.df_plant_encar
+    df_pp = m.df_def_plant[['pp_id'] + _get_cluster_key_cols(m)].copy()
+
+    set_pp_excl = set()
+    for tb in PP_SPECIFIC_TABLES:
+        df = getattr(m, tb, None)
+        if df is not None and 'pp_id' in df.columns:
+            set_pp_excl |= set(df.pp_id)
+
+    # supply profiles and efficiency over all energy carriers
+    df_pp['supply'] = df_pp.pp_id.map(
+        df_pe.assign(supply_pf_id=df_pe.get('supply_pf_id', np.nan))
+             .sort_values(['pp_id', 'ca_id'])
+             .groupby('pp_id')
+             .apply(lambda x: tuple(zip(x.ca_id, x.supply_pf_id.fillna(-1))))
+        ).astype(str)
+    df_pp['eff'] = df_pp.pp_id.map(df_pe.groupby('pp_id').pp_eff.mean()
+                                   if 'pp_eff' in df_pe.columns else {})
+    df_pp['cap'] = df_pp.pp_id.map(
+            df_pe.groupby('pp_id').cap_pwr_leg.sum()
+            if 'cap_pwr_leg' in df_pe.columns else {}).fillna(0)
+    df_pp['excl'] = df_pp.pp_id.isin(set_pp_excl)
+
+    cols_key = _get_cluster_key_cols(m) + ['supply']
+    df_pp[cols_key] = df_pp[cols_key].fillna(-1)
+
+    def get_bins(eff):
+        if len(eff) == 1 or eff.isna().all() or eff.max() == eff.min():
+            return pd.Series(0, index=eff.index)
+        return pd.Series(pd.cut(eff, nbins, labels=False), index=eff.index)
+
+    df_pp['ibin'] = (df_pp.groupby(cols_key).eff
+                          .transform(get_bins).fillna(0))
+    df_pp.loc[df_pp.excl, 'ibin'] = -1 - df_pp.loc[df_pp.excl, 'pp_id']
+
+    cols_cl = cols_key + ['ibin']
+    df_pp['pp_cluster_id'] = (df_pp.groupby(cols_cl).pp_id
+                                   .transform('min'))
+
+    cap_cl = df_pp.groupby('pp_cluster_id').cap.transform('sum')
+    size_cl = df_pp.groupby('pp_cluster_id').cap.transform('size')
+    df_pp['cap_share'] = (df_pp.cap / cap_cl).where(cap_cl > 0, 1 / size_cl)
+
+    return df_pp[['pp_id', 'pp_cluster_id', 'cap_share']]
+
+
+def cluster_plants(m, nbins=3):
+    '''
+    Merges plants into capacity-weighted blocks.
+
+    The clusters are defined by :func:`get_plant_clusters`. Capacities,
+    CHP energy, and maximum energy are summed; efficiencies and other
+    plant parameters are capacity-weighted averages.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with input tables; modified in place
+    nbins : int
+        number of efficiency bins
+
+    Returns
+    -------
+    pandas.DataFrame
+        plant map, also stored as attribute ``m.df_pp_cluster``
+
+    '''
+
+    df_pp_cluster = get_plant_clusters(m, nbins)
+    dict_cl = df_pp_cluster.set_index('pp_id').pp_cluster_id.to_dict()
+
+    df = m.df_plant_encar.copy()
+    df['cap_weight'] = df.get('cap_pwr_leg', pd.Series(0, df.index))
+    df = df.assign(member=df.pp_id.map(dict_cl) != df.pp_id
+                   ).sort_values(['member', 'pp_id']).drop('member', axis=1)
+    df = _map_col(df, 'pp_id', dict_cl)
+    m.df_plant_encar = _aggregate(df, ['pp_id', 'ca_id'],
+                                  cols_sum=_get_cols(df, PP_SUM_COLS),
+                                  col_weight='cap_weight'
+                                  ).drop('cap_weight', axis=1)
+
+    if getattr(m, 'df_plant_encar_scenarios', None) is not None:
+        df = _map_col(m.df_plant_encar_scenarios.copy(), 'pp_id', dict_cl)
+        m.df_plant_encar_scenarios = _aggregate(
+                df, ['pp_id', 'ca_id', 'scenario'],
+                cols_sum=_get_cols(df, PP_SUM_COLS))
+
+    if getattr(m, 'df_parameter_month', None) is not None:
+        df = m.df_parameter_month
+        mask_pp = df.set_1_name == 'pp_id'
+        m.df_parameter_month = df.loc[~mask_pp | df.set_1_id.isin(
+                                        df_pp_cluster.pp_cluster_id)]
+
+    m.df_def_plant = m.df_def_plant.loc[m.df_def_plant.pp_id.isin(
+                                        df_pp_cluster.pp_cluster_id)]
+    m.df_pp_cluster = df_pp_cluster
+
+    logger.info('cluster_plants: %d plants merged into %d clusters'
+                %(len(df_pp_cluster), df_pp_cluster.pp_cluster_id.nunique()))
+
+    return df_pp_cluster
+
+
+def disaggregate_plants(df, df_pp_cluster, cols_value=('value',)):
+    '''
+    Distributes plant results among the original plants.
+
+    The values of each cluster are split by the capacity shares of the
+    member plants.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        results table with a ``pp_id`` column (cluster ids)
+    df_pp_cluster : pandas.DataFrame
+        plant map, see :func:`get_plant_clusters`
+    cols_value : list of str
+        value columns to be split
+
+    Returns
+    -------
+    pandas.DataFrame
+        results table with the original ``pp_id``
+
+    '''
+
+    df = df.rename(columns={'pp_id': 'pp_cluster_id'})
+    df = df.merge(df_pp_cluster, on='pp_cluster_id', how='left')
+
+    for col in cols_value:
+        df[col] = df[col] * df.cap_share
+
+    return df.drop(['pp_cluster_id', 'cap_share'], axis=1)
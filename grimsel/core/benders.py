@@ -0,0 +1,657 @@
+'''
+Benders decomposition
+======================
+
+Decomposition of a capacity expansion model into an investment master
+problem and independent dispatch subproblems, one for each period (e.g.
+month) of the time map. The subproblems are solved in parallel.
+
+The Pyomo model is built once (:func:`ModelLoop.build_model`); master and
+subproblems are different states of the same model instance, set by
+activating/deactivating constraints and fixing/releasing variables (see
+:class:`grimsel.core.rolling_horizon.TimeSlotModel`).
+
+Complicating variables
+----------------------
+
+* The capacity variables :data:`grimsel.core.rolling_horizon.INVESTMENT_VARS`.
+  The tree doesn't have transmission capacity investment variables.
+* The storage and reservoir levels ``erg_st`` at the last time slot
+  of each period; these link consecutive periods through the
+  ``erg_store_level`` constraints.
+
+Each subproblem ties the complicating variables it uses to the master
+values through the elastic constraints ``benders_fix``. The penalized
+slack variables keep the subproblems feasible for any master solution
+(so only optimality cuts are required). The dual values of these
+constraints are the cut coefficients:
+
+.. math::
+    \\theta_k \\ge c_k(\\hat{x}) + \\sum_j \\lambda_{k,j} (x_j - \\hat{x}_j)
+
+Master problem
+--------------
+
+* All time-indexed variables are fixed at zero, except for the
+  period-boundary energy levels. These are bounded through the
+  constraints :data:`MASTER_CONS` of their time slots.
+* The original objective then reduces to the fixed costs. The
+  subproblem costs are added as variables ``benders_theta`` (one for each
+  period) with lower bound ``theta_lb``.
+
+Subproblems
+-----------
+
+* Objective: original objective without fixed costs
+  (:data:`FIXED_COST_VARS`) plus penalty on the elastic slacks.
+* Yearly limits :data:`YEARLY_LIMITS` can't be split among periods and
+  are deactivated. Monthly limits :data:`MONTHLY_LIMITS` are active for the
+  months of the period.
+* The constraints :data:`BOUNDARY_RELAX` (ramping) are released at the
+  first time slot of each period.
+
+The decomposed solution equals the monolithic solution within the
+convergence tolerance if none of the limits :data:`YEARLY_LIMITS` is binding
+and ramping costs at the period boundaries are negligible.
+
+Convergence statistics are written to the table ``def_benders`` next to
+``def_run``.
+
+Usage::
+
+    ml.build_model()
+    bd = BendersDecomposition(ml, period='mt_id', nproc=4)
+    for irow in range(len(ml.df_def_run)):
+        ml.select_run(irow)
+        bd.perform_model_run()
+
+.. note::
+   With ``nproc > 1`` the subproblems are solved in forked worker
+   processes (:func:`grimsel.auxiliary.multiproc.map_parallel`), which
+   inherit the current model state. The
+   :class:`BendersDecomposition` must therefore run in the main process,
+   not inside the workers of :func:`grimsel.auxiliary.multiproc.run_parallel`.
+
+'''
+
+import time
+import itertools
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+
+from grimsel.auxiliary.multiproc import map_parallel
+from grimsel.core.rolling_horizon import (TimeSlotModel, INVESTMENT_VARS,
+                                          LINK_VARS, _is_time_set)
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# fixed cost variables and their defining constraints; master problem only
+FIXED_COST_VARS = {'fc_om_pp_yr': 'calc_fc_om',
+                   'fc_cp_pp_yr': 'calc_fc_cp'}
+
+# variables depending on the capacities only; values from the master problem
+CAPACITY_VARS = (INVESTMENT_VARS + ['cap_pwr_tot', 'cap_erg_tot']
+                 + list(FIXED_COST_VARS))
+
+# time-indexed constraints bounding the period-boundary energy levels in
+# the master problem
+MASTER_CONS = ['st_erg_capac', 'hy_reservoir_boundary_conditions',
+               'hy_erg_min']
+
+# yearly limits; deactivated in the subproblems
+YEARLY_LIMITS = ['pp_max_fuel']
+
+# limits indexed by month; only active for the months of the subproblem
+MONTHLY_LIMITS = ['hy_month_min']
+
+# constraints released at the first time slot of each period
+BOUNDARY_RELAX = ['calc_ramp_rate']
+
+# instance inherited by the forked worker processes
+_instance = None
+
+
+def _solve_subproblem(args):
+
+    return _instance.solve_subproblem(*args)
+
+
+class BendersDecomposition(TimeSlotModel):
+    '''
+    Benders decomposition solve of a fully built model.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with completely built model (``ml.build_model()``);
+        all nodes must share the same time map
+    period : str
+        column of the ``df_tm_soy`` table defining the subproblems,
+        e.g. ``'mt_id'`` or ``'wk_id'``
+    nproc : int
+        number of processes for the subproblems
+    tol : float
+        convergence tolerance of the relative gap between upper and lower
+        bound
+    max_iter : int
+        maximum number of iterations
+    penalty : float
+        cost of the elastic slack variables in the subproblems
+    theta_lb : float
+        lower bound of the subproblem costs
+
+    Raises
+    ------
+    ValueError
+        If the model has multiple time maps or ``period`` is not a column
+        of ``df_tm_soy``.
+
+    '''
+
+    def __init__(self, ml, period='mt_id', nproc=1, tol=1e-4, max_iter=50,
+                 penalty=1e6, theta_lb=0):
+
+        super().__init__(ml)
+
+        if not period in self.m.df_tm_soy.columns:
+            raise ValueError('BendersDecomposition: period %s is not a '
+                             'column of df_tm_soy.'%period)
+
+        self.period = period
+        self.nproc = nproc
+        self.tol = tol
+        self.max_iter = max_iter
+        self.penalty = penalty
+        self.theta_lb = theta_lb
+
+        self._init_periods()
+        self._init_complicating_vars()
+
+        # yearly variables summed over the subproblems
+        self.list_var_yr = [
+            comp for comp in self.m.component_objects(po.Var,
+                                                      descend_into=False)
+            if not comp.name in CAPACITY_VARS
+            and not (comp.is_indexed() and _is_time_set(comp.index_set()))]
+
+        self.df_iter = pd.DataFrame()
+
+    def _init_periods(self):
+        '''
+        Generates the time slots, boundary time slots, and months of each
+        period.
+
+        * ``dict_period_sy``: time slots of each period
+        * ``dict_period_first``: time slots whose predecessor belongs to
+          a different period
+        * ``dict_period_prev``: predecessors of the ``dict_period_first``
+          time slots
+        * ``dict_period_mt``: months of each period
+
+        '''
+
+        df_tm = self.m.df_tm_soy.loc[self.m.df_tm_soy.sy.isin(self.list_sy)]
+
+        dict_sy_period = df_tm.set_index('sy')[self.period].to_dict()
+
+        self.dict_period_sy = (df_tm.groupby(self.period).sy
+                                    .apply(sorted).to_dict())
+        self.list_period = sorted(self.dict_period_sy)
+
+        self.dict_period_first = {}
+        self.dict_period_prev = {}
+        for per, list_sy in self.dict_period_sy.items():
+            list_prev = [(sy, self.m.get_last_soy(self.tm_id, sy))
+                         for sy in list_sy]
+            list_prev = [(sy, prev) for sy, prev in list_prev
+                         if dict_sy_period[prev] != per]
+            self.dict_period_first[per] = [sy for sy, _ in list_prev]
+            self.dict_period_prev[per] = sorted(set(prev for _, prev
+                                                    in list_prev))
+
+        self.list_sy_bound = sorted(set(itertools.chain.from_iterable(
+                                        self.dict_period_prev.values())))
+
+        self.dict_period_mt = (df_tm.groupby(self.period).mt_id
+                                    .apply(lambda x: set(x.unique()))
+                                    .to_dict())
+
+    def _init_complicating_vars(self):
+        '''
+        Collects the complicating variable data and their relevance for
+        the subproblems.
+
+        Generates the list ``list_cpl`` of ``(vardata, sy)`` tuples
+        (``sy`` is None for the capacity variables) and the dictionary
+        ``dict_period_cpl`` with the relevant list indices for each period.
+
+        '''
+
+        set_sy_bound = set(self.list_sy_bound)
+
+        self.list_cpl = [(vardata, None) for name in INVESTMENT_VARS
+                         if hasattr(self.m, name)
+                         for vardata in getattr(self.m, name).values()]
+        self.list_cpl += [(vardata, key[0]) for name in LINK_VARS
+                          if hasattr(self.m, name)
+                          for key, vardata in getattr(self.m, name).items()
+                          if key[0] in set_sy_bound]
+
+        self.dict_period_cpl = {}
+        for per in self.list_period:
+            set_sy = (set(self.dict_period_sy[per])
+                      | set(self.dict_period_prev[per]))
+            self.dict_period_cpl[per] = [j for j, (_, sy)
+                                         in enumerate(self.list_cpl)
+                                         if sy is None or sy in set_sy]
+
+    def _get_objective(self):
+
+        for name_obj in ['objective_lin', 'objective_quad', 'objective']:
+            obj = getattr(self.m, name_obj, None)
+            if obj is not None and obj.active:
+                return obj
+
+        raise ValueError('BendersDecomposition: No active objective.')
+
+    def _add_components(self):
+        '''
+        Adds the elastic fixing constraints, the subproblem cost variables,
+        the cuts, and the master/subproblem objectives to the model.
+
+        '''
+
+        m = self.m
+
+        self.obj = self._get_objective()
+
+        m.benders_cpl = po.Set(initialize=range(len(self.list_cpl)),
+                               ordered=True)
+        m.benders_x = po.Param(m.benders_cpl, initialize=0, mutable=True)
+        m.benders_slack_pos = po.Var(m.benders_cpl, bounds=(0, None))
+        m.benders_slack_neg = po.Var(m.benders_cpl, bounds=(0, None))
+
+        def benders_fix_rule(m, j):
+            return (self.list_cpl[j][0] == m.benders_x[j]
+                    + m.benders_slack_pos[j] - m.benders_slack_neg[j])
+        m.benders_fix = po.Constraint(m.benders_cpl, rule=benders_fix_rule)
+
+        m.benders_period = po.Set(initialize=self.list_period, ordered=True)
+        m.benders_theta = po.Var(m.benders_period,
+                                 bounds=(self.theta_lb, None))
+        m.benders_cuts = po.ConstraintList()
+
+        m.benders_obj_master = po.Objective(
+            expr=self.obj.expr + po.quicksum(m.benders_theta.values()),
+            sense=po.minimize)
+        m.benders_obj_sub = po.Objective(
+            expr=self.obj.expr + self.penalty
+                 * po.quicksum(list(m.benders_slack_pos.values())
+                               + list(m.benders_slack_neg.values())),
+            sense=po.minimize)
+
+    def _delete_components(self):
+
+        list_name = [comp.name for comp in self.m.component_objects()
+                     if comp.name.startswith('benders_')]
+        for name in list_name:
+            self.m.del_component(name)
+
+    def _iter_free_cons(self, names):
+
+        for name in names:
+            comp = getattr(self.m, name, None)
+            if comp is not None:
+                yield from comp.items()
+
+    def _set_common(self, master):
+        '''
+        Model state shared by master and subproblems.
+
+        All time-indexed variables are fixed at zero and all
+        time-indexed constraints are deactivated.
+
+        '''
+
+        m = self.m
+
+        self.obj.deactivate()
+        if master:
+            m.benders_obj_master.activate()
+            m.benders_obj_sub.deactivate()
+        else:
+            m.benders_obj_master.deactivate()
+            m.benders_obj_sub.activate()
+
+        self._set_slots(self.list_sy, fix='zero', activate=False)
+
+        for name in INVESTMENT_VARS:
+            if hasattr(m, name):
+                getattr(m, name).unfix()
+
+        for name_var, name_con in FIXED_COST_VARS.items():
+            for comp in [getattr(m, name_var, None), getattr(m, name_con,
+                                                             None)]:
+                if comp is None:
+                    continue
+                elif isinstance(comp, po.Var) and master:
+                    comp.unfix()
+                elif isinstance(comp, po.Var):
+                    comp.fix(0)
+                elif master:
+                    comp.activate()
+                else:
+                    comp.deactivate()
+
+    def _set_master(self):
+
+        m = self.m
+
+        self._set_common(master=True)
+
+        for vardata, sy in self.list_cpl:
+            vardata.unfix()
+
+        for sy in self.list_sy_bound:
+            for condata in self.dict_sy_con[sy]:
+                if condata.parent_component().name in MASTER_CONS:
+                    condata.activate()
+
+        for _, condata in self._iter_free_cons(YEARLY_LIMITS):
+            condata.activate()
+        for _, condata in self._iter_free_cons(MONTHLY_LIMITS):
+            condata.deactivate()
+
+        m.benders_fix.deactivate()
+        m.benders_theta.unfix()
+        m.benders_cuts.activate()
+
+    def _set_subproblem(self, per):
+
+        m = self.m
+
+        self._set_common(master=False)
+
+        self._set_slots(self.dict_period_sy[per], fix='free', activate=True)
+
+        for sy in self.dict_period_first[per]:
+            for condata in self.dict_sy_con[sy]:
+                if condata.parent_component().name in BOUNDARY_RELAX:
+                    condata.deactivate()
+
+        m.benders_fix.deactivate()
+        for j in self.dict_period_cpl[per]:
+            self.list_cpl[j][0].unfix()
+            m.benders_fix[j].activate()
+
+        for _, condata in self._iter_free_cons(YEARLY_LIMITS):
+            condata.deactivate()
+        for key, condata in self._iter_free_cons(MONTHLY_LIMITS):
+            (condata.activate() if key[0] in self.dict_period_mt[per]
+             else condata.deactivate())
+
+        m.benders_theta.fix(0)
+        m.benders_cuts.deactivate()
+
+    def _restore(self):
+
+        m = self.m
+
+        self._set_slots(self.list_sy, fix='free', activate=True)
+
+        for name in INVESTMENT_VARS + list(FIXED_COST_VARS):
+            if hasattr(m, name):
+                getattr(m, name).unfix()
+        for name in (list(FIXED_COST_VARS.values()) + YEARLY_LIMITS
+                     + MONTHLY_LIMITS):
+            if hasattr(m, name):
+                getattr(m, name).activate()
+
+        self._delete_components()
+        self.obj.activate()
+
+    def solve_subproblem(self, per, get_values=False):
+        '''
+        Solves the subproblem of a single period.
+
+        Parameters
+        ----------
+        per : int
+            period
+        get_values : bool
+            return the variable values of the period's time slots, the
+            values of the non-capacity yearly variables, and the dual
+            values of the period's time-indexed constraints
+
+        Returns
+        -------
+        dict
+            keys ``period``, ``cost``, ``dual`` (``{index of list_cpl:
+            dual value}``), ``info``, ``tdiff``, and optionally ``values``,
+            ``values_yr``, and ``duals_sy``
+
+        '''
+
+        t = time.time()
+
+        self._set_subproblem(per)
+        self.m.run()
+
+        res = {'period': per,
+               'cost': po.value(self.m.benders_obj_sub, exception=False),
+               'info': str(self.m.results.Solver[0]['Termination condition'])}
+
+        has_dual = hasattr(self.m, 'dual')
+        res['dual'] = {j: (self.m.dual.get(self.m.benders_fix[j], 0)
+                           if has_dual else 0)
+                       for j in self.dict_period_cpl[per]}
+
+        if get_values:
+            res['values'] = {
+                (vardata.parent_component().name, vardata.index()):
+                    vardata.value
+                for sy in self.dict_period_sy[per]
+                for vardata in self.dict_sy_var[sy]}
+            res['values_yr'] = {
+                (comp.name, key): vardata.value
+                for comp in self.list_var_yr
+                for key, vardata in comp.items()}
+            res['duals_sy'] = ({
+                (condata.parent_component().name, condata.index()):
+                    self.m.dual.get(condata)
+                for sy in self.dict_period_sy[per]
+                for condata in self.dict_sy_con[sy]
+                if condata.active} if has_dual else {})
+
+        res['tdiff'] = time.time() - t
+
+        return res
+
+    def _solve_subproblems(self, get_values=False):
+
+        global _instance
+        _instance = self
+
+        args = [(per, get_values) for per in self.list_period]
+
+        return map_parallel(_solve_subproblem, args, self.nproc)
+
+    def _add_cuts(self, list_res, x_hat):
+
+        m = self.m
+
+        for res in list_res:
+            m.benders_cuts.add(
+                m.benders_theta[res['period']]
+                >= res['cost'] + sum(lmbd * (self.list_cpl[j][0] - x_hat[j])
+                                     for j, lmbd in res['dual'].items()
+                                     if lmbd))
+
+    def _get_capacity_values(self):
+
+        return {(name, key): vardata.value for name in CAPACITY_VARS
+                if hasattr(self.m, name)
+                for key, vardata in getattr(self.m, name).items()}
+
+    def _stitch(self, list_res, dict_cap):
+        '''
+        Combines the subproblem solutions and the master capacities.
+
+        Time-indexed variables are taken from the subproblem of their
+        period, yearly aggregates are summed over all subproblems.
+
+        '''
+
+        m = self.m
+
+        dict_sum = {}
+        for res in list_res:
+            for (name, key), val in res['values'].items():
+                getattr(m, name)[key].value = val
+            for name_key, val in res['values_yr'].items():
+                dict_sum[name_key] = dict_sum.get(name_key, 0) + (val or 0)
+            if hasattr(m, 'dual'):
+                for (name, key), val in res['duals_sy'].items():
+                    if val is not None:
+                        m.dual[getattr(m, name)[key]] = val
+
+        for (name, key), val in itertools.chain(dict_sum.items(),
+                                                dict_cap.items()):
+            getattr(m, name)[key].value = val
+
+    def run(self):
+        '''
+        Iterates master and subproblems until convergence.
+
+        If no iteration yields an upper bound (e.g. ``max_iter`` 0 or
+        infeasible master problems), the model is restored without
+        solution values and the objective value is NaN.
+
+        Returns
+        -------
+        pandas.DataFrame
+            iteration statistics, also stored as attribute ``df_iter``
+
+        '''
+
+        m = self.m
+
+        self._add_components()
+
+        lb, ub = -np.inf, np.inf
+        x_best, dict_cap_best = None, None
+        gap = np.inf
+        list_iter = []
+
+        for it in range(self.max_iter):
+
+            t = time.time()
+            self._set_master()
+            m.run()
+            tdiff_master = time.time() - t
+            info_master = str(m.results.Solver[0]['Termination condition'])
+
+            lb = po.value(m.benders_obj_master, exception=False)
+            theta = sum(v.value or 0 for v in m.benders_theta.values())
+            fixed_cost = (lb - theta) if lb is not None else np.nan
+
+            x_hat = [vardata.value or 0 for vardata, _ in self.list_cpl]
+            dict_cap = self._get_capacity_values()
+            for j, val in enumerate(x_hat):
+                m.benders_x[j] = val
+
+            t = time.time()
+            list_res = self._solve_subproblems()
+            tdiff_sub = time.time() - t
+
+            ub_it = fixed_cost + sum(res['cost'] for res in list_res)
+            if ub_it < ub:
+                ub, x_best, dict_cap_best = ub_it, x_hat, dict_cap
+
+            gap = (ub - lb) / max(abs(ub), 1e-10)
+
+            list_iter.append({'iteration': it, 'lower_bound': lb,
+                              'upper_bound': ub, 'gap': gap,
+                              'tdiff_master': tdiff_master,
+                              'tdiff_sub': tdiff_sub,
+                              'info': info_master})
+            logger.info('Benders iteration %d: lower bound %s, '
+                        'upper bound %s, gap %s'%(it, lb, ub, gap))
+
+            if gap <= self.tol:
+                break
+
+            self._add_cuts(list_res, x_hat)
+
+        converged = gap <= self.tol
+
+        if x_best is None:
+            logger.error('Benders: no upper bound after %d iterations; '
+                         'no solution'%len(list_iter))
+            self._restore()
+            m.objective_value = np.nan
+        else:
+            if not converged:
+                logger.warning('Benders: not converged after %d '
+                               'iterations, gap %s'%(len(list_iter), gap))
+
+            # final subproblems at the best master solution
+            for j, val in enumerate(x_best):
+                m.benders_x[j] = val
+            list_res = self._solve_subproblems(get_values=True)
+
+            self._restore()
+            self._stitch(list_res, dict_cap_best)
+
+            m.objective_value = ub
+
+        self.df_iter = pd.DataFrame(list_iter,
+                                    columns=['iteration', 'lower_bound',
+                                             'upper_bound', 'gap',
+                                             'tdiff_master', 'tdiff_sub',
+                                             'info'])
+        self.df_iter['converged'] = converged
+
+        return self.df_iter
+
+    def perform_model_run(self):
+        '''
+        Benders equivalent of
+        :func:`grimsel.core.model_loop.ModelLoop.perform_model_run`.
+
+        Writes the stitched results of the current ``run_id`` to the output
+        tables and the ``def_run`` table, and the iteration statistics to
+        the ``def_benders`` table.
+
+        '''
+
+        ml = self.ml
+
+        t = time.time()
+        df_iter = self.run()
+        tdiff_solve = time.time() - t
+
+        gap = df_iter.gap.iloc[-1] if len(df_iter) else np.inf
+        stat = ('Benders (%d iterations, gap %.2e): %s'
+                %(len(df_iter), gap,
+                  'converged' if len(df_iter) and df_iter.converged.iloc[-1]
+                  else 'not converged'))
+
+        if ml.io.replace_runs_if_exist and ml.io.resume_loop:
+            ml.io.delete_run_id(ml.run_id, operator='=')
+
+        t = time.time()
+        ml.io.write_run(run_id=ml.run_id)
+        tdiff_write = time.time() - t
+
+        ml.append_row(info=stat, tdiff_solve=tdiff_solve,
+                      tdiff_write=tdiff_write)
+
+        ml.append_to_table('def_benders',
+                           df_iter.assign(run_id=ml.run_id,
+                                          converged=df_iter.converged
+                                                           .astype(int)))
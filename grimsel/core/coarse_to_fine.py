@@ -0,0 +1,530 @@
+'''
+Coarse-to-fine solve
+=====================
+
+Two-stage solve of a :class:`grimsel.core.model_loop.ModelLoop` model:
+
+1. The same model is solved at a coarse time resolution (e.g.
+   ``nhours=24``). This model is a separate
+   :class:`grimsel.core.model_loop.ModelLoop` instance, which is built once.
+   Before each coarse solve, the values of the non-time-indexed mutable
+   parameters and the fixed non-time-indexed variables are copied from
+   the fine model. This way, model loop modifications (e.g. fuel prices,
+   emission prices, legacy capacities) applied to the fine model also
+   apply to the coarse model.
+2. The capacity investment variables
+   :data:`grimsel.core.rolling_horizon.INVESTMENT_VARS` of the fine model
+   are fixed at the coarse solution values (``investment='fix'``) or
+   bounded to a relative margin around them (``investment='bound'``).
+3. Plants with zero total capacity ``cap_pwr_tot`` in the coarse solution
+   are removed from the fine model through
+   :func:`grimsel.core.sets.Sets.remove_plants`, i.e. the same mechanism as
+   the model's ``presolve``. Since their capacity investments are fixed at
+   zero, this doesn't change the fine solution. The fine model is rebuilt
+   only if the set of removed plants differs from the previous run.
+   The rebuild reuses the time-mapped input tables of the initial build;
+   no input data is read.
+4. The fine model is solved, optionally warm-started with the coarse
+   solution interpolated to the fine time slots.
+
+Run statistics (solve times, objective values, removed plants, and
+optionally the speedup relative to the unrestricted fine model) are
+written to the table ``def_coarse_to_fine`` next to ``def_run``.
+
+Usage::
+
+    ml.build_model()
+    ctf = CoarseToFine(ml, nhours_coarse=24)
+    for irow in range(len(ml.df_def_run)):
+        ml.select_run(irow)
+        # ... apply model loop modifications to ml.m ...
+        ctf.perform_model_run()
+
+.. note::
+   The rebuild of the fine model requires the input tables. It is
+   incompatible with the model attribute ``slim``. Parameter values,
+   fixed variables, and deactivated constraints of the fine model are
+   carried over to the rebuilt model; other modifications of the Pyomo
+   components are not.
+
+'''
+
+import time
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+
+from grimsel.core.rolling_horizon import (INVESTMENT_VARS, _is_time_set,
+                                           _has_time_index)
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+class CoarseToFine():
+    '''
+    Coarse-to-fine solve of a fully built model.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with completely built model (``ml.build_model()``)
+    ml_coarse : grimsel.core.model_loop.ModelLoop
+        model loop of the coarse model; if None, it is generated from the
+        ``ml`` arguments with ``nhours=nhours_coarse`` and without output
+    nhours_coarse : int or tuple
+        time resolution of the coarse model; see the
+        :class:`grimsel.core.model_base.ModelBase` ``nhours`` argument
+    investment : str, one of ``{'fix', 'bound'}``
+        fix the fine model's investment variables at the coarse values or
+        bound them to ``[(1 - bound_margin) * x, (1 + bound_margin) * x]``
+    bound_margin : float
+        relative margin for ``investment='bound'``
+    prune : bool
+        remove plants without capacity in the coarse solution from the
+        fine model
+    zero_tol : float
+        capacity threshold for the removal of plants
+    reference : bool
+        additionally solve the unrestricted fine model to report speedup
+        and objective deviation; this disables ``prune``
+
+    Raises
+    ------
+    ValueError
+        If ``investment`` is invalid or ``prune`` is combined with
+        a ``slim`` model.
+
+    '''
+
+    def __init__(self, ml, ml_coarse=None, nhours_coarse=24,
+                 investment='fix', bound_margin=0.1, prune=True,
+                 zero_tol=1e-6, reference=False):
+
+        if not investment in ['fix', 'bound']:
+            raise ValueError('CoarseToFine: Parameter investment must be one '
+                             'of [\'fix\', \'bound\']; got %s.'%investment)
+
+        self.ml = ml
+        self.m = ml.m
+        self.investment = investment
+        self.bound_margin = bound_margin
+        self.prune = prune and not reference
+        self.zero_tol = zero_tol
+        self.reference = reference
+
+        if self.prune and getattr(self.m, 'slim', False):
+            raise ValueError('CoarseToFine: Plant pruning requires the '
+                             'input tables; incompatible with slim=True.')
+
+        if ml_coarse is None:
+            ml_coarse = self._get_coarse_model_loop(nhours_coarse)
+        self.ml_coarse = ml_coarse
+        self.m_coarse = ml_coarse.m
+
+        # input tables of the initial build; basis of all rebuilds
+        self._dict_tables = {name: getattr(self.m, name)
+                             for name in (self.m.presolve_tables
+                                          + ['df_profsupply_soy'])
+                             if hasattr(self.m, name)}
+        self._dict_presolve = {
+                name: deepcopy(getattr(self.m, name, None))
+                for name in ['dict_presolve_rows', 'presolve_pp_id']}
+
+        self.list_pp_pruned = []
+        self.df_stats = pd.DataFrame()
+
+    def _get_coarse_model_loop(self, nhours_coarse):
+        '''
+        Generates and builds the coarse model loop from the ``ml`` arguments.
+
+        '''
+
+        from grimsel.core.model_loop import ModelLoop
+
+        mkwargs = dict(self.ml.mkwargs, nhours=nhours_coarse)
+        iokwargs = {key: val for key, val in self.ml.iokwargs.items()
+                    if not key == 'model'}
+        iokwargs.update(no_output=True, resume_loop=False,
+                        cl_out=str(iokwargs.get('cl_out', '')) + '_coarse')
+
+        ml_coarse = ModelLoop(nsteps=self.ml.nsteps, mkwargs=mkwargs,
+                              iokwargs=iokwargs)
+        ml_coarse.build_model()
+
+        return ml_coarse
+
+    @staticmethod
+    def _get_state(m, time_indexed=True):
+        '''
+        Collects mutable parameter values, fixed variables, and deactivated
+        constraints.
+
+        Parameters
+        ----------
+        m : grimsel.core.model_base.ModelBase
+            model instance
+        time_indexed : bool
+            include components indexed by the time slot in any position
+            (e.g. the time slot ``weight``)
+
+        Returns
+        -------
+        dict
+            ``{'par'|'var'|'con': {(name, key): value}}``
+
+        '''
+
+        def slct(comp):
+            return time_indexed or not (comp.is_indexed()
+                                        and _has_time_index(comp.index_set()))
+
+        state = {'par': {}, 'var': {}, 'con': {}}
+
+        for comp in m.component_objects(po.Param, descend_into=False):
+            if getattr(comp, '_mutable', False) and slct(comp):
+                state['par'].update({(comp.name, key): po.value(val)
+                                     for key, val in comp.items()})
+
+        for comp in m.component_objects(po.Var, descend_into=False):
+            if slct(comp):
+                state['var'].update({(comp.name, key): vardata.value
+                                     for key, vardata in comp.items()
+                                     if vardata.fixed})
+
+        for comp in m.component_objects(po.Constraint, descend_into=False):
+            if slct(comp):
+                state['con'].update({(comp.name, key): False
+                                     for key, condata in comp.items()
+                                     if not condata.active})
+
+        return state
+
+    @staticmethod
+    def _set_state(m, state, unfix=False):
+        '''
+        Applies the output of :func:`_get_state` to the model ``m``.
+
+        Components and indices missing in ``m`` are skipped.
+
+        Parameters
+        ----------
+        unfix : bool
+            release all non-time-indexed variables first
+
+        '''
+
+        def iter_comp(dct):
+            for (name, key), val in dct.items():
+                comp = getattr(m, name, None)
+                if comp is not None and key in comp:
+                    yield comp[key], val
+
+        for pardata, val in iter_comp(state['par']):
+            pardata.value = val
+
+        if unfix:
+            for comp in m.component_objects(po.Var, descend_into=False):
+                if not (comp.is_indexed()
+                        and _has_time_index(comp.index_set())):
+                    comp.unfix()
+
+        for vardata, val in iter_comp(state['var']):
+            vardata.fix(val)
+
+        for condata, _ in iter_comp(state['con']):
+            condata.deactivate()
+
+    def _get_pruned_plants(self):
+        '''
+        Returns the sorted list of candidate plants without capacity in the
+        coarse solution.
+
+        Candidates are the plants of the initial fine model which can be
+        removed through :func:`grimsel.core.sets.Sets.remove_plants`.
+
+        '''
+
+        cap = getattr(self.m_coarse, 'cap_pwr_tot', None)
+        if cap is None:
+            return []
+
+        srs = pd.Series({key: abs(vardata.value or 0)
+                         for key, vardata in cap.items()}, dtype=float)
+        srs = srs.groupby(level=0).sum()
+
+        pp_cap = set(srs.index[srs > self.zero_tol])
+        pp_cand = (set(self.m._get_prune_candidates())
+                   | set(self.list_pp_pruned))
+
+        return sorted(pp_cand - pp_cap)
+
+    def rebuild(self, list_pp_prune):
+        '''
+        Rebuilds the fine model without the plants ``list_pp_prune``.
+
+        Starts from the input tables of the initial build, i.e. previously
+        removed plants are restored. The current model state
+        (see :func:`_get_state`) is carried over.
+
+        Parameters
+        ----------
+        list_pp_prune : list
+            pp_ids of the plants to be removed
+
+        '''
+
+        m = self.m
+        state = self._get_state(m)
+
+        for comp in list(m.component_objects((po.Constraint, po.Objective,
+                                              po.Var, po.Set, po.Param),
+                                             descend_into=False)):
+            m.del_component(comp)
+
+        for name, df in self._dict_tables.items():
+            setattr(m, name, df)
+        for name, val in self._dict_presolve.items():
+            setattr(m, name, deepcopy(val))
+
+        m.get_setlst()
+        m.define_sets()
+        m.add_parameters()
+        self._set_state(m, {'par': state['par'], 'var': {}, 'con': {}})
+
+        if list_pp_prune:
+            # presolve rows of the removed plants use the current parameters
+            m.remove_plants(list_pp_prune)
+            self._set_state(m, {'par': state['par'], 'var': {}, 'con': {}})
+
+        m.define_variables()
+        m.add_all_constraints()
+        self._set_state(m, state)
+
+        if hasattr(m, 'dual'):
+            m.dual.clear()
+
+        self.ml.io.modwr.init_compio_objs()
+        self.list_pp_pruned = list_pp_prune
+
+    def _restrict_investment(self):
+        '''
+        Fixes or bounds the fine model's investment variables based on the
+        coarse solution.
+
+        Returns
+        -------
+        list
+            ``(vardata, lb, ub, fixed)`` original bounds and fixed status
+            for :func:`_release_investment`
+
+        '''
+
+        list_orig = []
+
+        for name in INVESTMENT_VARS:
+            var = getattr(self.m, name, None)
+            var_coarse = getattr(self.m_coarse, name, None)
+            if var is None:
+                continue
+
+            for key, vardata in var.items():
+                list_orig.append((vardata, vardata.lb, vardata.ub,
+                                  vardata.fixed))
+                if vardata.fixed:
+                    continue
+
+                val = (var_coarse[key].value if var_coarse is not None
+                       and key in var_coarse else None)
+                val = val if val is not None else 0
+
+                if self.investment == 'fix':
+                    vardata.fix(val)
+                else:
+                    vardata.setlb(max(0, val * (1 - self.bound_margin)))
+                    vardata.setub(val * (1 + self.bound_margin))
+
+        return list_orig
+
+    @staticmethod
+    def _release_investment(list_orig):
+
+        for vardata, lb, ub, fixed in list_orig:
+            vardata.setlb(lb)
+            vardata.setub(ub)
+            if not fixed:
+                vardata.unfix()
+
+    def _get_sy_map(self):
+        '''
+        Returns the map fine time slot |rarr| coarse time slot.
+
+        Each fine time slot is mapped to the coarse time slot of its first
+        hour. Returns None if any of the models has multiple time maps.
+
+        '''
+
+        df_fine, df_coarse = self.m.df_hoy_soy, self.m_coarse.df_hoy_soy
+
+        if df_fine.tm_id.nunique() > 1 or df_coarse.tm_id.nunique() > 1:
+            return None
+
+        dict_hy_coarse = df_coarse.set_index('hy').sy.to_dict()
+
+        return (df_fine.groupby('sy').hy.min()
+                       .map(dict_hy_coarse).dropna().to_dict())
+
+    def set_warmstart_values(self):
+        '''
+        Sets the free fine model variables to the coarse solution values.
+
+        Time-indexed values are interpolated piecewise constant, i.e. each
+        fine time slot gets the value of the coarse time slot containing it.
+        This requires uniform time maps; otherwise only non-time-indexed
+        variables are initialized.
+
+        '''
+
+        dict_sy = self._get_sy_map()
+
+        if dict_sy is None:
+            logger.warning('CoarseToFine: Multiple time maps. Warm start '
+                           'values only for non-time-indexed variables.')
+
+        for var in self.m.component_objects(po.Var, descend_into=False):
+
+            var_coarse = getattr(self.m_coarse, var.name, None)
+            if var_coarse is None:
+                continue
+
+            is_time = var.is_indexed() and _is_time_set(var.index_set())
+            if is_time and dict_sy is None:
+                continue
+
+            for key, vardata in var.items():
+                if vardata.fixed:
+                    continue
+
+                key_coarse = key
+                if is_time:
+                    key_coarse = (dict_sy.get(key[0]),) + key[1:]
+
+                if key_coarse in var_coarse:
+                    vardata.set_value(var_coarse[key_coarse].value)
+
+    def _solve(self, m, warmstart=False):
+
+        t = time.time()
+        with m.temp_files() as (tmp_dir, logf, warmf, solnf):
+            m.run(warmstart=warmstart, tmp_dir=tmp_dir,
+                  logf=logf, warmf=warmf, solnf=solnf)
+
+        return (time.time() - t,
+                str(m.results.Solver[0]['Termination condition']),
+                getattr(m, 'objective_value', np.nan))
+
+    def run(self, warmstart=False):
+        '''
+        Coarse solve, fine model restriction, and fine solve.
+
+        The investment variables are released after the fine solve; the
+        removed plants remain removed until the next run.
+
+        Parameters
+        ----------
+        warmstart : bool
+            warm-start the fine solve with the interpolated coarse
+            solution (see :func:`set_warmstart_values`)
+
+        Returns
+        -------
+        dict
+            run statistics
+
+        '''
+
+        stats = {'run_id': self.ml.run_id}
+
+        # apply model loop modifications to the coarse model
+        self.ml_coarse.select_run(self.ml.run_id)
+        self._set_state(self.m_coarse,
+                        self._get_state(self.m, time_indexed=False),
+                        unfix=True)
+
+        (stats['tdiff_coarse'], stats['info_coarse'],
+         stats['objective_coarse']) = self._solve(self.m_coarse)
+
+        t = time.time()
+        if self.prune:
+            list_pp_prune = self._get_pruned_plants()
+            if not list_pp_prune == self.list_pp_pruned:
+                self.rebuild(list_pp_prune)
+        stats['tdiff_rebuild'] = time.time() - t
+        stats['npp_pruned'] = len(self.list_pp_pruned)
+
+        if self.reference:
+            (stats['tdiff_reference'], stats['info_reference'],
+             stats['objective_reference']) = self._solve(self.m)
+
+        list_orig = self._restrict_investment()
+        if warmstart:
+            self.set_warmstart_values()
+
+        (stats['tdiff_fine'], stats['info_fine'],
+         stats['objective_fine']) = self._solve(self.m, warmstart=warmstart)
+
+        self._release_investment(list_orig)
+
+        stats['tdiff_total'] = (stats['tdiff_coarse'] + stats['tdiff_rebuild']
+                                + stats['tdiff_fine'])
+        stats['objective_diff_coarse'] = (stats['objective_fine']
+                                          / stats['objective_coarse'] - 1)
+        if self.reference:
+            stats['speedup'] = (stats['tdiff_reference']
+                                / stats['tdiff_total'])
+            stats['objective_diff_reference'] = (
+                    stats['objective_fine']
+                    / stats['objective_reference'] - 1)
+
+        logger.info('CoarseToFine: run_id %s; %s'%(self.ml.run_id, stats))
+
+        self.df_stats = pd.concat([self.df_stats, pd.DataFrame([stats])],
+                                  ignore_index=True, sort=False)
+
+        return stats
+
+    def perform_model_run(self, warmstart=False):
+        '''
+        Coarse-to-fine equivalent of
+        :func:`grimsel.core.model_loop.ModelLoop.perform_model_run`.
+
+        Writes the fine solution of the current ``run_id`` to the output
+        tables, the ``def_run`` table, and the run statistics to the
+        ``def_coarse_to_fine`` table.
+
+        '''
+
+        ml = self.ml
+
+        t = time.time()
+        stats = self.run(warmstart=warmstart)
+        tdiff_solve = time.time() - t
+
+        stat = 'Coarse-to-fine: Solver: ' + stats['info_fine']
+
+        if ml.io.replace_runs_if_exist and ml.io.resume_loop:
+            ml.io.delete_run_id(ml.run_id, operator='=')
+
+        t = time.time()
+        ml.io.write_run(run_id=ml.run_id)
+        tdiff_write = time.time() - t
+
+        ml.append_row(info=stat, tdiff_solve=tdiff_solve,
+                      tdiff_write=tdiff_write)
+
+        df_stats = pd.DataFrame([stats])
+        df_stats = df_stats[[c for c in df_stats.columns
+                             if not c.startswith('info')]]
+        ml.append_to_table('def_coarse_to_fine', df_stats)
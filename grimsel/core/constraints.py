@@ -10,6 +10,8 @@ serves as a mixin class to :class:`grimsel.core.model_base.ModelBase`.
 
 from functools import wraps
 
+import numpy as np
+import pandas as pd
 import pyomo.environ as po
 
 from grimsel.core.io import IO
@@ -79,6 +81,26 @@ class Constraints:
         obj = objclass(*args, **kwargs)
         setattr(self, name, obj)
 
+    def get_last_soy(self, tm, sy):
+        '''
+        Returns the time slot preceding ``sy`` in time map ``tm``.
+
+        Time is circular: the first time slot follows the last. For
+        representative periods (see
+        :class:`grimsel.auxiliary.timemap.RepresentativeTimeMap`) this
+        applies to each period separately.
+
+        '''
+
+        dict_sy_prev = getattr(self, 'dict_tm_sy_prev', {}).get(tm)
+
+        if dict_sy_prev is not None:
+            return dict_sy_prev.get(sy, sy - 1)
+
+        list_sy = self.dict_tm_sy[tm]
+
+        return (sy - 1) if sy != list_sy[0] else list_sy[-1]
+
     def add_transmission_bounds_rules(self):
         r'''
         Add transmission bounds.
@@ -92,28 +114,54 @@ class Constraints:
         .. note::
            This method modifies the ``trm`` transmission power Pyomo
            variable object by calling its ``setub`` and ``setlb`` methods.
+           Month and weight node of all indices are obtained through a
+           single table join. The bounds remain expressions of the mutable
+           parameters ``cap_trme_leg``, ``cap_trmi_leg``, and ``nd_weight``;
+           a single expression per month, node pair, and energy carrier is
+           shared by all time slots.
 
         '''
 
-        dict_weight = IO.param_to_df(self.nd_weight).set_index('nd_id').value.to_dict()
+        if not hasattr(self, 'trm') or self.trm is None:
+            return
 
-        if hasattr(self, 'trm'):
-            for sy, nd1, nd2, ca in self.trm:
+        dict_weight = IO.param_to_df(self.nd_weight).set_index('nd_id').value
 
-                # get node with max weight
-                nd_w = max([nd1, nd2], key=lambda x: dict_weight[x])
+        df = pd.DataFrame(list(self.trm.keys()),
+                          columns=['sy', 'nd_id', 'nd_2_id', 'ca_id'])
 
-                tm = self.dict_ndnd_tm_id[nd1, nd2]
+        if df.empty:
+            return
 
-                mt = self.dict_soy_month[(tm, sy)]
+        df['tm_id'] = [self.dict_ndnd_tm_id[ndnd] for ndnd
+                       in zip(df.nd_id, df.nd_2_id)]
+        df['mt_id'] = (pd.Series(self.dict_soy_month)
+                         .reindex(pd.MultiIndex.from_arrays([df.tm_id, df.sy]))
+                         .values)
+
+        # get node with max weight; nd_id for equal weights
+        df['nd_w'] = np.where(df.nd_2_id.map(dict_weight)
+                              > df.nd_id.map(dict_weight),
+                              df.nd_2_id, df.nd_id)
+
+        cols_bd = ['mt_id', 'nd_id', 'nd_2_id', 'ca_id', 'nd_w']
+        df['bd_id'] = df.groupby(cols_bd, sort=False).ngroup()
+
+        list_bd = [(self.cap_trme_leg[mt, nd1, nd2, ca] * self.nd_weight[nd_w],
+                    - (self.cap_trmi_leg[mt, nd1, nd2, ca]
+                       * self.nd_weight[nd_w]))
+                   for mt, nd1, nd2, ca, nd_w
+                   in df[cols_bd].drop_duplicates().itertuples(index=False)]
 
-                ub = (self.cap_trme_leg[mt, nd1, nd2, ca]
-                      * self.nd_weight[nd_w])
-                lb = - (self.cap_trmi_leg[mt, nd1, nd2, ca]
-                        * self.nd_weight[nd_w])
+        # Pyomo has no bulk bound setter; only the assignment is per element
+        list_idx = df[['sy', 'nd_id', 'nd_2_id', 'ca_id']].itertuples(
+                                                    index=False, name=None)
+        for idx, bd_id in zip(list_idx, df.bd_id):
 
-                self.trm[(sy, nd1, nd2, ca)].setub(ub)
-                self.trm[(sy, nd1, nd2, ca)].setlb(lb)
+            ub, lb = list_bd[bd_id]
+            trm = self.trm[idx]
+            trm.setub(ub)
+            trm.setlb(lb)
 
     def add_supply_rules(self):
         r'''
@@ -559,10 +607,8 @@ class Constraints:
 
             tm = self.dict_pp_tm_id[pp]
 
-            list_sy = self.dict_tm_sy[tm]
-
             this_soy = sy
-            last_soy = (sy - 1) if this_soy != list_sy[0] else list_sy[-1]
+            last_soy = self.get_last_soy(tm, sy)
 
             return (self.pwr_ramp[sy, pp, ca]
                     == self.pwr[this_soy, pp, ca]
@@ -632,6 +678,8 @@ class Constraints:
           without inflow
 
         Time is circular, i.e. the first time slot follows after the last.
+        With representative periods, this applies to each period (see
+        :func:`get_last_soy`).
 
         .. math::
 
@@ -652,10 +700,8 @@ class Constraints:
             fl = self.mps.dict_plant_2_fuel_id[pp]
             tm = self.dict_nd_tm_id[nd]
 
-            list_sy = self.dict_tm_sy[tm]
-
             this_soy = sy
-            last_soy = (sy - 1) if this_soy != list_sy[0] else list_sy[-1]
+            last_soy = self.get_last_soy(tm, sy)
 
             left = 0
             right = 0
@@ -19,6 +19,7 @@ import psycopg2 as pg
 
 import grimsel
 import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+import grimsel.auxiliary.aux_dtypes as aux_dtypes
 import grimsel.core.autocomplete as ac
 import grimsel.core.table_struct as table_struct
 from grimsel import _get_logger
@@ -97,7 +98,7 @@ class CompIO(_HDFWriter, _ParqWriter):
     '''
 
     def __init__(self, tb, cl_out, comp_obj, idx, connect, output_target,
-                 model=None):
+                 model=None, results_store=None):
 
         self.tb = tb
         self.cl_out = cl_out
@@ -105,9 +106,11 @@ class CompIO(_HDFWriter, _ParqWriter):
         self.output_target = output_target
         self.connect = connect
         self.model = model
+        self.results_store = results_store
 
         self.columns = None  # set in index setter
         self.run_id = None  # set in call to self.write_run
+        self.sink = None  # optional receiver of the output tables
 
         self.index = tuple(idx) if not isinstance(idx, tuple) else idx
 
@@ -157,17 +160,20 @@ class CompIO(_HDFWriter, _ParqWriter):
     def _to_file(self, df, tb):
         '''
         Casts the data types of the output table and writes the
-        table to the output HDF file.
+        table to the output HDF file. Returns the cast table.
 
         '''
 
-        dtype_dict = {'value': np.dtype('float64'),
-                      'bool_out': np.dtype('bool')}
-        dtype_dict.update({col: np.dtype('int32') for col in df.columns
-                           if not col in ('value', 'bool_out')})
+        if getattr(self.model, 'narrow_dtypes', False):
+            df = df.astype(aux_dtypes.output_dtypes(df))
+        else:
+            dtype_dict = {'value': np.dtype('float64'),
+                          'bool_out': np.dtype('bool')}
+            dtype_dict.update({col: np.dtype('int32') for col in df.columns
+                               if not col in ('value', 'bool_out')})
 
-        df = df.astype({col: dtype for col, dtype in dtype_dict.items()
-                        if col in df.columns})
+            df = df.astype({col: dtype for col, dtype in dtype_dict.items()
+                            if col in df.columns})
 
 
         if self.output_target == 'hdf5':
@@ -184,6 +190,8 @@ class CompIO(_HDFWriter, _ParqWriter):
             raise RuntimeError('_to_file: no '
                                'output_target applicable')
 
+        return df
+
 
     def _to_sql(self, df, tb):
 
@@ -191,9 +199,23 @@ class CompIO(_HDFWriter, _ParqWriter):
                   schema=self.cl_out, if_exists='append', index=False)
 
     def _finalize(self, df, tb=None):
-        ''' Add run_id column and write to database table '''
+        '''
+        Add run_id column and write to database table.
+
+        The table is also added to the results store
+        (:class:`grimsel.core.results_store.ResultsStore`), if any.
+
+        If the ``sink`` attribute is set, the table is passed to
+        ``sink(compio, df, tb)`` instead of being written (see
+        :class:`grimsel.core.rolling_horizon.RollingHorizon`).
+        '''
 
         tb = self.tb if not tb else tb
+
+        if self.sink is not None:
+            self.sink(self, df, tb)
+            return
+
         logger.info('Writing {} to {}.{}'.format(self.comp_obj.name,
                                                  self.cl_out, tb))
 
@@ -205,13 +227,16 @@ class CompIO(_HDFWriter, _ParqWriter):
         t = time.time()
 
         if self.output_target in ['hdf5', 'fastparquet']:
-            self._to_file(df, tb)
+            df = self._to_file(df, tb)
         elif self.output_target == 'psql':
             self._to_sql(df, tb)
         else:
             raise RuntimeError('_finalize: no '
                                'output_target applicable')
 
+        if self.results_store is not None:
+            self.results_store.put(tb, self.run_id, df)
+
         logger.info(' ... done in %.3f sec'%(time.time() - t))
 
     @property
@@ -228,10 +253,27 @@ class CompIO(_HDFWriter, _ParqWriter):
     def get_df(self):
 
         df = self.to_df()
+        df = self._add_presolve_rows(df)
         df = self.post_processing(df)
 
         return df
 
+    def _add_presolve_rows(self, df):
+        '''
+        Appends the rows of plants removed by the model's presolve.
+
+        See :func:`grimsel.core.sets.Sets.presolve_sets`.
+
+        '''
+
+        dict_rows = getattr(self.model, 'dict_presolve_rows', None)
+
+        if not dict_rows or not self.comp_obj.name in dict_rows:
+            return df
+
+        return pd.concat([df, dict_rows[self.comp_obj.name]],
+                         axis=0, sort=False, ignore_index=True)[df.columns]
+
     def write(self, run_id):
 
         self.run_id = run_id
@@ -495,6 +537,15 @@ def skip_if_no_output(f):
     return wrapper
 
 
+def skip_if_no_reset_output(f):
+    def wrapper(self, *args, **kwargs):
+        if not self.reset_output:
+            pass
+        else:
+            f(self, *args, **kwargs)
+    return wrapper
+
+
 class ModelWriter():
     '''
     The IO singleton class manages the TableIO instances and communicates with
@@ -514,6 +565,8 @@ class ModelWriter():
                      'output_target': 'hdf5',
                      'sql_connector': None,
                      'no_output': False,
+                     'reset_output': True,
+                     'results_store': None,
                      'dev_mode': False,
                      'coll_out': None,
                      'keep': None,
@@ -570,9 +623,15 @@ class ModelWriter():
         '''
         Reset the SQL schema or hdf file for model output writing.
 
+        Skipped if the ``reset_output`` option is False, e.g. for work queue
+        workers writing to a shared output collection
+        (:mod:`grimsel.auxiliary.work_queue`).
+
         '''
 
-        if self.output_target == 'psql':
+        if not self.reset_output:
+            logger.info('Keeping output collection %s'%self.cl_out)
+        elif self.output_target == 'psql':
             self._reset_schema()
         elif self.output_target == 'hdf5':
             self._reset_hdf_file()
@@ -738,7 +797,8 @@ Hit enter to proceed.
                                       idx=idx,
                                       connect=self.sql_connector,
                                       output_target=self.output_target,
-                                      model=self.model)
+                                      model=self.model,
+                                      results_store=self.results_store)
 
                 self.dict_comp_obj[comp] = io_class(**io_class_kwars)
 
@@ -747,6 +807,10 @@ Hit enter to proceed.
 
         ''' Calls the write methods of all CompIO objects. '''
 
+        if self.results_store is not None:
+            # tables of repeated runs are replaced
+            self.results_store.discard_run(self.run_id)
+
         for comp, io_obj in self.dict_comp_obj.items():
 
             io_obj.write(self.run_id)
@@ -981,6 +1045,11 @@ class TableReader():
 
             df = pd.concat(list_df, axis=0, sort=False) if tb_exists else None
 
+            if tb_exists and getattr(self.model, 'narrow_dtypes', False):
+                float32_cols = (['value'] if self.model.float32_profiles
+                                and table.startswith('prof') else [])
+                df = aux_dtypes.narrow_dtypes(df, float32_cols=float32_cols)
+
             setattr(self.model, 'df_' + table, df)
 
             if not tb_exists:
@@ -1058,6 +1127,7 @@ class DataReader(_HDFWriter, _ParqWriter):
                     'autocomplete_curtailment': False,
                     'autocompletion': True,
                     'no_output': False,
+                    'reset_output': True,
                     'dev_mode': False,
                     'data_path': None,
                     'sql_connector': None,
@@ -1405,6 +1475,7 @@ class DataReader(_HDFWriter, _ParqWriter):
 
     @skip_if_resume_loop
     @skip_if_no_output
+    @skip_if_no_reset_output
     def write_runtime_tables(self):
         '''
         Some input tables depend on model parameters (time resolution).
@@ -1500,6 +1571,7 @@ class IO:
                     'sql_connector': None,
                     'autocompletion': True,
                     'no_output': False,
+                    'reset_output': True,
                     'dev_mode': False,
                     'data_path': None,
                     'sc_inp': None,
@@ -1559,6 +1631,7 @@ class IO:
     def read_model_data(self):
 
         self.datrd.read_model_data()
+        self.datrd.model.validate_input()
 
     def write_runtime_tables(self):
 
@@ -0,0 +1,319 @@
+'''
+Memoization of model runs
+=========================
+
+Skips solves whose model state is identical to an earlier run, e.g. if a
+modifier step has no effect at the selected nodes or if an extended sweep
+is repeated.
+
+* The state key (:func:`get_state_key`) is a hash of all parameter values,
+  the fixed values and bounds of the variables, and the deactivated
+  constraints, computed after the modifiers were applied in
+  :func:`grimsel.core.model_loop.ModelLoop.perform_model_run`. It includes
+  the structure key (:func:`get_structure_key`), a hash of the names and
+  index sets of all model components, which is computed once.
+* The :class:`MemoCatalog` maps the state keys of successfully solved runs
+  to their output collection and run_id. It is a directory of small json
+  files written atomically, shared by parallel workers and by consecutive
+  sweeps.
+* If the state key of a run is found in the catalog, the output tables of
+  the earlier run are copied to the current run_id (:func:`copy_run`)
+  instead of solving the model. The ``info`` column of the ``def_run`` table
+  reads ``Memoized: run_id ...``; ``tdiff_solve`` is zero. If the earlier
+  output doesn't exist anymore (e.g. after an output reset), the model is
+  solved as usual.
+
+Example
+-------
+
+.. code-block:: python
+
+    ml = ModelLoop(nsteps=nsteps, mkwargs=mkwargs, iokwargs=iokwargs,
+                   memo_catalog=MemoCatalog('memo'))
+
+'''
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+import numpy as np
+import pyomo.environ as po
+
+from grimsel.core.io import TransmIO, DmndIO
+from grimsel.core.results_store import read_output_table
+from grimsel.core.run_control import get_termination_condition
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# increment if the state key definition changes
+MEMO_VERSION = 1
+
+
+def _sorted_components(m, ctype):
+
+    return sorted(m.component_objects(ctype, descend_into=True),
+                  key=lambda comp: comp.name)
+
+
+def _update_values(hsh, values):
+
+    try:
+        arr = np.array([np.nan if val is None else val for val in values],
+                       dtype=np.float64)
+        hsh.update(arr.tobytes())
+    except (TypeError, ValueError):  # non-numeric values
+        hsh.update(repr(list(values)).encode())
+
+
+def get_structure_key(m):
+    '''
+    Hash of the names, types, and index sets of all model components.
+
+    Parameters
+    ----------
+    m : grimsel.core.model_base.ModelBase
+        built model
+
+    Returns
+    -------
+    str
+
+    '''
+
+    hsh = hashlib.sha1(repr(MEMO_VERSION).encode())
+
+    for ctype in (po.Set, po.Param, po.Var, po.Constraint, po.Objective):
+        for comp in _sorted_components(m, ctype):
+            hsh.update(('%s %s %d'%(comp.name, type(comp).__name__,
+                                    len(comp))).encode())
+            if comp.is_indexed():
+                hsh.update(repr(list(comp.keys())).encode())
+
+    return hsh.hexdigest()
+
+
+def get_state_key(m, structure_key):
+    '''
+    Hash of the mutable state of the model.
+
+    Parameters
+    ----------
+    m : grimsel.core.model_base.ModelBase
+        model after all modifications of the current run
+    structure_key : str
+        output of :func:`get_structure_key`
+
+    Returns
+    -------
+    str
+
+    '''
+
+    hsh = hashlib.sha1(structure_key.encode())
+
+    for par in _sorted_components(m, po.Param):
+        _update_values(hsh, par.extract_values().values())
+
+    for var in _sorted_components(m, po.Var):
+        list_vardata = list(var.values())
+        _update_values(hsh, (vardata.value if vardata.fixed else np.inf
+                             for vardata in list_vardata))
+        _update_values(hsh, (vardata.lb for vardata in list_vardata))
+        _update_values(hsh, (vardata.ub for vardata in list_vardata))
+
+    for ctype in (po.Constraint, po.Objective):
+        for comp in _sorted_components(m, ctype):
+            hsh.update(repr([idx for idx, compdata in comp.items()
+                             if not compdata.active]).encode())
+
+    return hsh.hexdigest()
+
+
+class MemoCatalog():
+    '''
+    Directory of memoized runs by state key.
+
+    Parameters
+    ----------
+    catalog_dir : str
+        catalog directory; shared by all workers and sweeps which should
+        reuse each other's results
+
+    '''
+
+    def __init__(self, catalog_dir):
+
+        self.catalog_dir = catalog_dir
+
+        os.makedirs(self.catalog_dir, exist_ok=True)
+
+    def __repr__(self):
+
+        return 'MemoCatalog(catalog_dir=%s)'%self.catalog_dir
+
+    def _get_file(self, key):
+
+        return os.path.join(self.catalog_dir, '%s.json'%key)
+
+    def get(self, key):
+        '''
+        Catalog entry of a state key.
+
+        Returns
+        -------
+        dict or None
+            keys ``output_target``, ``cl_out``, ``run_id``, ``objective``;
+            None if the key is not in the catalog
+
+        '''
+
+        try:
+            with open(self._get_file(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        '''
+        Adds or replaces the entry of a state key.
+        '''
+
+        fd, fn_tmp = tempfile.mkstemp(dir=self.catalog_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(fn_tmp, self._get_file(key))
+
+    def remove(self, key):
+
+        try:
+            os.remove(self._get_file(key))
+        except FileNotFoundError:
+            pass
+
+
+def copy_run(io, entry, run_id):
+    '''
+    Copies all output tables of a memoized run to a new run_id.
+
+    All tables are read before any is written; nothing is written if any
+    table of the memoized run is missing.
+
+    Parameters
+    ----------
+    io : grimsel.core.io.IO
+        io instance of the model loop
+    entry : dict
+        catalog entry of the memoized run (:func:`MemoCatalog.get`)
+    run_id : int
+        current run
+
+    '''
+
+    if entry['output_target'] != io.modwr.output_target:
+        raise ValueError('Memoized run_id %s has output_target %s'
+                         %(entry['run_id'], entry['output_target']))
+
+    # the representative io object of each table writes the copied rows
+    dict_tb_obj = {}
+    for io_obj in io.modwr.dict_comp_obj.values():
+        dict_tb_obj.setdefault(io_obj.tb, io_obj)
+    for io_obj in io.modwr.dict_comp_obj.values():
+        if isinstance(io_obj, (TransmIO, DmndIO)):
+            # also written to the power table
+            dict_tb_obj.setdefault('var_sy_pwr', io_obj)
+
+    dict_df = {tb: read_output_table(io, tb, entry['run_id'],
+                                     cl_out=entry['cl_out'])
+               for tb in dict_tb_obj}
+
+    if io.modwr.results_store is not None:
+        io.modwr.results_store.discard_run(run_id)
+
+    for tb, df in dict_df.items():
+        io_obj = dict_tb_obj[tb]
+        io_obj.run_id = run_id
+        io_obj._finalize(df.drop(columns='run_id'), tb)
+
+
+def reuse_run(ml, key):
+    '''
+    Completes the current run with the results of a memoized run.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with selected and modified run
+    key : str
+        state key of the current run
+
+    Returns
+    -------
+    bool
+        False if the key is not in the catalog or if the output of the
+        memoized run is not available; the run must be solved
+
+    '''
+
+    entry = ml.memo_catalog.get(key)
+
+    if not entry:
+        return False
+
+    if entry['cl_out'] == ml.io.cl_out and entry['run_id'] == ml.run_id:
+        return False  # repetition of the memoized run itself
+
+    t = time.time()
+
+    if not ml.io.modwr.no_output:
+
+        if ml.io.replace_runs_if_exist and ml.io.resume_loop:
+            ml.io.delete_run_id(ml.run_id, operator='=')
+
+        try:
+            copy_run(ml.io, entry, ml.run_id)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning('Output of memoized run_id %s in %s not '
+                           'available (%r); solving run_id %s'
+                           %(entry['run_id'], entry['cl_out'], e, ml.run_id))
+            ml.memo_catalog.remove(key)
+            return False
+
+    source = ('' if entry['cl_out'] == ml.io.cl_out
+              else ' in %s'%os.path.basename(str(entry['cl_out'])))
+    logger.info('Run_id %s is identical to run_id %s%s; copied results'
+                %(ml.run_id, entry['run_id'], source))
+
+    ml.m.objective_value = entry['objective']
+    ml.append_row(info='Memoized: run_id %s%s'%(entry['run_id'], source),
+                  tdiff_solve=0, tdiff_write=time.time() - t)
+
+    return True
+
+
+def record_run(ml, key):
+    '''
+    Adds the current run to the catalog if it was solved to optimality.
+
+    Runs without output are not added since they can't be copied. Skipped
+    solves (model ``skip_runs`` option) are not added either: their output
+    is not a solution.
+
+    '''
+
+    if ml.io.modwr.no_output or ml.m.skip_runs:
+        return
+
+    if get_termination_condition(ml.m) != 'optimal':
+        return
+
+    ml.memo_catalog.put(key, {'output_target': ml.io.modwr.output_target,
+                              'cl_out': ml.io.cl_out,
+                              'run_id': int(ml.run_id),
+                              'objective': float(getattr(ml.m,
+                                                         'objective_value',
+                                                         np.nan))})
@@ -4,6 +4,7 @@ Module docstring
 
 import sys
 import os
+import gc
 from importlib import reload
 import tempfile
 import string
@@ -21,16 +22,51 @@ from pyomo.opt import SolverFactory
 
 import grimsel.auxiliary.maps as maps
 import grimsel.auxiliary.timemap as timemap
+import grimsel.auxiliary.aux_dtypes as aux_dtypes
+import grimsel.auxiliary.aux_cache as aux_cache
 
 import grimsel.core.constraints as constraints
 import grimsel.core.variables as variables
 import grimsel.core.parameters as parameters
 import grimsel.core.sets as sets
 import grimsel.core.io as io # for class methods
+import grimsel.core.aggregation as aggregation
+import grimsel.core.validation as validation
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
 
+# profile name -> (table defining the pf_id column, model id columns)
+PF_REGISTRY = {'pricebuy': ('df_fuel_node_encar', ['fl_id', 'nd_id', 'ca_id']),
+               'pricesll': ('df_fuel_node_encar', ['fl_id', 'nd_id', 'ca_id']),
+               'dmnd': ('df_node_encar', ['nd_id', 'ca_id']),
+               'supply': ('df_plant_encar', ['pp_id', 'ca_id'])}
+
+# profile name -> (profile table, pf_id column)
+PF_PROFILE_TABLES = {'pricebuy': ('df_profpricebuy', 'price_pf_id'),
+                     'pricesll': ('df_profpricesll', 'price_pf_id'),
+                     'dmnd': ('df_profdmnd', 'dmnd_pf_id'),
+                     'supply': ('df_profsupply', 'supply_pf_id')}
+
+# attributes required after the model build, by consumer; these are never
+# released by ModelBase.release_build_data
+SLIM_KEEP = {'io': ['df_def_plant', 'df_def_pp_type', 'dict_nd_tm_id',
+                    'is_min_node', 'setlst', 'dict_presolve_rows'],
+             'parameters': ['dict_par', 'df_parameter_month'],
+             'constraints': ['dict_ndnd_tm_id', 'dict_soy_month'],
+             # including the tables read by model_loop_modifier/*.py
+             'modifiers': ['df_def_node', 'df_def_fuel', 'df_def_encar',
+                           'df_def_profile', 'df_plant_encar',
+                           'df_fuel_node_encar', 'df_node_encar',
+                           'df_node_connect', 'df_tm_soy', 'df_tm_soy_full',
+                           'df_profdmnd', 'df_plant_encar_scenarios',
+                           'df_fuel_node_encar_scenarios'],
+             'aggregation': ['df_nd_aggr', 'df_pp_cluster']}
+
+# intermediate non-DataFrame attributes released in slim mode
+SLIM_RELEASE = ['dict_sysy', 'dict_tm_sy', 'dict_week_soy', 'dict_soy_week',
+                'dict_month_soy', 'dict_pp_tm_id']
+
 
 def get_random_suffix():
     return ''.join(np.random.choice(list(string.ascii_lowercase), 4))
@@ -104,6 +140,48 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         skip_runs -- boolean; if True, solver calls are skipped, also
                      stops the IO instance from trying to write the model
                      variables.
+        presolve -- boolean; if True, inactive plants are removed from
+                    the sets prior to the variable definition; see
+                    :func:`grimsel.core.sets.Sets.presolve_sets`
+        narrow_dtypes -- boolean; if True, input, time map, and output
+                         tables use the memory-efficient data types of
+                         :module:`grimsel.auxiliary.aux_dtypes`
+        float32_profiles -- boolean; if True (and ``narrow_dtypes``),
+                            profile values are stored as float32
+        repr_periods -- dict; if not None, the time slots are based on
+                        representative periods; keyword arguments of
+                        :class:`grimsel.auxiliary.timemap.RepresentativeTimeMap`
+                        e.g. ``{'nclusters': 12, 'period': 'day',
+                        'method': 'kmedoids'}``; requires a uniform time
+                        resolution of all nodes
+        adaptive_slices -- dict; if not None, variable-length time slots
+                           are based on the profile variability; keyword
+                           arguments of
+                           :class:`grimsel.auxiliary.timemap.AdaptiveTimeMap`
+                           e.g. ``{'tolerance': 0.1, 'max_len': 24}``;
+                           requires a uniform time resolution of all nodes
+        slim -- boolean; if True, build-time tables are released after
+                the model build; see :func:`release_build_data`
+        slim_keep -- list of additional attribute names to be kept in
+                     slim mode, e.g. tables used by model loop modifiers
+        slim_spill_dir -- directory; if not None, released tables are
+                          pickled to this directory in slim mode
+        nd_aggr -- dict ``{node: zone}``; if not None, nodes are merged
+                   into zones named after one of their nodes; see
+                   :func:`aggregate_input`
+        pp_cluster_bins -- int; if not None, plants of identical type, fuel,
+                           and node are clustered into this number of
+                           efficiency bins; see :func:`aggregate_input`
+        cache_dir -- directory of the on-disk cache of time maps and
+                     time-mapped profiles; if None, the environment
+                     variable ``GRIMSEL_CACHE_DIR`` is used; see
+                     :mod:`grimsel.auxiliary.aux_cache`
+        input_validation -- one of ``{False, True, 'strict'}`` (default
+                            False); if True, the input tables are checked
+                            after reading and all problems are logged; if
+                            ``'strict'``, an
+                            :class:`grimsel.core.validation.InputValidationError`
+                            is raised; see :func:`validate_input`
         '''
 
         super(ModelBase, self).__init__() # init of po.ConcreteModel
@@ -122,7 +200,19 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                     'skip_runs': False,
                     'nthreads': False,
                     'keepfiles': True,
-                    'tempdir': None}
+                    'tempdir': None,
+                    'presolve': False,
+                    'narrow_dtypes': False,
+                    'float32_profiles': False,
+                    'repr_periods': None,
+                    'adaptive_slices': None,
+                    'slim': False,
+                    'slim_keep': [],
+                    'slim_spill_dir': None,
+                    'nd_aggr': None,
+                    'pp_cluster_bins': None,
+                    'cache_dir': None,
+                    'input_validation': False}
         for key, val in defaults.items():
             setattr(self, key, val)
         self.__dict__.update(kwargs)
@@ -383,6 +473,11 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         * ``dict_dmnd_pf``: (nd_id, ca_id) |rarr| (dmnd_pf_id)
         * ``dict_supply_pf``: (pp_id, ca_id) |rarr| (supply_pf_id)
 
+        The same mappings are registered once as tables in the profile id
+        registry ``pf_registry`` (profile name |rarr| DataFrame with the
+        model id columns and a ``pf_id`` column), which is used by
+        :func:`translate_pf_id`.
+
         Purpose
         ---------
 
@@ -392,34 +487,70 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
         '''
 
-        list_pf = [(self.df_fuel_node_encar,
-                    ['fl_id', 'nd_id', 'ca_id'], 'pricebuy'),
-                   (self.df_fuel_node_encar,
-                    ['fl_id', 'nd_id', 'ca_id'], 'pricesll'),
-                   (self.df_node_encar,
-                    ['nd_id', 'ca_id'], 'dmnd'),
-                   (self.df_plant_encar,
-                    ['pp_id', 'ca_id'], 'supply')]
+        self.pf_registry = {}
 
-        df, ind, name = list_pf[-1]
-        for df, ind, name in list_pf:
+        for name, (tb_name, ind) in PF_REGISTRY.items():
 
+            df = getattr(self, tb_name, None)
             col = '%s_pf_id'%name
             if df is not None and col in df.columns:
                 ind_df = df.loc[~df[col].isna()].set_index(ind)[col]
                 dct = ind_df.to_dict()
+                df_reg = ind_df.rename('pf_id').reset_index()
+                df_reg = df_reg.drop_duplicates(ind, keep='last')
             else:
                 dct = {}
+                df_reg = pd.DataFrame(columns=ind + ['pf_id'])
 
             setattr(self, 'dict_%s_pf'%name, dct)
+            self.pf_registry[name] = df_reg
+
+    def get_pf_registry_name(self, pf_ids):
+        '''
+        Identifies the registered profile the ``pf_ids`` belong to.
+
+        Parameters
+        ----------
+        pf_ids : array-like
+            profile ids
+
+        Returns
+        -------
+        str
+            key of the ``pf_registry``
+
+        Raises
+        ------
+        ValueError: If multiple registered profiles correspond to the pf_id
+                    values or the ``pf_ids`` are empty.
+        ValueError: If no registered profile can be found for the pf_id
+                    values.
+
+        '''
+
+        pf_ids = pd.unique(np.asarray(pf_ids))
+
+        list_names = [name for name, df_reg in self.pf_registry.items()
+                      if np.isin(pf_ids, df_reg.pf_id.values).all()]
+
+        if len(list_names) > 1:
+            raise ValueError('Ambiguous pf array in translate_pf_id '
+                             'or df empty.')
+        elif not list_names:
+            raise ValueError('No pf array found for pf_ids %s. Maybe you are '
+                             'trying to translate a table with pf_ids which '
+                             'are not included in the original model.'
+                             %pf_ids.tolist()[:10])
+
+        return list_names[0]
 
     def translate_pf_id(self, df):
         '''
         Adds model id columns for the profile ids in the input DataFrame.
 
-        Searches vars(self) for the pf_dict corresponding to the pf_ids
-        in the input DataFrame. Then uses this dictionary to add additional
-        columns to the output table.
+        Identifies the registered profile corresponding to the pf_ids in the
+        input DataFrame (:func:`get_pf_registry_name`). Then merges the
+        registry table to add additional columns to the output table.
 
         Parameters
         ----------
@@ -432,49 +563,91 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
         Raises
         ------
-        IndexError: If multiple pf dictionaries correspond to the pf_id
+        ValueError: If multiple pf dictionaries correspond to the pf_id
                     values in the input DataFrame.
-        IndexError: If no pf dictionary can be found for the pf_id values.
+        ValueError: If no pf dictionary can be found for the pf_id values.
 
         '''
 
-        # identify corresponding pf dict
-        list_pf_id = set(df.pf_id.unique().tolist())
+        try:
+            name = self.get_pf_registry_name(df.pf_id.values)
+        except ValueError as e:
+            raise ValueError('%s Table columns: %s'%(e, df.columns.tolist()))
 
-        pf_arrs = {name_dict:
-                    list_pf_id
-                        .issubset(set(getattr(self, name_dict).values()))
-                    for name_dict in vars(self)
-                    if name_dict.startswith('dict_')
-                    and name_dict.endswith('_pf')}
+        return pd.merge(self.pf_registry[name], df, on='pf_id')
 
-        if sum(pf_arrs.values()) > 1:
-            raise ValueError('Ambiguous pf array in translate_pf_id '
-                             'or df empty.')
-        elif sum(pf_arrs.values()) == 0:
-            raise ValueError('No pf array found for table with columns '
-                             '%s'%df.columns.tolist() + '. Maybe you are '
-                             'trying to translate a table with pf_ids which '
-                             'are not included in the original model.')
-        else:
-            pf_dict = {val: key for key, val in pf_arrs.items()}[True]
+    def check_pf_ids(self):
+        '''
+        Checks whether all referenced pf_ids exist in the profile tables.
+
+        For each registered profile, the pf_ids of the ``pf_registry``
+        are compared with the corresponding profile table and
+        the ``def_profile`` table. Missing ids are logged as warnings.
+
+        Returns
+        -------
+        dict
+            ``{(profile name, table name): sorted list of missing pf_ids}``
+
+        '''
+
+        dict_missing = {}
+
+        for name, df_reg in self.pf_registry.items():
+
+            if df_reg.empty:
+                continue
 
-            new_cols = {'dict_pricesll_pf': ['fl_id', 'nd_id', 'ca_id'],
-                        'dict_pricebuy_pf': ['fl_id', 'nd_id', 'ca_id'],
-                        'dict_price_pf': ['fl_id', 'nd_id', 'ca_id'],
-                        'dict_dmnd_pf': ['nd_id', 'ca_id'],
-                        'dict_supply_pf': ['pp_id', 'ca_id']}[pf_dict]
+            tb_prof, col = PF_PROFILE_TABLES[name]
+            list_tb = [(tb_prof, col), ('df_def_profile', 'pf_id')]
 
-            pf_dict = getattr(self, pf_dict)
+            for tb_name, col in list_tb:
+                df = getattr(self, tb_name, None)
+                pf_ids_tb = (df[col].unique()
+                             if df is not None and col in df.columns
+                             else np.array([]))
 
+                mask = ~np.isin(df_reg.pf_id.values, pf_ids_tb)
+                if mask.any():
+                    missing = sorted(set(df_reg.pf_id.values[mask].tolist()))
+                    dict_missing[(name, tb_name)] = missing
+                    logger.warning('check_pf_ids: %s pf_ids missing '
+                                   'in %s: %s'%(name, tb_name, missing))
 
-            df_new = pd.Series(pf_dict).reset_index()
-            df_new.columns = new_cols + ['pf_id']
+        return dict_missing
 
-            df_new = pd.merge(df_new, df, on='pf_id')
 
-            return df_new
+    def validate_input(self):
+        '''
+        Checks the consistency of the input tables.
+
+        Performs all checks of :func:`grimsel.core.validation.validate_input`
+        depending on the ``input_validation`` keyword argument. The problem
+        table is stored as attribute ``df_input_problems``.
+
+        Raises
+        ------
+        grimsel.core.validation.InputValidationError
+            If ``input_validation`` is ``'strict'`` and any problems are
+            found.
+
+        '''
+
+        if not self.input_validation:
+            return
+
+        self.df_input_problems = validation.validate_input(self)
 
+        if self.df_input_problems.empty:
+            logger.info('validate_input: no problems found')
+            return
+
+        if self.input_validation == 'strict':
+            raise validation.InputValidationError(self.df_input_problems)
+
+        logger.warning('validate_input: %d problem(s) found:\n%s'
+                       %(len(self.df_input_problems),
+                         validation.format_problems(self.df_input_problems)))
 
     def _get_nhours_nodes(self, nhours):
         '''
@@ -531,6 +704,30 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         return nhours_dict
 
 
+    def aggregate_input(self):
+        '''
+        Aggregates nodes and clusters plants in the input tables.
+
+        Applies :func:`grimsel.core.aggregation.aggregate_nodes` if the
+        ``nd_aggr`` keyword argument is set and
+        :func:`grimsel.core.aggregation.cluster_plants` if
+        ``pp_cluster_bins`` is set. The maps to the original ids are
+        stored as attributes ``df_nd_aggr`` and ``df_pp_cluster``.
+
+        '''
+
+        if not self.nd_aggr and not self.pp_cluster_bins:
+            return
+
+        if self.nd_aggr:
+            aggregation.aggregate_nodes(self, self.nd_aggr)
+
+        if self.pp_cluster_bins:
+            aggregation.cluster_plants(self, self.pp_cluster_bins)
+
+        # demand profile ids changed
+        self._init_pf_dicts()
+
     def init_maps(self):
         '''
         Uses the input DataFrames to initialize a
@@ -544,15 +741,38 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         self.mps = maps.Maps.from_dicts(dct)
 
     def _init_time_map_connect(self):
+        '''
+        Generates the time slot maps between connected nodes.
+
+        Generated attributes:
+            * ``is_min_node`` (``dict``): ``(nd, nd_2) -> bool``, ``True`` if
+              ``nd`` has the higher (or equal) time resolution
+            * ``dict_ndnd_tm_id`` (``dict``): ``(nd, nd_2) -> tm_id`` of the
+              node with the higher time resolution
+            * ``df_sysy_ndcnn`` (``DataFrame``): time slot correspondence
+              ``sy <-> sy2`` for all node connections
+            * ``dict_sysy`` (``dict``): ``(nd, nd_2, sy) -> set(sy2)``
+            * ``df_symin_ndcnn`` (``DataFrame``): index table of the
+              transmission variable
+
+        All tables are constructed through merges on unique time map pairs
+        rather than row-wise ``apply`` calls.
+
+        '''
 
         df_ndcnn = self.df_node_connect[['nd_id', 'nd_2_id', 'ca_id']].drop_duplicates()
 
-        df_ndcnn['freq'] = df_ndcnn.nd_id.apply(lambda x: {key: frnh[0] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['nhours'] = df_ndcnn.nd_id.apply(lambda x: {key: frnh[1] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['freq_2'] = df_ndcnn.nd_2_id.apply(lambda x: {key: frnh[0] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['nhours_2'] = df_ndcnn.nd_2_id.apply(lambda x: {key: frnh[1] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['tm_id'] = df_ndcnn.nd_id.replace(self.dict_nd_tm_id)
-        df_ndcnn['tm_2_id'] = df_ndcnn.nd_2_id.replace(self.dict_nd_tm_id)
+        dict_nd_freq = {nd: frnh[0] for nd, frnh in self._dict_nd_tm.items()}
+        dict_nd_nhours = {nd: frnh[1] for nd, frnh in self._dict_nd_tm.items()}
+
+        df_ndcnn['freq'] = df_ndcnn.nd_id.map(dict_nd_freq)
+        df_ndcnn['nhours'] = df_ndcnn.nd_id.map(dict_nd_nhours)
+        df_ndcnn['freq_2'] = df_ndcnn.nd_2_id.map(dict_nd_freq)
+        df_ndcnn['nhours_2'] = df_ndcnn.nd_2_id.map(dict_nd_nhours)
+        df_ndcnn['tm_id'] = df_ndcnn.nd_id.map(self.dict_nd_tm_id)
+        df_ndcnn['tm_2_id'] = df_ndcnn.nd_2_id.map(self.dict_nd_tm_id)
+
+        nd_smaller = (df_ndcnn.nhours <= df_ndcnn.nhours_2).values
 
         # make dict_sy_ndnd_min
         is_min_node = pd.concat([df_ndcnn,
@@ -566,52 +786,81 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                                    .set_index(['nd_id', 'nd_2_id'])
                                    .is_min).to_dict()
 
-        def get_map_sy(x):
-            tm = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
-                                 freq=x[['freq', 'freq_2']].min(axis=1).values[0],
-                                 nhours=x.nhours.iloc[0])
-            tm_2 = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
-                                   freq=x[['freq', 'freq_2']].min(axis=1).values[0],
-                                   nhours=x.nhours_2.iloc[0])
-            return pd.merge(tm.df_hoy_soy,
-                            tm_2.df_hoy_soy.rename(columns={'sy': 'sy2'}),
-                            on='hy')[['sy', 'sy2']]
-
-        self.dict_ndnd_tm_id =  df_ndcnn.set_index(['nd_id', 'nd_2_id']).copy()
-        self.dict_ndnd_tm_id['tm_min_id'] = self.dict_ndnd_tm_id.apply(lambda x: x.tm_id if x.nhours <= x.nhours_2 else x.tm_2_id, axis=1)
-        self.dict_ndnd_tm_id = self.dict_ndnd_tm_id.tm_min_id.to_dict()
+        df_ndcnn['tm_min_id'] = np.where(nd_smaller, df_ndcnn.tm_id,
+                                         df_ndcnn.tm_2_id)
+
+        self.dict_ndnd_tm_id = (df_ndcnn.set_index(['nd_id', 'nd_2_id'])
+                                        .tm_min_id.to_dict())
         self.dict_ndnd_tm_id = {**self.dict_ndnd_tm_id,
                                 **{(key[1], key[0]): val
                                    for key, val
                                    in self.dict_ndnd_tm_id.items()}}
 
-        sysymap = df_ndcnn[[c for c in df_ndcnn.columns if not 'nd' in c]]
-        sysymap = df_ndcnn.drop_duplicates()
-        sysymap = df_ndcnn.groupby(['tm_id', 'tm_2_id']).apply(get_map_sy).reset_index()
-        sysymap = sysymap.drop('level_2', axis=1)
+        # one hy-merge per unique pair of time maps
+        cols_tm = ['tm_id', 'tm_2_id', 'freq', 'freq_2', 'nhours', 'nhours_2']
+        list_sysy = []
+        for tm_id, tm_2_id, freq, freq_2, nhours, nhours_2 in (
+                df_ndcnn[cols_tm].drop_duplicates(['tm_id', 'tm_2_id'])
+                                 .itertuples(index=False)):
+            if tm_id == tm_2_id:
+                sy = self.df_tm_soy.loc[self.df_tm_soy.tm_id == tm_id, 'sy']
+                sysy = pd.DataFrame({'sy': sy.values, 'sy2': sy.values})
+                list_sysy.append(sysy.assign(tm_id=tm_id, tm_2_id=tm_2_id))
+                continue
+
+            freq_min = min(freq, freq_2)
+            tm = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
+                                 freq=freq_min, nhours=nhours,
+                                 cache_dir=self.cache_dir)
+            tm_2 = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
+                                   freq=freq_min, nhours=nhours_2,
+                                   cache_dir=self.cache_dir)
+            sysy = pd.merge(tm.df_hoy_soy[['sy', 'hy']],
+                            tm_2.df_hoy_soy[['sy', 'hy']]
+                                .rename(columns={'sy': 'sy2'}),
+                            on='hy')[['sy', 'sy2']].drop_duplicates()
+            list_sysy.append(sysy.assign(tm_id=tm_id, tm_2_id=tm_2_id))
+
+        sysymap = pd.concat(list_sysy, sort=False)
 
         self.df_sysy_ndcnn = pd.merge(
                 df_ndcnn[['nd_id', 'nd_2_id', 'ca_id', 'tm_id', 'tm_2_id']],
                 sysymap, on=['tm_id', 'tm_2_id'], how='outer')
 
-        self.dict_sysy = {**self.df_sysy_ndcnn.groupby(['nd_id', 'nd_2_id', 'sy']).sy2.apply(lambda x: set((*x,))).to_dict(),
-                          **self.df_sysy_ndcnn.groupby(['nd_2_id', 'nd_id', 'sy2']).sy.apply(lambda x: set((*x,))).to_dict()}
+        def get_set_dict(df, cols_key, col_val):
+            ''' Groups ``col_val`` by ``cols_key`` through a sorted split. '''
 
-        self.df_symin_ndcnn = self.df_sysy_ndcnn.join(df_ndcnn.set_index(['nd_id', 'nd_2_id'])[['nhours', 'nhours_2']], on=['nd_id', 'nd_2_id'])
+            df = df[cols_key + [col_val]].drop_duplicates()
+            df = df.sort_values(cols_key)
+            keys = df[cols_key].values
+            vals = df[col_val].values
 
-        idx = ['nd_id', 'nd_2_id']
-        cols = ['sy', 'sy2', 'tm_2_id', 'ca_id', 'tm_id', 'nhours', 'nhours_2']
-        list_df = []
-        for nd_id, nd_2_id in set(self.df_symin_ndcnn.set_index(idx).index.values):
-            df = self.df_symin_ndcnn.set_index(idx).loc[[(nd_id, nd_2_id)], cols]
+            if not len(keys):
+                return {}
+
+            is_new = np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]
+            idx_new = np.flatnonzero(is_new)
+
+            return {tuple(key): set(val) for key, val
+                    in zip(keys[idx_new].tolist(),
+                           np.split(vals, idx_new[1:]))}
 
-            nd_smaller = df.nhours.iloc[0] <= df.nhours_2.iloc[0]
-            list_df.append(df.assign(symin = df.sy if nd_smaller else df.sy2,
-                                     tm_min_id = df.tm_id if nd_smaller
-                                                 else df.tm_2_id))
+        self.dict_sysy = {**get_set_dict(self.df_sysy_ndcnn,
+                                         ['nd_id', 'nd_2_id', 'sy'], 'sy2'),
+                          **get_set_dict(self.df_sysy_ndcnn,
+                                         ['nd_2_id', 'nd_id', 'sy2'], 'sy')}
+
+        df_symin = self.df_sysy_ndcnn.join(
+                df_ndcnn.set_index(['nd_id', 'nd_2_id'])[['tm_min_id']]
+                        .assign(nd_smaller=nd_smaller),
+                on=['nd_id', 'nd_2_id'])
+
+        df_symin['symin'] = np.where(df_symin.nd_smaller,
+                                     df_symin.sy, df_symin.sy2)
 
         cols = ['tm_min_id', 'symin', 'nd_id', 'nd_2_id', 'ca_id']
-        self.df_symin_ndcnn = pd.concat(list_df).reset_index()[cols]
+        self.df_symin_ndcnn = (df_symin[cols].drop_duplicates()
+                                             .reset_index(drop=True))
 
     def _init_time_map_input(self):
         '''
@@ -706,10 +955,22 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                               {val: key for key, val in dict_tm.items()}[tm]
                               for nd, tm in self._dict_nd_tm.items()}
 
-        self._tm_objs = {tm_id:
-                   timemap.TimeMap(tm_filt=self.tm_filt,
-                                   nhours=frnh[1], freq=frnh[0])
-                   for tm_id, frnh in dict_tm.items()}
+        if self.repr_periods and self.adaptive_slices:
+            raise ValueError('The model attributes repr_periods and '
+                             'adaptive_slices are mutually exclusive.')
+
+        if (self.repr_periods or self.adaptive_slices) and len(dict_tm) > 1:
+            raise ValueError('Profile-based time maps require a uniform '
+                             'time resolution of all nodes. Got nhours=%s.'
+                             %self.nhours)
+
+        self._tm_objs = {tm_id: self._get_time_map_obj(*frnh)
+                         for tm_id, frnh in dict_tm.items()}
+
+        # first -> last time slot of representative periods
+        self.dict_tm_sy_prev = {tm_id: tm.dict_sy_prev
+                                for tm_id, tm in self._tm_objs.items()
+                                if hasattr(tm, 'dict_sy_prev')}
 
         self.df_def_node['tm_id'] = (self.df_def_node.reset_index().nd_id
                                          .replace(self.dict_nd_tm_id).values)
@@ -728,19 +989,7 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                         for tm_id, tm in self._tm_objs.items()]
         self.df_hoy_soy = pd.concat(list_hoy_soy, axis=0)
 
-        df = self.df_tm_soy
-
-        # get dictionaries month/week <-> time slots;
-        # these are used in the constraint definitions
-        cl, nm = ('wk_id', 'week')
-        for cl, nm in [('wk_id', 'week'), ('mt_id', 'month')]:
-
-            dct = df.pivot_table(index=['tm_id', cl],
-                                 values='sy', aggfunc=list).sy.to_dict()
-            setattr(self, 'dict_' + nm + '_soy', dct)
-
-            dct = df.set_index(['tm_id', 'sy'])[cl].to_dict()
-            setattr(self, 'dict_soy_' + nm, dct)
+        self._init_soy_dicts()
 
 
         # dict pp_id -> tm
@@ -759,6 +1008,93 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         self._make_minimum_time_map()
 
 
+    def _init_soy_dicts(self):
+        '''
+        Generates the dictionaries month/week <-> time slots from the
+        ``df_tm_soy`` table; these are used in the constraint definitions.
+
+        Generated attributes: ``dict_week_soy``, ``dict_soy_week``,
+        ``dict_month_soy``, ``dict_soy_month``
+
+        '''
+
+        df = self.df_tm_soy
+
+        for cl, nm in [('wk_id', 'week'), ('mt_id', 'month')]:
+
+            dct = df.pivot_table(index=['tm_id', cl],
+                                 values='sy', aggfunc=list).sy.to_dict()
+            setattr(self, 'dict_' + nm + '_soy', dct)
+
+            dct = df.set_index(['tm_id', 'sy'])[cl].to_dict()
+            setattr(self, 'dict_soy_' + nm, dct)
+
+    def _get_time_map_obj(self, freq, nhours):
+        '''
+        Returns a time map object for the given time resolution.
+
+        This is a :class:`grimsel.auxiliary.timemap.RepresentativeTimeMap`
+        or :class:`grimsel.auxiliary.timemap.AdaptiveTimeMap` if the
+        ``repr_periods`` or ``adaptive_slices`` model attributes are set,
+        else a :class:`grimsel.auxiliary.timemap.TimeMap`.
+
+        '''
+
+        if self.adaptive_slices:
+            return timemap.AdaptiveTimeMap(
+                        df_prof=self._get_profile_features(),
+                        nhours=nhours, freq=freq, tm_filt=self.tm_filt,
+                        **self.adaptive_slices)
+
+        if not self.repr_periods:
+            return timemap.TimeMap(tm_filt=self.tm_filt,
+                                   nhours=nhours, freq=freq,
+                                   cache_dir=self.cache_dir)
+
+        return timemap.RepresentativeTimeMap(
+                        df_prof=self._get_profile_features(),
+                        nhours=nhours, freq=freq, tm_filt=self.tm_filt,
+                        **self.repr_periods)
+
+    def _get_profile_features(self):
+        '''
+        Joint hourly profile table used for the profile-based time maps.
+
+        Returns
+        -------
+        pandas.DataFrame
+            index *hy*, one column per non-constant demand, supply, inflow,
+            chp, and price profile
+
+        '''
+
+        list_prof = [('df_profdmnd', ['dmnd_pf_id']),
+                     ('df_profsupply', ['supply_pf_id']),
+                     ('df_profinflow', ['pp_id', 'ca_id']),
+                     ('df_profchp', ['nd_id', 'ca_id']),
+                     ('df_profprice', ['price_pf_id'])]
+
+        list_df = []
+        for name_df, cols in list_prof:
+
+            df = getattr(self, name_df, None)
+            if df is None or df.empty:
+                continue
+
+            df = df.pivot_table(index='hy', columns=cols, values='value',
+                                aggfunc=np.mean)
+            df.columns = ['%s_%s'%(name_df, '_'.join(map(str, c))
+                                   if isinstance(c, tuple) else c)
+                          for c in df.columns]
+            list_df.append(df)
+
+        if not list_df:
+            raise ValueError('Profile-based time map: no profile data found.')
+
+        df = pd.concat(list_df, axis=1, sort=True)
+
+        return df.loc[:, df.max() > df.min()]
+
     def _make_minimum_time_map(self):
         '''
         Generate table mapping all time maps to the minimum time map.
@@ -841,6 +1177,11 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
             sy_null = self.df_plant_month.sy.isnull()
             self.df_plant_month = self.df_plant_month.loc[-sy_null]
 
+            if self.repr_periods:
+                # several months can start in the same representative period
+                self.df_plant_month = self.df_plant_month.drop_duplicates(
+                                                    ['pp_id', 'sy'])
+
 
     def map_to_time_res(self):
         '''
@@ -851,6 +1192,10 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         Also generates dictionaries which contain all slot ids for each
         week/month and vice versa.
 
+        The time-mapped profile tables are cached on disk if a cache
+        directory is set (model attribute ``cache_dir``); see
+        :func:`_map_profile_cached`.
+
         Raises
         ------
         ValueError
@@ -894,11 +1239,191 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                 df_tbsoy = getattr(self, name_df)
 
                 setattr(self, 'df_prof' + itb + '_soy',
-                        self.map_profile_to_time_resolution(df=df_tbsoy,
-                                                            idx=idx, itb=itb))
+                        self._map_profile_cached(df=df_tbsoy,
+                                                 idx=idx, itb=itb))
 
         self._get_maximum_demand()
 
+        if self.narrow_dtypes:
+            self.apply_dtype_policy()
+
+    def _map_profile_cached(self, df, idx, itb):
+        '''
+        Cached version of :func:`map_profile_to_time_resolution`.
+
+        The cache key is the hash of the input profile table and of all
+        model attributes the mapping depends on: the time map tables
+        (i.e. ``nhours``, ``tm_filt``, and profile-based time maps), the
+        time map ids of nodes and plants, and the profile id registry.
+
+        '''
+
+        cache_dir = aux_cache.get_cache_dir(self.cache_dir)
+
+        if not cache_dir:
+            return self.map_profile_to_time_resolution(df=df, idx=idx,
+                                                       itb=itb)
+
+        dict_tm_nhours = ({tm_id: tm.nhours
+                           for tm_id, tm in self._tm_objs.items()}
+                          if self.repr_periods or self.adaptive_slices
+                          else None)
+
+        key = aux_cache.get_key(df, idx, self.df_hoy_soy,
+                                self.df_tm_soy[['sy', 'tm_id', 'weight']],
+                                self.dict_pp_tm_id, self.dict_nd_tm_id,
+                                self.pf_registry, dict_tm_nhours)
+
+        df_soy = aux_cache.read(cache_dir, 'prof%s_soy'%itb, key)
+
+        if df_soy is None:
+            df_soy = self.map_profile_to_time_resolution(df=df, idx=idx,
+                                                         itb=itb)
+            aux_cache.write(df_soy, cache_dir, 'prof%s_soy'%itb, key)
+
+        return df_soy
+
+    def apply_dtype_policy(self, list_df=None):
+        '''
+        Casts the model's DataFrame attributes to memory-efficient types.
+
+        Uses :func:`grimsel.auxiliary.aux_dtypes.narrow_dtypes`. Profile
+        ``value`` columns are cast to ``float32`` if the model attribute
+        ``float32_profiles`` is True.
+
+        Parameters
+        ----------
+        list_df : list of str
+            names of the DataFrame attributes; default: time maps and
+            profile tables mapped to the time resolution
+
+        '''
+
+        if list_df is None:
+            list_df = ['df_tm_soy', 'df_tm_soy_full', 'df_hoy_soy',
+                       'df_sysy_ndcnn', 'df_symin_ndcnn']
+            list_df += [name for name in vars(self)
+                        if name.startswith('df_prof')
+                        and name.endswith('_soy')]
+
+        for name in list_df:
+
+            df = getattr(self, name, None)
+            float32_cols = (['value'] if self.float32_profiles
+                            and name.startswith('df_prof') else [])
+
+            setattr(self, name,
+                    aux_dtypes.narrow_dtypes(df, float32_cols=float32_cols))
+
+    def get_slim_keep(self):
+        '''
+        Returns the set of attribute names required after the model build.
+
+        Combines all lists of the module dictionary :data:`SLIM_KEEP` and the
+        model attribute ``slim_keep``.
+
+        '''
+
+        return set(sum(SLIM_KEEP.values(), [])) | set(self.slim_keep)
+
+    def release_build_data(self):
+        '''
+        Releases build-time data after the model construction.
+
+        Only performed if the model attribute ``slim`` is True. Released are
+
+        * all ``df_*`` DataFrame attributes, except for those returned by
+          :func:`get_slim_keep`
+        * the intermediate dictionaries :data:`SLIM_RELEASE`
+        * the hourly tables of the :class:`grimsel.auxiliary.timemap.TimeMap`
+          objects
+        * the source DataFrames of the
+          :class:`grimsel.core.parameters.ParameterAdder` objects (the
+          parameter data required by :func:`reset_all_parameters` is kept)
+
+        Released attributes are set to ``None``. If the model attribute
+        ``slim_spill_dir`` is set, they are pickled to this directory first
+        and can be reloaded using :func:`restore_build_data`.
+
+        Returns
+        -------
+        pandas.Series
+            freed memory of the released DataFrames in MB
+
+        '''
+
+        if not self.slim:
+            return pd.Series(dtype=float)
+
+        rss_0 = aux_dtypes.get_rss()
+        df_mem_0 = aux_dtypes.get_df_memory(self)
+
+        keep = self.get_slim_keep()
+        list_release = [name for name, val in vars(self).items()
+                        if (name.startswith('df_')
+                            and isinstance(val, pd.DataFrame))
+                        or name in SLIM_RELEASE]
+        list_release = [name for name in list_release
+                        if not name in keep
+                        and getattr(self, name) is not None]
+
+        if self.slim_spill_dir:
+            os.makedirs(self.slim_spill_dir, exist_ok=True)
+
+        self.dict_slim_spilled = getattr(self, 'dict_slim_spilled', {})
+        for name in list_release:
+            if self.slim_spill_dir:
+                fn = os.path.join(self.slim_spill_dir, '%s.pickle'%name)
+                pd.to_pickle(getattr(self, name), fn)
+                self.dict_slim_spilled[name] = fn
+            setattr(self, name, None)
+
+        for tm in getattr(self, '_tm_objs', {}).values():
+            for name in ['df_time_map', 'df_time_red', 'df_hoy_soy']:
+                setattr(tm, name, None)
+
+        for par in getattr(self, 'dict_par', {}).values():
+            if isinstance(par.source_dataframe, pd.DataFrame):
+                par.source_dataframe = None
+
+        gc.collect()
+
+        df_mem_freed = df_mem_0.reindex(list_release).dropna()
+        self.slim_freed = {'df_memory': df_mem_freed.sum(),
+                           'rss': rss_0 - aux_dtypes.get_rss()}
+
+        logger.info('release_build_data: Released %d attributes%s; '
+                    'DataFrame memory freed: %.1f MB; RSS change: %.1f MB'
+                    %(len(list_release),
+                      (' (spilled to %s)'%self.slim_spill_dir
+                       if self.slim_spill_dir else ''),
+                      self.slim_freed['df_memory'], -self.slim_freed['rss']))
+
+        return df_mem_freed
+
+    def restore_build_data(self, list_names=None):
+        '''
+        Reloads attributes spilled to disk by :func:`release_build_data`.
+
+        Parameters
+        ----------
+        list_names : list of str
+            names of the attributes; default: all spilled attributes
+
+        '''
+
+        dict_spilled = getattr(self, 'dict_slim_spilled', {})
+
+        if list_names is None:
+            list_names = list(dict_spilled)
+
+        for name in list_names:
+            if not name in dict_spilled:
+                raise ValueError('Attribute %s was not spilled to disk. '
+                                 'Add it to the model attribute slim_keep '
+                                 'instead.'%name)
+            setattr(self, name, pd.read_pickle(dict_spilled[name]))
+
 
     def _add_tm_columns(self, df):
         '''
@@ -943,12 +1468,12 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         if 'pp_id' in df.columns:
 
             dct_p2tm = self.dict_pp_tm_id
-            df['tm_id'] = df.pp_id.replace(dct_p2tm)
+            df['tm_id'] = df.pp_id.map(dct_p2tm)
 
         elif 'nd_id' in df.columns:
 
             dct_n2tm = self.dict_nd_tm_id
-            df['tm_id'] = df.nd_id.replace(dct_n2tm)
+            df['tm_id'] = df.nd_id.map(dct_n2tm)
 
         return df[cols + ['tm_id']]
 
@@ -1026,6 +1551,10 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         
         # Adding weight to compare with input data
         df_hoy_soy_1 = pd.merge(self.df_hoy_soy,self.df_tm_soy[['sy','tm_id','weight']], on=['sy','tm_id'])
+        if self.repr_periods or self.adaptive_slices:
+            # weights of profile-based time maps are not nominal durations
+            df_hoy_soy_1['weight'] = df_hoy_soy_1.tm_id.map(
+                    {tm_id: tm.nhours for tm_id, tm in self._tm_objs.items()})
         ind = ['hy', 'tm_id']
         df[ind] = df[ind].astype(float)
         df = df.join(df_hoy_soy_1.set_index(ind), on=ind)
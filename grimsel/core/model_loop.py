@@ -2,6 +2,7 @@
 Module doc
 '''
 import os
+import re
 from multiprocess import Lock, Pool, current_process
 import numpy as np
 import pandas as pd
@@ -13,9 +14,13 @@ import fastparquet as pq
 
 import grimsel.core.model_base as model_base
 import grimsel.core.io as io
+import grimsel.core.results_store as results_store
+import grimsel.core.memoization as memoization
+import grimsel.core.solver_stats as solver_stats
 import grimsel.core.model_loop_modifier as model_loop_modifier
 import grimsel.auxiliary.sqlutils.aux_sql_func as aql
 import grimsel.auxiliary.maps as maps
+import grimsel.auxiliary.aux_dtypes as aux_dtypes
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
@@ -57,13 +62,29 @@ class ModelLoop():
         Keyword arguments:
         nsteps -- list of model loop dimensions and steps; format:
                   (name::str, number_of_steps::int, type_of_steps::function)
+        results_store -- :class:`grimsel.core.results_store.ResultsStore`
+                         keeping output tables of recent runs in memory;
+                         see :func:`get_run_results`
+        retry_policy -- :class:`grimsel.core.run_control.RetryPolicy`
+                        repeating failed solves in :func:`perform_model_run`
+                        with different solver options
+        memo_catalog -- :class:`grimsel.core.memoization.MemoCatalog`;
+                        runs with the same model state as a run in the
+                        catalog copy its results instead of being solved
+        solver_stats -- write the solver statistics of each run to the
+                        def_solver_stats table (default False); see
+                        :mod:`grimsel.core.solver_stats`
         '''
 
         defaults = {
                     'nsteps': [],
                     'mkwargs': {},
                     'iokwargs': {},
-                    'full_setup': True
+                    'full_setup': True,
+                    'results_store': None,
+                    'retry_policy': None,
+                    'memo_catalog': None,
+                    'solver_stats': False,
                     }
 
         for key, val in defaults.items():
@@ -71,13 +92,24 @@ class ModelLoop():
         self.__dict__.update(kwargs)
 
         self.run_id = None  # set later
+        # name for the worker def_run files; set by work queue workers
+        self.worker_name = None
+        # hash of the model components for the memoization; set lazily
+        self._memo_structure_key = None
         self.__runlevel_state = -1
 
+        # resident set size (MB) after each runlevel; -1: before build
+        self.dict_runlevel_rss = {-1: aux_dtypes.get_rss()}
+
         self.m = model_base.ModelBase(**self.mkwargs)
 
         self.iokwargs.update({'model': self.m})
         self.io = io.IO(**self.iokwargs)
 
+        if self.results_store is not None:
+            self.results_store.io = self.io
+            self.io.modwr.results_store = self.results_store
+
         self.init_run_table()
         self.select_run(0)
 
@@ -101,16 +133,18 @@ class ModelLoop():
 
     _dict_runlevels = {
             0: 'io.read_model_data',
-            1: 'm.init_maps',
-            2: 'm.map_to_time_res',
-            3: 'io.write_runtime_tables',
-            4: 'm.get_setlst',
-            5: 'm.define_sets',
-            6: 'm.add_parameters',
-            7: 'm.define_variables',
-            8: 'm.add_all_constraints',
-            9: 'm.init_solver',
-            10: 'io.init_output_tables'}
+            1: 'm.aggregate_input',
+            2: 'm.init_maps',
+            3: 'm.map_to_time_res',
+            4: 'io.write_runtime_tables',
+            5: 'm.get_setlst',
+            6: 'm.define_sets',
+            7: 'm.add_parameters',
+            8: 'm.presolve_sets',
+            9: 'm.define_variables',
+            10: 'm.add_all_constraints',
+            11: 'm.init_solver',
+            12: 'io.init_output_tables'}
 
 
     def build_model(self, to_runlevel='full'):
@@ -120,14 +154,27 @@ class ModelLoop():
 
         Parameters
         ----------
-        to_runlevel : str, one of `['full', 'input_data']`
+        to_runlevel : str, one of `['full', 'runtime_tables', 'input_data',
+                      'maps']`
+            `'maps'`: stop after reading the input data and initializing
+            the maps, prior to the time resolution mapping; e.g. to
+            estimate the model size (see
+            :class:`grimsel.core.model_size.ModelSize`)
             `'input_data'`: stop after reading all input data; allows to
             make modifications to the input dataframes
+            `'runtime_tables'`: stop after writing the time map dependent
+            runtime tables; e.g. to restrict the model time slots (see
+            :class:`grimsel.core.rolling_horizon.RollingHorizon`)
             `'full'`: complete construction of the model; allows to
             make modications to the Pyomo components
+
+        After the complete construction, build-time tables are released
+        if the model attribute ``slim`` is True (see
+        :func:`grimsel.core.model_base.ModelBase.release_build_data`).
         '''
 
-        dict_to_runlevel = {'input_data': 2, 'full': 10}
+        dict_to_runlevel = {'maps': 2, 'input_data': 3, 'runtime_tables': 4,
+                            'full': 12}
 
         assert to_runlevel in dict_to_runlevel, (
                 f'Unknown to_runlevel level \'{to_runlevel}\'. '
@@ -153,16 +200,26 @@ class ModelLoop():
             func()
             self._runlevel_state = runlevel
 
+            rss = aux_dtypes.get_rss()
+            rss_diff = rss - self.dict_runlevel_rss[runlevel - 1]
+            self.dict_runlevel_rss[runlevel] = rss
+            logger.info(f'ModelLoop.build_model: RSS after runlevel '
+                        f'{runlevel}: {rss:.1f} MB ({rss_diff:+.1f} MB)')
 
-    def init_run_table(self):
+        if (_dict_runlevel_slct
+                and self._runlevel_state == dict_to_runlevel['full']):
+            self.m.release_build_data()
+
+
+    def get_step_levels(self):
         '''
-        Initializes the ``df_def_run`` table by expanding the ``nsteps`` list.
+        Values of each loop dimension as defined by ``nsteps``.
 
-        Expands the ``nsteps`` parameter to the corresponding DataFrame.
-        The resulting attribute ``df_def_run`` contains all relevant
-        combinations of the model change indices as defined in ``nsteps``.
+        Returns
+        -------
+        list of lists of float
+            one list of step values for each item of ``nsteps``
 
-        Also initializes the output ``def_run`` table, if required.
         '''
 
         for istep in self.nsteps:
@@ -181,7 +238,22 @@ class ModelLoop():
         list_steps = [list(getfunc(istep)(*istep[3:], istep[1]))
                       for istep in _nsteps]
 
-        list_steps = [list(map(float, lst)) for lst in list_steps]
+        return [list(map(float, lst)) for lst in list_steps]
+
+    def init_run_table(self):
+        '''
+        Initializes the ``df_def_run`` table by expanding the ``nsteps`` list.
+
+        Expands the ``nsteps`` parameter to the corresponding DataFrame.
+        The resulting attribute ``df_def_run`` contains all relevant
+        combinations of the model change indices as defined in ``nsteps``.
+        Subsets of these combinations are generated by the samplers in
+        :mod:`grimsel.auxiliary.sampling`.
+
+        Also initializes the output ``def_run`` table, if required.
+        '''
+
+        list_steps = self.get_step_levels()
         full_steps = np.array([tuple(reversed(lst)) for lst in
                       list(itertools.product(*list(reversed(list_steps))))])
         list_index = [list(range(len(i))) for i in list_steps]
@@ -189,7 +261,7 @@ class ModelLoop():
                       list(itertools.product(*list(reversed(list_index))))])
         full_all = np.concatenate([full_index, full_steps,
                                    float('nan')*full_index], axis=1)
-        self.cols_step = [ist[0] for ist in _nsteps]
+        self.cols_step = [ist[0] for ist in self.nsteps]
         self.cols_id = [c + '_id' for c in self.cols_step]
         self.cols_val = [c + '_vl' for c in self.cols_step]
         cols_all = self.cols_id + self.cols_step + self.cols_val
@@ -255,17 +327,20 @@ class ModelLoop():
 
         return df_add.astype(dtypes)
 
-    def get_def_run_name(self):
+    def get_def_run_name(self, tb='def_run'):
 
         # if multiprocessing, locked writing to common parquet file has
         # too much overhead for small models. Therefore writing to files
         # by worker + later merge
-        if current_process().name == 'MainProcess':
+        if self.worker_name:
+            suffix = '_' + self.worker_name
+            fn = os.path.join(self.io.cl_out, '%s%s.csv'%(tb, suffix))
+        elif current_process().name == 'MainProcess':
             suffix = ''
-            fn = os.path.join(self.io.cl_out, 'def_run%s.parq'%suffix)
+            fn = os.path.join(self.io.cl_out, '%s%s.parq'%(tb, suffix))
         elif current_process().name.startswith('ForkPoolWorker'):
             suffix = '_' + current_process().name
-            fn = os.path.join(self.io.cl_out, 'def_run%s.csv'%suffix)
+            fn = os.path.join(self.io.cl_out, '%s%s.csv'%(tb, suffix))
         else:
             raise ValueError('Unexpected current_process name'
                              ' %s'%current_process().name)
@@ -285,18 +360,37 @@ class ModelLoop():
 
         df_add = self._get_row_df_run(**kwargs)
 
+        self.append_to_table('def_run', df_add)
+
+    def append_to_table(self, tb, df_add):
+        '''
+        Appends rows to a run information table next to ``def_run``.
+
+        Used for ``def_run`` itself and for additional per-run tables
+        (e.g. convergence statistics). The rows are written even if the
+        io ``no_output`` option is set.
+
+        Parameters
+        ----------
+        tb : str
+            table name
+        df_add : pandas.DataFrame
+            rows to be appended
+
+        '''
+
         # can't use io method here if we want this to happen when no_output
         if self.io.modwr.output_target == 'psql':
             aql.write_sql(df_add, self.io.sql_connector.db,
-                          self.io.cl_out, 'def_run', 'append')
+                          self.io.cl_out, tb, 'append')
         elif self.io.modwr.output_target == 'hdf5':
             with pd.HDFStore(self.io.cl_out, mode='a') as store:
-                store.append('def_run', df_add, data_columns=True,
+                store.append(tb, df_add, data_columns=True,
                              min_itemsize=150 # set string length!
                              )
         elif self.io.modwr.output_target == 'fastparquet':
 
-            fn, csv_def_run = self.get_def_run_name()
+            fn, csv_def_run = self.get_def_run_name(tb)
 
             if not csv_def_run:
                 pq.write(fn, df_add, append=os.path.isfile(fn))
@@ -313,21 +407,79 @@ class ModelLoop():
             raise ValueError('Unknown output_target '
                              '%s'%self.io.modwr.output_target)
 
+    def delete_from_table(self, tb, run_id):
+        '''
+        Deletes the rows of a run from a table written by
+        :func:`append_to_table`.
+
+        Used for the tables which aren't covered by
+        :func:`grimsel.core.io.IO.delete_run_id` when runs are replaced.
+        Missing tables are ignored.
+
+        Parameters
+        ----------
+        tb : str
+            table name
+        run_id : int
+            run whose rows are deleted
+
+        '''
+
+        if self.io.modwr.output_target == 'psql':
+            db = self.io.sql_connector.db
+            if tb in aql.get_sql_tables(self.io.cl_out, db):
+                aql.exec_sql('DELETE FROM {sc}.{tb} WHERE run_id = {run_id};'
+                             .format(sc=self.io.cl_out, tb=tb,
+                                     run_id=run_id), ret_res=False, db=db)
+        elif self.io.modwr.output_target == 'hdf5':
+            with pd.HDFStore(self.io.cl_out, mode='a') as store:
+                if tb in store:
+                    store.remove(tb, where='run_id == %d'%run_id)
+        elif self.io.modwr.output_target == 'fastparquet':
+
+            fn, csv_def_run = self.get_def_run_name(tb)
+
+            if os.path.isfile(fn):
+                df = (pd.read_csv(fn) if csv_def_run
+                      else pd.read_parquet(fn))
+                df = df.loc[df.run_id != run_id]
+                if csv_def_run:
+                    df.to_csv(fn, index=False)
+                else:
+                    pq.write(fn, df)
+
+        else:
+            raise ValueError('Unknown output_target '
+                             '%s'%self.io.modwr.output_target)
+
 
     def _merge_df_run_files(self):
         '''
         Merge all files with name out_dir/def_run_ForkPoolWorker-%d into single
-        def_run.
+        def_run. Same for the other tables written by
+        :func:`append_to_table` and for the files of the work queue workers
+        (out_dir/def_run_QueueWorker-host-pid,
+        see :mod:`grimsel.auxiliary.work_queue`).
         '''
 
-        list_fn = glob(os.path.join(self.io.cl_out,
-                                    'def_run_ForkPoolWorker-[0-9]*.csv'))
+        list_fn = (glob(os.path.join(self.io.cl_out,
+                                     '*_ForkPoolWorker-[0-9]*.csv'))
+                   + glob(os.path.join(self.io.cl_out,
+                                       '*_QueueWorker-*.csv')))
+
+        dict_tb_fn = {}
+        for fn in list_fn:
+            tb = re.split('_ForkPoolWorker-|_QueueWorker-',
+                          os.path.basename(fn))[0]
+            dict_tb_fn.setdefault(tb, []).append(fn)
+
+        for tb, list_fn_tb in dict_tb_fn.items():
 
-        df_def_run = pd.concat(pd.read_csv(fn) for fn in list_fn)
-        df_def_run = df_def_run.sort_values('run_id').reset_index(drop=True)
+            df_tb = pd.concat(pd.read_csv(fn) for fn in list_fn_tb)
+            df_tb = df_tb.sort_values('run_id').reset_index(drop=True)
 
-        fn = os.path.join(self.io.cl_out, 'def_run.parq')
-        pq.write(fn, df_def_run, append=False)
+            fn = os.path.join(self.io.cl_out, '%s.parq'%tb)
+            pq.write(fn, df_tb, append=False)
 
 
     def _print_run_title(self, warmstartfile, solutionfile):
@@ -362,6 +514,78 @@ class ModelLoop():
         return df
 
 
+    def get_run_id(self, **offsets):
+        '''
+        run_id of a model run relative to the current one.
+
+        Resolved from the in-memory ``df_def_run`` table; this works in
+        the worker processes without access to the written ``def_run``
+        table of the other workers.
+
+        Parameters
+        ----------
+        offsets :
+            offsets of the step indices (``*_id`` columns of
+            ``df_def_run``) by step name, e.g. ``swfy=-1`` for the run with
+            the previous ``swfy`` step and identical other steps; see
+            :func:`grimsel.core.model_loop_modifier.depends_on`
+
+        Returns
+        -------
+        int
+
+        Raises
+        ------
+        ValueError
+            If the run is not part of ``df_def_run``.
+
+        '''
+
+        dct_id = {col: val + offsets.get(col[:-len('_id')], 0)
+                  for col, val in self.dct_id.items()}
+
+        mask = np.logical_and.reduce([self.df_def_run[col] == val
+                                      for col, val in dct_id.items()])
+        list_run_id = self.df_def_run.loc[mask, 'run_id'].tolist()
+
+        if len(list_run_id) != 1:
+            raise ValueError('ModelLoop.get_run_id: Found %d runs with step '
+                             'indices %s'%(len(list_run_id), dct_id))
+
+        return int(list_run_id[0])
+
+    def get_run_results(self, tb, run_id):
+        '''
+        Output table rows of earlier model runs.
+
+        Taken from the ``results_store`` if available, otherwise read from
+        the output collection.
+
+        Parameters
+        ----------
+        tb : str
+            output table name, e.g. ``'var_yr_cap_pwr_new'``
+        run_id : int or list of int
+            model runs
+
+        Returns
+        -------
+        pandas.DataFrame
+
+        '''
+
+        list_run_id = [run_id] if np.isscalar(run_id) else list(run_id)
+
+        if self.results_store is not None:
+            list_df = [self.results_store.get(tb, int(run_id))
+                       for run_id in list_run_id]
+        else:
+            list_df = [results_store.read_output_table(self.io, tb,
+                                                       int(run_id))
+                       for run_id in list_run_id]
+
+        return pd.concat(list_df, ignore_index=True, sort=False)
+
     def get_list_run_id(self):
 
         return list(range(self.io.resume_loop,
@@ -378,19 +602,46 @@ class ModelLoop():
 
         """
 
+        if self.memo_catalog is not None:
+            if self._memo_structure_key is None:
+                self._memo_structure_key = \
+                        memoization.get_structure_key(self.m)
+            memo_key = memoization.get_state_key(self.m,
+                                                 self._memo_structure_key)
+            if memoization.reuse_run(self, memo_key):
+                return
+
         t = time.time()
 
         with self.m.temp_files() as (tmp_dir, logf, warmf, solnf):
 
             self._print_run_title(self.m.warmstartfile, self.m.solutionfile)
-            self.m.run(warmstart=warmstart, tmp_dir=tmp_dir,
-                       logf=logf, warmf=warmf, solnf=solnf)
+            if self.retry_policy:
+                # nothing is written if all attempts fail
+                nattempts = self.retry_policy.solve(self.m,
+                                                    warmstart=warmstart,
+                                                    tmp_dir=tmp_dir,
+                                                    logf=logf, warmf=warmf,
+                                                    solnf=solnf)
+            else:
+                self.m.run(warmstart=warmstart, tmp_dir=tmp_dir,
+                           logf=logf, warmf=warmf, solnf=solnf)
+                nattempts = 1
             tdiff_solve = time.time() - t
             stat = ('Solver: ' + str(self.m.results.Solver[0]['Termination condition']))
+            if nattempts > 1:
+                stat += ' (attempt %d)'%nattempts
+
+            if self.solver_stats:
+                # the solver log is removed with the temporary files
+                df_stats = solver_stats.get_solver_stats(self.m, self.run_id,
+                                                         nattempts)
 
             if self.io.replace_runs_if_exist and self.io.resume_loop:
 
                 self.io.delete_run_id(self.run_id, operator='=')
+                if self.solver_stats:
+                    self.delete_from_table('def_solver_stats', self.run_id)
 
             # append to output tables
             t = time.time()
@@ -401,6 +652,12 @@ class ModelLoop():
             self.append_row(info=stat,
                             tdiff_solve=tdiff_solve, tdiff_write=tdiff_write)
 
+            if self.solver_stats:
+                self.append_to_table('def_solver_stats', df_stats)
+
+            if self.memo_catalog is not None:
+                memoization.record_run(self, memo_key)
+
 
 
 
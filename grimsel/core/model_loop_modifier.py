@@ -6,6 +6,79 @@ Created on Fri Jul  6 11:23:06 2018
 """
 
 
+def depends_on(**offsets):
+    '''
+    Declares that a modifier method uses the results of earlier runs.
+
+    Decorator for the methods of model loop modifier classes. The runs
+    depended on have the same loop steps as the current run, except for the
+    given offsets of the step indices. Used by :func:`get_run_dependencies`.
+
+    Parameters
+    ----------
+    offsets : int
+        offsets of the step indices by step name, e.g. ``swfy=-1`` for the
+        run of the previous future year
+
+    '''
+
+    def decorator(f):
+        f.depends_on = offsets
+        return f
+
+    return decorator
+
+
+def get_run_dependencies(ml, modifier, methods=None):
+    '''
+    Run dependencies from the :func:`depends_on` declarations of a modifier.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop instance
+    modifier : object
+        model loop modifier instance
+    methods : list of str, optional
+        names of the methods called for each run; defaults to all declaring
+        methods of the modifier
+
+    Returns
+    -------
+    dict
+        ``{run_id: [run_ids depended on]}`` for all runs of ``df_def_run``;
+        runs whose step offsets fall outside of the loop have no
+        dependencies
+
+    '''
+
+    list_offsets = []
+    for name in dir(type(modifier)):
+        offsets = getattr(getattr(type(modifier), name), 'depends_on', None)
+        if offsets and (methods is None or name in methods):
+            list_offsets.append(offsets)
+
+    cols_id = [step + '_id' for step in ml.cols_step]
+    df_id = ml.df_def_run[['run_id'] + cols_id].astype(int)
+
+    dict_dep = {run_id: set() for run_id in df_id.run_id}
+
+    for offsets in list_offsets:
+
+        df_dep = df_id.copy()
+        for step, offset in offsets.items():
+            df_dep[step + '_id'] += offset
+
+        df_dep = df_dep.merge(df_id.rename(columns={'run_id': 'run_id_dep'}),
+                              on=cols_id)
+
+        for run_id, run_id_dep in zip(df_dep.run_id, df_dep.run_id_dep):
+            dict_dep[run_id].add(run_id_dep)
+
+    return {run_id: sorted(dep) for run_id, dep in dict_dep.items()}
+
+
+
 class ModelLoopModifier():
     '''
     The purpose of this class is to modify the parameters of the BaseModel
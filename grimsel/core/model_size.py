@@ -0,0 +1,596 @@
+'''
+Model size estimation
+======================
+
+Predicts the size of the optimization problem (number of variables,
+constraints, and nonzero coefficients per constraint group) and the memory
+and time required for the model build, without constructing any Pyomo
+components.
+
+The estimate only requires the input tables, i.e. a model after
+``ModelLoop.build_model('maps')``. The time slot counts follow from the
+:class:`grimsel.auxiliary.timemap.TimeMap` tables of each node's time
+resolution; all other set sizes are obtained from the same tables and
+columns as in :func:`grimsel.core.sets.Sets.define_sets`. The structure
+of the variables and constraints (index sets and terms per row) is encoded
+in :func:`ModelSize._get_variable_sizes` and
+:func:`ModelSize._get_constraint_sizes`; these need to be kept in sync
+with :mod:`grimsel.core.variables` and :mod:`grimsel.core.constraints`.
+
+Constraints which are skipped depending on parameter values (e.g.
+``hy_reservoir_boundary_conditions``) are estimated from the input tables.
+The plants removed by the model's ``presolve`` depend on the parameter
+values; they are included in the estimate, which is an upper bound in this
+case.
+
+The memory and build time estimates are linear in the component sizes;
+the coefficients :data:`MEMORY_COEFFS` and :data:`TIME_COEFFS` are
+empirical (Pyomo 5.7, CPython 3.8, 64 bit). The memory requirements of
+the solver are not included.
+
+Usage::
+
+    ml.build_model('maps')
+    ms = ModelSize(ml.m)
+    ms.df_size  # table by component
+    ms.summary  # totals, memory, build time
+
+    ml.m.nhours = select_nhours(ml.m, max_memory_mb=4000)
+    ml.build_model()
+
+'''
+
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import grimsel.auxiliary.timemap as timemap
+import grimsel.auxiliary.aux_dtypes as aux_dtypes
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# MB per variable, constraint, nonzero coefficient, and parameter value;
+# fitted to the build memory (RSS increase) of the example model at
+# nhours = 1 ... 24
+MEMORY_COEFFS = {'var': 3.0e-4, 'con': 4.0e-4, 'nnz': 1.05e-4, 'par': 2.0e-4}
+
+# build time in seconds per variable, constraint, nonzero coefficient, and
+# parameter value
+TIME_COEFFS = {'var': 1.0e-5, 'con': 4.0e-5, 'nnz': 1.5e-5, 'par': 1.0e-5}
+
+# candidate time resolutions of :func:`select_nhours`, finest first
+LIST_NHOURS = [1, 2, 3, 4, 6, 8, 12, 24, 48, 168]
+
+
+@contextmanager
+def _swap_attrs(obj, **kwargs):
+    ''' Temporarily sets the attributes ``kwargs`` of ``obj``. '''
+
+    dict_prev = {key: getattr(obj, key) for key in kwargs}
+    for key, val in kwargs.items():
+        setattr(obj, key, val)
+    try:
+        yield
+    finally:
+        for key, val in dict_prev.items():
+            setattr(obj, key, val)
+
+
+class ModelSize:
+    '''
+    Size estimate of a :class:`grimsel.core.model_base.ModelBase` model.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with the input tables; the time-mapped tables, sets,
+        and Pyomo components are not required
+    nhours : number, tuple, or dict
+        time resolution, see the :class:`ModelBase` ``nhours`` keyword
+        argument; defaults to the model's ``nhours``. If None and the
+        model is already mapped to its time resolution, the model's time
+        map tables are used.
+    tm_filt : list
+        time map filter; defaults to the model's ``tm_filt``
+
+    Attributes
+    ----------
+    df_size : pandas.DataFrame
+        one row per variable, constraint, and time-indexed parameter with
+        the columns *group*, *component*, *kind* (one of
+        ``{'var', 'con', 'par'}``), *size* (number of variables,
+        constraints, or parameter values), and *nnz* (nonzero coefficients
+        of the constraints)
+    summary : dict
+        totals ``nvar``, ``ncon``, ``nnz``, and ``npar``, the estimated
+        memory ``memory_mb`` (input tables plus Pyomo components), and the
+        estimated build time ``build_time_s`` (sets, parameters, variables,
+        and constraints)
+
+    '''
+
+    def __init__(self, m, nhours=None, tm_filt=None):
+
+        self.m = m
+        self.nhours = nhours
+        self.tm_filt = tm_filt if tm_filt is not None else m.tm_filt
+
+        if getattr(m, 'mps', None) is None:
+            m.init_maps()
+
+        self._init_time_slots()
+        self._init_tables()
+
+        self.df_size = self.get_table()
+        self.summary = self.get_summary(self.df_size)
+
+    def _init_time_slots(self):
+        '''
+        Number of time slots and months of each time map.
+
+        Generated attributes:
+            * ``dict_nd_tm`` (``dict``): ``nd_id -> tm_id``
+            * ``dict_tm_nsy`` (``dict``): ``tm_id -> number of time slots``
+            * ``dict_tm_mt`` (``dict``): ``tm_id -> set of months``
+            * ``dict_tm_hy`` (``dict``): ``tm_id -> set of hours of the year``
+
+        '''
+
+        m = self.m
+
+        if (self.nhours is None and getattr(m, 'df_tm_soy', None) is not None
+                and getattr(m, 'dict_nd_tm_id', None)):
+            # model is mapped to its time resolution
+            df = m.df_tm_soy
+            self.dict_nd_tm = dict(m.dict_nd_tm_id)
+            self.dict_tm_nsy = df.groupby('tm_id').sy.nunique().to_dict()
+            self.dict_tm_mt = (df.groupby('tm_id').mt_id
+                                 .apply(lambda x: set(x.dropna())).to_dict()
+                               if 'mt_id' in df.columns else {})
+            self.dict_tm_hy = (m.df_hoy_soy.groupby('tm_id').hy
+                                .apply(set).to_dict())
+            return
+
+        nhours = self.nhours if self.nhours is not None else m.nhours
+        dict_nd_frnh = m._get_nhours_nodes(nhours)
+        list_frnh = sorted(set(dict_nd_frnh.values()))
+
+        self.dict_nd_tm = {nd: list_frnh.index(frnh)
+                           for nd, frnh in dict_nd_frnh.items()}
+        self.dict_tm_nsy = {}
+        self.dict_tm_mt = {}
+        self.dict_tm_hy = {}
+
+        for tm_id, (freq, nhours) in enumerate(list_frnh):
+
+            if m.repr_periods or m.adaptive_slices:
+                # profile-based time maps are only generated through the
+                # model, they depend on the profiles
+                with _swap_attrs(m, tm_filt=self.tm_filt):
+                    tm = m._get_time_map_obj(freq, nhours)
+            else:
+                tm = timemap.TimeMap(nhours=nhours, freq=freq,
+                                     tm_filt=self.tm_filt, minimum=True,
+                                     cache_dir=m.cache_dir)
+
+            self.dict_tm_nsy[tm_id] = tm.df_time_red.sy.nunique()
+            self.dict_tm_mt[tm_id] = set(tm.df_time_red.mt_id)
+            self.dict_tm_hy[tm_id] = set(tm.df_hoy_soy.hy)
+
+    def _init_tables(self):
+        '''
+        Plant and node index tables with the number of time slots.
+
+        Generated attributes:
+            * ``setlst`` (``dict``): plant subsets, see
+              :func:`grimsel.core.sets.Sets.get_setlst`
+            * ``df_ppca`` (``DataFrame``): *pp_id, ca_id, nd_id, nsy*
+              (``ppall_ca``)
+            * ``df_ppndcafl`` (``DataFrame``): *pp_id, nd_id, ca_id, fl_id,
+              nsy* (``ppall_ndcafl``)
+            * ``df_ndca`` (``DataFrame``): *nd_id, ca_id, nsy*
+
+        '''
+
+        m = self.m
+
+        if getattr(m, 'setlst', None) is None:
+            m.get_setlst()
+        self.setlst = m.setlst
+
+        dict_nd_nsy = {nd: self.dict_tm_nsy[tm]
+                       for nd, tm in self.dict_nd_tm.items()}
+
+        df = m.df_plant_encar[['pp_id', 'ca_id']]
+        df = df.join(m.df_def_plant.set_index('pp_id')[['nd_id', 'fl_id']],
+                     on='pp_id')
+        df = df.loc[df.pp_id.isin(self.get_pp('ppall'))
+                    & df.nd_id.isin(self.dict_nd_tm)]
+        df = df.assign(nsy=df.nd_id.map(dict_nd_nsy))
+
+        self.df_ppca = df[['pp_id', 'ca_id', 'nd_id', 'nsy']]
+        self.df_ppndcafl = df.loc[df.fl_id.isin(self.setlst['fl']),
+                                  ['pp_id', 'nd_id', 'ca_id', 'fl_id', 'nsy']]
+
+        df = m.df_node_encar[['nd_id', 'ca_id']].drop_duplicates()
+        df = df.loc[df.nd_id.isin(self.dict_nd_tm)]
+        self.df_ndca = df.assign(nsy=df.nd_id.map(dict_nd_nsy))
+
+    def get_pp(self, *sets, exclude=()):
+        '''
+        Returns the union of plant sets ``sets`` minus the plant sets
+        ``exclude``.
+
+        '''
+
+        return (set().union(*(self.setlst.get(st, []) for st in sets))
+                - set().union(*(self.setlst.get(st, []) for st in exclude)))
+
+    def n_ca(self, *sets, exclude=()):
+        ''' Size of the *pp_ca* sets, e.g. ``(st_ca | hyrs_ca)``. '''
+
+        return int(self.df_ppca.pp_id.isin(self.get_pp(*sets,
+                                                       exclude=exclude)).sum())
+
+    def n_sy_ca(self, *sets, exclude=()):
+        ''' Size of the *sy_pp_ca* sets, e.g. ``(sy_st_ca | sy_hyrs_ca)``. '''
+
+        mask = self.df_ppca.pp_id.isin(self.get_pp(*sets, exclude=exclude))
+        return int(self.df_ppca.loc[mask, 'nsy'].sum())
+
+    def n_ndcafl(self, *sets, exclude=()):
+        ''' Size of the *pp_ndcafl* and *pp_cafl* sets. '''
+
+        return int(self.df_ppndcafl.pp_id.isin(
+                                self.get_pp(*sets, exclude=exclude)).sum())
+
+    def _n_sy_ndcafl(self, *sets, exclude=()):
+        ''' Number of time slots summed over the *pp_ndcafl* rows. '''
+
+        mask = self.df_ppndcafl.pp_id.isin(self.get_pp(*sets,
+                                                       exclude=exclude))
+        return int(self.df_ppndcafl.loc[mask, 'nsy'].sum())
+
+    def _has_monthly_factors(self, par):
+
+        df = getattr(self.m, 'df_parameter_month', None)
+        return df is not None and par in df.parameter.unique()
+
+    def _get_n_symin_ndcnn(self):
+        ''' Size of the transmission index ``symin_ndcnn``. '''
+
+        df = self.m.df_node_connect
+
+        if df is None or df.empty:
+            return 0
+
+        df = df[['nd_id', 'nd_2_id', 'ca_id']].drop_duplicates()
+        df = df.loc[df.nd_id.isin(self.dict_nd_tm)
+                    & df.nd_2_id.isin(self.dict_nd_tm)]
+        nsy = np.maximum(df.nd_id.map(self.dict_nd_tm).map(self.dict_tm_nsy),
+                         df.nd_2_id.map(self.dict_nd_tm)
+                                   .map(self.dict_tm_nsy))
+
+        return int(nsy.sum())
+
+    def _get_n_sy_ndcaca(self):
+        ''' Supply constraint terms of plants consuming energy carriers. '''
+
+        m = self.m
+
+        if not 'fl_id' in m.df_def_encar.columns:
+            return 0
+
+        list_fl_ca = m.df_def_encar.fl_id.dropna().tolist()
+        mask = (self.df_ppca.pp_id.map(m.df_def_plant.set_index('pp_id')
+                                                     .fl_id)
+                                  .isin(list_fl_ca))
+
+        return int(self.df_ppca.loc[mask, 'nsy'].sum())
+
+    def _get_pp_max_fuel(self):
+        ''' Rows and nonzeros of the ``pp_max_fuel`` constraint. '''
+
+        m = self.m
+        df = m.df_fuel_node_encar
+
+        if (df is None or not 'is_constrained' in m.df_def_fuel.columns
+                or not 'erg_inp' in df.columns):
+            return 0, 0
+
+        list_fl = m.df_def_fuel.loc[m.df_def_fuel.is_constrained == 1,
+                                    'fl_id'].tolist()
+        df = df.loc[df.fl_id.isin(list_fl) & (df.erg_inp.fillna(0) != 0),
+                    ['nd_id', 'ca_id', 'fl_id']].drop_duplicates()
+        df = pd.merge(df, self.df_ppndcafl, on=['nd_id', 'ca_id', 'fl_id'])
+
+        return len(df[['nd_id', 'ca_id', 'fl_id']].drop_duplicates()), len(df)
+
+    def _get_n_hydro_bc(self):
+        ''' Rows of the ``hy_reservoir_boundary_conditions`` constraint. '''
+
+        df = self.m.df_plant_month
+
+        if df is None:
+            return 0
+
+        df = df.loc[df.pp_id.isin(self.get_pp('hyrs'))]
+
+        if 'sy' in df.columns:
+            # already mapped to the time slots
+            return len(df)
+
+        # boundary conditions refer to the first hour of the month
+        df = df.join(self.m.df_def_month.set_index('mt_id').month_min_hoy,
+                     on='mt_id')
+        dict_pp_hy = (self.df_ppca.drop_duplicates('pp_id')
+                                  .set_index('pp_id').nd_id
+                                  .map(self.dict_nd_tm)
+                                  .map(self.dict_tm_hy).to_dict())
+
+        return sum(hy in dict_pp_hy.get(pp, ())
+                   for pp, hy in zip(df.pp_id, df.month_min_hoy))
+
+    def _get_vc_fl_nnz(self):
+        ''' Nonzeros of the ``calc_vc_fl_pp`` constraint. '''
+
+        m = self.m
+        df = self.df_ppndcafl.loc[self.df_ppndcafl.pp_id.isin(
+                                        self.get_pp('pp', exclude=['lin']))]
+
+        if self._has_monthly_factors('vc_fl'):
+            return int(len(df) + df.nsy.sum())
+
+        set_pf = (set(getattr(m, 'dict_pricebuy_pf', {}))
+                  | set(getattr(m, 'dict_pricesll_pf', {})))
+        has_pf = np.array([key in set_pf for key
+                           in zip(df.fl_id, df.nd_id, df.ca_id)], dtype=bool)
+
+        return int(len(df) + np.where(has_pf, df.nsy, 1).sum())
+
+    def _get_variable_sizes(self):
+        '''
+        Variable sizes; see
+        :func:`grimsel.core.variables.Variables.get_variable_specs`.
+
+        '''
+
+        n_mt = (len(self.m.df_def_month)
+                if getattr(self.m, 'df_def_month', None) is not None else 0)
+
+        return [('pwr', self.n_sy_ca('ppall')),
+                ('pwr_ramp', self.n_sy_ca('rp')),
+                ('pwr_ramp_abs', self.n_sy_ca('rp')),
+                ('pwr_st_ch', self.n_sy_ca('st')),
+                ('erg_st', self.n_sy_ca('st', 'hyrs')),
+                ('trm', self._get_n_symin_ndcnn()),
+                ('erg_mt', n_mt * self.n_ca('hyrs')),
+                ('erg_fl_yr', self.n_ndcafl('ppall')),
+                ('erg_yr', self.n_ca('ppall')),
+                ('pwr_ramp_yr', self.n_ca('rp')),
+                ('vc_fl_pp_yr', self.n_ndcafl('ppall', exclude=['lin'])),
+                ('vc_om_pp_yr', self.n_ca('ppall')),
+                ('fc_om_pp_yr', self.n_ca('ppall')),
+                ('fc_cp_pp_yr', self.n_ca('add')),
+                ('vc_co2_pp_yr', self.n_ca('pp')),
+                ('vc_ramp_yr', self.n_ca('rp')),
+                ('cap_pwr_tot', self.n_ca('ppall')),
+                ('cap_pwr_new', self.n_ca('add')),
+                ('cap_pwr_rem', self.n_ca('rem')),
+                ('cap_erg_tot', self.n_ca('st', 'hyrs'))]
+
+    def _get_constraint_sizes(self):
+        '''
+        Constraint sizes by constraint group; see
+        :mod:`grimsel.core.constraints`.
+
+        Returns
+        -------
+        list
+            ``(group, constraint name, rows, nonzeros)`` tuples
+
+        '''
+
+        m = self.m
+
+        n_mt = (len(m.df_def_month)
+                if getattr(m, 'df_def_month', None) is not None else 0)
+        has_all_months = len(set().union(*self.dict_tm_mt.values())) == 12
+
+        sy = self.n_sy_ca
+        ca = self.n_ca
+
+        # pp_ndcafl - lin_ndcafl
+        n_ndcafl_nolin = self.n_ndcafl('pp', exclude=['lin'])
+        n_co2 = (n_ndcafl_nolin + self._n_sy_ndcafl('pp', exclude=['lin'])
+                 if self._has_monthly_factors('price_co2')
+                 else 2 * n_ndcafl_nolin)
+        n_max_fuel, nnz_max_fuel = self._get_pp_max_fuel()
+        n_hyd_bc = self._get_n_hydro_bc()
+        has_hydro = getattr(m, 'df_hydro', None) is not None
+
+        return [
+            ('supply', 'supply', int(self.df_ndca.nsy.sum()),
+             sy('ppall') + 2 * self._get_n_symin_ndcnn() + sy('st')
+             + self._get_n_sy_ndcaca()),
+
+            ('energy_aggregation', 'yearly_energy',
+             ca('ppall'), ca('ppall') + sy('ppall')),
+            ('energy_aggregation', 'yearly_ramping',
+             ca('rp'), ca('rp') + sy('rp')),
+            ('energy_aggregation', 'yearly_fuel_cons',
+             self.n_ndcafl('pp'), 2 * self.n_ndcafl('pp')),
+
+            ('capacity_calculation', 'calc_cap_pwr_tot',
+             ca('ppall'), ca('ppall') + ca('add') + ca('rem')),
+            ('capacity_calculation', 'calc_cap_erg_tot',
+             ca('st', 'hyrs'), 2 * ca('st', 'hyrs')),
+
+            ('capacity_constraint', 'ppst_capac',
+             sy('hyrs') + sy('pp', exclude=['pr', 'hyrs']),
+             2 * (sy('hyrs') + sy('pp', exclude=['pr', 'hyrs']))),
+            ('capacity_constraint', 'st_chg_dis_capac',
+             sy('st'), 3 * sy('st')),
+            ('capacity_constraint', 'st_erg_capac',
+             sy('st', 'hyrs'), 2 * sy('st', 'hyrs')),
+            ('capacity_constraint', 'pwr_pot_add', ca('add'), ca('add')),
+
+            ('chp', 'chp_prof', sy('chp'), sy('chp')),
+
+            ('monthly_total', 'monthly_totals',
+             has_all_months * n_mt * ca('hyrs'),
+             has_all_months * (n_mt * ca('hyrs') + sy('hyrs'))),
+
+            ('variables', 'variables_prof', sy('pr'), 2 * sy('pr')),
+
+            ('ramp_rate', 'calc_ramp_rate', sy('rp'), 3 * sy('rp')),
+            ('ramp_rate', 'ramp_rate_abs_pos', sy('rp'), 2 * sy('rp')),
+            ('ramp_rate', 'ramp_rate_abs_neg', sy('rp'), 2 * sy('rp')),
+
+            ('energy_constraint', 'pp_max_fuel', n_max_fuel, nnz_max_fuel),
+
+            ('charging_level', 'erg_store_level',
+             sy('st', 'hyrs', 'ror'),
+             4 * sy('st') + 3 * sy('hyrs', exclude=['st'])
+             + sy('ror', exclude=['st', 'hyrs'])),
+
+            ('hydro', 'hy_reservoir_boundary_conditions',
+             n_hyd_bc, 2 * n_hyd_bc),
+            ('hydro', 'hy_month_min',
+             n_mt * self.n_ndcafl('hyrs'), n_mt * self.n_ndcafl('hyrs')),
+            ('hydro', 'hy_erg_min',
+             has_hydro * sy('hyrs'), has_hydro * 2 * sy('hyrs')),
+
+            ('yearly_cost', 'calc_vc_fl_pp',
+             n_ndcafl_nolin, self._get_vc_fl_nnz()),
+            ('yearly_cost', 'calc_vc_om_pp', ca('ppall'), 2 * ca('ppall')),
+            ('yearly_cost', 'calc_vc_co2_pp', n_ndcafl_nolin, n_co2),
+            ('yearly_cost', 'calc_vc_ramp', ca('rp'), 2 * ca('rp')),
+            ('yearly_cost', 'calc_fc_om',
+             bool(ca('add')) * ca('add', 'rem'),
+             bool(ca('add')) * 2 * ca('add', 'rem')),
+            ('yearly_cost', 'calc_fc_cp', ca('add'), 2 * ca('add')),
+
+            ('objective', 'objective_quad', 1,
+             self.n_ndcafl('pp', exclude=['lin']) + ca('pp', exclude=['lin'])
+             + 2 * ca('ppall') + ca('rp') + ca('add') + sy('lin')),
+            ]
+
+    def _get_parameter_sizes(self):
+        ''' Sizes of the time-indexed parameters. '''
+
+        n_sy_ndca = int(self.df_ndca.nsy.sum())
+        nsy_max = max(self.dict_tm_nsy.values())
+        n_pf_price = (len(self.setlst.get('pricebuy_pf', []))
+                      + len(self.setlst.get('pricesll_pf', [])))
+
+        return [('dmnd', n_sy_ndca),
+                ('supprof', self.n_sy_ca('pr')),
+                ('chpprof', n_sy_ndca),
+                ('inflowprof', self.n_sy_ca('hyrs', 'ror')),
+                ('pricebuyprof', nsy_max * n_pf_price),
+                ('weight', sum(self.dict_tm_nsy.values()))]
+
+    def get_table(self):
+        '''
+        Returns the size table ``df_size``; see the class docstring.
+
+        Constraints of groups which are not in the model's
+        ``constraint_groups`` and empty components are omitted.
+
+        '''
+
+        list_rows = ([('variables', name, 'var', size, 0)
+                      for name, size in self._get_variable_sizes()]
+                   + [(group, name, 'con', rows, nnz)
+                      for group, name, rows, nnz
+                      in self._get_constraint_sizes()
+                      if group in self.m.constraint_groups]
+                   + [('parameters', name, 'par', size, 0)
+                      for name, size in self._get_parameter_sizes()])
+
+        df = pd.DataFrame(list_rows, columns=['group', 'component', 'kind',
+                                              'size', 'nnz'])
+        df = df.loc[df['size'] > 0].reset_index(drop=True)
+
+        return df.astype({'size': int, 'nnz': int})
+
+    def get_summary(self, df_size):
+        '''
+        Returns the ``summary`` dictionary; see the class docstring.
+
+        Parameters
+        ----------
+        df_size : pandas.DataFrame
+            size table as returned by :func:`get_table`
+
+        '''
+
+        dict_tot = df_size.groupby('kind')['size'].sum().to_dict()
+        dict_tot = {kind: int(dict_tot.get(kind, 0))
+                    for kind in ['var', 'con', 'par']}
+        dict_tot['nnz'] = int(df_size.nnz.sum())
+
+        memory_input = aux_dtypes.get_df_memory(self.m).sum()
+
+        return {'nvar': dict_tot['var'], 'ncon': dict_tot['con'],
+                'nnz': dict_tot['nnz'], 'npar': dict_tot['par'],
+                'memory_mb': (memory_input
+                              + sum(MEMORY_COEFFS[key] * val
+                                    for key, val in dict_tot.items())),
+                'build_time_s': sum(TIME_COEFFS[key] * val
+                                    for key, val in dict_tot.items())}
+
+
+def select_nhours(m, max_memory_mb=None, max_time_s=None,
+                  list_nhours=LIST_NHOURS, tm_filt=None):
+    '''
+    Returns the finest uniform time resolution which fits a memory and/or
+    build time budget.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with the input tables, see :class:`ModelSize`
+    max_memory_mb : float
+        maximum estimated memory ``ModelSize.summary['memory_mb']``
+    max_time_s : float
+        maximum estimated build time ``ModelSize.summary['build_time_s']``
+    list_nhours : list
+        candidate time resolutions (hours per time slot)
+    tm_filt : list
+        time map filter; defaults to the model's ``tm_filt``
+
+    Returns
+    -------
+    number
+        smallest element of ``list_nhours`` within the budget
+
+    Raises
+    ------
+    ValueError
+        If none of the candidates fits the budget.
+
+    '''
+
+    for nhours in sorted(list_nhours):
+
+        summary = ModelSize(m, nhours=nhours, tm_filt=tm_filt).summary
+
+        logger.info('select_nhours: nhours=%s: %d variables, %d '
+                    'constraints, %d nonzeros, %.1f MB, %.1f s'
+                    %(nhours, summary['nvar'], summary['ncon'],
+                      summary['nnz'], summary['memory_mb'],
+                      summary['build_time_s']))
+
+        if ((max_memory_mb is None or summary['memory_mb'] <= max_memory_mb)
+                and (max_time_s is None
+                     or summary['build_time_s'] <= max_time_s)):
+            return nhours
+
+    raise ValueError('select_nhours: none of the time resolutions %s fits '
+                     'max_memory_mb=%s, max_time_s=%s.'
+                     %(list_nhours, max_memory_mb, max_time_s))
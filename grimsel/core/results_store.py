@@ -0,0 +1,268 @@
+'''
+Results store
+=============
+
+Keeps selected output tables of recent model runs in memory, e.g. for
+modifiers which set parameters from the results of earlier runs
+(:func:`grimsel.core.model_loop.ModelLoop.get_run_results`).
+
+* The in-process tier is an LRU cache of the last ``max_runs`` runs.
+* The optional shared tier stores the tables as pickle files in a
+  memory-backed directory (e.g. below ``/dev/shm``), where they are
+  available to all processes on the host, e.g. the workers of
+  :func:`grimsel.auxiliary.multiproc.run_parallel`, which don't share the
+  in-process tier after the fork. Files are written atomically; the least
+  recently used runs beyond ``max_shared_runs`` are deleted.
+* Tables not found in either tier are read from the output collection
+  (:func:`read_output_table`).
+
+The tables are added when they are written to the output
+(:func:`grimsel.core.io.CompIO._finalize`); nothing is stored if the io
+``no_output`` option is set.
+
+'''
+
+import os
+import tempfile
+from collections import OrderedDict
+
+import pandas as pd
+
+import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+from grimsel.core.io import FORMAT_RUN_ID
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# output tables read by the modifiers of the model loop examples
+DEFAULT_TABLES = ('var_yr_cap_pwr_new', 'par_cap_pwr_leg')
+
+
+def read_output_table(io, tb, run_id, cl_out=None):
+    '''
+    Reads the rows of a single run from an output table.
+
+    Parameters
+    ----------
+    io : grimsel.core.io.IO
+        io instance of the model loop
+    tb : str
+        output table name
+    run_id : int
+        model run
+    cl_out : str, optional
+        output collection of the same ``output_target``; defaults to the
+        one of ``io``
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    '''
+
+    output_target = io.modwr.output_target
+    cl_out = cl_out if cl_out else io.cl_out
+
+    if output_target == 'hdf5':
+        df = pd.read_hdf(cl_out, tb, where='run_id == %d'%run_id)
+    elif output_target == 'fastparquet':
+        fn = os.path.join(cl_out, ('%s_%s.parq'%(tb, FORMAT_RUN_ID))
+                                     .format(run_id))
+        df = pd.read_parquet(fn)
+    elif output_target == 'psql':
+        df = aql.read_sql(io.db, cl_out, tb, filt=[('run_id', [run_id])])
+    else:
+        raise ValueError('Unknown output_target %s'%output_target)
+
+    return df.reset_index(drop=True)
+
+
+class ResultsStore():
+    '''
+    LRU store of output tables by run_id.
+
+    Parameters
+    ----------
+    tables : list of str
+        output tables to be stored, e.g. ``'var_yr_cap_pwr_new'``
+    max_runs : int
+        number of runs kept in the in-process tier
+    shared_dir : str, optional
+        directory of the shared tier, on a memory-backed file system;
+        must be specific to the output collection; disabled if None
+    max_shared_runs : int
+        number of runs kept in the shared tier
+
+    '''
+
+    def __init__(self, tables=DEFAULT_TABLES, max_runs=10, shared_dir=None,
+                 max_shared_runs=50):
+
+        self.tables = list(tables)
+        self.max_runs = max_runs
+        self.shared_dir = shared_dir
+        self.max_shared_runs = max_shared_runs
+
+        # run_id -> {table: DataFrame}
+        self._runs = OrderedDict()
+
+        self.io = None  # set by the model loop; used for disk reads
+
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+
+    def __repr__(self):
+
+        return ('ResultsStore(tables=%s, runs in memory=%s, shared_dir=%s)'
+                %(self.tables, list(self._runs), self.shared_dir))
+
+    def _get_shared_file(self, tb, run_id):
+
+        return os.path.join(self.shared_dir, '%s_%d.pickle'%(tb, run_id))
+
+    def discard_run(self, run_id):
+        '''
+        Removes all tables of a run, e.g. before it is repeated.
+        '''
+
+        self._runs.pop(run_id, None)
+
+        if self.shared_dir:
+            for tb in self.tables:
+                fn = self._get_shared_file(tb, run_id)
+                if os.path.isfile(fn):
+                    os.remove(fn)
+
+    def put(self, tb, run_id, df):
+        '''
+        Adds output table rows of a run.
+
+        Rows are appended if the table of this run exists already, since
+        some tables are written in several parts (e.g. ``var_sy_pwr``).
+        Tables not in :attr:`tables` are ignored.
+
+        '''
+
+        if tb not in self.tables:
+            return
+
+        dict_tb = self._runs.setdefault(run_id, {})
+        self._runs.move_to_end(run_id)
+
+        if tb in dict_tb:
+            df = pd.concat([dict_tb[tb], df], ignore_index=True, sort=False)
+
+        dict_tb[tb] = df
+
+        while len(self._runs) > self.max_runs:
+            self._runs.popitem(last=False)
+
+        if self.shared_dir:
+            self._put_shared(tb, run_id, df)
+
+    def _put_shared(self, tb, run_id, df):
+
+        fn = self._get_shared_file(tb, run_id)
+
+        try:
+            fd, fn_tmp = tempfile.mkstemp(dir=self.shared_dir, suffix='.tmp')
+            os.close(fd)
+            pd.to_pickle(df, fn_tmp)
+            os.replace(fn_tmp, fn)
+        except OSError as e:
+            logger.warning('Failed to write shared results %s: %s'%(fn, e))
+            return
+
+        self._evict_shared()
+
+    def _evict_shared(self):
+
+        dict_mtime = {}
+        for fn in os.listdir(self.shared_dir):
+            if not fn.endswith('.pickle'):
+                continue
+            run_id = int(fn[:-len('.pickle')].rsplit('_', 1)[1])
+            try:
+                mtime = os.path.getmtime(os.path.join(self.shared_dir, fn))
+            except FileNotFoundError:
+                continue  # evicted by another process
+            dict_mtime[run_id] = max(mtime, dict_mtime.get(run_id, 0))
+
+        list_evict = sorted(dict_mtime, key=dict_mtime.get)
+        for run_id in list_evict[:max(0, len(dict_mtime)
+                                         - self.max_shared_runs)]:
+            for tb in self.tables:
+                try:
+                    os.remove(self._get_shared_file(tb, run_id))
+                except FileNotFoundError:
+                    pass
+
+    def _get_shared(self, tb, run_id):
+
+        fn = self._get_shared_file(tb, run_id)
+
+        try:
+            df = pd.read_pickle(fn)
+            os.utime(fn)  # recently used
+        except (OSError, EOFError):
+            return None
+
+        return df
+
+    def get(self, tb, run_id):
+        '''
+        Output table rows of a single run.
+
+        Looks up the in-process tier, the shared tier, and the output
+        collection, in this order.
+
+        Parameters
+        ----------
+        tb : str
+            output table name
+        run_id : int
+            model run
+
+        Returns
+        -------
+        pandas.DataFrame
+
+        '''
+
+        if run_id in self._runs and tb in self._runs[run_id]:
+            self._runs.move_to_end(run_id)
+            return self._runs[run_id][tb]
+
+        df = None
+        if self.shared_dir and tb in self.tables:
+            df = self._get_shared(tb, run_id)
+
+        if df is None:
+            if self.io is None:
+                raise KeyError('Table %s of run_id %s not in results store '
+                               'and no io for disk reads'%(tb, run_id))
+
+            logger.info('Reading %s of run_id %s from output'%(tb, run_id))
+            df = read_output_table(self.io, tb, run_id)
+
+        if tb in self.tables:
+            # cache without writing to the shared tier again
+            self._runs.setdefault(run_id, {})[tb] = df
+            self._runs.move_to_end(run_id)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+
+        return df
+
+    def clear(self):
+        '''
+        Removes all runs from both tiers.
+        '''
+
+        self._runs.clear()
+
+        if self.shared_dir and os.path.isdir(self.shared_dir):
+            for fn in os.listdir(self.shared_dir):
+                if fn.endswith('.pickle'):
+                    os.remove(os.path.join(self.shared_dir, fn))
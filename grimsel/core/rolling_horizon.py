@@ -0,0 +1,880 @@
+'''
+Rolling horizon
+=================
+
+Solves a :class:`grimsel.core.model_loop.ModelLoop` model in consecutive
+overlapping time windows instead of a single optimization problem.
+
+The Pyomo model (sets, time maps, parameters, variables, and constraints)
+is built once for the time slots of a single window, i.e. for the time map
+``0, 1, ..., nsy_solve`` (committed window and overlap, plus one boundary
+slot). For each window, the time-indexed parameters (profiles and time slot
+weights), the transmission bounds, the hydro boundary conditions, and the
+month-dependent components are updated from the full-year input tables;
+the model is not rebuilt. The size of the Pyomo model therefore depends on
+the window length, not on the number of time slots of the year.
+
+* Window slot 0 is a boundary slot holding the values of the last committed
+  time slot of the previous window. In particular, its storage and
+  reservoir energy levels ``erg_st`` are the initial levels of the window.
+  The constraints of the boundary slot are inactive and its weight is zero.
+* The energy level at the last time slot of the year is free in the first
+  window (boundary slot 0 of the first window). It is fixed at this value
+  in the last window, which closes the cycle.
+* Window slots beyond the end of the year (last window) are fixed at zero.
+* The committed time slots of each window are written to the output tables
+  with their full-year time slot ``sy``. The yearly totals and costs
+  (:data:`YEARLY_VARS`) and the monthly hydro production ``erg_mt`` are
+  summed over the committed time slots of all windows.
+
+Usage::
+
+    ml = ModelLoop(...)
+    rh = RollingHorizon(ml, window=672, overlap=48)  # builds ml.m
+    for irow in range(len(ml.df_def_run)):
+        ml.select_run(irow)
+        # ... apply model loop modifications ...
+        rh.perform_model_run()
+
+Limitations
+-----------
+
+* All nodes must share a single time map generated by
+  :class:`grimsel.auxiliary.timemap.TimeMap`; representative and adaptive
+  time maps, input ``tm_soy`` tables, and the model presolve are not
+  supported.
+* The time-indexed parameters are reset from the full-year tables
+  ``RollingHorizon.dict_df_full`` for each window. Model loop modifications
+  of these parameters must be applied to these tables instead.
+* Non-time-indexed inequality constraints (e.g. yearly fuel limits
+  ``pp_max_fuel`` or the monthly hydro minimum ``hy_month_min``) can't be
+  evaluated for partial years and are deactivated, as are the monthly
+  totals (see :data:`WINDOW_INACTIVE`).
+
+Capacity investment variables
+-----------------------------
+
+Investment decisions can't be taken consistently in individual windows
+(the annualized fixed costs would be attributed to the first window). The
+variables :data:`INVESTMENT_VARS` are therefore fixed during the rolling
+horizon solve:
+
+* If a solved model is passed as ``cap_model`` (e.g. the same model
+  with a coarse time resolution ``nhours=24``), the investment variables
+  are fixed at its solution values.
+* Otherwise they are fixed at zero, i.e. only the legacy capacities are
+  available.
+
+'''
+
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+from pyomo.core.base.set import SetProduct
+from pyomo.core.expr.current import identify_variables
+from pyomo.util.calc_var_value import calculate_variable_from_constraint
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# capacity investment variables fixed during the rolling horizon solve
+INVESTMENT_VARS = ['cap_pwr_new', 'cap_pwr_rem']
+
+# energy levels linking consecutive windows and the end of the year
+LINK_VARS = ['erg_st']
+
+# time-indexed parameters updated for each window:
+# parameter -> (full-year table, ModelBase method returning the parameter
+# table; None if the table is used directly)
+WINDOW_PARAMS = {'dmnd': ('df_profdmnd_soy', '_get_df_demand'),
+                 'supprof': ('df_profsupply_soy', '_get_df_supply'),
+                 'chpprof': ('df_profchp_soy', None),
+                 'inflowprof': ('df_profinflow_soy', None),
+                 'pricebuyprof': ('df_profpricebuy_soy', None),
+                 'pricesllprof': ('df_profpricesll_soy', None),
+                 'weight': ('df_tm_soy', None)}
+
+# components depending on the months of the time slots -> parameters whose
+# monthly factors require the reconstruction of the component for each window
+MONTH_COMPS = {'ppst_capac': ['vc_fl'],
+               'calc_vc_fl_pp': ['vc_fl'],
+               'calc_vc_co2_pp': ['price_co2'],
+               'objective_quad': ['vc_fl', 'price_co2']}
+
+# yearly variables summed over the committed time slots and their defining
+# constraints, in order of evaluation
+YEARLY_VARS = [('erg_yr', 'yearly_energy'),
+               ('pwr_ramp_yr', 'yearly_ramping'),
+               ('erg_fl_yr', 'yearly_fuel_cons'),
+               ('vc_fl_pp_yr', 'calc_vc_fl_pp'),
+               ('vc_om_pp_yr', 'calc_vc_om_pp'),
+               ('vc_co2_pp_yr', 'calc_vc_co2_pp'),
+               ('vc_ramp_yr', 'calc_vc_ramp')]
+
+# constraints deactivated during the windows; the hydro boundary conditions
+# are replaced by the window-specific constraint ``rh_hyd_erg_bc``
+WINDOW_INACTIVE = ['monthly_totals', 'hy_reservoir_boundary_conditions']
+
+
+def _is_time_set(st):
+    '''
+    Checks whether the first index of a Pyomo set is the time slot.
+
+    Relies on the naming of the time-indexed sets in
+    :class:`grimsel.core.sets.Sets` (``sy_*``, ``symin_*``).
+
+    '''
+
+    if st.name == 'sy' or st.name.startswith(('sy_', 'symin_')):
+        return True
+
+    sets = getattr(st, '_sets', None)
+
+    if not sets:
+        return False
+    elif isinstance(st, SetProduct):
+        return _is_time_set(sets[0])
+    else:
+        return any(_is_time_set(st_) for st_ in sets)
+
+
+def _has_time_index(st):
+    '''
+    Checks whether the time slot is part of a Pyomo set in any position.
+
+    Unlike :func:`_is_time_set`, this includes sets defined on a product
+    domain with the time slot in a later position (e.g. ``tmsy``).
+
+    '''
+
+    if st.name == 'sy' or st.name.startswith(('sy_', 'symin_')):
+        return True
+
+    sets = list(getattr(st, '_sets', None) or [])
+    domain = getattr(st, 'domain', None)
+    if domain is not None and domain is not st:
+        sets.append(domain)
+
+    return any(_has_time_index(st_) for st_ in sets)
+
+
+class TimeSlotModel():
+    '''
+    Access to the time-indexed components of a fully built model.
+
+    Base class of the solve drivers operating on subsets of time slots
+    (:class:`RollingHorizon`,
+    :class:`grimsel.core.benders.BendersDecomposition`). The variable and
+    constraint data are grouped by time slot once; activating,
+    deactivating, fixing, and releasing time slots then doesn't require
+    any model rebuild.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with completely built model (``ml.build_model()``);
+        all nodes must share the same time map
+
+    Raises
+    ------
+    ValueError
+        If the model has multiple time maps.
+
+    '''
+
+    def __init__(self, ml):
+
+        self.ml = ml
+        self.m = ml.m
+
+        if self.m.df_tm_soy.tm_id.nunique() > 1:
+            raise ValueError('%s: Requires a uniform time '
+                             'resolution of all nodes.'%type(self).__name__)
+
+        self.tm_id = self.m.df_tm_soy.tm_id.iloc[0]
+        self.list_sy = sorted(self.m.sy)
+
+        self._init_component_maps()
+
+    def _init_component_maps(self):
+        '''
+        Groups the time-indexed variable and constraint data by time slot.
+
+        Generates the attributes ``dict_sy_var`` and ``dict_sy_con``
+        (``{sy: [component data]}``), as well as ``list_con_free``,
+        the non-time-indexed inequality constraints.
+
+        '''
+
+        self.dict_sy_var = {sy: [] for sy in self.list_sy}
+        self.dict_sy_con = {sy: [] for sy in self.list_sy}
+        self.list_con_free = []
+
+        for comp in self.m.component_objects(po.Var, descend_into=False):
+            if comp.is_indexed() and _is_time_set(comp.index_set()):
+                for key, vardata in comp.items():
+                    self.dict_sy_var[key[0]].append(vardata)
+
+        for comp in self.m.component_objects(po.Constraint,
+                                             descend_into=False):
+            if comp.is_indexed() and _is_time_set(comp.index_set()):
+                for key, condata in comp.items():
+                    self.dict_sy_con[key[0]].append(condata)
+            else:
+                self.list_con_free += [condata for condata in comp.values()
+                                       if not condata.equality
+                                       and condata.active]
+
+    def _set_slots(self, list_sy, fix=None, activate=None):
+        '''
+        Fixes/releases the variables and (de)activates the constraints of
+        the time slots ``list_sy``.
+
+        Parameters
+        ----------
+        list_sy : list
+            time slots
+        fix : str or None
+            ``'zero'``: fix at zero; ``'value'``: fix at current value;
+            ``'free'``: release; None: no change
+        activate : bool or None
+            activate or deactivate constraints; None: no change
+
+        '''
+
+        for sy in list_sy:
+            if fix is not None:
+                for vardata in self.dict_sy_var[sy]:
+                    if fix == 'zero':
+                        vardata.fix(0)
+                    elif fix == 'value':
+                        vardata.fix()
+                    else:
+                        vardata.unfix()
+            if activate is not None:
+                for condata in self.dict_sy_con[sy]:
+                    if activate:
+                        condata.activate()
+                    else:
+                        condata.deactivate()
+
+    def _get_slots(self, sy_start, sy_end):
+        ''' Returns the time slots between ``sy_start`` and ``sy_end``. '''
+
+        return [sy for sy in self.list_sy if sy_start <= sy <= sy_end]
+
+
+class RollingHorizon(TimeSlotModel):
+    '''
+    Rolling horizon solve on a single window-sized model.
+
+    Builds the model of the model loop ``ml`` for the time slots of one
+    window and keeps the full-year time-indexed input tables in the
+    attribute ``dict_df_full``.
+
+    Parameters
+    ----------
+    ml : grimsel.core.model_loop.ModelLoop
+        model loop with the model built to runlevel ``'runtime_tables'``
+        at most (see :func:`grimsel.core.model_loop.ModelLoop.build_model`);
+        the construction is completed by the :class:`RollingHorizon`
+    window : float
+        committed duration of each window in hours
+    overlap : float
+        additional look-ahead duration of each window in hours; these
+        time slots are solved but re-optimized in the next window
+    cap_model : grimsel.core.model_base.ModelBase
+        solved model providing the values of the :data:`INVESTMENT_VARS`;
+        if None, these are fixed at zero
+
+    Raises
+    ------
+    ValueError
+        If the model is built beyond the runtime tables, if the model
+        uses multiple or profile-based time maps or the presolve, or if
+        the window covers all time slots.
+
+    '''
+
+    def __init__(self, ml, window=672, overlap=48, cap_model=None):
+
+        self.m = m = ml.m
+        name = type(self).__name__
+
+        if ml._runlevel_state > 4:
+            raise ValueError('%s: The model must not be built beyond the '
+                             'runtime tables. Call ModelLoop.build_model('
+                             '\'runtime_tables\') at most.'%name)
+
+        if m.repr_periods or m.adaptive_slices or m.presolve:
+            raise ValueError('%s: Representative or adaptive time maps and '
+                             'the model presolve are not '
+                             'supported.'%name)
+
+        ml.build_model('runtime_tables')
+
+        if m.df_tm_soy.tm_id.nunique() > 1 or m.dict_soy_month is None:
+            raise ValueError('%s: Requires a uniform time resolution of all '
+                             'nodes generated by a TimeMap.'%name)
+
+        self.cap_model = cap_model
+        self.tm_id = m.df_tm_soy.tm_id.iloc[0]
+        self.nsy = len(m.df_tm_soy)
+
+        nhours = m.df_tm_soy.weight.iloc[0]
+
+        self.nsy_window = max(1, int(round(window / nhours)))
+        self.nsy_overlap = int(round(overlap / nhours))
+
+        if self.nsy_window >= self.nsy:
+            raise ValueError('%s: The window covers all %d time slots.'
+                             %(name, self.nsy))
+
+        # number of solved time slots of a window
+        self.nsy_solve = min(self.nsy_window + self.nsy_overlap,
+                             self.nsy - 1)
+
+        # first time slot, number of committed and solved time slots
+        self.list_window = [(isy, min(self.nsy_window, self.nsy - isy),
+                             min(self.nsy_solve, self.nsy - isy))
+                            for isy in range(0, self.nsy, self.nsy_window)]
+
+        self.dict_df_full = {name_df: getattr(m, name_df) for name_df
+                             in [val[0] for val in WINDOW_PARAMS.values()]
+                                + ['df_plant_month']
+                             if getattr(m, name_df, None) is not None}
+
+        self._init_window_maps()
+        self._set_window_tables(0)
+
+        # used by the reconstruction of the month-dependent components
+        m.slim_keep = list(m.slim_keep) + ['dict_pp_tm_id', 'dict_tm_sy']
+
+        ml.build_model('full')
+
+        super().__init__(ml)
+
+        self.list_comp_month = [
+                name_comp for name_comp, list_par in MONTH_COMPS.items()
+                if hasattr(m, name_comp)
+                and any(m.dict_par[par].has_monthly_factors
+                        for par in list_par if par in m.dict_par)]
+
+        self.df_windows = pd.DataFrame()
+
+    def _init_window_maps(self):
+        '''
+        Restricts the time slot maps of the model to the window slots.
+
+        All nodes share the same time map, the time slot maps of the node
+        connections are identities.
+
+        '''
+
+        m = self.m
+        list_sy = list(range(self.nsy_solve + 1))
+
+        m.dict_tm_sy = {self.tm_id: list_sy}
+        m.dict_tm_sy_prev = {}
+
+        if getattr(m, 'df_symin_ndcnn', None) is not None:
+            m.df_symin_ndcnn = m.df_symin_ndcnn.loc[
+                                        m.df_symin_ndcnn.symin.isin(list_sy)]
+            m.df_sysy_ndcnn = m.df_sysy_ndcnn.loc[
+                                        m.df_sysy_ndcnn.sy.isin(list_sy)]
+            m.dict_sysy = {key: val for key, val in m.dict_sysy.items()
+                           if key[2] in list_sy}
+
+    def _get_window_table(self, df, sy_start):
+        '''
+        Returns the rows of the full-year table ``df`` for the window
+        starting at ``sy_start``.
+
+        The column ``sy`` is translated to the window slots: slot ``s``
+        corresponds to the full-year time slot ``sy_start - 1 + s``; time
+        is circular.
+
+        '''
+
+        sy = ((df.sy - sy_start + 1) % self.nsy).astype(int)
+        mask = sy <= self.nsy_solve
+
+        return (df.loc[mask].assign(sy=sy[mask])
+                            .sort_values('sy', kind='mergesort'))
+
+    def _set_window_tables(self, sy_start):
+        '''
+        Sets the model's time-indexed tables and time slot dictionaries
+        for the window starting at ``sy_start``.
+
+        '''
+
+        for name_df, df in self.dict_df_full.items():
+            setattr(self.m, name_df, self._get_window_table(df, sy_start))
+
+        self.m._init_soy_dicts()
+
+    def _init_component_maps(self):
+        '''
+        Extends :func:`TimeSlotModel._init_component_maps`.
+
+        Deactivates the non-time-indexed inequality constraints and the
+        :data:`WINDOW_INACTIVE` constraints; the latter are removed from
+        the time slot maps.
+
+        '''
+
+        super()._init_component_maps()
+
+        for condata in self.list_con_free:
+            condata.deactivate()
+
+        for name in WINDOW_INACTIVE:
+            comp = getattr(self.m, name, None)
+            if comp is None:
+                continue
+
+            comp.deactivate()
+            for sy, list_con in self.dict_sy_con.items():
+                self.dict_sy_con[sy] = [condata for condata in list_con
+                                        if condata.parent_component()
+                                        is not comp]
+
+    def _update_parameters(self, nsy_solve):
+        '''
+        Updates the :data:`WINDOW_PARAMS` from the current window tables.
+
+        The weights of the boundary slot and of the slots beyond
+        ``nsy_solve`` are set to zero.
+
+        '''
+
+        m = self.m
+
+        for name, (name_df, get_df) in WINDOW_PARAMS.items():
+
+            adder = m.dict_par.get(name)
+            if adder is None or adder.flag_infeasible:
+                continue
+
+            df = (getattr(m, get_df)() if get_df
+                  else getattr(m, name_df))
+
+            param = getattr(m, name)
+            for key, val in adder._get_data_dict(df).items():
+                if key in param:
+                    param[key] = val
+
+        for sy in [0] + self.list_sy[nsy_solve + 1:]:
+            m.weight[self.tm_id, sy] = 0
+
+    def _update_month_components(self):
+        '''
+        Updates the components depending on the months of the time slots.
+
+        These are the transmission bounds, the set ``tmsy_mt``, and the
+        :data:`MONTH_COMPS` of parameters with monthly factors.
+
+        '''
+
+        m = self.m
+
+        if getattr(m, 'tmsy_mt', None) is not None:
+            m.tmsy_mt.clear()
+            for row in m.df_tm_soy[['tm_id', 'sy', 'mt_id']].itertuples(
+                                                    index=False, name=None):
+                m.tmsy_mt.add(row)
+
+        m.add_transmission_bounds_rules()
+
+        if self.list_comp_month:
+            for name_comp in self.list_comp_month:
+                comp = getattr(m, name_comp)
+                if isinstance(comp, po.Objective):
+                    # the objective sense is dropped after the construction
+                    comp.set_value(comp.rule(m))
+                else:
+                    comp.reconstruct()
+
+            self._init_component_maps()
+
+    def _add_hydro_bcs(self, sy_start, nsy_solve):
+        '''
+        Adds the reservoir boundary conditions of the solved window slots
+        as constraint ``rh_hyd_erg_bc``.
+
+        Replaces the model's ``hy_reservoir_boundary_conditions``, which is
+        defined for the time slots of the first window only.
+
+        '''
+
+        m = self.m
+        m.delete_component('rh_hyd_erg_bc')
+
+        df = self.dict_df_full.get('df_plant_month')
+        if (df is None or not 'hyd_erg_bc' in df.columns
+                or not hasattr(m, 'erg_st')):
+            return
+
+        df = self._get_window_table(df, sy_start)
+        df = df.loc[df.sy.between(1, nsy_solve) & df.hyd_erg_bc.notna()]
+
+        dict_bc = (df.drop_duplicates(['sy', 'pp_id'])
+                     .set_index(['sy', 'pp_id']).hyd_erg_bc.to_dict())
+
+        def rh_hyd_erg_bc_rule(m, sy, pp, ca):
+            ''' Reservoir boundary conditions of the window. '''
+
+            return (m.erg_st[sy, pp, ca]
+                    == dict_bc[(sy, pp)] * m.cap_erg_tot[pp, ca])
+
+        list_idx = [(sy, pp, ca) for sy, pp, ca in m.sy_hyrs_ca
+                    if (sy, pp) in dict_bc]
+        m.rh_hyd_erg_bc = po.Constraint(list_idx, rule=rh_hyd_erg_bc_rule)
+
+    @staticmethod
+    def _get_var_key(vardata):
+        ''' Variable name and index without the time slot. '''
+
+        return (vardata.parent_component().name, vardata.index()[1:])
+
+    def _get_link_vars(self, sy):
+        ''' Returns the :data:`LINK_VARS` data of window slot ``sy``. '''
+
+        return [vardata for vardata in self.dict_sy_var[sy]
+                if vardata.parent_component().name in LINK_VARS]
+
+    def _set_window(self, sy_start, nsy_solve, dict_boundary):
+        '''
+        Updates the model for the window starting at ``sy_start``.
+
+        Parameters
+        ----------
+        sy_start : int
+            first full-year time slot of the window
+        nsy_solve : int
+            number of solved time slots
+        dict_boundary : dict
+            values of the boundary slot variables
+            ``{(variable name, index without time slot): value}``;
+            missing variables are fixed at zero
+
+        '''
+
+        self._set_window_tables(sy_start)
+        self._update_parameters(nsy_solve)
+        self._update_month_components()
+        self._add_hydro_bcs(sy_start, nsy_solve)
+
+        self._set_slots(self.list_sy[1:nsy_solve + 1],
+                        fix='free', activate=True)
+        self._set_slots(self.list_sy[nsy_solve + 1:],
+                        fix='zero', activate=False)
+        self._set_slots([0], activate=False)
+
+        for vardata in self.dict_sy_var[0]:
+            vardata.fix(dict_boundary.get(self._get_var_key(vardata), 0))
+
+    def _fix_investment(self):
+        '''
+        Fixes the :data:`INVESTMENT_VARS` at the ``cap_model`` values or
+        zero.
+
+        '''
+
+        if self.cap_model is None:
+            logger.warning('RollingHorizon: No cap_model provided. Fixing '
+                           'investment variables %s at zero.'
+                           %INVESTMENT_VARS)
+
+        for name in INVESTMENT_VARS:
+            var = getattr(self.m, name, None)
+            var_cap = getattr(self.cap_model, name, None)
+            if var is None:
+                continue
+
+            for key, vardata in var.items():
+                val = (var_cap[key].value if var_cap is not None
+                       and key in var_cap else None)
+                vardata.fix(val if val is not None else 0)
+
+    def _get_objective(self):
+
+        for name_obj in ['objective_lin', 'objective_quad', 'objective']:
+            obj = getattr(self.m, name_obj, None)
+            if obj is not None and obj.active:
+                return obj
+
+    def _get_committed_state(self, list_sy):
+        '''
+        Evaluates the :data:`YEARLY_VARS` and the objective for the time
+        slots ``list_sy`` only.
+
+        The time-indexed variables of all other time slots are temporarily
+        set to zero.
+
+        Returns
+        -------
+        tuple
+            ``({variable name: {index: value}}, objective value)``
+
+        '''
+
+        m = self.m
+        set_sy = set(list_sy)
+
+        list_val = [(vardata, vardata.value) for sy in self.list_sy
+                    if not sy in set_sy for vardata in self.dict_sy_var[sy]]
+        for vardata, _ in list_val:
+            vardata.value = 0
+
+        dict_yr = {}
+        for name_var, name_con in YEARLY_VARS:
+            var = getattr(m, name_var, None)
+            con = getattr(m, name_con, None)
+            if var is None or con is None:
+                continue
+
+            dict_yr[name_var] = {}
+            for condata in con.values():
+                vardata = next(vardata for vardata
+                               in identify_variables(condata.body)
+                               if vardata.parent_component() is var)
+                calculate_variable_from_constraint(vardata, condata)
+                dict_yr[name_var][vardata.index()] = vardata.value
+
+        obj = self._get_objective()
+        val_obj = po.value(obj) if obj is not None else np.nan
+
+        for vardata, val in list_val:
+            vardata.value = val
+
+        return dict_yr, val_obj
+
+    def _get_monthly_energy(self, list_sy):
+        '''
+        Monthly reservoir production ``erg_mt`` of the time slots
+        ``list_sy``; ``{(mt_id, pp_id, ca_id): value}``.
+
+        '''
+
+        m = self.m
+
+        if not hasattr(m, 'erg_mt'):
+            return {}
+
+        dict_erg = {}
+        for sy in list_sy:
+            mt = m.dict_soy_month[(self.tm_id, sy)]
+            weight = po.value(m.weight[self.tm_id, sy])
+            for pp, ca in m.hyrs_ca:
+                dict_erg[(mt, pp, ca)] = (dict_erg.get((mt, pp, ca), 0)
+                                          + m.pwr[sy, pp, ca].value * weight)
+
+        return dict_erg
+
+    def _collect(self, compio, df, tb, window=None):
+        '''
+        Sink of the :class:`grimsel.core.io.CompIO` objects collecting the
+        output tables in the attribute ``dict_out``.
+
+        Parameters
+        ----------
+        window : tuple or None
+            ``(sy_start, nsy_commit)``: the committed time slots of tables
+            with an ``sy`` column are collected, translated to the
+            full-year time slots; other tables are skipped.
+            None: only tables without ``sy`` column are collected.
+
+        '''
+
+        if 'sy' in df.columns:
+            if window is None:
+                return
+
+            sy_start, nsy_commit = window
+            df = df.loc[df.sy.between(1, nsy_commit)]
+            df = df.assign(sy=df.sy + sy_start - 1)
+
+        elif window is not None:
+            return
+
+        self.dict_out.setdefault((compio, tb), []).append(df)
+
+    def _write_to_sink(self, window):
+
+        sink = partial(self._collect, window=window)
+
+        for compio in self.ml.io.modwr.dict_comp_obj.values():
+            compio.sink = sink
+            try:
+                compio.write(self.ml.run_id)
+            finally:
+                compio.sink = None
+
+    def write_run(self):
+        '''
+        Writes the tables collected by :func:`run` and the final
+        non-time-indexed tables to the output.
+
+        '''
+
+        modwr = self.ml.io.modwr
+
+        if modwr.no_output:
+            return
+
+        self._write_to_sink(window=None)
+
+        if modwr.results_store is not None:
+            # tables of repeated runs are replaced
+            modwr.results_store.discard_run(self.ml.run_id)
+
+        for (compio, tb), list_df in self.dict_out.items():
+            compio.run_id = self.ml.run_id
+            compio._finalize(pd.concat(list_df, ignore_index=True,
+                                       sort=False), tb)
+
+        self.dict_out = {}
+
+    def run(self, warmstart=False):
+        '''
+        Solves all windows sequentially.
+
+        The output tables of the committed time slots are collected after
+        each window (see :func:`write_run`). After the last window, the
+        :data:`YEARLY_VARS` and ``erg_mt`` hold the sums over the
+        committed time slots of all windows; the time-indexed variables
+        hold the values of the last window. The objective value is
+        evaluated for the stitched solution: the committed objective terms
+        of all windows and the fixed costs.
+
+        Parameters
+        ----------
+        warmstart : bool
+            passed to the solver calls of all windows except the first
+
+        Returns
+        -------
+        pandas.DataFrame
+            window statistics, also stored as attribute ``df_windows``
+
+        '''
+
+        m = self.m
+
+        self._fix_investment()
+
+        write_output = not self.ml.io.modwr.no_output
+        self.dict_out = {}
+
+        dict_boundary = {}
+        dict_link = {}  # free end-of-year levels of the first window
+        dict_yr_tot = {}
+        dict_mt_tot = {}
+        list_obj = []
+        list_stats = []
+
+        for iwin, (sy_start, nsy_commit, nsy_solve) in enumerate(
+                                                        self.list_window):
+
+            logger.info('RollingHorizon: Window %d/%d; time slots %s-%s '
+                        '(committed until %s)'
+                        %(iwin + 1, len(self.list_window), sy_start,
+                          sy_start + nsy_solve - 1,
+                          sy_start + nsy_commit - 1))
+
+            self._set_window(sy_start, nsy_solve, dict_boundary)
+
+            if iwin == 0:  # free initial energy level
+                for vardata in self._get_link_vars(0):
+                    vardata.unfix()
+            if iwin == len(self.list_window) - 1:  # close the cycle
+                for vardata in self._get_link_vars(nsy_solve):
+                    vardata.fix(dict_link[self._get_var_key(vardata)])
+
+            t = time.time()
+            m.run(warmstart=warmstart and iwin > 0)
+            tdiff = time.time() - t
+
+            stat = str(m.results.Solver[0]['Termination condition'])
+            list_stats.append({'window': iwin, 'sy_start': sy_start,
+                               'sy_commit': sy_start + nsy_commit - 1,
+                               'sy_end': sy_start + nsy_solve - 1,
+                               'tdiff_solve': tdiff, 'info': stat,
+                               'objective': getattr(m, 'objective_value',
+                                                    np.nan)})
+
+            if iwin == 0:
+                dict_link.update({self._get_var_key(vardata): vardata.value
+                                  for vardata in self._get_link_vars(0)})
+
+            if write_output:
+                self._write_to_sink(window=(sy_start, nsy_commit))
+
+            list_sy_commit = self.list_sy[1:nsy_commit + 1]
+
+            dict_yr, val_obj = self._get_committed_state(list_sy_commit)
+            list_obj.append(val_obj)
+            for name_var, dct in dict_yr.items():
+                dct_tot = dict_yr_tot.setdefault(name_var, {})
+                for key, val in dct.items():
+                    dct_tot[key] = dct_tot.get(key, 0) + val
+
+            for key, val in self._get_monthly_energy(list_sy_commit).items():
+                dict_mt_tot[key] = dict_mt_tot.get(key, 0) + val
+
+            if iwin == 0:  # objective at zero dispatch: fixed costs
+                _, val_obj_fix = self._get_committed_state([])
+
+            dict_boundary = {self._get_var_key(vardata): vardata.value
+                             for vardata in self.dict_sy_var[nsy_commit]}
+
+        for name_var, dct in dict_yr_tot.items():
+            var = getattr(m, name_var)
+            for key, val in dct.items():
+                var[key].value = val
+
+        for key, val in dict_mt_tot.items():
+            m.erg_mt[key].value = val
+
+        m.objective_value = (sum(list_obj)
+                             - (len(list_obj) - 1) * val_obj_fix)
+
+        self.df_windows = pd.DataFrame(list_stats)
+
+        return self.df_windows
+
+    def perform_model_run(self, warmstart=False):
+        '''
+        Rolling horizon equivalent of
+        :func:`grimsel.core.model_loop.ModelLoop.perform_model_run`.
+
+        Solves all windows and writes the stitched results of the current
+        ``run_id`` to the output tables and the ``def_run`` table.
+
+        '''
+
+        ml = self.ml
+
+        t = time.time()
+        df_windows = self.run(warmstart=warmstart)
+        tdiff_solve = time.time() - t
+
+        stat = ('Rolling horizon (%d windows): '%len(df_windows)
+                + ', '.join(sorted(set(df_windows['info']))))
+
+        if ml.io.replace_runs_if_exist and ml.io.resume_loop:
+            ml.io.delete_run_id(ml.run_id, operator='=')
+
+        t = time.time()
+        self.write_run()
+        tdiff_write = time.time() - t
+
+        ml.append_row(info=stat, tdiff_solve=tdiff_solve,
+                      tdiff_write=tdiff_write)
@@ -0,0 +1,309 @@
+'''
+Run control
+===========
+
+Retries, time limits, and checkpoints of individual model runs.
+
+* :class:`RetryPolicy` repeats failed solves of
+  :func:`grimsel.core.model_loop.ModelLoop.perform_model_run` with different
+  solver options, e.g. with the barrier method. A solve fails if it raises
+  an exception or doesn't terminate optimally, e.g. because the solver time
+  limit was reached. If all attempts fail, :class:`RunFailedError` is raised
+  and nothing is written to the output.
+* :func:`time_limit` is a hard wall time limit of a complete run, used by the
+  ``timeout`` argument of the functions in :mod:`grimsel.auxiliary.multiproc`.
+  On expiration, the solver processes are killed and :class:`RunTimeout` is
+  raised in the running Python code.
+* The checkpoint file is a csv table appended with the status of each run
+  as soon as it is finished. Runs which are done according to the checkpoint
+  are skipped when the loop is restarted with the same file
+  (:func:`get_run_ids_done`); :func:`read_checkpoint` yields the final
+  report.
+
+Example
+-------
+
+.. code-block:: python
+
+    ml = ModelLoop(nsteps=nsteps, mkwargs=mkwargs, iokwargs=iokwargs,
+                   retry_policy=RetryPolicy(timelimit=3600))
+    ml.build_model()
+    run_parallel(ml, run_model, 4, timeout=3 * 3600 + 600,
+                 checkpoint='status.csv')
+
+'''
+
+import os
+import time
+import signal
+import contextlib
+
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# CPLEX options of the successive attempts: default, barrier, barrier with
+# numerical emphasis
+DEFAULT_SOLVER_OPTIONS = ({},
+                          {'lpmethod': 4},
+                          {'lpmethod': 4, 'emphasis_numerical': 1})
+
+CHECKPOINT_COLS = ['run_id', 'status', 'worker', 'tdiff', 'error', 't_end']
+
+
+class RunFailedError(Exception):
+    '''
+    Raised if all solve attempts of a :class:`RetryPolicy` failed.
+    '''
+
+
+class RunTimeout(Exception):
+    '''
+    Raised if a run exceeds the wall time of :func:`time_limit`.
+    '''
+
+
+def get_termination_condition(m):
+    '''
+    Termination condition of the last solve, e.g. ``'optimal'``.
+
+    None if the solve was skipped (model ``skip_runs`` option).
+
+    '''
+
+    # the pro-forma results of skip_runs have no solver attribute
+    solver = getattr(m.results, 'solver', None)
+
+    return solver.termination_condition.value if solver else None
+
+
+class RetryPolicy():
+    '''
+    Repeats failed solves with different solver options.
+
+    Parameters
+    ----------
+    list_solver_options : list of dict
+        solver options of each attempt, updating the options of the model's
+        solver; the number of attempts is the length of the list
+    timelimit : float, optional
+        solver time limit per attempt in seconds (CPLEX ``timelimit``); runs
+        hitting the limit are retried with the next options
+
+    '''
+
+    def __init__(self, list_solver_options=DEFAULT_SOLVER_OPTIONS,
+                 timelimit=None):
+
+        self.list_solver_options = list(list_solver_options)
+        self.timelimit = timelimit
+
+    def __repr__(self):
+
+        return ('RetryPolicy(list_solver_options=%s, timelimit=%s)'
+                %(self.list_solver_options, self.timelimit))
+
+    def solve(self, m, **kwargs):
+        '''
+        Solves the model until an attempt succeeds.
+
+        Parameters
+        ----------
+        m : grimsel.core.model_base.ModelBase
+            model
+        kwargs :
+            passed to :func:`grimsel.core.model_base.ModelBase.run`
+
+        Returns
+        -------
+        int
+            number of attempts
+
+        Raises
+        ------
+        RunFailedError
+            if all attempts failed
+        RunTimeout
+            if the run's time limit expired; not retried
+
+        '''
+
+        options_0 = dict(m.solver.options)
+        list_error = []
+
+        for iattempt, options in enumerate(self.list_solver_options):
+
+            m.solver.options.update(options)
+            if self.timelimit:
+                m.solver.options['timelimit'] = self.timelimit
+
+            try:
+                m.run(**kwargs)
+                cond = get_termination_condition(m)
+                if cond in (None, 'optimal'):
+                    return iattempt + 1
+                error = 'termination condition %s'%cond
+            except RunTimeout:
+                raise
+            except Exception as e:
+                error = repr(e)
+            finally:
+                for key in list(m.solver.options):
+                    if key not in options_0:
+                        del m.solver.options[key]
+                m.solver.options.update(options_0)
+
+            list_error.append('attempt %d with options %s: %s'
+                              %(iattempt + 1, options, error))
+            logger.warning('Solve failed, %s'%list_error[-1])
+
+        raise RunFailedError('All %d solve attempts failed; %s'
+                             %(len(list_error), '; '.join(list_error)))
+
+
+def _get_descendants(pid):
+    '''
+    Process ids of all descendants of a process (Linux ``/proc``).
+    '''
+
+    dict_children = {}
+    for fn in os.listdir('/proc'):
+        if not fn.isdigit():
+            continue
+        try:
+            with open(os.path.join('/proc', fn, 'stat'), 'r') as f:
+                # the ppid follows the parenthesized command name
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # process ended
+        dict_children.setdefault(ppid, []).append(int(fn))
+
+    list_pid = []
+    list_parent = [pid]
+    while list_parent:
+        list_new = dict_children.get(list_parent.pop(), [])
+        list_pid += list_new
+        list_parent += list_new
+
+    return list_pid
+
+
+def kill_children():
+    '''
+    Kills all descendant processes of the current process, e.g. solvers.
+    '''
+
+    if not os.path.isdir('/proc'):
+        return
+
+    for pid in _get_descendants(os.getpid()):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            logger.warning('Killed child process %d'%pid)
+        except OSError:
+            pass
+
+
+def _raise_timeout(signum, frame):
+
+    kill_children()
+
+    raise RunTimeout('Run exceeded its time limit')
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    '''
+    Raises :class:`RunTimeout` in the enclosed code after ``seconds``.
+
+    Uses ``SIGALRM`` and must therefore be called from the main thread;
+    without time limit if ``seconds`` is None or on platforms without
+    ``SIGALRM``. Output tables being written at the expiration might be
+    incomplete.
+
+    '''
+
+    if not seconds or not hasattr(signal, 'SIGALRM'):
+        yield
+        return
+
+    handler_0 = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler_0)
+
+
+def write_checkpoint(fn, run_id, status, worker=None, tdiff=None,
+                     error=None):
+    '''
+    Appends the status of a finished run to the checkpoint file.
+    '''
+
+    df = pd.DataFrame([(run_id, status, worker, tdiff, error, time.time())],
+                      columns=CHECKPOINT_COLS)
+
+    df.to_csv(fn, mode='a', index=False, header=not os.path.isfile(fn))
+
+
+def read_checkpoint(fn):
+    '''
+    Latest status of each run in the checkpoint file.
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``CHECKPOINT_COLS``; empty if the file doesn't exist
+
+    '''
+
+    if not os.path.isfile(fn):
+        return pd.DataFrame(columns=CHECKPOINT_COLS)
+
+    df = pd.read_csv(fn)
+
+    return (df.drop_duplicates('run_id', keep='last')
+              .sort_values('run_id').reset_index(drop=True))
+
+
+def get_run_ids_done(fn):
+    '''
+    Set of the run_ids which are done according to the checkpoint file.
+    '''
+
+    df = read_checkpoint(fn)
+
+    return set(df.loc[df.status == 'done', 'run_id'])
+
+
+def get_failure_report(df_status):
+    '''
+    Table of the unsuccessful runs with the last line of their errors.
+
+    Parameters
+    ----------
+    df_status : pandas.DataFrame
+        status table, e.g. returned by
+        :func:`grimsel.auxiliary.multiproc.run_parallel` or
+        :func:`read_checkpoint`
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``run_id``, ``status``, ``worker``, ``error``
+
+    '''
+
+    df = df_status.loc[df_status.status != 'done',
+                       ['run_id', 'status', 'worker', 'error']].copy()
+    df['error'] = [str(error).strip().splitlines()[-1]
+                   if isinstance(error, str) and error.strip() else error
+                   for error in df.error]
+
+    return df.reset_index(drop=True)
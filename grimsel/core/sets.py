@@ -6,6 +6,7 @@ Model sets
 '''
 
 
+import itertools
 import pyomo.environ as po
 import pyomo.core.base.set as poset
 import pandas as pd
@@ -13,6 +14,7 @@ import numpy as np
 
 from grimsel.auxiliary.aux_general import silence_pd_warning
 from grimsel.auxiliary.aux_m_func import cols2tuplelist
+import grimsel.core.table_struct as table_struct
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
@@ -66,6 +68,10 @@ class Sets:
                  'hyrs', 'chp', 'add', 'rem',
                  'curt', 'sll', 'rp']
 
+    # input tables filtered by pp_id in presolve_sets
+    presolve_tables = ['df_def_plant', 'df_plant_encar', 'df_profinflow_soy',
+                       'df_plant_month', 'df_plant_week', 'df_hydro']
+
 
     def define_sets(self):
         r'''
@@ -373,6 +379,246 @@ class Sets:
                              + (self.setlst['hyrs'] if 'hyrs' in self.setlst else [])
                              + (self.setlst['st'] if 'st' in self.setlst else []))
 
+    def presolve_sets(self):
+        r'''
+        Removes inactive power plants from all sets prior to the definition
+        of variables and constraints.
+
+        Only performed if the model attribute ``presolve`` is True. Plants
+        are considered inactive if all of their variables are necessarily
+        zero:
+
+        * dispatchable, storage, and variable renewable plants
+          (:math:`\mathrm{pp \cup st \cup pr}`) without legacy capacity
+          ``cap_pwr_leg`` and without capacity additions
+          (:math:`\mathrm{add}`)
+        * variable renewables without legacy capacity whose supply profile
+          ``supprof`` is all zeros and whose capacity additions have
+          positive capital cost ``fc_cp_ann``
+
+        Hydro reservoirs, run-of-river, co-generation, curtailment, and
+        selling plants are never removed.
+
+        The plants are removed from the :attr:`presolve_tables` and their
+        supply profiles are dropped; then all sets and parameters are
+        re-initialized through :func:`get_setlst`, :func:`define_sets`, and
+        :func:`add_parameters`. The values of the removed plants'
+        variables (zero) and parameters are kept in the attribute
+        ``dict_presolve_rows`` (component name -> DataFrame), which
+        is used by the :mod:`grimsel.core.io` module to complete the
+        output tables.
+
+        .. note::
+           The plant selection is based on the parameter values at the time
+           of the presolve. Model loop modifications must not activate
+           removed plants.
+
+        '''
+
+        if not getattr(self, 'presolve', False):
+            return
+
+        list_pp_prune = self._get_inactive_plants()
+
+        if not list_pp_prune:
+            logger.info('presolve_sets: No inactive plants found.')
+            return
+
+        self.remove_plants(list_pp_prune)
+
+    def remove_plants(self, list_pp_prune):
+        '''
+        Removes plants from the sets and re-initializes sets and parameters.
+
+        Used by :func:`presolve_sets`. The plants are removed from the
+        :attr:`presolve_tables` and their supply profiles are dropped; then
+        all sets and parameters are re-initialized. The output rows of the
+        removed plants are added to ``dict_presolve_rows``.
+
+        Variables and constraints are not re-initialized.
+
+        Parameters
+        ----------
+        list_pp_prune : list
+            pp_ids of the plants to be removed
+
+        '''
+
+        sets_log = ['ppall', 'ppall_ca', 'sy_ppall_ca', 'sy_rp_ca',
+                    'sy_st_ca', 'sy_pr_ca']
+        len_sets_0 = {st: len(getattr(self, st)) for st in sets_log}
+
+        dict_rows = self._get_presolve_rows(list_pp_prune)
+        dict_rows_prev = getattr(self, 'dict_presolve_rows', None) or {}
+        self.dict_presolve_rows = {
+            name: pd.concat([df for df in (dict_rows_prev.get(name),
+                                           dict_rows.get(name))
+                             if df is not None],
+                            ignore_index=True)
+            for name in set(dict_rows) | set(dict_rows_prev)}
+        pp_prev = getattr(self, 'presolve_pp_id', None) or []
+        self.presolve_pp_id = sorted(set(pp_prev) | set(list_pp_prune))
+
+        for comp in list(self.component_objects((po.Set, po.Param),
+                                                descend_into=False)):
+            self.del_component(comp)
+
+        for name_df in self.presolve_tables:
+            df = getattr(self, name_df, None)
+            if df is not None and 'pp_id' in df.columns:
+                setattr(self, name_df,
+                        df.loc[~df.pp_id.isin(list_pp_prune)])
+
+        # supply profiles exclusively used by removed plants
+        df_reg = self.pf_registry['supply']
+        mask_prune = df_reg.pp_id.isin(list_pp_prune)
+        pf_prune = (set(df_reg.loc[mask_prune, 'pf_id'])
+                    - set(df_reg.loc[~mask_prune, 'pf_id']))
+        df = getattr(self, 'df_profsupply_soy', None)
+        if df is not None and pf_prune:
+            self.df_profsupply_soy = df.loc[~df.supply_pf_id.isin(pf_prune)]
+
+        self.get_setlst()
+        self.define_sets()
+        self.add_parameters()
+
+        logger.info('remove_plants: Removed %d plants %s.'
+                    %(len(list_pp_prune), list_pp_prune))
+        for st in sets_log:
+            logger.info('remove_plants: Set %s: %d -> %d'
+                        %(st, len_sets_0[st], len(getattr(self, st))))
+
+    def _get_prune_candidates(self):
+        '''
+        Returns the set of plants which may be removed by
+        :func:`remove_plants`.
+
+        Dispatchable, storage, and variable renewable plants, except for
+        hydro reservoirs, run-of-river, co-generation, curtailment, and
+        selling plants.
+
+        '''
+
+        def get_set(name):
+            return set(self.setlst.get(name, []))
+
+        return ((get_set('pp') | get_set('st') | get_set('pr'))
+                - get_set('hyrs') - get_set('ror') - get_set('chp')
+                - get_set('curt') - get_set('sll'))
+
+    def _get_inactive_plants(self):
+        '''
+        Returns the sorted list of plants removed by :func:`presolve_sets`.
+
+        '''
+
+        def get_set(name):
+            return set(self.setlst.get(name, []))
+
+        pp_cand = self._get_prune_candidates()
+
+        def get_par(name):
+            ''' Dense parameter values as Series (index: parameter index)'''
+
+            par = getattr(self, name, None)
+            if par is None:
+                return pd.Series(dtype=float)
+
+            return pd.Series({key: po.value(par[key]) for key in par},
+                             dtype=float).fillna(0)
+
+        cap_leg = get_par('cap_pwr_leg').abs()
+        cap_leg = cap_leg.groupby(level=0).sum() if not cap_leg.empty else cap_leg
+        pp_no_cap = pp_cand - set(cap_leg.index[cap_leg > 0])
+
+        pp_prune = pp_no_cap - get_set('add')
+
+        # variable renewables with zero profiles and costly investments
+        pp_zero_prof = pp_no_cap & get_set('pr') & get_set('add')
+        if pp_zero_prof:
+            df_supply = self._get_df_supply()
+            prof_max = df_supply.assign(value=df_supply.value.abs()
+                                             .astype(float)
+                                       ).groupby('pp_id').value.max()
+            pp_zero_prof -= set(prof_max.index[prof_max > 0])
+
+            fc_cp = get_par('fc_cp_ann')
+            fc_cp = fc_cp.groupby(level=0).min() if not fc_cp.empty else fc_cp
+            pp_zero_prof &= set(fc_cp.index[fc_cp > 0])
+
+            fc_om = get_par('fc_om')
+            fc_om = fc_om.groupby(level=0).min() if not fc_om.empty else fc_om
+            pp_zero_prof -= set(fc_om.index[fc_om < 0])
+
+            pp_prune |= pp_zero_prof
+
+        return sorted(pp_prune)
+
+    def _get_presolve_rows(self, list_pp_prune):
+        '''
+        Collects the output table rows of the plants removed by
+        :func:`presolve_sets`.
+
+        Variable rows are obtained from the index sets of the
+        :func:`get_variable_specs` with value zero; parameter rows
+        are the current parameter values.
+
+        Parameters
+        ----------
+        list_pp_prune : list
+            pp_ids of the removed plants
+
+        Returns
+        -------
+        dict
+            component name |rarr| DataFrame with the output table columns
+
+        '''
+
+        set_pp_prune = set(list_pp_prune)
+
+        def flatten(comb):
+            return tuple(itertools.chain.from_iterable(
+                            (x if isinstance(x, tuple) else (x,))
+                            for x in comb))
+
+        def get_cols(name):
+            cols = table_struct.DICT_COMP_IDX.get(name, ())
+            return [c for c in cols if not c == 'bool_out']
+
+        dict_rows = {}
+        for var in self.get_variable_specs():
+
+            cols = get_cols(var.name)
+            sets = var.sets if isinstance(var.sets, tuple) else (var.sets,)
+            if not 'pp_id' in cols or any(st is None for st in sets):
+                continue
+
+            ipp = cols.index('pp_id')
+            rows = [flatten(comb) for comb in itertools.product(*sets)]
+            rows = [row + (0.,) for row in rows
+                    if len(row) == len(cols) and row[ipp] in set_pp_prune]
+            if rows:
+                dict_rows[var.name] = pd.DataFrame(rows,
+                                                  columns=cols + ['value'])
+
+        for par in self.component_objects(po.Param, descend_into=False):
+
+            cols = get_cols(par.name)
+            if not 'pp_id' in cols:
+                continue
+
+            ipp = cols.index('pp_id')
+            rows = [(key if isinstance(key, tuple) else (key,)) + (val,)
+                    for key, val in par.extract_values().items()]
+            rows = [row for row in rows
+                    if len(row) == len(cols) + 1 and row[ipp] in set_pp_prune]
+            if rows:
+                dict_rows[par.name] = pd.DataFrame(rows,
+                                                  columns=cols + ['value'])
+
+        return dict_rows
+
     @silence_pd_warning
     @staticmethod
     def _get_set_docs():
@@ -0,0 +1,363 @@
+'''
+Solver statistics
+=================
+
+Structured per-run statistics of the solves performed by
+:func:`grimsel.core.model_loop.ModelLoop.perform_model_run`, written to the
+table ``def_solver_stats`` next to ``def_run`` (columns ``STATS_COLS``) if
+the ``solver_stats`` option of the model loop is set.
+
+* Solver status, return code, and problem size are taken from the pyomo
+  results object (:func:`get_results_stats`).
+* Presolve reductions, iteration counts, the barrier/crossover split, and
+  the solver-reported times are parsed from the solver log
+  (:func:`parse_log`); the log also overrides the problem size where it
+  reports it. The patterns are defined per solver in
+  ``LOG_PATTERNS``; CPLEX, Gurobi, GLPK, and CBC are supported. Values which
+  the solver doesn't report are NaN.
+* ``solver_peak_mb`` is the peak memory of the solver processes of the
+  current Python process (``RUSAGE_CHILDREN``) unless the solver log reports
+  it. Since it is a running maximum, it is exact only for runs which exceed
+  the peak of the earlier runs of the same worker. ``worker_rss_mb`` is the
+  resident set size of the Python process after the solve.
+
+Memoized runs (:mod:`grimsel.core.memoization`) are not solved and have no
+row; runs with the model ``skip_runs`` option have NaN values.
+
+:func:`flag_outliers` lists the runs whose iterations or solve times are
+far above the median, e.g. to spot difficult scenarios or to compare sweeps
+before and after a model change.
+
+Example
+-------
+
+.. code-block:: python
+
+    ml = ModelLoop(nsteps=nsteps, mkwargs=mkwargs, iokwargs=iokwargs,
+                   solver_stats=True)
+    ml.build_model()
+    run_parallel(ml, run_model, nproc)
+
+    df_stats = pd.read_parquet(os.path.join(ml.io.cl_out,
+                                            'def_solver_stats.parq'))
+    flag_outliers(df_stats)
+
+'''
+
+import re
+import os
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+import grimsel.auxiliary.aux_dtypes as aux_dtypes
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+STATS_COLS = ['run_id', 'solver', 'status', 'termination_condition',
+              'return_code', 'nattempts', 'nrows', 'ncols', 'nnonzeros',
+              'nrows_presolved', 'ncols_presolved', 'nnonzeros_presolved',
+              'tdiff_presolve', 'iterations', 'iterations_barrier',
+              'tdiff_barrier', 'crossover', 'tdiff_crossover', 'tdiff_solver',
+              'ticks', 'tdiff_wall', 'solver_peak_mb', 'worker_rss_mb']
+
+STATS_COLS_STR = ['solver', 'status', 'termination_condition', 'crossover']
+
+# rows of a barrier iteration log: iteration, primal and dual objective
+_BARRIER_ROW = r'^\s*(\d+)\s+[-+]?\d\.\d+e[+-]\d+\s+[-+]?\d\.\d+e[+-]\d+'
+
+# column -> list of alternative (regex, aggregation) of the log of each
+# solver; the first group of the matches of the first matching alternative
+# is aggregated with 'first', 'last', 'max', or 'join' (unique, lower case)
+LOG_PATTERNS = {
+    'cplex': {
+        'nrows_presolved': [(r'Reduced \w+ has (\d+) rows', 'first')],
+        'ncols_presolved': [(r'Reduced \w+ has \d+ rows, (\d+) columns',
+                             'first')],
+        'nnonzeros_presolved': [(r'Reduced \w+ has \d+ rows, \d+ columns, '
+                                 r'and (\d+) nonzeros', 'first')],
+        'tdiff_presolve': [(r'Presolve time = ([\d.]+) sec', 'first')],
+        'iterations': [(r'Solution time =\s*[\d.]+ sec\.\s+'
+                        r'Iterations = (\d+)', 'last')],
+        'iterations_barrier': [(r'Barrier iterations = (\d+)', 'last'),
+                               (_BARRIER_ROW, 'max')],
+        'tdiff_barrier': [(r'Barrier time = ([\d.]+) sec', 'last')],
+        'crossover': [(r'(Primal|Dual) crossover\.', 'join')],
+        'tdiff_crossover': [(r'[Cc]rossover time = ([\d.]+) sec', 'last')],
+        'tdiff_solver': [(r'Solution time =\s*([\d.]+) sec', 'last')],
+        'ticks': [(r'Deterministic time = ([\d.]+) ticks', 'last')],
+    },
+    'gurobi': {
+        'nrows': [(r'Optimize a model with (\d+) rows', 'first')],
+        'ncols': [(r'Optimize a model with \d+ rows, (\d+) columns',
+                   'first')],
+        'nnonzeros': [(r'Optimize a model with \d+ rows, \d+ columns and '
+                       r'(\d+) nonzeros', 'first')],
+        'nrows_presolved': [(r'Presolved: (\d+) rows', 'first')],
+        'ncols_presolved': [(r'Presolved: \d+ rows, (\d+) columns',
+                             'first')],
+        'nnonzeros_presolved': [(r'Presolved: \d+ rows, \d+ columns, '
+                                 r'(\d+) nonzeros', 'first')],
+        'tdiff_presolve': [(r'Presolve time: ([\d.]+)s', 'first')],
+        'iterations': [(r'Solved in (\d+) iterations', 'last')],
+        'iterations_barrier': [(r'Barrier solved model in (\d+) iterations',
+                                'last'),
+                               (_BARRIER_ROW, 'max')],
+        'crossover': [(r'(Crossover) log', 'join')],
+        'tdiff_solver': [(r'Solved in \d+ iterations and ([\d.]+) seconds',
+                          'last')],
+        'ticks': [(r'\(([\d.]+) work units\)', 'last')],
+    },
+    'glpk': {
+        'nrows': [(r'^\s*(\d+) rows, \d+ columns, \d+ non-zeros', 'first')],
+        'ncols': [(r'^\s*\d+ rows, (\d+) columns, \d+ non-zeros', 'first')],
+        'nnonzeros': [(r'^\s*\d+ rows, \d+ columns, (\d+) non-zeros',
+                       'first')],
+        'iterations': [(r'^[*\s]\s*(\d+): obj =', 'max')],
+        'tdiff_solver': [(r'Time used:\s*([\d.]+) secs', 'last')],
+        'solver_peak_mb': [(r'Memory used:\s*([\d.]+) Mb', 'last')],
+    },
+    'cbc': {
+        # the problem statistics refer to the presolved model unless presolve
+        # failed
+        'nnonzeros': [(r'Problem has \d+ rows, \d+ columns .*and (\d+) '
+                       r'elements', 'first')],
+        'nrows_presolved': [(r'Presolve (\d+) \([-\d]+\) rows', 'first')],
+        'ncols_presolved': [(r'Presolve \d+ \([-\d]+\) rows, (\d+) '
+                             r'\([-\d]+\) columns', 'first')],
+        'nnonzeros_presolved': [(r'Presolve \d+ \([-\d]+\) rows, \d+ '
+                                 r'\([-\d]+\) columns and (\d+) \([-\d]+\) '
+                                 r'elements', 'first')],
+        'tdiff_presolve': [(r'iterations time [\d.]+, Presolve ([\d.]+)',
+                            'last')],
+        'iterations': [(r'objective \S+ - (\d+) iterations', 'last')],
+        'tdiff_solver': [(r'iterations time ([\d.]+)', 'last'),
+                         (r'Total time \(CPU seconds\):\s*([\d.]+)', 'last')],
+    },
+}
+
+
+def _to_float(val):
+
+    try:
+        return float(val)
+    except (TypeError, ValueError):  # includes pyomo's UndefinedData
+        return np.nan
+
+
+def _to_str(val):
+
+    val = getattr(val, 'value', val)  # pyomo enums
+
+    return val if isinstance(val, str) else ''
+
+
+def get_solver_name(m):
+    '''
+    Base name of the model's solver, e.g. ``'cplex'`` for ``cplex_direct``.
+    '''
+
+    name = getattr(getattr(m, 'solver', None), 'name', None) or ''
+
+    return name.split('_')[0].lower()
+
+
+def get_solver_log(m):
+    '''
+    Log text of the last solve.
+
+    Reads the solver's log file if it still exists (i.e. within
+    :func:`grimsel.core.model_base.ModelBase.temp_files`), otherwise the
+    captured output of the solver process.
+
+    Returns
+    -------
+    str
+        empty if no log is available
+
+    '''
+
+    solver = getattr(m, 'solver', None)
+    fn = getattr(solver, '_log_file', None)
+
+    if fn and os.path.isfile(fn):
+        with open(fn, 'r', errors='replace') as f:
+            return f.read()
+
+    log = getattr(solver, '_log', None)
+
+    return log if isinstance(log, str) else ''
+
+
+def parse_log(log, solver_name):
+    '''
+    Statistics parsed from the log text of a solve.
+
+    Parameters
+    ----------
+    log : str
+        solver log, e.g. from :func:`get_solver_log`
+    solver_name : str
+        key of ``LOG_PATTERNS``; unknown solvers yield an empty dict
+
+    Returns
+    -------
+    dict
+        values of the columns found in the log
+
+    '''
+
+    dict_stats = {}
+
+    for col, list_alt in LOG_PATTERNS.get(solver_name, {}).items():
+        for pattern, agg in list_alt:
+
+            list_match = re.findall(pattern, log, flags=re.MULTILINE)
+            if not list_match:
+                continue
+
+            if agg == 'join':
+                dict_stats[col] = ', '.join(sorted({match.lower()
+                                                    for match in list_match}))
+            elif agg == 'max':
+                dict_stats[col] = max(float(match) for match in list_match)
+            else:
+                dict_stats[col] = float(list_match[0 if agg == 'first'
+                                                   else -1])
+            break
+
+    return dict_stats
+
+
+def get_results_stats(results):
+    '''
+    Problem size and solver status from a pyomo results object.
+
+    Returns
+    -------
+    dict
+        empty for the pro-forma results of the model ``skip_runs`` option
+
+    '''
+
+    if not hasattr(results, 'solver'):
+        return {}
+
+    problem = results.problem
+    solver = results.solver
+
+    return {'status': _to_str(solver.status),
+            'termination_condition': _to_str(solver.termination_condition),
+            'return_code': _to_float(solver.return_code),
+            'nrows': _to_float(problem.number_of_constraints),
+            'ncols': _to_float(problem.number_of_variables),
+            'nnonzeros': _to_float(problem.number_of_nonzeros)}
+
+
+def get_solver_stats(m, run_id, nattempts=1):
+    '''
+    Statistics of the last solve of a model.
+
+    Must be called before the temporary solver files are removed, i.e.
+    within :func:`grimsel.core.model_base.ModelBase.temp_files`.
+
+    Parameters
+    ----------
+    m : grimsel.core.model_base.ModelBase
+        solved model
+    run_id : int
+        current run
+    nattempts : int
+        number of solve attempts
+        (:class:`grimsel.core.run_control.RetryPolicy`); the statistics are
+        those of the last attempt
+
+    Returns
+    -------
+    pandas.DataFrame
+        single row with columns ``STATS_COLS``
+
+    '''
+
+    solver_name = get_solver_name(m)
+
+    dict_stats = {'run_id': run_id, 'solver': solver_name,
+                  'nattempts': nattempts}
+
+    if not m.skip_runs:
+
+        if resource:
+            # ru_maxrss of the waited-for children, i.e. the solver; kB on
+            # Linux
+            dict_stats['solver_peak_mb'] = (resource.getrusage(
+                                    resource.RUSAGE_CHILDREN).ru_maxrss / 1024)
+        dict_stats['tdiff_wall'] = _to_float(getattr(m.solver,
+                                                     '_last_solve_time',
+                                                     None))
+
+        dict_stats.update({key: val for key, val
+                           in get_results_stats(m.results).items()
+                           if val == val and val != ''})
+        # the solver's own log takes precedence; pyomo doesn't parse the
+        # problem size of all solvers correctly
+        dict_stats.update(parse_log(get_solver_log(m), solver_name))
+
+        logger.info(('Solver statistics: %g rows, %g columns, %g nonzeros; '
+                     '%g iterations, %g barrier iterations')
+                    %tuple(dict_stats.get(key, np.nan) for key
+                           in ('nrows', 'ncols', 'nnonzeros', 'iterations',
+                               'iterations_barrier')))
+
+    dict_stats['worker_rss_mb'] = aux_dtypes.get_rss()
+
+    df = pd.DataFrame([dict_stats]).reindex(columns=STATS_COLS)
+    df[STATS_COLS_STR] = df[STATS_COLS_STR].fillna('')
+    cols_num = [col for col in STATS_COLS if col not in STATS_COLS_STR]
+    df[cols_num] = df[cols_num].astype(float)
+    df['run_id'] = df.run_id.astype(int)
+
+    return df
+
+
+def flag_outliers(df_stats, cols=('iterations', 'iterations_barrier',
+                                  'tdiff_solver', 'tdiff_wall'),
+                  factor=3):
+    '''
+    Runs whose statistics exceed a multiple of their median.
+
+    Parameters
+    ----------
+    df_stats : pandas.DataFrame
+        ``def_solver_stats`` table
+    cols : tuple of str
+        columns to check; columns without values are ignored
+    factor : float
+        threshold relative to the median of each column
+
+    Returns
+    -------
+    pandas.DataFrame
+        rows of the flagged runs and of the runs which didn't terminate
+        optimally, with the column ``flag`` listing the reasons
+
+    '''
+
+    df = df_stats.copy()
+
+    flag = pd.Series('', index=df.index)
+    for col in [col for col in cols if col in df and df[col].notna().any()]:
+        flag += np.where(df[col] > factor * df[col].median(),
+                         '%s > %g x median; '%(col, factor), '')
+
+    flag += np.where(df.termination_condition.isin(['optimal', '']),
+                     '', 'not optimal; ')
+
+    df['flag'] = flag.str.rstrip('; ')
+
+    return df.loc[df.flag != ''].reset_index(drop=True)
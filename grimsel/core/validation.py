@@ -0,0 +1,583 @@
+'''
+Input validation
+=================
+
+Consistency checks of the input tables, performed after reading the input
+data (:func:`grimsel.core.io.IO.read_model_data`), i.e. before the maps,
+time maps, and Pyomo components are initialized. Without these checks,
+inconsistent input data typically only surfaces as ``KeyError`` in the
+constraint rules or---worse---as silently applied default values.
+
+All checks are vectorized table operations. All problems are collected and
+reported together as a table (see :func:`validate_input`):
+
+* ``foreign_key``: ids which don't exist in the referenced definition
+  table, e.g. ``df_plant_encar.pp_id`` not in ``df_def_plant``
+* ``primary_key``: duplicate ids, e.g. two ``df_plant_encar`` rows with the
+  same ``(pp_id, ca_id)``
+* ``profile_id``: pf_ids referenced by the model tables (see
+  :data:`grimsel.core.model_base.PF_REGISTRY`) which are missing in the
+  profile tables or in ``df_def_profile``
+* ``profile``: incomplete profiles: NaN values, hours out of range,
+  duplicate hours, or not exactly :data:`NHOURS_YEAR` hours per profile
+  (number of time slots if the time map is provided as input table)
+* ``coverage``: required rows which are missing, e.g. fuel prices
+  ``df_fuel_node_encar`` of fuel-consuming plants, monthly transmission
+  capacities of node connections, inflow profiles of hydro plants
+* ``range``: values outside their valid range, e.g. negative capacities or
+  storage losses not in ``[0, 1)``; scenario columns (e.g.
+  ``cap_pwr_leg_yr2030``) are included
+* ``monthly_factors``: inconsistent set definitions, missing months, or
+  NaN factors in ``df_parameter_month``
+* ``time_map``: node names in a ``nhours`` dictionary which don't exist
+
+Validation is controlled by the
+:class:`grimsel.core.model_base.ModelBase` keyword argument
+``input_validation`` (disabled by default); in strict mode an
+:class:`InputValidationError` is raised before the model maps are
+initialized.
+
+'''
+
+import numpy as np
+import pandas as pd
+
+import grimsel.core.table_struct as table_struct
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# number of hours of the input profiles
+NHOURS_YEAR = 8760
+
+# maximum number of example values per problem
+NEXAMPLES = 5
+
+# (table, id column, referenced table, referenced column)
+FOREIGN_KEYS = [
+    ('df_def_plant', 'nd_id', 'df_def_node', 'nd_id'),
+    ('df_def_plant', 'fl_id', 'df_def_fuel', 'fl_id'),
+    ('df_def_plant', 'pt_id', 'df_def_pp_type', 'pt_id'),
+    ('df_plant_encar', 'pp_id', 'df_def_plant', 'pp_id'),
+    ('df_plant_encar', 'ca_id', 'df_def_encar', 'ca_id'),
+    ('df_node_encar', 'nd_id', 'df_def_node', 'nd_id'),
+    ('df_node_encar', 'ca_id', 'df_def_encar', 'ca_id'),
+    ('df_fuel_node_encar', 'fl_id', 'df_def_fuel', 'fl_id'),
+    ('df_fuel_node_encar', 'nd_id', 'df_def_node', 'nd_id'),
+    ('df_fuel_node_encar', 'ca_id', 'df_def_encar', 'ca_id'),
+    ('df_node_connect', 'nd_id', 'df_def_node', 'nd_id'),
+    ('df_node_connect', 'nd_2_id', 'df_def_node', 'nd_id'),
+    ('df_node_connect', 'ca_id', 'df_def_encar', 'ca_id'),
+    ('df_node_connect', 'mt_id', 'df_def_month', 'mt_id'),
+    ('df_hydro', 'pp_id', 'df_def_plant', 'pp_id'),
+    ('df_plant_month', 'pp_id', 'df_def_plant', 'pp_id'),
+    ('df_plant_month', 'mt_id', 'df_def_month', 'mt_id'),
+    ('df_plant_week', 'pp_id', 'df_def_plant', 'pp_id'),
+    ('df_profinflow', 'pp_id', 'df_def_plant', 'pp_id'),
+    ('df_profchp', 'nd_id', 'df_def_node', 'nd_id'),
+    ('df_parameter_month', 'mt_id', 'df_def_month', 'mt_id'),
+    ]
+
+# table -> unique index columns
+PRIMARY_KEYS = {'df_def_plant': ['pp_id'],
+                'df_def_node': ['nd_id'],
+                'df_def_fuel': ['fl_id'],
+                'df_def_encar': ['ca_id'],
+                'df_def_pp_type': ['pt_id'],
+                'df_def_month': ['mt_id'],
+                'df_plant_encar': ['pp_id', 'ca_id'],
+                'df_node_encar': ['nd_id', 'ca_id'],
+                'df_fuel_node_encar': ['fl_id', 'nd_id', 'ca_id'],
+                'df_node_connect': ['nd_id', 'nd_2_id', 'ca_id', 'mt_id'],
+                'df_hydro': ['pp_id'],
+                'df_plant_month': ['pp_id', 'mt_id']}
+
+# profile table -> profile id columns
+PROFILE_KEYS = {'df_profdmnd': ['dmnd_pf_id'],
+                'df_profsupply': ['supply_pf_id'],
+                'df_profpricebuy': ['price_pf_id'],
+                'df_profpricesll': ['price_pf_id'],
+                'df_profchp': ['nd_id', 'ca_id'],
+                'df_profinflow': ['pp_id', 'ca_id']}
+
+# (table, column, lower bound, upper bound, closed side as in pd.Interval)
+VALUE_RANGES = [
+    ('df_plant_encar', 'cap_pwr_leg', 0, None, 'both'),
+    ('df_plant_encar', 'discharge_duration', 0, None, 'both'),
+    ('df_plant_encar', 'st_lss_rt', 0, 1, 'left'),
+    ('df_plant_encar', 'st_lss_hr', 0, 1, 'left'),
+    ('df_plant_encar', 'cap_avlb', 0, 1, 'both'),
+    ('df_plant_encar', 'vc_om', 0, None, 'both'),
+    ('df_plant_encar', 'vc_ramp', 0, None, 'both'),
+    ('df_plant_encar', 'fc_om', 0, None, 'both'),
+    ('df_plant_encar', 'fc_cp_ann', 0, None, 'both'),
+    ('df_plant_encar', 'pwr_pot', 0, None, 'both'),
+    ('df_plant_encar', 'erg_chp', 0, None, 'both'),
+    ('df_node_encar', 'grid_losses', 0, 1, 'left'),
+    ('df_fuel_node_encar', 'erg_inp', 0, None, 'both'),
+    ('df_def_fuel', 'co2_int', 0, None, 'both'),
+    ('df_def_node', 'price_co2', 0, None, 'both'),
+    ('df_def_node', 'nd_weight', 0, None, 'neither'),
+    ('df_hydro', 'min_erg_mt_out_share', 0, 1, 'both'),
+    ('df_hydro', 'max_erg_mt_in_share', 0, 1, 'both'),
+    ('df_hydro', 'min_erg_share', 0, 1, 'both'),
+    ('df_node_connect', 'cap_trme_leg', 0, None, 'both'),
+    ('df_node_connect', 'cap_trmi_leg', 0, None, 'both'),
+    ('df_plant_month', 'hyd_erg_bc', 0, 1, 'both'),
+    ('df_parameter_month', 'mt_fact', 0, None, 'both'),
+    ('df_profdmnd', 'value', 0, None, 'both'),
+    ('df_profsupply', 'value', 0, 1, 'both'),
+    ('df_profchp', 'value', 0, None, 'both'),
+    ('df_profinflow', 'value', 0, None, 'both'),
+    ]
+
+PROBLEM_COLS = ['check', 'table', 'column', 'count', 'examples', 'message']
+
+
+class InputValidationError(ValueError):
+    '''
+    Raised by :func:`grimsel.core.model_base.ModelBase.validate_input` in
+    strict mode if the input tables have problems.
+
+    Attributes
+    ----------
+    df_problems : pandas.DataFrame
+        problem table as returned by :func:`validate_input`
+
+    '''
+
+    def __init__(self, df_problems):
+
+        self.df_problems = df_problems
+        super().__init__('Input validation failed with %d problem(s):\n%s'
+                         %(len(df_problems), format_problems(df_problems)))
+
+
+def _get_table(m, name):
+
+    df = getattr(m, name, None)
+    return df if isinstance(df, pd.DataFrame) else None
+
+
+def _examples(values):
+    ''' String representation of the first unique values. '''
+
+    values = pd.unique(np.asarray(values, dtype=object)
+                       if not isinstance(values, pd.Index) else values)
+    str_ex = ', '.join(map(str, values[:NEXAMPLES]))
+    return str_ex + (', ...' if len(values) > NEXAMPLES else '')
+
+
+def _problem(check, table, column, values, message):
+
+    return (check, table, column, len(values), _examples(values), message)
+
+
+def _check_foreign_keys(m):
+
+    list_prob = []
+
+    for tb, col, tb_ref, col_ref in FOREIGN_KEYS:
+
+        df, df_ref = _get_table(m, tb), _get_table(m, tb_ref)
+
+        if df is None or not col in df.columns:
+            continue
+
+        vals_ref = (df_ref[col_ref].values
+                    if df_ref is not None and col_ref in df_ref.columns
+                    else [])
+
+        vals = df[col]
+        # negative ids are placeholders, e.g. mt_id -1 in df_parameter_month
+        mask = ~vals.isin(vals_ref) & vals.notna() & (vals >= 0)
+
+        if mask.any():
+            list_prob.append(_problem('foreign_key', tb, col,
+                                      vals.loc[mask].unique(),
+                                      'ids missing in %s.%s'
+                                      %(tb_ref, col_ref)))
+
+    return list_prob
+
+
+def _check_primary_keys(m):
+
+    list_prob = []
+
+    for tb, cols in PRIMARY_KEYS.items():
+
+        df = _get_table(m, tb)
+
+        if df is None or not set(cols).issubset(df.columns):
+            continue
+
+        mask = df.duplicated(cols)
+
+        if mask.any():
+            keys = (df.loc[mask, cols[0]] if len(cols) == 1
+                    else pd.Index(df.loc[mask, cols].itertuples(index=False,
+                                                                name=None)))
+            list_prob.append(_problem('primary_key', tb, ', '.join(cols),
+                                      pd.unique(keys), 'duplicate keys'))
+
+    return list_prob
+
+
+def _check_profile_ids(m):
+
+    from grimsel.core.model_base import PF_PROFILE_TABLES
+
+    list_prob = []
+
+    df_def_profile = _get_table(m, 'df_def_profile')
+
+    for name, df_reg in getattr(m, 'pf_registry', {}).items():
+
+        if df_reg.empty:
+            continue
+
+        tb_prof, col = PF_PROFILE_TABLES[name]
+        df_prof = _get_table(m, tb_prof)
+
+        for tb, df, col in [(tb_prof, df_prof, col),
+                            ('df_def_profile', df_def_profile, 'pf_id')]:
+
+            vals = df[col].values if df is not None else []
+            mask = ~df_reg.pf_id.isin(vals)
+
+            if mask.any():
+                list_prob.append(_problem('profile_id', tb, col,
+                                          df_reg.pf_id.loc[mask].unique(),
+                                          '%s pf_ids referenced by the model '
+                                          'tables are missing'%name))
+
+    return list_prob
+
+
+def _check_profiles(m):
+
+    list_prob = []
+
+    df_tm_soy = _get_table(m, 'df_tm_soy')
+    nhy = len(df_tm_soy) if df_tm_soy is not None else NHOURS_YEAR
+
+    for tb, cols in PROFILE_KEYS.items():
+
+        df = _get_table(m, tb)
+
+        if df is None or not set(cols + ['hy', 'value']).issubset(df.columns):
+            continue
+
+        def get_keys(mask):
+            keys = df.loc[mask, cols]
+            return (keys[cols[0]].unique() if len(cols) == 1 else
+                    pd.unique(pd.Index(keys.itertuples(index=False,
+                                                       name=None))))
+
+        mask_nan = df.value.isna().values
+        if mask_nan.any():
+            list_prob.append(_problem('profile', tb, 'value',
+                                      get_keys(mask_nan),
+                                      'profiles with NaN values'))
+
+        mask_rng = ((df.hy < 0) | (df.hy >= nhy)).values
+        if mask_rng.any():
+            list_prob.append(_problem('profile', tb, 'hy',
+                                      get_keys(mask_rng),
+                                      'profiles with hours outside [0, %d)'
+                                      %nhy))
+
+        mask_dup = df.duplicated(cols + ['hy']).values
+        if mask_dup.any():
+            list_prob.append(_problem('profile', tb, 'hy',
+                                      get_keys(mask_dup),
+                                      'profiles with duplicate hours'))
+
+        nrows = df.loc[~(mask_rng | mask_dup)].groupby(cols).size()
+        nrows = nrows.loc[nrows != nhy]
+        if not nrows.empty:
+            list_prob.append(_problem('profile', tb, 'hy', nrows.index,
+                                      'profiles without exactly %d hours'
+                                      %nhy))
+
+    return list_prob
+
+
+def _get_plant_encar(m):
+    ''' Plant/energy carrier table with efficiencies and plant definitions. '''
+
+    df_pp, df_ppca = _get_table(m, 'df_def_plant'), _get_table(m,
+                                                             'df_plant_encar')
+
+    if df_pp is None or df_ppca is None:
+        return None
+
+    cols = [c for c in ['pp_id', 'ca_id', 'pp_eff'] if c in df_ppca.columns]
+
+    return df_ppca[cols].join(df_pp.set_index('pp_id'), on='pp_id')
+
+
+def _check_coverage(m):
+
+    list_prob = []
+
+    df_ppca = _get_plant_encar(m)
+
+    # fuel prices of fuel-consuming plants
+    df_fnc = _get_table(m, 'df_fuel_node_encar')
+    df_fl = _get_table(m, 'df_def_fuel')
+    if (df_ppca is not None and df_fl is not None
+            and 'set_def_pp' in df_ppca.columns):
+
+        list_fl_ca = (df_fl.loc[df_fl.is_ca == 1, 'fl_id']
+                      if 'is_ca' in df_fl.columns else [])
+        df = df_ppca.loc[(df_ppca.set_def_pp == 1)
+                         & df_ppca.fl_id.isin(df_fl.fl_id)
+                         & ~df_ppca.fl_id.isin(list_fl_ca)]
+        cols = ['fl_id', 'nd_id', 'ca_id']
+        idx = pd.MultiIndex.from_frame(df[cols])
+        idx_ref = (pd.MultiIndex.from_frame(df_fnc[cols])
+                   if df_fnc is not None else pd.MultiIndex.from_tuples(
+                                                        [], names=cols))
+        mask = ~idx.isin(idx_ref)
+
+        if mask.any():
+            list_prob.append(_problem('coverage', 'df_fuel_node_encar',
+                                      ', '.join(cols), df.pp.values[mask],
+                                      'plants consuming fuels without '
+                                      'fuel_node_encar row (fuel price, '
+                                      'energy input)'))
+
+    # inflow profiles of hydro and run-of-river plants, chp profiles
+    for set_def, tb, cols in [('set_def_hyrs', 'df_profinflow',
+                               ['pp_id', 'ca_id']),
+                              ('set_def_ror', 'df_profinflow',
+                               ['pp_id', 'ca_id']),
+                              ('set_def_chp', 'df_profchp',
+                               ['nd_id', 'ca_id'])]:
+
+        if df_ppca is None or not set_def in df_ppca.columns:
+            continue
+
+        df = df_ppca.loc[df_ppca[set_def] == 1]
+        df_prof = _get_table(m, tb)
+        idx = pd.MultiIndex.from_frame(df[cols])
+        idx_ref = (pd.MultiIndex.from_frame(df_prof[cols].drop_duplicates())
+                   if df_prof is not None
+                   else pd.MultiIndex.from_tuples([], names=cols))
+        mask = ~idx.isin(idx_ref)
+
+        if mask.any():
+            list_prob.append(_problem('coverage', tb, ', '.join(cols),
+                                      df.pp.values[mask],
+                                      'plants of set %s without profile'
+                                      %set_def.replace('set_def_', '')))
+
+    # monthly transmission capacities
+    df_ndcnn = _get_table(m, 'df_node_connect')
+    df_mt = _get_table(m, 'df_def_month')
+    if (df_ndcnn is not None and df_mt is not None
+            and 'mt_id' in df_ndcnn.columns and not df_ndcnn.empty):
+
+        cols = ['nd_id', 'nd_2_id', 'ca_id']
+        nmt = (df_ndcnn.loc[df_ndcnn.mt_id.isin(df_mt.mt_id)]
+                       .drop_duplicates(cols + ['mt_id'])
+                       .groupby(cols).size())
+        nmt = nmt.reindex(pd.MultiIndex.from_frame(
+                    df_ndcnn[cols].drop_duplicates()), fill_value=0)
+        nmt = nmt.loc[nmt < len(df_mt)]
+
+        if not nmt.empty:
+            list_prob.append(_problem('coverage', 'df_node_connect',
+                                      'mt_id', nmt.index,
+                                      'node connections without '
+                                      'transmission capacities for all '
+                                      'months'))
+
+    return list_prob
+
+
+def _check_plant_efficiency(m):
+    ''' Efficiencies of fuel-consuming plants with constant supply curves. '''
+
+    df = _get_plant_encar(m)
+
+    if (df is None or not 'set_def_pp' in df.columns
+            or not 'pp_eff' in df.columns):
+        return []
+
+    mask = df.set_def_pp == 1
+    if 'set_def_lin' in df.columns:
+        mask &= df.set_def_lin != 1
+    mask &= df.pp_eff.notna() & (df.pp_eff <= 0)
+
+    if not mask.any():
+        return []
+
+    return [_problem('range', 'df_plant_encar', 'pp_eff',
+                     df.pp.loc[mask].values,
+                     'efficiencies of non-linear plants not > 0')]
+
+
+def _check_value_ranges(m):
+
+    list_prob = []
+
+    for tb, col, lower, upper, closed in VALUE_RANGES:
+
+        df = _get_table(m, tb)
+
+        if df is None:
+            continue
+
+        # include scenario columns, e.g. cap_pwr_leg_yr2030
+        list_col = [c for c in df.columns
+                    if c == col or c.startswith(col + '_yr')]
+
+        for c in list_col:
+
+            vals = pd.to_numeric(df[c], errors='coerce')
+            mask = pd.Series(False, index=df.index)
+
+            if lower is not None:
+                mask |= ((vals < lower) if closed in ('both', 'left')
+                         else (vals <= lower))
+            if upper is not None:
+                mask |= ((vals > upper) if closed in ('both', 'right')
+                         else (vals >= upper))
+
+            if mask.any():
+                str_int = '%s%s, %s%s'%('[' if closed in ('both', 'left')
+                                        else '(',
+                                        lower if lower is not None
+                                        else '-inf',
+                                        upper if upper is not None
+                                        else 'inf',
+                                        ']' if closed in ('both', 'right')
+                                        else ')')
+                list_prob.append(_problem('range', tb, c,
+                                          vals.loc[mask].unique(),
+                                          'values outside %s'%str_int))
+
+    return list_prob + _check_plant_efficiency(m)
+
+
+def _check_monthly_factors(m):
+
+    df = _get_table(m, 'df_parameter_month')
+    df_mt = _get_table(m, 'df_def_month')
+
+    if df is None or df.empty:
+        return []
+
+    list_prob = []
+
+    name_cols = [c for c in df.columns if c.endswith('_name')]
+    id_cols = [c.replace('_name', '_id') for c in name_cols]
+
+    # one set group per parameter
+    nsets = df[['parameter'] + name_cols].drop_duplicates().parameter
+    nsets = nsets.loc[nsets.duplicated()].unique()
+    if len(nsets):
+        list_prob.append(_problem('monthly_factors', 'df_parameter_month',
+                                  ', '.join(name_cols), nsets,
+                                  'parameters with more than one set group'))
+
+    # parameters without output index definition
+    list_par = [par for par in df.parameter.unique()
+                if not par in table_struct.DICT_COMP_IDX]
+    if list_par:
+        list_prob.append(_problem('monthly_factors', 'df_parameter_month',
+                                  'parameter', list_par,
+                                  'unknown parameters'))
+
+    # all months of the model are required since the monthly parameters
+    # are indexed by the months of the df_parameter_month table
+    if df_mt is not None:
+        list_mt = sorted(set(df_mt.mt_id) - set(df.mt_id))
+        if list_mt:
+            list_prob.append(_problem('monthly_factors',
+                                      'df_parameter_month', 'mt_id', list_mt,
+                                      'months without any monthly factors'))
+
+    # months missing for single keys are silently filled with factor 1
+    cols = ['parameter'] + [c for c in id_cols if c in df.columns]
+    nmt_all = df.mt_id.nunique()
+    nmt = df.drop_duplicates(cols + ['mt_id']).groupby(cols).size()
+    nmt = nmt.loc[nmt < nmt_all]
+    if not nmt.empty:
+        list_prob.append(_problem('monthly_factors', 'df_parameter_month',
+                                  ', '.join(cols), nmt.index,
+                                  'keys with factors for fewer than %d '
+                                  'months'%nmt_all))
+
+    if 'mt_fact' in df.columns and df.mt_fact.isna().any():
+        list_prob.append(_problem('monthly_factors', 'df_parameter_month',
+                                  'mt_fact',
+                                  df.loc[df.mt_fact.isna(),
+                                         'parameter'].unique(),
+                                  'parameters with NaN factors'))
+
+    return list_prob
+
+
+def _check_time_map(m):
+
+    df_nd = _get_table(m, 'df_def_node')
+
+    if not isinstance(m.nhours, dict) or df_nd is None:
+        return []
+
+    list_nd = [nd for nd in m.nhours if not nd in set(df_nd.nd)]
+
+    if not list_nd:
+        return []
+
+    return [_problem('time_map', 'df_def_node', 'nd', list_nd,
+                     'nodes of the nhours dictionary not in the model')]
+
+
+def validate_input(m):
+    '''
+    Performs all input data checks.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance with the input tables, i.e. after
+        :func:`grimsel.core.io.IO.read_model_data`
+
+    Returns
+    -------
+    pandas.DataFrame
+        one row per problem with the columns
+
+        * *check*: check category, see module docstring
+        * *table*, *column*: problematic table and column(s)
+        * *count*: number of affected ids or values
+        * *examples*: the first affected ids or values
+        * *message*: description
+
+    '''
+
+    list_prob = (_check_foreign_keys(m)
+                 + _check_primary_keys(m)
+                 + _check_profile_ids(m)
+                 + _check_profiles(m)
+                 + _check_coverage(m)
+                 + _check_value_ranges(m)
+                 + _check_monthly_factors(m)
+                 + _check_time_map(m))
+
+    return pd.DataFrame(list_prob, columns=PROBLEM_COLS)
+
+
+def format_problems(df_problems):
+    ''' Returns a string with one problem per line. '''
+
+    return '\n'.join('* [%s] %s.%s: %s (%d): %s'
+                     %(row.check, row.table, row.column, row.message,
+                       row.count, row.examples)
+                     for row in df_problems.itertuples())
@@ -45,39 +45,48 @@ class Variables:
 
 
 
+    def get_variable_specs(self):
+        '''
+        Returns the list of variable specifications.
+
+        Each item is a ``Var(name, sets, bounds)`` namedtuple; the sets
+        are evaluated from the current model set attributes.
+
+        '''
+
+        Var = namedtuple('Var', ['name', 'sets', 'bounds'])
+
+        return [Var('pwr', self.sy_ppall_ca, None),
+                Var('pwr_ramp', self.sy_rp_ca, (None, None)),
+                Var('pwr_ramp_abs', self.sy_rp_ca, None),
+                Var('pwr_st_ch', self.sy_st_ca, None),
+                Var('erg_st', self.sy_st_ca | self.sy_hyrs_ca, None),
+
+                Var('trm', self.symin_ndcnn, (None, None)),
+                Var('erg_mt', (self.mt, self.hyrs_ca), None),
+                Var('erg_fl_yr', self.ppall_ndcafl, None),
+                Var('erg_yr', self.ppall_ca, None),
+                Var('pwr_ramp_yr', self.rp_ca, None),
+
+                Var('vc_fl_pp_yr', self.ppall_cafl - self.lin_cafl, (None, None)),
+                Var('vc_om_pp_yr', self.ppall_ca, None),
+                Var('fc_om_pp_yr', self.ppall_ca, None),
+                Var('fc_cp_pp_yr', self.add_ca, None),
+                Var('vc_co2_pp_yr', self.pp_ca, None),
+                Var('vc_ramp_yr', self.rp_ca, None),
+                Var('cap_pwr_tot', self.ppall_ca, None),
+                Var('cap_pwr_new', self.add_ca, None),
+                Var('cap_pwr_rem', self.rem_ca, None),
+                Var('cap_erg_tot', self.st_ca | self.hyrs_ca, None),
+                ]
+
     def define_variables(self):
         r'''
         Adds all variables to the model instance by calling :func:`vadd`.
 
         '''
 
-        Var = namedtuple('Var', ['name', 'sets', 'bounds'])
-
-        vars_ = [Var('pwr', self.sy_ppall_ca, None),
-                 Var('pwr_ramp', self.sy_rp_ca, (None, None)),
-                 Var('pwr_ramp_abs', self.sy_rp_ca, None),
-                 Var('pwr_st_ch', self.sy_st_ca, None),
-                 Var('erg_st', self.sy_st_ca | self.sy_hyrs_ca, None),
-
-                 Var('trm', self.symin_ndcnn, (None, None)),
-                 Var('erg_mt', (self.mt, self.hyrs_ca), None),
-                 Var('erg_fl_yr', self.ppall_ndcafl, None),
-                 Var('erg_yr', self.ppall_ca, None),
-                 Var('pwr_ramp_yr', self.rp_ca, None),
-
-                 Var('vc_fl_pp_yr', self.ppall_cafl - self.lin_cafl, (None, None)),
-                 Var('vc_om_pp_yr', self.ppall_ca, None),
-                 Var('fc_om_pp_yr', self.ppall_ca, None),
-                 Var('fc_cp_pp_yr', self.add_ca, None),
-                 Var('vc_co2_pp_yr', self.pp_ca, None),
-                 Var('vc_ramp_yr', self.rp_ca, None),
-                 Var('cap_pwr_tot', self.ppall_ca, None),
-                 Var('cap_pwr_new', self.add_ca, None),
-                 Var('cap_pwr_rem', self.rem_ca, None),
-                 Var('cap_erg_tot', self.st_ca | self.hyrs_ca, None),
-                 ]
-
-        for var in vars_:
+        for var in self.get_variable_specs():
             self.delete_component(var.name)
             self.vadd(var.name, var.sets,
                       var.bounds if var.bounds else (0, None),
@@ -16,11 +16,11 @@ import sys, os, socket
 import pandas as pd
 import numpy as np
 import logging
-from glob import glob
 
 import pyomo.environ as po
 
 from grimsel.core.io import IO
+from grimsel.core.model_loop_modifier import depends_on
 import grimsel.auxiliary.sqlutils.aux_sql_func as aql
 from grimsel.auxiliary.aux_m_func import cols2tuplelist
 import grimsel.auxiliary.maps as maps
@@ -28,7 +28,6 @@ from grimsel import _get_logger
 
 import grimsel_config as config
 
-import multiprocess as mp
 
 logger = _get_logger(__name__)
 logger.setLevel('DEBUG')
@@ -1313,6 +1312,7 @@ class ModelLoopModifier():
 
         self.ml.dct_vl['swfy_vl'] = 'yr' + str(dict_fy[slct_fy])
         
+    @depends_on(swfy=-1)
     def keep_cap_new(self, dict_fy=None): 
         ''' Keep the output capacity for power plants in set add for selected year '''
         
@@ -1372,53 +1372,16 @@ class ModelLoopModifier():
             logger.info(msg)
         
     
-            filt = [(key, [val]) for key, val in self.ml.dct_step.items()
-                 if not key == 'swfy'] + [('swfy', [self.ml.dct_step['swfy'] - 1])]
-               
-            if self.ml.io.modwr.output_target == 'hdf5':
-                qry = ' & '.join(str(f[0] + '=' + '"%s"'%f[1][0]) for f in filt)
-                slct_run_id = pd.read_hdf(self.ml.io.cl_out, 'def_run',
-                                          where=qry,
-                                          columns=['run_id']).run_id.tolist()
-                df_cpn = pd.read_hdf(self.ml.io.cl_out, 'var_yr_cap_pwr_new',
-                                    where='run_id in %s and pp_id in %s'%(str(slct_run_id),str(list_all_add))) #list_sto_arch for stopt
-        
-                df_cpl = pd.read_hdf(self.ml.io.cl_out, 'par_cap_pwr_leg',
-                                    where='run_id in %s and pp_id in %s'%(str(slct_run_id),str(list_all_add)))
-                
-                dict_cpn_add = (df_cpn.set_index(['pp_id', 'ca_id'])['value'] 
-                                + df_cpl.set_index(['pp_id', 'ca_id'])['value']).to_dict()
-                
-            elif self.ml.io.modwr.output_target == 'psql':
-                raise RuntimeError('exogenous_node_ops: Fix nd_weight for psql')
- 
-            elif self.ml.io.modwr.output_target == 'fastparquet':
-                qry = ' & '.join(str(f[0] + '==' + '"%s"'%f[1][0]) for f in filt)
-                
-#                if mp.active_children():
-                if not mp.current_process().name == 'MainProcess':
-                    msg = ('MULTIPROCESSING')
-                    logger.info(msg)
-                    df_def_run = pd.concat([pd.read_csv(fn) for fn in glob(self.ml.io.cl_out + '/def_run*.csv')])
-                
-                else:
-                    msg = ('NO MULTIPROCESSING')
-                    logger.info(msg)
-                    df_def_run= pd.read_parquet(self.ml.io.cl_out + '/def_run.parq')
-                                
-                slct_run_id = df_def_run.query(qry)#.to_list()
-                assert len(slct_run_id) == 1, 'Found multiple run_ids'
-                slct_run_id = slct_run_id.run_id.reset_index(drop=True).get(0)
-                
-                df_cpn = pd.read_parquet(self.ml.io.cl_out + '/var_yr_cap_pwr_new' + '_{:04d}.parq'.format(slct_run_id))
-                df_cpn = df_cpn.loc[df_cpn.pp_id.isin(list_all_add)]
-                                
-                df_cpl = pd.read_parquet(self.ml.io.cl_out + '/par_cap_pwr_leg' + '_{:04d}.parq'.format(slct_run_id))
-                df_cpl = df_cpl.loc[df_cpl.pp_id.isin(list_all_add)]
-
-                
-                dict_cpn_add = (df_cpn.set_index(['pp_id', 'ca_id'])['value'] 
-                                + df_cpl.set_index(['pp_id', 'ca_id'])['value']).to_dict()
-                
+            slct_run_id = self.ml.get_run_id(swfy=-1)
+
+            df_cpn = self.ml.get_run_results('var_yr_cap_pwr_new', slct_run_id)
+            df_cpn = df_cpn.loc[df_cpn.pp_id.isin(list_all_add)]
+
+            df_cpl = self.ml.get_run_results('par_cap_pwr_leg', slct_run_id)
+            df_cpl = df_cpl.loc[df_cpl.pp_id.isin(list_all_add)]
+
+            dict_cpn_add = (df_cpn.set_index(['pp_id', 'ca_id'])['value']
+                            + df_cpl.set_index(['pp_id', 'ca_id'])['value']).to_dict()
+
             for kk, vv in dict_cpn_add.items():
                 self.ml.m.cap_pwr_leg[kk] = vv 
\ No newline at end of file